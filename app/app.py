@@ -1,10 +1,18 @@
 """API Flask para geração de mapas mentais."""
 import logging
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, send_file
 from werkzeug.exceptions import HTTPException
 from service import MapaService
 from cleaner import CleanupService
+from warmer import Aquecedor
 from config import Config
+from metrics import REGISTRY, REQUESTS, CONTENT_TYPE, registrar_gauges
+from synapsis.codec import CONTENT_TYPE as TREE_CONTENT_TYPE
+from perfis import PERFIS
+from documentacao import documentacao
+from ratelimit import criar_rate_limiter, identificar_cliente, ip_do_cliente
+from idempotency import criar_idempotencia
+from requisicoes import Geracao
 
 # Configurar logging
 logging.basicConfig(
@@ -19,7 +27,10 @@ app.config['JSON_SORT_KEYS'] = False
 
 # Serviço
 service = MapaService()
-cleaner = CleanupService()
+cleaner = CleanupService(storage=service.storage)
+aquecedor = Aquecedor(service)
+geracao = Geracao(service, criar_rate_limiter(), criar_idempotencia())
+registrar_gauges(service)
 
 
 # ============================================================================
@@ -55,6 +66,14 @@ def handle_exception(error):
     return jsonify({"erro": "Erro ao processar requisição"}), 500
 
 
+@app.after_request
+def contar_requisicao(response):
+    """Conta requisições por rota (padrão, não a URL) e status."""
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+    REQUESTS.inc(rota, str(response.status_code))
+    return response
+
+
 # ============================================================================
 # Rotas da API
 # ============================================================================
@@ -66,62 +85,77 @@ def saude():
     Returns:
         Status da aplicação
     """
-    stats = service.obter_stats()
     return jsonify({
         "status": "ok",
         "versao": "1.0",
-        "stats": stats
+        "stats": _stats()
     }), 200
 
 
+def _stats() -> dict:
+    """Estatísticas do serviço e do aquecedor."""
+    stats = service.obter_stats()
+    stats["aquecedor"] = aquecedor.obter_status()
+    return stats
+
+
 @app.route("/api/gerar", methods=["POST"])
 def gerar():
     """Gera um novo mapa mental.
     
     Recebe:
         {
-            "tema": "seu tema aqui"
+            "tema": "seu tema aqui",
+            "perfil": "rapido",         (opcional, ver /api/perfis)
+            "prioridade": "lote"        (opcional: interativo, lote, fundo)
         }
+        
+    O cliente é a chave do header X-API-Key (se estiver em API_KEYS) ou o
+    IP: limite de taxa, cota diária e fila justa são por cliente. Acima do
+    limite retorna 429 e, com a fila da prioridade cheia, 503, ambos com
+    Retry-After.
+    
+    Com o header Idempotency-Key, repetições da mesma requisição recebem a
+    resposta da primeira (Idempotent-Replayed: true) em vez de gerar outro
+    mapa; enquanto a primeira não termina, 409 com Retry-After; a mesma
+    chave com outro corpo, 422 (ver idempotency.py).
     
     Retorna:
         {
             "id": "uuid",
             "tema": "...",
+            "perfil": "rapido",
             "arquivo": "...",
             "criado": "2026-02-04T...",
             "links": {
                 "preview": "/api/preview/id",
                 "download": "/api/download/id",
-                "info": "/api/info/id"
+                "info": "/api/info/id",
+                "arvore": "/api/arvore/id",
+                "svg": "/api/svg/id"
             }
         }
     """
-    try:
-        dados = request.get_json()
+    corpo, status, headers = geracao.gerar(
+        request.get_json(), _cliente(), request.headers.get("Idempotency-Key")
+    )
+    return jsonify(corpo), status, headers
         
-        if not dados or "tema" not in dados:
-            return jsonify({"erro": "Campo 'tema' obrigatório"}), 400
         
-        tema = dados["tema"]
-        map_id, map_info = service.gerar_mapa(tema)
+def _cliente() -> str:
+    """Identificador do cliente: chave de API conhecida (X-API-Key) ou IP."""
+    ip = ip_do_cliente(request.remote_addr, request.headers.getlist("X-Forwarded-For"))
+    return identificar_cliente(request.headers.get("X-API-Key"), ip)
         
-        return jsonify({
-            "id": map_id,
-            "tema": map_info["tema"],
-            "arquivo": map_info["arquivo"],
-            "tamanho": map_info["tamanho"],
-            "criado": map_info["criado"],
-            "links": {
-                "preview": f"/api/preview/{map_id}",
-                "download": f"/api/download/{map_id}",
-                "info": f"/api/info/{map_id}"
-            }
-        }), 201
     
-    except ValueError as e:
-        return jsonify({"erro": str(e)}), 400
-    except RuntimeError as e:
-        return jsonify({"erro": str(e)}), 500
+@app.route("/api/perfis", methods=["GET"])
+def perfis():
+    """Lista os perfis de geração.
+    
+    Retorna:
+        Perfis com modelo, limites e meta de latência, e o perfil padrão
+    """
+    return jsonify({"padrao": Config.PERFIL_PADRAO, "perfis": PERFIS}), 200
 
 
 @app.route("/api/info/<map_id>", methods=["GET"])
@@ -160,6 +194,35 @@ def listar():
         return jsonify({"erro": str(e)}), 500
 
 
+def _enviar_mapa(map_id: str, download_name: str = None) -> Response:
+    """Envia o HTML de um mapa a partir do blob store.
+    
+    Blobs locais usam send_file (sendfile do SO); os demais são
+    transmitidos em chunks, sem carregar o arquivo inteiro em memória.
+    """
+    key = service.obter_arquivo(map_id)
+    blobs = service.storage.blobs
+    service.registrar_acesso(map_id)
+    
+    filepath = blobs.local_path(key)
+    if filepath is not None:
+        return send_file(
+            filepath,
+            as_attachment=download_name is not None,
+            download_name=download_name,
+            mimetype="text/html"
+        )
+    
+    headers = {}
+    tamanho = blobs.size(key)
+    if tamanho is not None:
+        headers["Content-Length"] = str(tamanho)
+    if download_name:
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    
+    return Response(blobs.iter_chunks(key), mimetype="text/html", headers=headers)
+
+
 @app.route("/api/preview/<map_id>", methods=["GET"])
 def preview(map_id):
     """Visualiza um mapa (serve o HTML).
@@ -168,9 +231,8 @@ def preview(map_id):
         Arquivo HTML do mapa
     """
     try:
-        filepath = service.obter_arquivo(map_id)
-        return send_file(filepath, mimetype="text/html")
-    except ValueError as e:
+        return _enviar_mapa(map_id)
+    except (ValueError, KeyError) as e:
         return jsonify({"erro": str(e)}), 404
 
 
@@ -182,15 +244,65 @@ def download(map_id):
         Arquivo HTML para download
     """
     try:
-        filepath = service.obter_arquivo(map_id)
-        return send_file(
-            filepath,
-            as_attachment=True,
-            download_name=f"mapa_mental_{map_id}.html",
-            mimetype="text/html"
-        )
+        return _enviar_mapa(map_id, download_name=f"mapa_mental_{map_id}.html")
+    except (ValueError, KeyError) as e:
+        return jsonify({"erro": str(e)}), 404
+
+
+@app.route("/api/arvore/<map_id>", methods=["GET"])
+def arvore(map_id):
+    """Obtém a árvore de um mapa.
+    
+    Query params:
+        formato: json (default), compacto (colunar) ou binario
+            (application/x-synapsis-tree, ver synapsis.codec)
+            
+    Retorna:
+        Árvore do mapa no formato pedido
+    """
+    formato = request.args.get("formato", "json")
+    if formato not in service.FORMATOS_ARVORE:
+        return jsonify({"erro": f"Formato inválido: {formato}"}), 400
+    
+    try:
+        dados = service.obter_arvore(map_id, formato)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 404
+    
+    service.registrar_acesso(map_id)
+    if formato == "binario":
+        return Response(dados, mimetype=TREE_CONTENT_TYPE)
+    return jsonify(dados), 200
+
+
+def _enviar_svg(map_id: str, miniatura: bool = False) -> Response:
+    try:
+        dados = service.obter_svg(map_id, miniatura)
     except ValueError as e:
         return jsonify({"erro": str(e)}), 404
+    
+    service.registrar_acesso(map_id)
+    return Response(dados, mimetype="image/svg+xml")
+
+
+@app.route("/api/svg/<map_id>", methods=["GET"])
+def svg(map_id):
+    """Obtém o desenho estático de um mapa (layout calculado na geração).
+    
+    Retorna:
+        SVG do mapa
+    """
+    return _enviar_svg(map_id)
+
+
+@app.route("/api/miniatura/<map_id>", methods=["GET"])
+def miniatura(map_id):
+    """Obtém a miniatura de um mapa (primeiros níveis, sem texto).
+    
+    Retorna:
+        SVG da miniatura
+    """
+    return _enviar_svg(map_id, miniatura=True)
 
 
 @app.route("/api/deletar/<map_id>", methods=["DELETE"])
@@ -218,12 +330,17 @@ def stats():
         Estatísticas gerais
     """
     try:
-        stats_data = service.obter_stats()
-        return jsonify(stats_data), 200
+        return jsonify(_stats()), 200
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Métricas no formato de exposição do Prometheus."""
+    return Response(REGISTRY.expose(), content_type=CONTENT_TYPE)
+
+
 # ============================================================================
 # Rotas da UI
 # ============================================================================
@@ -241,29 +358,7 @@ def index():
 @app.route("/docs", methods=["GET"])
 def docs():
     """Retorna documentação da API."""
-    return jsonify({
-        "nome": "API Mapas Mentais",
-        "versao": "1.0",
-        "descricao": "API para gerar mapas mentais usando IA",
-        "base_url": request.host_url.rstrip("/"),
-        "endpoints": {
-            "GET /api/saude": "Verifica saúde da API",
-            "POST /api/gerar": "Gera novo mapa mental",
-            "GET /api/info/<id>": "Obtém info de um mapa",
-            "GET /api/listar": "Lista todos os mapas",
-            "GET /api/preview/<id>": "Visualiza um mapa",
-            "GET /api/download/<id>": "Faz download de um mapa",
-            "DELETE /api/deletar/<id>": "Deleta um mapa",
-            "GET /api/stats": "Obtém estatísticas",
-            "GET /docs": "Documentação da API"
-        },
-        "exemplo_gerar": {
-            "metodo": "POST",
-            "url": "/api/gerar",
-            "headers": {"Content-Type": "application/json"},
-            "body": {"tema": "Inteligência Artificial"}
-        }
-    }), 200
+    return jsonify(documentacao(request.host_url)), 200
 
 
 if __name__ == "__main__":
@@ -272,8 +367,11 @@ if __name__ == "__main__":
     # Iniciar serviço de limpeza
     cleaner.iniciar(intervalo_minutos=5)
     logger.info("Serviço de limpeza automática ativado (a cada 5 minutos)")
+    aquecedor.iniciar()
     
     try:
         app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
     finally:
+        aquecedor.parar()
         cleaner.parar()
+        service.acessos.flush()
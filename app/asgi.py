@@ -0,0 +1,276 @@
+"""API ASGI (Starlette) para geração de mapas mentais.
+
+Mesmas rotas e respostas de ``app.py``, servidas por um event loop:
+``/api/gerar`` aguarda a LLM sem ocupar uma thread por requisição e
+``/api/preview``/``/api/download`` usam FileResponse (sendfile quando
+o servidor suporta) ou streaming em chunks. Rotas síncronas (acesso
+a metadados e blob store) rodam no threadpool do Starlette.
+
+Uso:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import logging
+from pathlib import Path
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.middleware import Middleware
+from starlette.routing import Route
+from service import MapaService
+from cleaner import CleanupService
+from warmer import Aquecedor
+from metrics import REGISTRY, REQUESTS, CONTENT_TYPE, registrar_gauges
+from synapsis.codec import CONTENT_TYPE as TREE_CONTENT_TYPE
+from config import Config
+from perfis import PERFIS
+from documentacao import documentacao
+from ratelimit import criar_rate_limiter, identificar_cliente, ip_do_cliente
+from idempotency import criar_idempotencia
+from requisicoes import Geracao
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+service = MapaService()
+cleaner = CleanupService(storage=service.storage)
+aquecedor = Aquecedor(service)
+geracao = Geracao(service, criar_rate_limiter(), criar_idempotencia())
+registrar_gauges(service)
+
+
+def saude(request: Request):
+    """Verifica saúde da API."""
+    return JSONResponse({
+        "status": "ok",
+        "versao": "1.0",
+        "stats": _stats()
+    })
+
+
+def _stats() -> dict:
+    """Estatísticas do serviço e do aquecedor."""
+    stats = service.obter_stats()
+    stats["aquecedor"] = aquecedor.obter_status()
+    return stats
+
+
+async def gerar(request: Request):
+    """Gera um novo mapa mental (ver app.gerar)."""
+    try:
+        dados = await request.json()
+    except ValueError:
+        dados = None
+    
+    corpo, status, headers = await geracao.gerar_async(
+        dados, _cliente(request), request.headers.get("idempotency-key")
+    )
+    return JSONResponse(corpo, status_code=status, headers=headers)
+
+
+def _cliente(request: Request) -> str:
+    """Identificador do cliente: chave de API conhecida (X-API-Key) ou IP."""
+    remoto = request.client.host if request.client else None
+    ip = ip_do_cliente(remoto, request.headers.getlist("x-forwarded-for"))
+    return identificar_cliente(request.headers.get("x-api-key"), ip)
+
+
+def perfis(request: Request):
+    """Lista os perfis de geração."""
+    return JSONResponse({"padrao": Config.PERFIL_PADRAO, "perfis": PERFIS})
+
+
+def obter_info(request: Request):
+    """Obtém informações de um mapa."""
+    try:
+        return JSONResponse(service.obter_mapa(request.path_params["map_id"]))
+    except ValueError as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+
+
+def listar(request: Request):
+    """Lista mapas salvos."""
+    try:
+        limite = int(request.query_params.get("limite", 50))
+    except ValueError:
+        limite = 50
+    
+    mapas = service.listar_mapas(limite=limite)
+    return JSONResponse({"total": len(mapas), "mapas": mapas})
+
+
+def _enviar_mapa(map_id: str, download_name: str = None):
+    """Envia o HTML de um mapa a partir do blob store (ver app._enviar_mapa)."""
+    key = service.obter_arquivo(map_id)
+    blobs = service.storage.blobs
+    service.registrar_acesso(map_id)
+    
+    filepath = blobs.local_path(key)
+    if filepath is not None:
+        return FileResponse(
+            filepath,
+            media_type="text/html",
+            filename=download_name,
+            content_disposition_type="attachment" if download_name else "inline"
+        )
+    
+    headers = {}
+    tamanho = blobs.size(key)
+    if tamanho is not None:
+        headers["Content-Length"] = str(tamanho)
+    if download_name:
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+    
+    # Iterador síncrono: o Starlette consome em threadpool
+    return StreamingResponse(blobs.iter_chunks(key), media_type="text/html", headers=headers)
+
+
+def preview(request: Request):
+    """Visualiza um mapa (serve o HTML)."""
+    try:
+        return _enviar_mapa(request.path_params["map_id"])
+    except (ValueError, KeyError) as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+
+
+def download(request: Request):
+    """Faz download de um mapa."""
+    map_id = request.path_params["map_id"]
+    try:
+        return _enviar_mapa(map_id, download_name=f"mapa_mental_{map_id}.html")
+    except (ValueError, KeyError) as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+
+
+def arvore(request: Request):
+    """Obtém a árvore de um mapa (?formato=json|compacto|binario)."""
+    map_id = request.path_params["map_id"]
+    formato = request.query_params.get("formato", "json")
+    if formato not in service.FORMATOS_ARVORE:
+        return JSONResponse({"erro": f"Formato inválido: {formato}"}, status_code=400)
+    
+    try:
+        dados = service.obter_arvore(map_id, formato)
+    except ValueError as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+    
+    service.registrar_acesso(map_id)
+    if formato == "binario":
+        return Response(dados, media_type=TREE_CONTENT_TYPE)
+    return JSONResponse(dados)
+
+
+def _enviar_svg(map_id: str, miniatura: bool = False):
+    try:
+        dados = service.obter_svg(map_id, miniatura)
+    except ValueError as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+    
+    service.registrar_acesso(map_id)
+    return Response(dados, media_type="image/svg+xml")
+
+
+def svg(request: Request):
+    """Obtém o desenho estático de um mapa (layout calculado na geração)."""
+    return _enviar_svg(request.path_params["map_id"])
+
+
+def miniatura(request: Request):
+    """Obtém a miniatura de um mapa (primeiros níveis, sem texto)."""
+    return _enviar_svg(request.path_params["map_id"], miniatura=True)
+
+
+def deletar(request: Request):
+    """Deleta um mapa."""
+    map_id = request.path_params["map_id"]
+    try:
+        service.deletar_mapa(map_id)
+    except ValueError as e:
+        return JSONResponse({"erro": str(e)}, status_code=404)
+    return JSONResponse({"id": map_id, "status": "deletado com sucesso"})
+
+
+def stats(request: Request):
+    """Obtém estatísticas da aplicação."""
+    return JSONResponse(_stats())
+
+
+def metrics(request: Request):
+    """Métricas no formato de exposição do Prometheus."""
+    return Response(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+
+def index(request: Request):
+    """Retorna página principal."""
+    return FileResponse(Path(__file__).parent / "index.html", media_type="text/html")
+
+
+def docs(request: Request):
+    """Retorna documentação da API."""
+    return JSONResponse(documentacao(str(request.base_url)))
+
+
+class MetricsMiddleware:
+    """Conta requisições por rota (padrão, não a URL) e status."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        status = []
+        
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # O roteador grava a rota encontrada no próprio scope
+            route = scope.get("route")
+            rota = route.path if route is not None else "desconhecida"
+            REQUESTS.inc(rota, str(status[0] if status else 500))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Inicia e para a limpeza e o aquecedor junto com a aplicação.
+    
+    Com vários workers, só o líder eleito de cada um executa.
+    """
+    cleaner.iniciar(intervalo_minutos=5, lider=True)
+    aquecedor.iniciar(lider=True)
+    try:
+        yield
+    finally:
+        aquecedor.parar()
+        cleaner.parar()
+        service.acessos.flush()
+
+
+routes = [
+    Route("/api/saude", saude, methods=["GET"]),
+    Route("/api/gerar", gerar, methods=["POST"]),
+    Route("/api/perfis", perfis, methods=["GET"]),
+    Route("/api/info/{map_id}", obter_info, methods=["GET"]),
+    Route("/api/listar", listar, methods=["GET"]),
+    Route("/api/preview/{map_id}", preview, methods=["GET"]),
+    Route("/api/download/{map_id}", download, methods=["GET"]),
+    Route("/api/arvore/{map_id}", arvore, methods=["GET"]),
+    Route("/api/svg/{map_id}", svg, methods=["GET"]),
+    Route("/api/miniatura/{map_id}", miniatura, methods=["GET"]),
+    Route("/api/deletar/{map_id}", deletar, methods=["DELETE"]),
+    Route("/api/stats", stats, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/", index, methods=["GET"]),
+    Route("/docs", docs, methods=["GET"]),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan, middleware=[Middleware(MetricsMiddleware)])
@@ -0,0 +1,87 @@
+"""Benchmark do layout de diretórios: plano vs sharded.
+
+Mede criação, lookup (stat), listagem e deleção de N arquivos
+em um diretório temporário.
+
+Uso:
+    python bench_shards.py [--n 1000000] [--depth 2] [--amostra 10000]
+"""
+import os
+import time
+import uuid
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from storage import shard_key
+
+
+def _cronometrar(func) -> float:
+    inicio = time.perf_counter()
+    func()
+    return time.perf_counter() - inicio
+
+
+def bench_layout(base: Path, ids: list, depth: int, amostra: int) -> dict:
+    """Executa o benchmark para um layout (depth=0 é o layout plano)."""
+    caminhos = [base / shard_key(map_id, depth) for map_id in ids]
+    conteudo = b"<html></html>"
+    
+    def criar():
+        for caminho in caminhos:
+            try:
+                caminho.write_bytes(conteudo)
+            except FileNotFoundError:
+                caminho.parent.mkdir(parents=True, exist_ok=True)
+                caminho.write_bytes(conteudo)
+    
+    def buscar():
+        for caminho in random.sample(caminhos, min(amostra, len(caminhos))):
+            caminho.stat()
+    
+    def listar():
+        for _root, _dirs, _files in os.walk(base):
+            pass
+    
+    def deletar():
+        for caminho in caminhos:
+            caminho.unlink()
+    
+    n = len(caminhos)
+    resultado = {}
+    for nome, func, ops in [
+        ("criar", criar, n),
+        ("buscar", buscar, min(amostra, n)),
+        ("listar", listar, 1),
+        ("deletar", deletar, n),
+    ]:
+        segundos = _cronometrar(func)
+        resultado[nome] = {"segundos": round(segundos, 3), "ops_s": round(ops / segundos)}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--amostra", type=int, default=10_000)
+    parser.add_argument("--dir", default=None, help="Diretório base (default: tmp)")
+    args = parser.parse_args()
+    
+    ids = [str(uuid.uuid4()) for _ in range(args.n)]
+    
+    for nome, depth in [("plano", 0), ("sharded", args.depth)]:
+        base = Path(tempfile.mkdtemp(prefix=f"bench_{nome}_", dir=args.dir))
+        try:
+            resultado = bench_layout(base, ids, depth, args.amostra)
+        finally:
+            shutil.rmtree(base, ignore_errors=True)
+        
+        print(f"\n{nome} (depth={depth}, n={args.n})")
+        for op, dados in resultado.items():
+            print(f"  {op:8s} {dados['segundos']:>10.3f}s {dados['ops_s']:>12,} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Armazenamento de blobs (artefatos HTML dos mapas)."""
+import io
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+from config import Config
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobStore:
+    """Interface de armazenamento de blobs por chave (ex: ``3f/2a/<uuid>.html``)."""
+    
+    def put(self, key: str, data: bytes) -> int:
+        """Grava blob e retorna tamanho em bytes."""
+        raise NotImplementedError
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        """Grava blob a partir de chunks e retorna tamanho em bytes.
+        
+        Se ``chunks`` falhar no meio, nada é gravado. O default junta os
+        chunks em memória; os drivers que podem gravar aos poucos sobrescrevem.
+        """
+        return self.put(key, b"".join(chunks))
+    
+    def move(self, src: str, dst: str) -> None:
+        """Renomeia blob (sobrescreve ``dst``). Levanta KeyError se ``src`` não existir."""
+        self.put(dst, self.get(src))
+        self.delete(src)
+    
+    def get(self, key: str) -> bytes:
+        """Lê blob inteiro. Levanta KeyError se não existir."""
+        return b"".join(self.iter_chunks(key))
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Lê blob em chunks. Levanta KeyError se não existir."""
+        raise NotImplementedError
+    
+    def exists(self, key: str) -> bool:
+        """Verifica se blob existe."""
+        return self.size(key) is not None
+    
+    def size(self, key: str) -> Optional[int]:
+        """Tamanho do blob em bytes ou None se não existir."""
+        raise NotImplementedError
+    
+    def delete(self, key: str) -> bool:
+        """Remove blob. Retorna False se não existia."""
+        raise NotImplementedError
+    
+    def local_path(self, key: str) -> Optional[Path]:
+        """Caminho local do blob (para sendfile) ou None se não for local."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs como arquivos em um diretório local."""
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+    
+    def _path(self, key: str) -> Path:
+        return self.root / key
+    
+    def put(self, key: str, data: bytes) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Grava em temporário e renomeia: leitores nunca veem arquivo parcial.
+        # O nome leva a thread: com chaves por conteúdo, duas threads gravam
+        # a mesma chave ao mesmo tempo
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return len(data)
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tamanho = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    tamanho += len(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return tamanho
+    
+    def move(self, src: str, dst: str) -> None:
+        path = self._path(dst)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(self._path(src), path)
+        except FileNotFoundError:
+            raise KeyError(src)
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise KeyError(key)
+        
+        def _gen():
+            with f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        return _gen()
+    
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, key: str) -> bool:
+        try:
+            self._path(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def local_path(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        return path if path.exists() else None
+
+
+class MemoryBlobStore(BlobStore):
+    """Blobs em memória. Útil para testes e desenvolvimento."""
+    
+    def __init__(self):
+        self._blobs: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+    
+    def put(self, key: str, data: bytes) -> int:
+        with self._lock:
+            self._blobs[key] = bytes(data)
+        return len(data)
+    
+    def move(self, src: str, dst: str) -> None:
+        with self._lock:
+            self._blobs[dst] = self._blobs.pop(src)
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        data = self._blobs[key]
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    
+    def size(self, key: str) -> Optional[int]:
+        data = self._blobs.get(key)
+        return None if data is None else len(data)
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._blobs.pop(key, None) is not None
+
+
+class S3BlobStore(BlobStore):
+    """Blobs em bucket S3 ou compatível (MinIO, R2, etc).
+    
+    Requer ``boto3``. Credenciais seguem a cadeia padrão do boto3
+    (``AWS_ACCESS_KEY_ID``, ``AWS_SECRET_ACCESS_KEY``, ...).
+    """
+    
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise RuntimeError("BLOB_BACKEND=s3 requer o pacote boto3")
+            client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+    
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+    
+    def _is_not_found(self, error: Exception) -> bool:
+        response = getattr(error, "response", None) or {}
+        code = response.get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+    
+    def put(self, key: str, data: bytes) -> int:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            Body=data,
+            ContentType="text/html; charset=utf-8",
+        )
+        return len(data)
+    
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> int:
+        # upload_fileobj envia em partes (multipart acima de 8 MB), sem
+        # juntar o blob em memória; um upload interrompido não cria o objeto
+        leitor = _LeitorChunks(chunks)
+        self.client.upload_fileobj(
+            io.BufferedReader(leitor, CHUNK_SIZE),
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": "text/html; charset=utf-8"},
+        )
+        return leitor.lidos
+    
+    def move(self, src: str, dst: str) -> None:
+        # Cópia no servidor (sem baixar o blob), depois remove a origem
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self._key(dst),
+                CopySource={"Bucket": self.bucket, "Key": self._key(src)},
+            )
+        except Exception as e:
+            if self._is_not_found(e):
+                raise KeyError(src)
+            raise
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(src))
+    
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._is_not_found(e):
+                raise KeyError(key)
+            raise
+        return response["Body"].iter_chunks(chunk_size)
+    
+    def size(self, key: str) -> Optional[int]:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return response["ContentLength"]
+    
+    def delete(self, key: str) -> bool:
+        existed = self.exists(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return existed
+
+
+class _LeitorChunks(io.RawIOBase):
+    """Arquivo somente leitura sobre um iterador de chunks."""
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pendente = memoryview(b"")
+        self.lidos = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while not self._pendente:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pendente = memoryview(chunk)
+        n = min(len(buffer), len(self._pendente))
+        buffer[:n] = self._pendente[:n]
+        self._pendente = self._pendente[n:]
+        self.lidos += n
+        return n
+
+
+@lru_cache(maxsize=None)
+def criar_blobstore() -> BlobStore:
+    """Cria (uma vez por processo) blob store conforme Config.BLOB_BACKEND.
+    
+    Raises:
+        ValueError: Se o backend for desconhecido
+    """
+    backend = Config.BLOB_BACKEND
+    if backend == "local":
+        return LocalBlobStore(Config.DATA_DIR)
+    if backend == "s3":
+        return S3BlobStore(
+            bucket=Config.S3_BUCKET,
+            prefix=Config.S3_PREFIX,
+            endpoint_url=Config.S3_ENDPOINT_URL,
+        )
+    if backend == "memory":
+        return MemoryBlobStore()
+    raise ValueError(f"BLOB_BACKEND desconhecido: {backend}")
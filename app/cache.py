@@ -0,0 +1,68 @@
+"""Cache de geração: reaproveita o mapa de um tema já gerado.
+
+Com ``CACHE_TTL_S`` > 0, um pedido cujo tema (sem diferenças de
+maiúsculas e espaços) e perfil já foram gerados há menos de
+``CACHE_TTL_S`` não chama a LLM: o mapa mais novo da mesma chave é
+copiado para um novo id. Só mapas gerados (não cópias) entram no
+cache, então o conteúdo é renovado a cada ``CACHE_TTL_S``.
+
+``AtribuicaoCache`` separa os acertos em mapas gerados por pedidos
+(``hit``) dos gerados pelo aquecedor (``warm_hit``, ver warmer.py) e
+estima a latência p50 sem o aquecedor.
+"""
+import threading
+from collections import deque
+from statistics import median
+from typing import Deque, Optional, Tuple
+from metrics import CACHE_REQUESTS, CACHE_SECONDS
+
+RESULTADOS = ("miss", "hit", "warm_hit")
+
+
+def chave_cache(tema: str, perfil: str) -> str:
+    """Chave de tema e perfil: temas que diferem só em caixa e espaços coincidem."""
+    return f"{perfil}:{' '.join(tema.casefold().split())}"
+
+
+class AtribuicaoCache:
+    """Resultado e duração dos pedidos recentes de geração."""
+    
+    def __init__(self, amostras: int = 2000):
+        self._amostras: Deque[Tuple[str, float]] = deque(maxlen=amostras)
+        self._contagem = dict.fromkeys(RESULTADOS, 0)
+        self._lock = threading.Lock()
+    
+    def registrar(self, resultado: str, segundos: float) -> None:
+        CACHE_REQUESTS.inc(resultado)
+        CACHE_SECONDS.observe(segundos, resultado)
+        with self._lock:
+            self._contagem[resultado] += 1
+            self._amostras.append((resultado, segundos))
+    
+    def relatorio(self) -> dict:
+        """Contagens e p50 dos pedidos recentes, com e sem o aquecedor.
+        
+        Sem o aquecedor, cada ``warm_hit`` teria sido uma geração: o p50
+        contrafactual troca a duração deles pela mediana dos ``miss``.
+        """
+        with self._lock:
+            contagem = dict(self._contagem)
+            amostras = list(self._amostras)
+        
+        return {
+            "pedidos": contagem,
+            "p50_ms": _ms(median(s for _, s in amostras) if amostras else None),
+            "p50_sem_aquecedor_ms": _ms(_p50_sem_aquecedor(amostras)),
+        }
+
+
+def _p50_sem_aquecedor(amostras) -> Optional[float]:
+    geracoes = [s for resultado, s in amostras if resultado == "miss"]
+    if not amostras or not geracoes:
+        return None
+    geracao = median(geracoes)
+    return median(geracao if resultado == "warm_hit" else s for resultado, s in amostras)
+
+
+def _ms(segundos: Optional[float]) -> Optional[float]:
+    return None if segundos is None else round(segundos * 1000, 1)
@@ -2,8 +2,8 @@
 import logging
 import threading
 from datetime import datetime, timedelta
-from pathlib import Path
 from storage import StorageManager
+from journal import try_file_lock
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -12,22 +12,31 @@ logger = logging.getLogger(__name__)
 class CleanupService:
     """Serviço de limpeza periódica de dados."""
     
-    def __init__(self):
-        self.storage = StorageManager()
+    LEADER_LOCK_FILE = "cleanup.leader"
+    
+    def __init__(self, storage: StorageManager = None):
+        self.storage = storage or StorageManager()
         self.running = False
         self.thread = None
+        self._orfaos_pendentes = []
+        self._lider = False
+        self._leader_lock = None
     
-    def iniciar(self, intervalo_minutos: int = 5):
+    def iniciar(self, intervalo_minutos: int = 5, lider: bool = False):
         """Inicia o serviço de limpeza em background.
         
         Args:
             intervalo_minutos: Intervalo entre limpezas em minutos
+            lider: Se True, só limpa o processo que detiver o lock de líder
+                (um por diretório de dados). Os demais tentam assumir a cada
+                intervalo, cobrindo a queda do líder atual.
         """
         if self.running:
             logger.warning("Serviço de limpeza já está em execução")
             return
         
         self.running = True
+        self._lider = lider
         intervalo_segundos = intervalo_minutos * 60
         
         self.thread = threading.Thread(
@@ -43,8 +52,21 @@ class CleanupService:
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
         logger.info("Serviço de limpeza parado")
     
+    def _sou_lider(self) -> bool:
+        """Tenta obter (ou confirma) a liderança da limpeza."""
+        if not self._lider or self._leader_lock is not None:
+            return True
+        
+        self._leader_lock = try_file_lock(self.storage.data_dir / self.LEADER_LOCK_FILE)
+        if self._leader_lock is not None:
+            logger.info("Este processo assumiu a limpeza automática")
+        return self._leader_lock is not None
+    
     def _loop_limpeza(self, intervalo_segundos: int):
         """Loop de limpeza periódica.
         
@@ -53,8 +75,9 @@ class CleanupService:
         """
         while self.running:
             try:
-                self.limpar_antigos()
-                self.limpar_orfaos()
+                if self._sou_lider():
+                    self.limpar_antigos()
+                    self.limpar_orfaos()
             except Exception as e:
                 logger.error(f"Erro durante limpeza: {str(e)}")
             
@@ -67,36 +90,19 @@ class CleanupService:
     def limpar_antigos(self) -> dict:
         """Limpa mapas mais antigos que RETENTION_DAYS.
         
+        Usa o índice de expiração do StorageManager: só as entradas
+        expiradas são visitadas e a remoção é gravada de uma vez.
+        
         Returns:
             Dict com estatísticas de limpeza
         """
-        metadata = self.storage._load_metadata()
         limite_dias = Config.RETENTION_DAYS
         data_limite = datetime.now() - timedelta(days=limite_dias)
         
-        deletados = []
-        
-        for map_id, map_info in list(metadata.items()):
-            try:
-                data_criacao = datetime.fromisoformat(map_info["criado"])
-                
-                if data_criacao < data_limite:
-                    filepath = Path(map_info["caminho"])
-                    
-                    # Deleta arquivo
-                    if filepath.exists():
-                        filepath.unlink()
-                    
-                    # Remove metadata
-                    del metadata[map_id]
-                    deletados.append(map_id)
-                    logger.debug(f"Mapa antigo deletado: {map_id}")
-            
-            except Exception as e:
-                logger.error(f"Erro ao processar mapa {map_id}: {str(e)}")
+        expirados = self.storage.expired_ids(data_limite)
+        deletados = self.storage.delete_maps(expirados)
         
         if deletados:
-            self.storage._save_metadata(metadata)
             logger.info(f"Limpeza concluída: {len(deletados)} mapas antigos removidos")
         
         return {
@@ -106,31 +112,48 @@ class CleanupService:
             "ids_deletados": deletados
         }
     
-    def limpar_orfaos(self) -> dict:
+    def limpar_orfaos(self, limite: int = None) -> dict:
         """Limpa metadados de arquivos que não existem.
         
+        A verificação é incremental: cada chamada confere no máximo
+        ``limite`` mapas e continua de onde a anterior parou. Um novo
+        ciclo começa quando todos os IDs do ciclo atual foram vistos.
+        
+        Args:
+            limite: Mapas verificados por chamada (default: Config.ORPHAN_SWEEP_BATCH)
+        
         Returns:
             Dict com estatísticas de limpeza
         """
-        metadata = self.storage._load_metadata()
-        deletados = []
+        if limite is None:
+            limite = Config.ORPHAN_SWEEP_BATCH
+        
+        if not self._orfaos_pendentes:
+            self._orfaos_pendentes = list(self.storage._load_metadata())
+        
+        lote = self._orfaos_pendentes[-limite:]
+        del self._orfaos_pendentes[-limite:]
         
-        for map_id, map_info in list(metadata.items()):
-            filepath = Path(map_info["caminho"])
+        orfaos = []
+        for map_id in lote:
+            key = self.storage.resolve_key(map_id)
             
             # Se arquivo não existe mas metadata está registrada
-            if not filepath.exists():
-                del metadata[map_id]
-                deletados.append(map_id)
-                logger.debug(f"Metadata órfã deletada: {map_id}")
+            if not self.storage.blobs.exists(key):
+                orfaos.append(map_id)
+                logger.debug(f"Metadata órfã encontrada: {map_id}")
         
+        # Sem o HTML, a árvore, o SVG e a miniatura do órfão também saem
+        # (se nenhum outro mapa os referenciar)
+        deletados = self.storage.delete_maps(orfaos)
         if deletados:
-            self.storage._save_metadata(metadata)
             logger.info(f"Metadados órfãos removidos: {len(deletados)}")
         
         return {
             "tipo": "orfaos",
+            "total_verificados": len(lote),
             "total_deletados": len(deletados),
+            "pendentes": len(self._orfaos_pendentes),
             "ids_deletados": deletados
         }
     
@@ -0,0 +1,79 @@
+"""Mede o tempo até a primeira requisição servida (cold start).
+
+Sobe o servidor em um processo novo, consulta ``/api/saude`` até a
+primeira resposta 200 e encerra o processo, repetindo ``--execucoes``
+vezes. Termina com código 1 se a mediana passar de ``--limite-ms``,
+para uso como verificação no CI:
+
+    python coldstart.py                          # Flask (python app.py)
+    python coldstart.py --asgi --limite-ms 1500  # Starlette (uvicorn)
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+
+# Meta documentada no README: mediana da primeira resposta, em ms
+LIMITE_MS = 1000
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir(asgi: bool = False, timeout: float = 30.0) -> float:
+    """Sobe o servidor uma vez e retorna ms até a primeira resposta."""
+    porta = _porta_livre()
+    env = dict(os.environ, FLASK_HOST="127.0.0.1", FLASK_PORT=str(porta), DATA_DIR=tempfile.mkdtemp())
+    if asgi:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(porta), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "app.py"]
+    
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        cmd, cwd=Path(__file__).parent, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - inicio < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/api/saude", timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - inicio) * 1000
+            except OSError:
+                if processo.poll() is not None:
+                    raise RuntimeError(f"Servidor terminou com código {processo.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"Sem resposta em {timeout} s")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a primeira requisição servida")
+    parser.add_argument("--asgi", action="store_true", help="Starlette via uvicorn (default: Flask)")
+    parser.add_argument("--execucoes", type=int, default=5)
+    parser.add_argument("--limite-ms", type=float, default=LIMITE_MS)
+    args = parser.parse_args()
+    
+    tempos = [medir(asgi=args.asgi) for _ in range(args.execucoes)]
+    mediana = statistics.median(tempos)
+    print(f"primeira resposta: mediana {mediana:.0f} ms  min {min(tempos):.0f} ms  max {max(tempos):.0f} ms")
+    
+    if mediana > args.limite_ms:
+        print(f"acima da meta de {args.limite_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
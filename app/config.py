@@ -12,28 +12,72 @@ class Config:
     
     # Diretório base
     BASE_DIR = Path(__file__).parent
-    DATA_DIR = BASE_DIR / "data"
+    DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))  # criado por StorageManager
     
     # Flask
     DEBUG = os.getenv("FLASK_DEBUG", "False").lower() == "true"
     HOST = os.getenv("FLASK_HOST", "0.0.0.0")
     PORT = int(os.getenv("FLASK_PORT", 5000))
     
+    # Servidor de produção (serve.py)
+    # Workers do servidor: serve.py define pelo --workers (default: núcleos de CPU);
+    # fora dele (python app.py, uvicorn) é um processo só
+    WORKERS = int(os.getenv("WORKERS", 1))
+    WORKER_THREADS = int(os.getenv("WORKER_THREADS", 16))  # gerações são I/O-bound
+    SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")  # wsgi (Flask) ou asgi (Starlette)
+    METRICS_DIR = os.getenv("METRICS_DIR", "")  # métricas somadas entre workers, default: DATA_DIR/metrics
+    
     # LLM
     LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", 60))
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # groq, fake
+    LLM_FAKE_LATENCY_MS = int(os.getenv("LLM_FAKE_LATENCY_MS", 500))
+    PERFIL_PADRAO = os.getenv("PERFIL_PADRAO", "profundo")  # rapido, balanceado, profundo (ver perfis.py)
+    LLM_CONCORRENCIA = int(os.getenv("LLM_CONCORRENCIA", 16))  # máximo de chamadas simultâneas por processo
+    LLM_CONCORRENCIA_INICIAL = int(os.getenv("LLM_CONCORRENCIA_INICIAL", 4))  # o limite adaptativo parte daqui
+    LLM_LATENCIA_TOLERANCIA = float(os.getenv("LLM_LATENCIA_TOLERANCIA", 2.0))  # latência / referência que reduz o limite
+    LLM_RESERVA_INTERATIVA = int(os.getenv("LLM_RESERVA_INTERATIVA", 2))  # slots só do interativo
+    LLM_FILA_CUSTO_MAX = int(os.getenv("LLM_FILA_CUSTO_MAX", 200000))  # tokens estimados por classe
     
     # Armazenamento
     MAX_MAPS = int(os.getenv("MAX_MAPS", 1000))
     RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", 30))
+    MAX_STORAGE_MB = int(os.getenv("MAX_STORAGE_MB", 0))  # 0 = sem limite
+    EVICTION_POLICY = os.getenv("EVICTION_POLICY", "nenhuma")  # nenhuma, lru, lfu, tamanho, ttl
+    EVICTION_TTL_HOURS = float(os.getenv("EVICTION_TTL_HOURS", 24 * 7))
+    ACCESS_FLUSH_BATCH = int(os.getenv("ACCESS_FLUSH_BATCH", 100))
+    ACCESS_FLUSH_SECONDS = float(os.getenv("ACCESS_FLUSH_SECONDS", 30))
+    ORPHAN_SWEEP_BATCH = int(os.getenv("ORPHAN_SWEEP_BATCH", 500))  # mapas por ciclo
+    JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", 1000))  # operações
+    JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "False").lower() == "true"
+    SHARD_DEPTH = int(os.getenv("SHARD_DEPTH", 2))  # níveis de prefixo hex
+    HTML_COMPACTO = os.getenv("HTML_COMPACTO", "False").lower() == "true"  # árvore comprimida no HTML (requer DecompressionStream)
+    BLOB_BACKEND = os.getenv("BLOB_BACKEND", "local")  # local, s3, memory
+    S3_BUCKET = os.getenv("S3_BUCKET", "mapas")
+    S3_PREFIX = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")  # ex: MinIO local
     
     # API
     MAX_REQUEST_SIZE = int(os.getenv("MAX_REQUEST_SIZE", 1024))  # caracteres
+    API_KEYS = frozenset(k for k in os.getenv("API_KEYS", "").split(",") if k)  # limitadas por chave, não por IP
+    PROXIES_CONFIAVEIS = int(os.getenv("PROXIES_CONFIAVEIS", 0))  # proxies reversos na frente da API (X-Forwarded-For)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "")  # memory, sqlite; vazio = sqlite com serve.py --workers > 1
+    RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "")  # default: DATA_DIR/ratelimit.db
+    RATE_LIMIT_POR_MINUTO = float(os.getenv("RATE_LIMIT_POR_MINUTO", 6))  # gerações/min por cliente, 0 = sem limite
+    RATE_LIMIT_RAJADA = int(os.getenv("RATE_LIMIT_RAJADA", 3))  # gerações seguidas antes de limitar
+    COTA_DIARIA = int(os.getenv("COTA_DIARIA", 100))  # gerações por dia (UTC) por cliente, 0 = sem limite
+    IDEMPOTENCIA_BACKEND = os.getenv("IDEMPOTENCIA_BACKEND", "")  # memory, sqlite; vazio = sqlite com serve.py --workers > 1
+    IDEMPOTENCIA_DB = os.getenv("IDEMPOTENCIA_DB", "")  # default: DATA_DIR/idempotencia.db
+    IDEMPOTENCIA_TTL_S = int(os.getenv("IDEMPOTENCIA_TTL_S", 86400))  # janela de repetição, 0 = ignora Idempotency-Key
+    IDEMPOTENCIA_EM_ANDAMENTO_S = int(os.getenv("IDEMPOTENCIA_EM_ANDAMENTO_S", 600))  # reserva de uma geração que não terminou
+    IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", 10000))  # respostas guardadas (as mais antigas saem)
     
-    @classmethod
-    def init(cls):
-        """Inicializa configurações."""
-        cls.DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-
-# Inicializa ao importar
-Config.init()
+    # Cache de geração e aquecedor
+    CACHE_TTL_S = int(os.getenv("CACHE_TTL_S", 0))  # reaproveita tema+perfil gerado há menos que isso, 0 = sem cache
+    AQUECEDOR = os.getenv("AQUECEDOR", "False").lower() == "true"  # pré-gera temas em alta (requer CACHE_TTL_S)
+    AQUECEDOR_INTERVALO_S = int(os.getenv("AQUECEDOR_INTERVALO_S", 60))
+    AQUECEDOR_UTILIZACAO_MAX = float(os.getenv("AQUECEDOR_UTILIZACAO_MAX", 0.5))  # só gera com a LLM abaixo disso
+    AQUECEDOR_TOKENS_DIA = int(os.getenv("AQUECEDOR_TOKENS_DIA", 100000))  # orçamento por dia (UTC)
+    AQUECEDOR_TOPICOS = int(os.getenv("AQUECEDOR_TOPICOS", 20))  # temas em alta considerados por ciclo
+    AQUECEDOR_JANELA_H = int(os.getenv("AQUECEDOR_JANELA_H", 24))  # histórico de pedidos analisado
+    AQUECEDOR_MIN_PEDIDOS = int(os.getenv("AQUECEDOR_MIN_PEDIDOS", 2))  # pedidos na janela para aquecer um tema
+    AQUECEDOR_RENOVAR = float(os.getenv("AQUECEDOR_RENOVAR", 0.75))  # fração de CACHE_TTL_S após a qual regenera
@@ -0,0 +1,37 @@
+"""Documentação da API (GET /docs), a mesma em app.py e asgi.py."""
+
+
+def documentacao(base_url: str) -> dict:
+    """Endpoints da API e exemplo de uso.
+    
+    Args:
+        base_url: URL base da requisição (ex: ``http://localhost:5000/``)
+    """
+    return {
+        "nome": "API Mapas Mentais",
+        "versao": "1.0",
+        "descricao": "API para gerar mapas mentais usando IA",
+        "base_url": base_url.rstrip("/"),
+        "endpoints": {
+            "GET /api/saude": "Verifica saúde da API",
+            "POST /api/gerar": "Gera novo mapa mental (perfil opcional)",
+            "GET /api/perfis": "Lista perfis de geração",
+            "GET /api/info/<id>": "Obtém info de um mapa",
+            "GET /api/listar": "Lista todos os mapas",
+            "GET /api/preview/<id>": "Visualiza um mapa",
+            "GET /api/download/<id>": "Faz download de um mapa",
+            "GET /api/arvore/<id>": "Obtém a árvore de um mapa (?formato=json|compacto|binario)",
+            "GET /api/svg/<id>": "Obtém o SVG estático de um mapa",
+            "GET /api/miniatura/<id>": "Obtém a miniatura SVG de um mapa",
+            "DELETE /api/deletar/<id>": "Deleta um mapa",
+            "GET /api/stats": "Obtém estatísticas",
+            "GET /metrics": "Métricas (Prometheus)",
+            "GET /docs": "Documentação da API"
+        },
+        "exemplo_gerar": {
+            "metodo": "POST",
+            "url": "/api/gerar",
+            "headers": {"Content-Type": "application/json"},
+            "body": {"tema": "Inteligência Artificial"}
+        }
+    }
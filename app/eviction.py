@@ -0,0 +1,188 @@
+"""Políticas de despejo e rastreamento de acessos."""
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    """Acumula acessos em memória e grava em lotes nos metadados.
+    
+    Cada leitura custa só um incremento em dict; a gravação acontece em
+    uma thread em background a cada ``flush_batch`` acessos ou
+    ``flush_seconds`` segundos, fora da requisição.
+    """
+    
+    def __init__(self, storage, flush_batch: int = None, flush_seconds: float = None):
+        self.storage = storage
+        self.flush_batch = flush_batch or Config.ACCESS_FLUSH_BATCH
+        self.flush_seconds = flush_seconds or Config.ACCESS_FLUSH_SECONDS
+        self._hits: Dict[str, Tuple[int, float]] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        # Thread de gravação, criada no primeiro acesso de cada processo
+        # (workers pré-forkados não herdam threads do master)
+        self._thread = None
+        self._pid = None
+    
+    def hit(self, map_id: str) -> None:
+        """Registra um acesso a um mapa."""
+        agora = time.time()
+        with self._lock:
+            count, _ = self._hits.get(map_id, (0, agora))
+            self._hits[map_id] = (count + 1, agora)
+            self._total += 1
+            cheio = self._total >= self.flush_batch
+        
+        self._iniciar()
+        if cheio:
+            self._acordar.set()
+    
+    def _iniciar(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="access-flush", daemon=True)
+            self._thread.start()
+    
+    def _loop(self) -> None:
+        while True:
+            self._acordar.wait(self.flush_seconds)
+            self._acordar.clear()
+            self.flush()
+    
+    def flush(self) -> int:
+        """Grava acessos pendentes. Retorna quantos mapas foram atualizados."""
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            self._total = 0
+        
+        if not hits:
+            return 0
+        
+        try:
+            return self.storage.record_access(hits)
+        except Exception as e:
+            logger.error(f"Erro ao gravar acessos: {str(e)}")
+            return 0
+
+
+class EvictionPolicy:
+    """Política de despejo: define quais mapas podem sair e em que ordem."""
+    
+    nome = ""
+    
+    def order(self, maps: Iterable[Dict], agora: float) -> List[Dict]:
+        """Retorna candidatos ao despejo, do primeiro ao último."""
+        raise NotImplementedError
+    
+    def select(
+        self, maps: Iterable[Dict], excesso_mapas: int, excesso_bytes: int,
+        liberar: Optional[Callable[[Dict], int]] = None
+    ) -> List[str]:
+        """Escolhe mapas a despejar até liberar o excesso pedido.
+        
+        Args:
+            maps: Metadados dos mapas
+            excesso_mapas: Quantidade de mapas a liberar
+            excesso_bytes: Bytes a liberar
+            liberar: Bytes que cada mapa escolhido libera, chamado na ordem
+                do despejo (default: o ``tamanho`` do HTML)
+                
+        Returns:
+            IDs dos mapas escolhidos
+        """
+        liberar = liberar or (lambda map_info: map_info.get("tamanho", 0))
+        escolhidos = []
+        liberados = 0
+        
+        for map_info in self.order(maps, time.time()):
+            if len(escolhidos) >= excesso_mapas and liberados >= excesso_bytes:
+                break
+            escolhidos.append(map_info["id"])
+            liberados += liberar(map_info)
+        
+        return escolhidos
+
+
+def _ultimo_acesso(map_info: Dict) -> float:
+    """Último acesso, ou a criação para mapas nunca acessados."""
+    return map_info.get("ultimo_acesso") or map_info.get("criado_ts", 0)
+
+
+class NoEviction(EvictionPolicy):
+    """Sem despejo: ao atingir o limite, novos mapas são recusados."""
+    
+    nome = "nenhuma"
+    
+    def order(self, maps, agora):
+        return []
+
+
+class LRUEviction(EvictionPolicy):
+    """Menos recentemente acessados primeiro."""
+    
+    nome = "lru"
+    
+    def order(self, maps, agora):
+        return sorted(maps, key=_ultimo_acesso)
+
+
+class LFUEviction(EvictionPolicy):
+    """Menos acessados primeiro; empate pelo acesso mais antigo."""
+    
+    nome = "lfu"
+    
+    def order(self, maps, agora):
+        return sorted(maps, key=lambda m: (m.get("acessos", 0), _ultimo_acesso(m)))
+
+
+class SizeEviction(EvictionPolicy):
+    """Maiores primeiro: libera o limite de bytes com menos despejos."""
+    
+    nome = "tamanho"
+    
+    def order(self, maps, agora):
+        return sorted(maps, key=lambda m: m.get("tamanho", 0), reverse=True)
+
+
+class TTLEviction(EvictionPolicy):
+    """Só despeja mapas sem acesso há mais de ttl_horas, mais antigos primeiro."""
+    
+    nome = "ttl"
+    
+    def __init__(self, ttl_horas: float = None):
+        self.ttl_segundos = (ttl_horas or Config.EVICTION_TTL_HOURS) * 3600
+    
+    def order(self, maps, agora):
+        limite = agora - self.ttl_segundos
+        return sorted(
+            (m for m in maps if _ultimo_acesso(m) < limite),
+            key=_ultimo_acesso
+        )
+
+
+POLICIES = {
+    policy.nome: policy
+    for policy in (NoEviction, LRUEviction, LFUEviction, SizeEviction, TTLEviction)
+}
+
+
+def criar_politica(nome: str = None) -> EvictionPolicy:
+    """Cria política de despejo pelo nome (default: Config.EVICTION_POLICY).
+    
+    Raises:
+        ValueError: Se a política for desconhecida
+    """
+    nome = nome or Config.EVICTION_POLICY
+    if nome not in POLICIES:
+        raise ValueError(f"EVICTION_POLICY desconhecida: {nome}")
+    return POLICIES[nome]()
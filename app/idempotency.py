@@ -0,0 +1,282 @@
+"""Chaves de idempotência para ``POST /api/gerar``.
+
+Um cliente que repete a requisição (ex: depois de um timeout) com o mesmo
+header ``Idempotency-Key`` não dispara outra geração:
+
+- primeira vez: a chave é reservada como em andamento e a geração segue;
+- em andamento: 409 com Retry-After, sem gerar de novo;
+- concluída: a resposta da primeira (status e corpo), com
+  ``Idempotent-Replayed: true``;
+- mesma chave com outro corpo: 422.
+
+Respostas 5xx e 429 não são guardadas: a chave é liberada e a repetição
+tenta de novo. As chaves são por cliente (ver ratelimit.identificar_cliente),
+valem ``IDEMPOTENCIA_TTL_S`` e são no máximo ``IDEMPOTENCIA_MAX`` (as
+respostas mais antigas saem primeiro; reservas em andamento nunca são
+descartadas pelo limite). A reserva de uma geração que não terminou
+(processo morto) expira em ``IDEMPOTENCIA_EM_ANDAMENTO_S``.
+
+Backends como em ratelimit: ``memory`` (um processo) e ``sqlite``
+(processos da mesma máquina, default quando ``serve.py`` sobe mais de um
+worker: com
+``memory`` a repetição que cai em outro worker geraria de novo).
+"""
+import json
+import time
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+from config import Config
+from metrics import IDEMPOTENT_REQUESTS
+from sqlitedb import BancoLocal, backend_padrao
+
+# (corpo, status, headers)
+Resposta = Tuple[dict, int, Dict[str, str]]
+
+TAMANHO_MAX_CHAVE = 255
+
+# Retry-After sugerido enquanto a primeira requisição não termina
+ESPERA_EM_ANDAMENTO = 2
+
+# Status 0: geração em andamento
+EM_ANDAMENTO = 0
+
+
+class Registro(NamedTuple):
+    """Estado de uma chave."""
+    impressao: str
+    status: int
+    corpo: Optional[dict]
+    expira: float
+
+
+def impressao(dados: dict) -> str:
+    """Hash do corpo da requisição, para recusar a chave reusada com outro corpo."""
+    texto = json.dumps(dados, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(texto.encode()).hexdigest()[:32]
+
+
+def chave_valida(chave: str) -> bool:
+    return 0 < len(chave) <= TAMANHO_MAX_CHAVE and chave.isascii() and chave.isprintable()
+
+
+def guardavel(status: int) -> bool:
+    """Respostas que a repetição recebe igual; as demais liberam a chave."""
+    return status < 500 and status != 429
+
+
+class IdempotencyStore:
+    """Interface: reserva, conclui e libera chaves de idempotência."""
+    
+    # True se as operações podem esperar por I/O (o app ASGI as chama em thread)
+    bloqueante = False
+    
+    def __init__(self, ttl: int = None, em_andamento: int = None, max_chaves: int = None):
+        """
+        Args:
+            ttl: Segundos em que uma resposta concluída é repetida
+            em_andamento: Segundos de validade da reserva sem conclusão
+            max_chaves: Número máximo de chaves guardadas
+        """
+        self.ttl = Config.IDEMPOTENCIA_TTL_S if ttl is None else ttl
+        self.em_andamento = Config.IDEMPOTENCIA_EM_ANDAMENTO_S if em_andamento is None else em_andamento
+        self.max_chaves = max_chaves or Config.IDEMPOTENCIA_MAX
+    
+    @property
+    def ativo(self) -> bool:
+        return self.ttl > 0
+    
+    def abrir(self, cliente: str, chave: str, dados: dict, agora: float = None) -> Optional[Resposta]:
+        """Reserva a chave para uma nova geração.
+        
+        Returns:
+            None se a geração deve seguir (chame ``fechar`` ou ``cancelar``
+            depois), ou a resposta a devolver no lugar dela
+        """
+        if not chave_valida(chave):
+            return {"erro": f"Idempotency-Key inválida (até {TAMANHO_MAX_CHAVE} caracteres ASCII)"}, 400, {}
+        
+        agora = time.time() if agora is None else agora
+        assinatura = impressao(dados)
+        novo = Registro(assinatura, EM_ANDAMENTO, None, agora + self.em_andamento)
+        atual = self._reservar(f"{cliente}\n{chave}", novo, agora)
+        
+        if atual is None:
+            IDEMPOTENT_REQUESTS.inc("new")
+            return None
+        if atual.impressao != assinatura:
+            IDEMPOTENT_REQUESTS.inc("mismatch")
+            return {"erro": "Idempotency-Key já usada com outro corpo de requisição"}, 422, {}
+        if atual.status == EM_ANDAMENTO:
+            IDEMPOTENT_REQUESTS.inc("in_progress")
+            return (
+                {"erro": "Requisição com esta Idempotency-Key ainda em andamento"},
+                409,
+                {"Retry-After": str(ESPERA_EM_ANDAMENTO)}
+            )
+        IDEMPOTENT_REQUESTS.inc("replayed")
+        return atual.corpo, atual.status, {"Idempotent-Replayed": "true"}
+    
+    def fechar(self, cliente: str, chave: str, dados: dict, corpo: dict, status: int, agora: float = None) -> None:
+        """Guarda a resposta da geração reservada por ``abrir``."""
+        if not guardavel(status):
+            self.cancelar(cliente, chave)
+            return
+        agora = time.time() if agora is None else agora
+        self._gravar(f"{cliente}\n{chave}", Registro(impressao(dados), status, corpo, agora + self.ttl))
+    
+    def cancelar(self, cliente: str, chave: str) -> None:
+        """Libera a chave: a próxima requisição com ela gera de novo."""
+        self._remover(f"{cliente}\n{chave}")
+    
+    def _reservar(self, id: str, novo: Registro, agora: float) -> Optional[Registro]:
+        """Grava ``novo`` se o id estiver livre ou expirado; senão retorna o registro atual."""
+        raise NotImplementedError
+    
+    def _gravar(self, id: str, registro: Registro) -> None:
+        raise NotImplementedError
+    
+    def _remover(self, id: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Chaves em um OrderedDict no processo, na ordem da última escrita."""
+    
+    def __init__(self, ttl: int = None, em_andamento: int = None, max_chaves: int = None):
+        super().__init__(ttl, em_andamento, max_chaves)
+        self._registros: "OrderedDict[str, Registro]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._registros)
+    
+    def _reservar(self, id: str, novo: Registro, agora: float) -> Optional[Registro]:
+        with self._lock:
+            self._expirar(agora)
+            atual = self._registros.get(id)
+            if atual is not None and atual.expira > agora:
+                return atual
+            self._inserir(id, novo)
+            return None
+    
+    def _gravar(self, id: str, registro: Registro) -> None:
+        with self._lock:
+            self._inserir(id, registro)
+    
+    def _remover(self, id: str) -> None:
+        with self._lock:
+            self._registros.pop(id, None)
+    
+    def _inserir(self, id: str, registro: Registro) -> None:
+        self._registros[id] = registro
+        self._registros.move_to_end(id)
+        excesso = len(self._registros) - self.max_chaves
+        if excesso > 0:
+            self._descartar_concluidas(excesso)
+    
+    def _descartar_concluidas(self, quantas: int) -> None:
+        # Reservas em andamento ficam (a repetição geraria de novo); são
+        # poucas, limitadas pelas gerações simultâneas
+        vitimas = []
+        for id, registro in self._registros.items():
+            if len(vitimas) == quantas:
+                break
+            if registro.status != EM_ANDAMENTO:
+                vitimas.append(id)
+        for id in vitimas:
+            del self._registros[id]
+    
+    def _expirar(self, agora: float) -> None:
+        # Aproximado: para na primeira chave válida (reservas e respostas
+        # têm validades diferentes); o limite de tamanho cobre o resto
+        while self._registros:
+            id, registro = next(iter(self._registros.items()))
+            if registro.expira > agora:
+                return
+            del self._registros[id]
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS idempotencia (
+    id TEXT PRIMARY KEY, impressao TEXT, status INTEGER, corpo TEXT, expira REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idempotencia_expira ON idempotencia (expira);
+"""
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Chaves em SQLite, compartilhadas entre processos da mesma máquina."""
+    
+    bloqueante = True
+    
+    # A cada tantas reservas, remove expiradas e excedentes
+    DESCARTE_A_CADA = 1000
+    
+    def __init__(self, caminho, ttl: int = None, em_andamento: int = None, max_chaves: int = None):
+        super().__init__(ttl, em_andamento, max_chaves)
+        self.banco = BancoLocal(caminho, ESQUEMA)
+        self._reservas = itertools.count(1)
+    
+    def _reservar(self, id: str, novo: Registro, agora: float) -> Optional[Registro]:
+        with self.banco.transacao() as conn:
+            linha = conn.execute(
+                "SELECT impressao, status, corpo, expira FROM idempotencia WHERE id = ?", (id,)
+            ).fetchone()
+            if linha is not None and linha[3] > agora:
+                assinatura, status, corpo, expira = linha
+                return Registro(assinatura, status, json.loads(corpo) if corpo else None, expira)
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotencia VALUES (?, ?, ?, NULL, ?)",
+                (id, novo.impressao, novo.status, novo.expira)
+            )
+        
+        if next(self._reservas) % self.DESCARTE_A_CADA == 0:
+            self.descartar(agora)
+        return None
+    
+    def _gravar(self, id: str, registro: Registro) -> None:
+        self.banco.conexao().execute(
+            "INSERT OR REPLACE INTO idempotencia VALUES (?, ?, ?, ?, ?)",
+            (id, registro.impressao, registro.status, json.dumps(registro.corpo), registro.expira)
+        )
+    
+    def _remover(self, id: str) -> None:
+        self.banco.conexao().execute("DELETE FROM idempotencia WHERE id = ?", (id,))
+    
+    def descartar(self, agora: float = None) -> int:
+        """Remove chaves expiradas e, acima de max_chaves, as respostas que
+        expiram primeiro (reservas em andamento ficam). Retorna quantas
+        foram removidas."""
+        agora = time.time() if agora is None else agora
+        with self.banco.transacao() as conn:
+            removidas = conn.execute("DELETE FROM idempotencia WHERE expira <= ?", (agora,)).rowcount
+            excesso = conn.execute("SELECT COUNT(*) FROM idempotencia").fetchone()[0] - self.max_chaves
+            if excesso > 0:
+                removidas += conn.execute(
+                    "DELETE FROM idempotencia WHERE id IN "
+                    "(SELECT id FROM idempotencia WHERE status != ? ORDER BY expira LIMIT ?)",
+                    (EM_ANDAMENTO, excesso)
+                ).rowcount
+        return removidas
+
+
+@lru_cache(maxsize=None)
+def criar_idempotencia() -> IdempotencyStore:
+    """Cria (uma vez por processo) o armazenamento conforme Config.IDEMPOTENCIA_BACKEND.
+    
+    Sem backend configurado: ``sqlite`` com mais de um worker, senão ``memory``.
+    
+    Raises:
+        ValueError: Se o backend for desconhecido
+    """
+    backend = backend_padrao(Config.IDEMPOTENCIA_BACKEND)
+    if backend == "memory":
+        return MemoryIdempotencyStore()
+    if backend == "sqlite":
+        caminho = Config.IDEMPOTENCIA_DB or Config.DATA_DIR / "idempotencia.db"
+        return SQLiteIdempotencyStore(caminho)
+    raise ValueError(f"IDEMPOTENCIA_BACKEND desconhecido: {backend}")
@@ -0,0 +1,314 @@
+"""Journal de metadados: snapshot + log append-only com lock entre processos."""
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def file_lock(path: Path, exclusive: bool = True):
+    """Lock consultivo (flock) em um arquivo, compartilhado entre processos.
+    
+    Em plataformas sem fcntl o lock vale só dentro do processo.
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def try_file_lock(path: Path):
+    """Tenta adquirir lock exclusivo sem bloquear.
+    
+    Returns:
+        Arquivo aberto (manter referência enquanto o lock for necessário;
+        fechar libera o lock) ou None se outro processo já o detém
+    """
+    f = open(path, "a+b")
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class MetadataJournal:
+    """Metadados como snapshot JSON + journal de operações.
+    
+    Cada gravação é um append O(1) de uma linha JSON no journal:
+    ``{"op": "save", "id": ..., "info": {...}}`` ou
+    ``{"op": "delete", "id": ...}`` ou
+    ``{"op": "update", "id": ..., "set": {...}, "incr": {...}}``. A leitura mantém o estado em
+    memória e só reaplica as linhas novas. A cada ``compact_every``
+    operações o journal é compactado em um novo snapshot, gravado em
+    arquivo temporário e renomeado atomicamente.
+    
+    Snapshot e journal têm uma geração: o snapshot grava a sua
+    (``{"geracao": N, "mapas": {...}}``) e o journal começa com a linha
+    ``{"op": "geracao", "n": N}``. A compactação publica o snapshot N+1
+    e só então troca o journal por um vazio da geração N+1; um crash
+    entre os dois deixa um journal de geração anterior, cujas operações
+    já estão no snapshot e não são reaplicadas (``incr`` não conta duas
+    vezes). O próximo append troca esse journal. Arquivos sem geração
+    (anteriores a ela) valem como geração 0.
+    
+    Uma linha parcial no fim do journal (crash durante o append) é
+    ignorada.
+    """
+    
+    def __init__(
+        self,
+        snapshot_file: Path,
+        compact_every: int = 1000,
+        fsync: bool = False,
+        listener: Optional[Callable[[Optional[dict]], None]] = None
+    ):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = self.snapshot_file.with_suffix(".journal")
+        self.lock_file = self.snapshot_file.with_suffix(".lock")
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.listener = listener
+        
+        self._state: Dict[str, Dict] = {}
+        self._snapshot_id = None
+        self._snapshot_gen = 0
+        self._journal_id = None
+        self._journal_gen = 0
+        self._offset = 0
+        self._entries = 0
+        self._mutex = threading.RLock()
+    
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    
+    @property
+    def mutex(self) -> threading.RLock:
+        """Lock do processo sob o qual o estado muda e o listener é chamado.
+        
+        Quem mantém estado derivado das operações (índices) pode usá-lo
+        para ler esse estado sem corrida com o listener.
+        """
+        return self._mutex
+    
+    def _stat_id(self, path: Path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _inode(self, path: Path):
+        try:
+            return path.stat().st_ino
+        except FileNotFoundError:
+            return None
+    
+    def _notify(self, op: Optional[dict]) -> None:
+        if self.listener is not None:
+            self.listener(op)
+    
+    def _apply(self, op: dict) -> None:
+        if op["op"] == "save":
+            self._state[op["id"]] = op["info"]
+        elif op["op"] == "delete":
+            removido = self._state.pop(op["id"], None)
+            if removido is not None:
+                # O listener recebe os metadados removidos (não vão para o arquivo)
+                op = {**op, "info": removido}
+        elif op["op"] == "update" and op["id"] in self._state:
+            # Copia antes de alterar: dicts já entregues a leitores não mudam
+            info = dict(self._state[op["id"]])
+            info.update(op.get("set", {}))
+            for campo, valor in op.get("incr", {}).items():
+                info[campo] = info.get(campo, 0) + valor
+            self._state[op["id"]] = info
+        self._entries += 1
+        self._notify(op)
+    
+    def _reload_snapshot(self) -> None:
+        data = {}
+        if self.snapshot_file.exists():
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        if "geracao" in data and isinstance(data.get("mapas"), dict):
+            self._state, self._snapshot_gen = data["mapas"], data["geracao"]
+        else:
+            self._state, self._snapshot_gen = data, 0
+        self._snapshot_id = self._stat_id(self.snapshot_file)
+        self._journal_id = self._inode(self.journal_file)
+        self._journal_gen = 0
+        self._offset = 0
+        self._entries = 0
+        self._notify(None)
+    
+    def _catch_up(self) -> None:
+        """Sincroniza estado em memória com disco. Chamar com lock."""
+        journal_size = self.journal_file.stat().st_size if self.journal_file.exists() else 0
+        
+        if (
+            self._stat_id(self.snapshot_file) != self._snapshot_id
+            or self._inode(self.journal_file) != self._journal_id
+            or journal_size < self._offset
+        ):
+            self._reload_snapshot()
+        
+        if journal_size == self._offset:
+            return
+        
+        with open(self.journal_file, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(journal_size - self._offset)
+        
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+                if op["op"] == "geracao":
+                    self._journal_gen = op["n"]
+                elif self._journal_gen == self._snapshot_gen:
+                    self._apply(op)
+                # Geração anterior ao snapshot: a operação já está nele
+            except (ValueError, KeyError):
+                logger.error("Linha inválida no journal de metadados ignorada")
+        self._offset += end
+    
+    def load(self) -> Dict[str, Dict]:
+        """Retorna o estado atual.
+        
+        O dict é compartilhado e pode mudar em outra thread: não modificar
+        e, para iterar, copiar antes com ``list(...)``.
+        """
+        with self._mutex:
+            with file_lock(self.lock_file, exclusive=False):
+                self._catch_up()
+            return self._state
+    
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    
+    def append(
+        self,
+        ops: List[dict],
+        before: Optional[Callable[[Dict[str, Dict]], None]] = None,
+        after: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Grava operações no journal com um único append.
+        
+        Args:
+            ops: Operações a gravar
+            before: Chamado com o estado atual, sob o lock exclusivo, antes
+                do append; se levantar exceção nada é gravado
+            after: Chamado sob o lock depois de aplicar as operações
+        """
+        if not ops:
+            return
+        
+        payload = "".join(
+            json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for op in ops
+        ).encode("utf-8")
+        
+        with self._mutex:
+            with file_lock(self.lock_file, exclusive=True):
+                self._catch_up()
+                if before is not None:
+                    before(self._state)
+                
+                if self._journal_gen != self._snapshot_gen:
+                    # Compactação interrompida antes de trocar o journal
+                    self._reset_journal()
+                elif self.journal_file.exists() and self.journal_file.stat().st_size > self._offset:
+                    # Descarta linha parcial deixada por um crash no meio de um append
+                    os.truncate(self.journal_file, self._offset)
+                
+                with open(self.journal_file, "ab") as f:
+                    f.write(payload)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+                    # Na primeira gravação o arquivo acaba de ser criado
+                    self._journal_id = os.fstat(f.fileno()).st_ino
+                
+                for op in ops:
+                    self._apply(op)
+                self._offset += len(payload)
+                if after is not None:
+                    after()
+                
+                if self._entries >= self.compact_every:
+                    self._compact()
+    
+    def replace(self, metadata: Dict[str, Dict]) -> None:
+        """Substitui todo o estado (grava snapshot e zera o journal)."""
+        with self._mutex:
+            with file_lock(self.lock_file, exclusive=True):
+                self._catch_up()
+                self._state = dict(metadata)
+                self._write_snapshot()
+                self._notify(None)
+    
+    def compact(self) -> None:
+        """Compacta journal em um novo snapshot."""
+        with self._mutex:
+            with file_lock(self.lock_file, exclusive=True):
+                self._catch_up()
+                self._compact()
+    
+    def _compact(self) -> None:
+        """Compacta sem adquirir lock. Chamar com lock exclusivo."""
+        self._write_snapshot()
+        logger.info(f"Journal de metadados compactado ({len(self._state)} mapas)")
+    
+    def _write_snapshot(self) -> None:
+        geracao = self._snapshot_gen + 1
+        tmp = self.snapshot_file.with_name(f".{self.snapshot_file.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"geracao": geracao, "mapas": self._state}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_file)
+        self._snapshot_id = self._stat_id(self.snapshot_file)
+        self._snapshot_gen = geracao
+        
+        # Snapshot já contém tudo: o journal pode ser trocado. Se houver crash
+        # antes disso, o journal antigo é de geração anterior e não é reaplicado
+        self._reset_journal()
+    
+    def _reset_journal(self) -> None:
+        """Troca o journal por um vazio da geração do snapshot. Chamar com lock exclusivo."""
+        header = (json.dumps({"op": "geracao", "n": self._snapshot_gen}) + "\n").encode("utf-8")
+        tmp = self.journal_file.with_name(f".{self.journal_file.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        # Rename (novo inode): leitores em outros processos recomeçam do início
+        os.replace(tmp, self.journal_file)
+        
+        self._journal_id = self._inode(self.journal_file)
+        self._journal_gen = self._snapshot_gen
+        self._offset = len(header)
+        self._entries = 0
@@ -1,46 +1,279 @@
-"""Teste de uso: gera mapa mental com Groq."""
+"""Interface com a LLM (Groq ou fake) e geração dos mapas com Synapsis."""
 import os
-import sys
-from pathlib import Path
+import time
+import asyncio
+from functools import partial
+from typing import Iterator, Tuple
 
 
 from dotenv import load_dotenv
-from groq import Groq
-from synapsis import generate
+import yaml
+from synapsis import (
+    SynapsisBuilder, sanitize, validate_schema, ValidationError, TokenUsage, prune_tree, AdaptiveLimiter
+)
+from synapsis.renderer import iter_tree_html
+from synapsis.layout import layout_tree, render_svg, render_thumbnail
+from config import Config
+from metrics import medir, contar_tokens, VALIDATION_FAILURES, PRUNED_NODES
+from perfis import obter_perfil
+from scheduler import LLMScheduler
 
 # Carrega .env da raiz
 load_dotenv()
 
-# Cliente Groq
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+# Clientes Groq, criados na primeira chamada: importar groq custa mais
+# que o resto do app e o provider fake não precisa dele
+client = None
+async_client = None
 
-def groq_llm(prompt: str) -> str:
+# Tokens por template de prompt (relatório em /api/stats, contadores em /metrics)
+TOKENS = TokenUsage(hooks=[contar_tokens])
+
+# Limite de chamadas simultâneas ajustado pela latência e pelos 429 do provider
+LIMITADOR = AdaptiveLimiter(
+    initial=Config.LLM_CONCORRENCIA_INICIAL,
+    max_limit=Config.LLM_CONCORRENCIA,
+    tolerance=Config.LLM_LATENCIA_TOLERANCIA
+)
+
+# Toda chamada à LLM do serviço passa pelo agendador (prioridade e cliente),
+# que libera até LIMITADOR.limit chamadas por vez
+AGENDADOR = LLMScheduler(lambda: LIMITADOR.limit)
+
+MODELO_PADRAO = "llama-3.3-70b-versatile"
+
+
+class RespostaTruncada(RuntimeError):
+    """A LLM parou em ``max_tokens``: o YAML da resposta veio cortado."""
+
+
+def _parametros(prompt: str, modelo: str, max_tokens: int = None) -> dict:
+    params = {"model": modelo, "messages": [{"role": "user", "content": prompt}]}
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+    return params
+
+
+def _conteudo(response, max_tokens: int = None) -> str:
+    """Texto da resposta, recusando respostas cortadas em max_tokens."""
+    escolha = response.choices[0]
+    if escolha.finish_reason == "length":
+        raise RespostaTruncada(f"Resposta da LLM cortada em {max_tokens} tokens")
+    return escolha.message.content
+
+
+def groq_llm(prompt: str, modelo: str = MODELO_PADRAO, max_tokens: int = None) -> str:
     """Wrapper Groq compatível com Synapsis."""
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": prompt}]
+    global client
+    if client is None:
+        from groq import Groq
+        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+
+    response = client.chat.completions.create(**_parametros(prompt, modelo, max_tokens))
+    return _conteudo(response, max_tokens)
+
+
+async def groq_llm_async(prompt: str, modelo: str = MODELO_PADRAO, max_tokens: int = None) -> str:
+    """Wrapper Groq assíncrono compatível com Synapsis."""
+    global async_client
+    if async_client is None:
+        from groq import AsyncGroq
+        async_client = AsyncGroq(api_key=os.environ.get("GROQ_API_KEY"))
+    
+    response = await async_client.chat.completions.create(**_parametros(prompt, modelo, max_tokens))
+    return _conteudo(response, max_tokens)
+
+
+FAKE_YAML = """title: "Mapa"
+icon: "🎯"
+color: "#667eea"
+children:
+  - title: "Conceito"
+    icon: "📚"
+    color: "#4CAF50"
+    children:
+      - title: "Detalhe"
+        icon: "📝"
+        color: "#8BC34A"
+"""
+
+
+def fake_llm(prompt: str) -> str:
+    """LLM fake para testes de carga: espera LLM_FAKE_LATENCY_MS e responde YAML fixo."""
+    time.sleep(Config.LLM_FAKE_LATENCY_MS / 1000)
+    return FAKE_YAML
+
+
+async def fake_llm_async(prompt: str) -> str:
+    """Versão assíncrona de fake_llm."""
+    await asyncio.sleep(Config.LLM_FAKE_LATENCY_MS / 1000)
+    return FAKE_YAML
+
+
+def obter_llm(perfil: dict = None):
+    """Retorna LLM síncrona conforme Config.LLM_PROVIDER e o perfil."""
+    if Config.LLM_PROVIDER == "fake":
+        return fake_llm
+    if perfil is None:
+        return groq_llm
+    return partial(groq_llm, modelo=perfil["modelo"], max_tokens=perfil["max_tokens"])
+
+
+def obter_llm_async(perfil: dict = None):
+    """Retorna LLM assíncrona conforme Config.LLM_PROVIDER e o perfil."""
+    if Config.LLM_PROVIDER == "fake":
+        return fake_llm_async
+    if perfil is None:
+        return groq_llm_async
+    return partial(groq_llm_async, modelo=perfil["modelo"], max_tokens=perfil["max_tokens"])
+
+
+def _custo(prompt: str, perfil: dict) -> int:
+    """Custo estimado de uma chamada em tokens: prompt (~4 caracteres por token) + saída máxima."""
+    return len(prompt) // 4 + perfil["max_tokens"]
+
+
+def _agendada(llm, perfil: dict, prioridade: str, cliente: str):
+    """Envolve a LLM para que cada chamada aguarde um slot do AGENDADOR.
+    
+    O resultado de cada chamada (latência por perfil, 429, timeout) ajusta o
+    LIMITADOR. O estágio "llm" mede só a chamada; a espera vai para
+    mapas_llm_queue_wait_seconds.
+    """
+    llm = LIMITADOR.wrap(llm, gate=False, key=perfil["nome"])
+    
+    def chamar(prompt: str) -> str:
+        with AGENDADOR.slot(prioridade, cliente, _custo(prompt, perfil)), medir("llm"):
+            return llm(prompt)
+    return chamar
+
+
+def _agendada_async(llm, perfil: dict, prioridade: str, cliente: str):
+    """Como _agendada, para LLM assíncrona."""
+    llm = LIMITADOR.wrap_async(llm, gate=False, key=perfil["nome"])
+    
+    async def chamar(prompt: str) -> str:
+        async with AGENDADOR.slot_async(prioridade, cliente, _custo(prompt, perfil)):
+            with medir("llm"):
+                return await llm(prompt)
+    return chamar
+
+
+def _renderizar(raw: str, perfil: dict) -> Tuple[Iterator[str], dict]:
+    """Sanitiza, valida e poda a resposta da LLM, medindo cada estágio.
+    
+    Returns:
+        Tuple com (pedaços do html, árvore). O HTML é renderizado à
+        medida que é gravado (StorageManager.save_map), sem montar a
+        string inteira em memória
+        
+    Raises:
+        ValidationError: Se o YAML não seguir o schema
+    """
+    with medir("sanitize"):
+        cleaned = sanitize(raw)
+    
+    with medir("validate_schema"):
+        valid, errors = validate_schema(cleaned)
+    if not valid:
+        VALIDATION_FAILURES.inc()
+        raise ValidationError(f"YAML inválido: {'; '.join(errors)}")
+    
+    with medir("yaml_parse"):
+        data = yaml.safe_load(cleaned)
+    
+    with medir("prune"):
+        data, removidos = prune_tree(
+            data,
+            max_depth=perfil["max_depth"],
+            max_fanout=perfil["max_fanout"],
+            max_nodes=perfil["max_nodes"]
+        )
+    if removidos:
+        PRUNED_NODES.inc(perfil["nome"], amount=removidos)
+    
+    return iter_tree_html(data, packed=Config.HTML_COMPACTO), data
+
+
+def _profundidade_menor(perfil: dict, erro: RespostaTruncada) -> int:
+    """Profundidade da nova tentativa após uma resposta truncada.
+    
+    Um nível a menos costuma reduzir o mapa pedido bem abaixo de
+    ``max_tokens``; sem nível a tirar, a truncagem é o erro final.
+    """
+    if perfil["max_depth"] <= 1:
+        raise _truncada(perfil) from erro
+    return perfil["max_depth"] - 1
+
+
+def _truncada(perfil: dict) -> RespostaTruncada:
+    return RespostaTruncada(
+        f"O mapa pedido não coube em {perfil['max_tokens']} tokens de resposta "
+        f"(perfil {perfil['nome']}); tente um perfil menor ou um tema mais específico"
     )
-    return response.choices[0].message.content
 
 
-def gerar_mapa_mental(tema: str, output_dir: str = None, filename: str = None) -> Path:
-    """Gera mapa mental com Groq e Synapsis."""
-    if filename is None:
-        filename = f"{tema.lower().replace(' ', '_')}_map.html"
+def desenhar(arvore: dict) -> Tuple[str, str]:
+    """Calcula o layout da árvore e retorna (svg, miniatura).
     
-    if output_dir is not None:
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        output = str(output_path / filename)
-    else:
-        output = filename
+    O SVG é estático (o navegador não refaz o layout de mapas largos) e
+    a miniatura serve as listagens.
+    """
+    with medir("render_svg"):
+        svg = render_svg(arvore, layout_tree(arvore))
+        miniatura = render_thumbnail(arvore)
+    return svg, miniatura
+
+
+def gerar_html(
+    tema: str,
+    perfil: dict = None,
+    prioridade: str = "interativo",
+    cliente: str = "",
+    usage: TokenUsage = None
+) -> Tuple[Iterator[str], dict]:
+    """Gera mapa mental com Groq e Synapsis e retorna (pedaços do html, árvore).
     
-    print(f"🧠 Gerando mapa mental: {tema}")
-    path = generate(tema, groq_llm, output=output)
-    print(f"✅ Mapa salvo: {path}")
-    return path
+    Args:
+        tema: Tema do mapa
+        perfil: Perfil de geração (default: obter_perfil())
+        prioridade: Classe no agendador (ver scheduler.PRIORIDADES)
+        cliente: Identificador do cliente, para o round-robin da classe
+        usage: Contador de tokens (default: TOKENS)
+        
+    Raises:
+        FilaCheia: Se o agendador recusar a chamada
+        RespostaTruncada: Se a resposta não couber em max_tokens, mesmo
+            na nova tentativa com um nível a menos
+    """
+    perfil = perfil or obter_perfil()
+    llm = _agendada(obter_llm(perfil), perfil, prioridade, cliente)
+    builder = SynapsisBuilder(llm, usage=usage or TOKENS)
+    try:
+        builder.expand(tema, max_depth=perfil["max_depth"], max_fanout=perfil["max_fanout"])
+    except RespostaTruncada as e:
+        try:
+            builder.expand(tema, max_depth=_profundidade_menor(perfil, e), max_fanout=perfil["max_fanout"])
+        except RespostaTruncada as e:
+            raise _truncada(perfil) from e
+    return _renderizar(builder.get_yaml(), perfil)
 
 
-if __name__ == "__main__":
-    tema = sys.argv[1] if len(sys.argv) > 1 else "como criar um banco de dados em Python do zero"
-    gerar_mapa_mental(tema)
+async def gerar_html_async(
+    tema: str, perfil: dict = None, prioridade: str = "interativo", cliente: str = ""
+) -> Tuple[Iterator[str], dict]:
+    """Como gerar_html, aguardando a LLM (e a fila) sem bloquear o event loop.
+    
+    Sanitização, validação, parse e poda (CPU) rodam em thread separada.
+    """
+    perfil = perfil or obter_perfil()
+    llm = _agendada_async(obter_llm_async(perfil), perfil, prioridade, cliente)
+    builder = SynapsisBuilder(llm, usage=TOKENS)
+    try:
+        await builder.expand_async(tema, max_depth=perfil["max_depth"], max_fanout=perfil["max_fanout"])
+    except RespostaTruncada as e:
+        try:
+            await builder.expand_async(tema, max_depth=_profundidade_menor(perfil, e), max_fanout=perfil["max_fanout"])
+        except RespostaTruncada as e:
+            raise _truncada(perfil) from e
+    return await asyncio.to_thread(_renderizar, builder.get_yaml(), perfil)
@@ -0,0 +1,107 @@
+"""Teste de carga: compara requisições/s e latência entre servidores.
+
+Suba os servidores com a LLM fake (sem custo e com latência fixa) e sem
+limite de taxa, já que todas as requisições vêm do mesmo IP:
+
+    export LLM_PROVIDER=fake LLM_FAKE_LATENCY_MS=500 RATE_LIMIT_POR_MINUTO=0 COTA_DIARIA=0
+    python app.py
+    uvicorn asgi:app --port 8000
+
+E rode:
+
+    python loadtest.py --url http://localhost:5000 --url http://localhost:8000 \\
+        --rota gerar --concorrencia 64 --requisicoes 500
+"""
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _requisicao(url: str, rota: str, map_id: str = None) -> tuple:
+    """Executa uma requisição e retorna (status, segundos)."""
+    if rota == "gerar":
+        req = urllib.request.Request(
+            f"{url}/api/gerar",
+            data=json.dumps({"tema": "teste de carga"}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+    else:
+        req = urllib.request.Request(f"{url}/api/{rota}/{map_id}")
+    
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - inicio
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def executar(url: str, rota: str, concorrencia: int, requisicoes: int) -> dict:
+    """Dispara ``requisicoes`` com ``concorrencia`` clientes simultâneos."""
+    map_id = None
+    if rota != "gerar":
+        _requisicao(url, "gerar")
+        with urllib.request.urlopen(f"{url}/api/listar?limite=1") as resp:
+            map_id = json.load(resp)["mapas"][0]["id"]
+    
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        resultados = list(pool.map(
+            lambda _: _requisicao(url, rota, map_id),
+            range(requisicoes)
+        ))
+    duracao = time.perf_counter() - inicio
+    
+    latencias = [seg for _, seg in resultados]
+    erros = sum(1 for status, _ in resultados if not 200 <= status < 300)
+    
+    return {
+        "url": url,
+        "rota": rota,
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "erros": erros,
+        "req_s": round(requisicoes / duracao, 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 1),
+        "p99_ms": round(_percentil(latencias, 0.99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", action="append", required=True)
+    parser.add_argument("--rota", default="gerar", choices=["gerar", "preview", "download"])
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+    
+    resultados = [
+        executar(url, args.rota, args.concorrencia, args.requisicoes)
+        for url in args.url
+    ]
+    
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    
+    print(f"{'url':30s} {'req/s':>8s} {'p50 ms':>9s} {'p99 ms':>9s} {'erros':>6s}")
+    for r in resultados:
+        print(f"{r['url']:30s} {r['req_s']:>8.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['erros']:>6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+"""Métricas no formato de exposição do Prometheus.
+
+Contadores e histogramas guardam valores por thread: cada thread só
+escreve no próprio shard, então o caminho quente (``inc``/``observe``)
+não adquire lock. O lock existe apenas quando uma thread nova registra
+seu shard, quando uma thread termina (o shard dela é somado aos das
+threads encerradas) e na leitura (``/metrics``), que soma os shards.
+
+Cada processo tem seus próprios valores. Com vários workers
+(``serve.py``), ``Registry.compartilhar`` faz cada processo gravar seus
+totais num diretório comum e o scrape somar os arquivos de todos.
+"""
+import os
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latências de estágio vão de microssegundos (sanitize) a dezenas de segundos (LLM)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class _Dono:
+    """Sentinela guardada no thread-local: é coletada quando a thread termina."""
+    
+    __slots__ = ("shard", "__weakref__")
+
+
+class _Shards:
+    """Um valor por thread, criado sob demanda.
+    
+    Quando a thread termina o shard dela é somado (``somar``) a um shard
+    único das threads encerradas, então threads de curta duração não
+    acumulam shards.
+    """
+    
+    def __init__(self, somar: Callable[[Any, Any], Any]):
+        self._local = threading.local()
+        self._shards: Dict[weakref.ref, dict] = {}
+        self._encerradas: dict = {}
+        self._somar = somar
+        self._lock = threading.Lock()
+    
+    def get(self) -> dict:
+        try:
+            return self._local.dono.shard
+        except AttributeError:
+            dono = _Dono()
+            dono.shard = {}
+            with self._lock:
+                self._shards[weakref.ref(dono, self._encerrar)] = dono.shard
+            self._local.dono = dono
+            return dono.shard
+    
+    def _encerrar(self, ref: weakref.ref) -> None:
+        with self._lock:
+            shard = self._shards.pop(ref)
+            # Novo dict: leitores podem estar iterando o anterior
+            encerradas = dict(self._encerradas)
+            for labels, valor in shard.items():
+                encerradas[labels] = self._somar(encerradas.get(labels), valor)
+            self._encerradas = encerradas
+    
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._shards.values()) + [self._encerradas]
+    
+    def __len__(self) -> int:
+        """Shards de threads vivas."""
+        with self._lock:
+            return len(self._shards)
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pares = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Metric:
+    """Base: nome, descrição e nomes de labels."""
+    
+    tipo = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def collect(self) -> List[str]:
+        """Linhas de amostra no formato texto."""
+        raise NotImplementedError
+    
+    def expose(self, amostras: Optional[List[str]] = None) -> str:
+        linhas = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.tipo}",
+        ]
+        return "\n".join(linhas + (self.collect() if amostras is None else amostras))
+
+
+class _Acumulada(Metric):
+    """Base de Counter e Histogram: valores por thread, somados na leitura."""
+    
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards(self._somar)
+    
+    @staticmethod
+    def _somar(acumulado, valor):
+        """Soma ``valor`` a ``acumulado`` (None = vazio) sem alterar nenhum dos dois."""
+        raise NotImplementedError
+    
+    def _totais(self) -> Dict[Tuple, Any]:
+        totais: Dict[Tuple, Any] = {}
+        for shard in self._shards.all():
+            for labels, valor in list(shard.items()):
+                totais[labels] = self._somar(totais.get(labels), valor)
+        return totais
+    
+    def collect(self, totais: Optional[Dict[Tuple, Any]] = None):
+        """Linhas de amostra; ``totais`` substitui os valores do processo."""
+        return self._linhas(self._totais() if totais is None else totais)
+    
+    def _linhas(self, totais: Dict[Tuple, Any]) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Acumulada):
+    """Contador monotônico."""
+    
+    tipo = "counter"
+    
+    def inc(self, *labels, amount: float = 1) -> None:
+        shard = self._shards.get()
+        shard[labels] = shard.get(labels, 0) + amount
+    
+    def value(self, *labels) -> float:
+        return sum(shard.get(labels, 0) for shard in self._shards.all())
+    
+    @staticmethod
+    def _somar(acumulado, valor):
+        return (acumulado or 0) + valor
+    
+    def _linhas(self, totais):
+        if not totais and not self.labelnames:
+            totais = {(): 0}
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {valor}"
+            for labels, valor in sorted(totais.items())
+        ]
+
+
+class Histogram(_Acumulada):
+    """Histograma com buckets fixos."""
+    
+    tipo = "histogram"
+    
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, valor: float, *labels) -> None:
+        shard = self._shards.get()
+        dados = shard.get(labels)
+        if dados is None:
+            # [contagem por bucket..., +Inf, soma]
+            dados = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        dados[bisect.bisect_left(self.buckets, valor)] += 1
+        dados[-1] += valor
+    
+    @contextmanager
+    def time(self, *labels):
+        """Mede a duração do bloco em segundos."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, *labels)
+    
+    @staticmethod
+    def _somar(acumulado, valor):
+        if acumulado is None:
+            return list(valor)
+        return [a + b for a, b in zip(acumulado, valor)]
+    
+    def count(self, *labels) -> int:
+        dados = self._totais().get(labels)
+        return int(sum(dados[:-1])) if dados else 0
+    
+    def _linhas(self, totais):
+        linhas = []
+        for labels, dados in sorted(totais.items()):
+            acumulado = 0
+            limites = [str(b) for b in self.buckets] + ["+Inf"]
+            for limite, contagem in zip(limites, dados[:-1]):
+                acumulado += contagem
+                extra = f'le="{limite}"'
+                linhas.append(f"{self.name}_bucket{_labels(self.labelnames, labels, extra)} {acumulado}")
+            linhas.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {dados[-1]}")
+            linhas.append(f"{self.name}_count{_labels(self.labelnames, labels)} {acumulado}")
+        return linhas
+
+
+class Gauge(Metric):
+    """Valor instantâneo lido por uma função no momento do scrape."""
+    
+    tipo = "gauge"
+    
+    def __init__(self, name, documentation, func: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.func = func
+    
+    def collect(self):
+        return [f"{self.name} {self.func()}"]
+
+
+class Registry:
+    """Conjunto de métricas expostas em ``/metrics``."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._diretorio: Optional[Path] = None
+        self._arquivo: Optional[Path] = None
+    
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def compartilhar(self, diretorio: Path, intervalo_s: float = 5.0) -> None:
+        """Soma contadores e histogramas de todos os processos em ``diretorio``.
+        
+        Chamado em cada worker depois do fork. O processo grava seus totais
+        em ``<diretorio>/<pid>-<id>.json`` a cada ``intervalo_s`` e em cada
+        scrape; o scrape soma os arquivos de todos os processos, então os
+        valores dos outros workers chegam com até ``intervalo_s`` de atraso.
+        Arquivos de workers encerrados permanecem, para que os contadores
+        não diminuam; o diretório é limpo quando o servidor sobe.
+        Gauges continuam sendo do processo que atende o scrape.
+        """
+        diretorio.mkdir(parents=True, exist_ok=True)
+        self._diretorio = diretorio
+        self._arquivo = diretorio / f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        self.gravar()
+        threading.Thread(target=self._loop, args=(intervalo_s,), daemon=True, name="metrics-dump").start()
+    
+    def _loop(self, intervalo_s: float) -> None:
+        while True:
+            time.sleep(intervalo_s)
+            try:
+                self.gravar()
+            except OSError as e:
+                logger.warning(f"Falha ao gravar métricas: {e}")
+    
+    def gravar(self) -> None:
+        """Grava os totais deste processo no diretório compartilhado."""
+        if self._arquivo is None:
+            return
+        dados = {
+            nome: [[list(labels), valor] for labels, valor in metric._totais().items()]
+            for nome, metric in self._metrics.items()
+            if isinstance(metric, _Acumulada)
+        }
+        tmp = self._arquivo.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dados))
+        os.replace(tmp, self._arquivo)
+    
+    def _somar_processos(self) -> Dict[str, Dict[Tuple, Any]]:
+        somados: Dict[str, Dict[Tuple, Any]] = {}
+        for arquivo in self._diretorio.glob("*.json"):
+            try:
+                dados = json.loads(arquivo.read_text())
+            except (OSError, ValueError):
+                continue  # removido ou sendo substituído
+            for nome, valores in dados.items():
+                metric = self._metrics.get(nome)
+                if not isinstance(metric, _Acumulada):
+                    continue
+                totais = somados.setdefault(nome, {})
+                for labels, valor in valores:
+                    labels = tuple(labels)
+                    totais[labels] = metric._somar(totais.get(labels), valor)
+        return somados
+    
+    def expose(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        if self._arquivo is None:
+            return "\n".join(m.expose() for m in self._metrics.values()) + "\n"
+        self.gravar()
+        somados = self._somar_processos()
+        return "\n".join(
+            m.expose(m.collect(somados.get(nome, {}))) if isinstance(m, _Acumulada) else m.expose()
+            for nome, m in self._metrics.items()
+        ) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "mapas_stage_seconds",
+    "Duração de cada estágio da geração de mapas",
+    ["stage"]
+))
+REQUESTS = REGISTRY.register(Counter(
+    "mapas_requests_total",
+    "Requisições HTTP por rota e status",
+    ["route", "status"]
+))
+VALIDATION_FAILURES = REGISTRY.register(Counter(
+    "mapas_validation_failures_total",
+    "Respostas da LLM rejeitadas pela validação de schema"
+))
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "mapas_generation_seconds",
+    "Duração ponta a ponta de uma geração, por perfil",
+    ["profile"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+))
+PROFILE_SLO = REGISTRY.register(Counter(
+    "mapas_profile_slo_total",
+    "Gerações dentro (ok) e fora (late) da meta de latência do perfil, ou que falharam (error)",
+    ["profile", "result"]
+))
+PRUNED_NODES = REGISTRY.register(Counter(
+    "mapas_pruned_nodes_total",
+    "Nós removidos por exceder os limites do perfil",
+    ["profile"]
+))
+LLM_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "mapas_llm_queue_wait_seconds",
+    "Espera na fila do agendador até a chamada à LLM, por classe de prioridade",
+    ["priority"]
+))
+LLM_REJECTED = REGISTRY.register(Counter(
+    "mapas_llm_rejected_total",
+    "Chamadas à LLM recusadas pelo controle de admissão, por classe de prioridade",
+    ["priority"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "mapas_llm_tokens_total",
+    "Tokens por template de prompt e tipo (prompt, prefix, completion)",
+    ["template", "kind"]
+))
+IDEMPOTENT_REQUESTS = REGISTRY.register(Counter(
+    "mapas_idempotent_requests_total",
+    "Requisições com Idempotency-Key por resultado (new, replayed, in_progress, mismatch)",
+    ["result"]
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "mapas_cache_requests_total",
+    "Gerações pedidas por resultado do cache (miss, hit, warm_hit = mapa do aquecedor)",
+    ["result"]
+))
+CACHE_SECONDS = REGISTRY.register(Histogram(
+    "mapas_cache_request_seconds",
+    "Duração de uma geração pedida (gerada ou do cache), por resultado do cache",
+    ["result"]
+))
+WARMER_GENERATIONS = REGISTRY.register(Counter(
+    "mapas_warmer_generations_total",
+    "Mapas gerados pelo aquecedor (ok, error)",
+    ["result"]
+))
+WARMER_TOKENS = REGISTRY.register(Counter(
+    "mapas_warmer_tokens_total",
+    "Tokens (prompt + resposta) gastos pelo aquecedor"
+))
+
+
+def contar_tokens(record: dict) -> None:
+    """Hook de synapsis.TokenUsage que alimenta LLM_TOKENS."""
+    for kind in ("prompt", "prefix", "completion"):
+        LLM_TOKENS.inc(record["template"], kind, amount=record[f"{kind}_tokens"])
+
+
+def medir(stage: str):
+    """Context manager que registra a duração de um estágio."""
+    return STAGE_SECONDS.time(stage)
+
+
+class Cronometro:
+    """Soma o tempo gasto dentro de um iterável consumido aos poucos.
+    
+    O HTML é renderizado enquanto é gravado (StorageManager.save_map): o
+    tempo dentro do gerador é o render e o resto, a gravação.
+    """
+    
+    def __init__(self):
+        self.segundos = 0.0
+    
+    def medir(self, iteravel):
+        iterador = iter(iteravel)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                item = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                self.segundos += time.perf_counter() - inicio
+            yield item
+
+
+def registrar_geracao(perfil: dict, segundos: float, sucesso: bool = True) -> None:
+    """Registra o resultado de uma geração frente à meta do perfil.
+    
+    Falhas (erro da LLM, timeout, resposta inválida, recusa da fila)
+    contam como "error", para que a taxa de "ok" não ignore quem não
+    recebeu o mapa. A duração só é observada nas concluídas.
+    """
+    if not sucesso:
+        PROFILE_SLO.inc(perfil["nome"], "error")
+        return
+    GENERATION_SECONDS.observe(segundos, perfil["nome"])
+    PROFILE_SLO.inc(perfil["nome"], "ok" if segundos <= perfil["meta_s"] else "late")
+
+
+def registrar_gauges(service) -> None:
+    """Registra gauges que dependem do serviço (fila e armazenamento)."""
+    REGISTRY.register(Gauge(
+        "mapas_generations_in_progress",
+        "Gerações em andamento (profundidade da fila)",
+        lambda: service.em_andamento
+    ))
+    REGISTRY.register(Gauge(
+        "mapas_llm_concurrency_limit",
+        "Limite adaptativo de chamadas simultâneas à LLM",
+        lambda: service.agendador.concorrencia
+    ))
+    REGISTRY.register(Gauge(
+        "mapas_llm_in_flight",
+        "Chamadas à LLM em andamento",
+        lambda: service.agendador.stats()["ativos"]
+    ))
+    REGISTRY.register(Gauge(
+        "mapas_storage_maps",
+        "Mapas armazenados",
+        lambda: len(service.storage.journal.load())
+    ))
+    REGISTRY.register(Gauge(
+        "mapas_storage_bytes",
+        "Bytes armazenados (cada blob compartilhado uma vez)",
+        lambda: service.storage.get_stats()["bytes_fisicos"]
+    ))
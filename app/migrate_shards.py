@@ -0,0 +1,82 @@
+"""Migra diretório de dados plano para o layout sharded.
+
+Pode rodar com a API no ar: cada arquivo é movido com ``os.replace``
+(atômico no mesmo filesystem) e ``StorageManager.resolve_key`` procura
+nos dois layouts enquanto a migração não termina. Só se aplica ao
+driver local (BLOB_BACKEND=local).
+
+Uso:
+    python migrate_shards.py [--lote 500] [--dry-run]
+"""
+import os
+import logging
+import argparse
+from storage import StorageManager, shard_key
+
+logger = logging.getLogger(__name__)
+
+
+def migrar(storage: StorageManager, lote: int = 500, dry_run: bool = False) -> dict:
+    """Move arquivos ``<uuid>.html`` da raiz para seus shards.
+    
+    Args:
+        storage: Gerenciador de armazenamento
+        lote: Quantidade de arquivos movidos entre gravações de metadados
+        dry_run: Apenas conta os arquivos, sem mover
+        
+    Returns:
+        Dict com estatísticas da migração
+    """
+    movidos = []
+    total = 0
+    
+    with os.scandir(storage.data_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith(".html"):
+                continue
+            
+            total += 1
+            map_id = entry.name[:-len(".html")]
+            destino = storage.shard_path(map_id)
+            
+            if dry_run:
+                continue
+            
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(entry.path, destino)
+            movidos.append(map_id)
+            
+            if len(movidos) >= lote:
+                _atualizar_chaves(storage, movidos)
+                movidos = []
+    
+    if movidos:
+        _atualizar_chaves(storage, movidos)
+    
+    return {"total": total, "dry_run": dry_run}
+
+
+def _atualizar_chaves(storage: StorageManager, map_ids: list) -> None:
+    """Atualiza 'chave' dos mapas movidos com um único append no journal."""
+    metadata = storage.journal.load()
+    storage.update_maps({
+        map_id: {"chave": shard_key(map_id)}
+        for map_id in map_ids
+        if map_id in metadata
+    })
+    logger.info(f"{len(map_ids)} arquivos migrados")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    
+    resultado = migrar(StorageManager(), lote=args.lote, dry_run=args.dry_run)
+    logger.info(f"Migração concluída: {resultado}")
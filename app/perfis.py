@@ -0,0 +1,56 @@
+"""Perfis de geração com meta de latência.
+
+Cada perfil limita o tamanho do mapa (e, portanto, os tokens de saída e
+o tempo de geração): modelo, profundidade, filhos por nó, total de nós
+e ``max_tokens`` da LLM. Profundidade e fanout vão no prompt e são
+impostos depois da geração por ``synapsis.prune_tree``, junto com o
+total de nós. ``meta_s`` é a meta de latência ponta a ponta medida em
+``mapas_profile_slo_total``.
+"""
+from typing import Dict
+from config import Config
+
+
+PERFIS: Dict[str, Dict] = {
+    "rapido": {
+        "modelo": "llama-3.1-8b-instant",
+        "max_depth": 3,
+        "max_fanout": 5,
+        "max_nodes": 60,
+        "max_tokens": 2048,
+        "meta_s": 5.0,
+    },
+    "balanceado": {
+        "modelo": "llama-3.3-70b-versatile",
+        "max_depth": 4,
+        "max_fanout": 6,
+        "max_nodes": 200,
+        "max_tokens": 4096,
+        "meta_s": 20.0,
+    },
+    # Limites do prompt original do Expander (5-8 filhos, 4-5 níveis)
+    "profundo": {
+        "modelo": "llama-3.3-70b-versatile",
+        "max_depth": 5,
+        "max_fanout": 8,
+        "max_nodes": 1000,
+        "max_tokens": 8192,
+        "meta_s": 60.0,
+    },
+}
+
+
+def obter_perfil(nome: str = None) -> Dict:
+    """Retorna o perfil pelo nome (default: Config.PERFIL_PADRAO).
+    
+    Returns:
+        Cópia do perfil, com a chave "nome"
+        
+    Raises:
+        ValueError: Se o perfil não existir ou não for texto
+    """
+    nome = nome or Config.PERFIL_PADRAO
+    # Vem do JSON: lista ou objeto nem são chaves válidas de PERFIS
+    if not isinstance(nome, str) or nome not in PERFIS:
+        raise ValueError(f"Perfil inválido: {nome} (opções: {', '.join(PERFIS)})")
+    return {"nome": nome, **PERFIS[nome]}
@@ -0,0 +1,266 @@
+"""Limite de taxa e cota diária de gerações por cliente.
+
+Cada cliente (chave de API conhecida ou IP) tem um token bucket
+(``RATE_LIMIT_POR_MINUTO`` de reposição, ``RATE_LIMIT_RAJADA`` de
+capacidade) e uma cota de gerações por dia UTC (``COTA_DIARIA``). A
+decisão é uma função pura (``decidir``) sobre o estado do cliente; os
+backends só guardam esse estado:
+
+- ``memory``: dict no processo, para um único processo (microssegundos).
+  Com N workers cada um tem o seu: o limite efetivo vira N vezes o
+  configurado.
+- ``sqlite``: arquivo compartilhado pelos processos/workers da máquina,
+  uma transação ``BEGIN IMMEDIATE`` por decisão. É o default quando
+  ``serve.py`` sobe mais de um worker (``Config.WORKERS`` > 1).
+
+Uma tentativa cuja geração falha por motivo do servidor (fila cheia,
+erro da LLM) é devolvida com ``devolver``.
+"""
+import time
+import hashlib
+import itertools
+import threading
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+from config import Config
+from sqlitedb import BancoLocal, backend_padrao
+
+DIA = 86400
+
+# Mensagem de erro por motivo da recusa
+MENSAGENS_LIMITE = {
+    "taxa": "Limite de gerações por minuto excedido",
+    "cota": "Cota diária de gerações esgotada",
+}
+
+
+class Regras(NamedTuple):
+    """Limites aplicados a cada cliente (0 = sem limite)."""
+    por_minuto: float
+    rajada: int
+    cota_diaria: int
+
+
+class Decisao(NamedTuple):
+    """Resultado de uma tentativa."""
+    permitido: bool
+    retry_after: int = 0
+    motivo: str = ""
+    cota_restante: Optional[int] = None
+
+
+def regras_padrao() -> Regras:
+    return Regras(Config.RATE_LIMIT_POR_MINUTO, Config.RATE_LIMIT_RAJADA, Config.COTA_DIARIA)
+
+
+def identificar_cliente(api_key: Optional[str], ip: Optional[str]) -> str:
+    """Chave do cliente: a chave de API, se estiver em Config.API_KEYS, ou o IP.
+    
+    A chave de API não é guardada em claro, só um hash curto.
+    """
+    if api_key and api_key in Config.API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+    return f"ip:{ip or ''}"
+
+
+def ip_do_cliente(remoto: Optional[str], encaminhado: List[str], proxies: int = None) -> Optional[str]:
+    """IP do cliente atrás de ``proxies`` proxies reversos confiáveis.
+    
+    Cada proxy acrescenta ao X-Forwarded-For o endereço de quem o chamou:
+    só as últimas ``proxies`` entradas são confiáveis, as anteriores vêm
+    do próprio cliente e podem ser forjadas.
+    
+    Args:
+        remoto: Endereço da conexão (o proxy mais próximo, se houver)
+        encaminhado: Valores dos headers X-Forwarded-For, em ordem
+        proxies: Proxies confiáveis (default: Config.PROXIES_CONFIAVEIS)
+    """
+    proxies = Config.PROXIES_CONFIAVEIS if proxies is None else proxies
+    enderecos = [e.strip() for valor in encaminhado for e in valor.split(",") if e.strip()]
+    if not proxies or len(enderecos) < proxies:
+        return remoto
+    return enderecos[-proxies]
+
+
+def decidir(estado: Optional[List[float]], agora: float, regras: Regras):
+    """Aplica token bucket e cota diária ao estado de um cliente.
+    
+    Args:
+        estado: [tokens, atualizado, dia, usados] ou None (cliente novo)
+        agora: Instante atual (epoch, segundos)
+        regras: Limites a aplicar
+        
+    Returns:
+        Tuple com (novo estado, Decisao)
+    """
+    dia = int(agora // DIA)
+    if estado is None:
+        tokens, atualizado, dia_estado, usados = regras.rajada, agora, dia, 0
+    else:
+        tokens, atualizado, dia_estado, usados = estado
+    if dia_estado != dia:
+        dia_estado, usados = dia, 0
+    
+    if regras.por_minuto:
+        taxa = regras.por_minuto / 60
+        tokens = min(regras.rajada, tokens + (agora - atualizado) * taxa)
+        if tokens < 1:
+            espera = int((1 - tokens) / taxa) + 1
+            return [tokens, agora, dia_estado, usados], Decisao(False, espera, "taxa")
+    
+    if regras.cota_diaria and usados >= regras.cota_diaria:
+        espera = int((dia + 1) * DIA - agora) + 1
+        return [tokens, agora, dia_estado, usados], Decisao(False, espera, "cota", 0)
+    
+    if regras.por_minuto:
+        tokens -= 1
+    usados += 1
+    restante = regras.cota_diaria - usados if regras.cota_diaria else None
+    return [tokens, agora, dia_estado, usados], Decisao(True, cota_restante=restante)
+
+
+def restituir(estado: List[float], agora: float, regras: Regras) -> List[float]:
+    """Desfaz uma tentativa permitida por ``decidir`` (devolve token e cota).
+    
+    A cota só volta se a tentativa for do mesmo dia.
+    """
+    tokens, atualizado, dia_estado, usados = estado
+    if regras.por_minuto:
+        tokens = min(regras.rajada, tokens + 1)
+    if dia_estado == int(agora // DIA):
+        usados = max(0, usados - 1)
+    return [tokens, atualizado, dia_estado, usados]
+
+
+class RateLimiter:
+    """Interface: decide e consome uma tentativa do cliente."""
+    
+    # True se tentar() pode esperar por I/O (o app ASGI a chama em thread)
+    bloqueante = False
+    
+    def __init__(self, regras: Regras = None):
+        self.regras = regras or regras_padrao()
+    
+    @property
+    def ativo(self) -> bool:
+        return bool(self.regras.por_minuto or self.regras.cota_diaria)
+    
+    def tentar(self, cliente: str, agora: float = None) -> Decisao:
+        raise NotImplementedError
+    
+    def devolver(self, cliente: str, agora: float = None) -> None:
+        """Devolve uma tentativa permitida cuja geração falhou no servidor."""
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Estado em dict no processo."""
+    
+    # Acima disso, clientes de dias anteriores são descartados
+    MAX_CLIENTES = 100_000
+    
+    def __init__(self, regras: Regras = None):
+        super().__init__(regras)
+        self._estados: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._limite = self.MAX_CLIENTES
+    
+    def tentar(self, cliente: str, agora: float = None) -> Decisao:
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            estado, decisao = decidir(self._estados.get(cliente), agora, self.regras)
+            self._estados[cliente] = estado
+            if len(self._estados) > self._limite:
+                self._descartar(agora)
+                # Próximo descarte só depois de outros tantos clientes novos:
+                # com muitos clientes ativos hoje o custo fica O(1) amortizado
+                self._limite = max(self.MAX_CLIENTES, 2 * len(self._estados))
+        return decisao
+    
+    def devolver(self, cliente: str, agora: float = None) -> None:
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            estado = self._estados.get(cliente)
+            if estado is not None:
+                self._estados[cliente] = restituir(estado, agora, self.regras)
+    
+    def _descartar(self, agora: float) -> None:
+        # Sem cota de hoje e com o bucket já cheio de novo, o estado não muda nada
+        hoje = int(agora // DIA)
+        recarga = self.regras.rajada / (self.regras.por_minuto / 60) if self.regras.por_minuto else 0
+        self._estados = {
+            cliente: estado for cliente, estado in self._estados.items()
+            if estado[2] == hoje or agora - estado[1] < recarga
+        }
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS limites (
+    cliente TEXT PRIMARY KEY, tokens REAL, atualizado REAL, dia INTEGER, usados INTEGER
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Estado em SQLite, compartilhado entre processos da mesma máquina."""
+    
+    bloqueante = True
+    
+    # A cada tantas decisões, remove clientes de dias anteriores
+    DESCARTE_A_CADA = 1000
+    
+    def __init__(self, caminho, regras: Regras = None):
+        super().__init__(regras)
+        self.banco = BancoLocal(caminho, ESQUEMA)
+        self._decisoes = itertools.count(1)
+    
+    def tentar(self, cliente: str, agora: float = None) -> Decisao:
+        agora = time.time() if agora is None else agora
+        with self.banco.transacao() as conn:
+            linha = conn.execute(
+                "SELECT tokens, atualizado, dia, usados FROM limites WHERE cliente = ?", (cliente,)
+            ).fetchone()
+            estado, decisao = decidir(list(linha) if linha else None, agora, self.regras)
+            conn.execute("INSERT OR REPLACE INTO limites VALUES (?, ?, ?, ?, ?)", (cliente, *estado))
+        
+        if next(self._decisoes) % self.DESCARTE_A_CADA == 0:
+            self.descartar_antigos(agora)
+        return decisao
+    
+    def devolver(self, cliente: str, agora: float = None) -> None:
+        agora = time.time() if agora is None else agora
+        with self.banco.transacao() as conn:
+            linha = conn.execute(
+                "SELECT tokens, atualizado, dia, usados FROM limites WHERE cliente = ?", (cliente,)
+            ).fetchone()
+            if linha:
+                estado = restituir(list(linha), agora, self.regras)
+                conn.execute("INSERT OR REPLACE INTO limites VALUES (?, ?, ?, ?, ?)", (cliente, *estado))
+    
+    def descartar_antigos(self, agora: float = None) -> int:
+        """Remove clientes sem uso hoje. Retorna quantos foram removidos.
+        
+        Um cliente de ontem com o bucket ainda incompleto volta com o bucket
+        cheio, o que no máximo antecipa uma rajada.
+        """
+        agora = time.time() if agora is None else agora
+        cursor = self.banco.conexao().execute("DELETE FROM limites WHERE dia < ?", (int(agora // DIA),))
+        return cursor.rowcount
+
+
+@lru_cache(maxsize=None)
+def criar_rate_limiter() -> RateLimiter:
+    """Cria (uma vez por processo) o limitador conforme Config.RATE_LIMIT_BACKEND.
+    
+    Sem backend configurado: ``sqlite`` com mais de um worker, senão ``memory``.
+    
+    Raises:
+        ValueError: Se o backend for desconhecido
+    """
+    backend = backend_padrao(Config.RATE_LIMIT_BACKEND)
+    if backend == "memory":
+        return MemoryRateLimiter()
+    if backend == "sqlite":
+        caminho = Config.RATE_LIMIT_DB or Config.DATA_DIR / "ratelimit.db"
+        return SQLiteRateLimiter(caminho)
+    raise ValueError(f"RATE_LIMIT_BACKEND desconhecido: {backend}")
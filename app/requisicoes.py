@@ -0,0 +1,165 @@
+"""Tratamento de ``POST /api/gerar`` comum às APIs Flask e ASGI.
+
+Validação, limite de taxa, idempotência e o mapeamento de erros para
+respostas ficam em um único fluxo (``Geracao._fluxo``), escrito como um
+gerador que entrega cada chamada com I/O como um ``Passo``. ``gerar``
+executa os passos direto (app.py, uma thread por requisição) e
+``gerar_async`` no event loop (asgi.py): a geração com a versão async do
+serviço e os backends que bloqueiam (sqlite) em thread.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Generator, NamedTuple, Optional, Tuple
+from scheduler import FilaCheia
+from llm import RespostaTruncada
+from ratelimit import MENSAGENS_LIMITE
+
+# (corpo, status, headers)
+Resposta = Tuple[Dict, int, Dict[str, str]]
+
+
+class Passo(NamedTuple):
+    """Chamada com I/O pedida pelo fluxo."""
+    funcao: Callable
+    args: tuple
+    # A chamada bloqueia (ex: sqlite): no event loop vai para uma thread
+    bloqueante: bool = False
+    # Versão async de ``funcao``, usada no event loop
+    corrotina: Optional[Callable] = None
+
+
+class Geracao:
+    """Pedidos de geração de um servidor: serviço, limitador e idempotência."""
+    
+    def __init__(self, service, limitador, idempotencia):
+        self.service = service
+        self.limitador = limitador
+        self.idempotencia = idempotencia
+    
+    def gerar(self, dados: Any, cliente: str, chave: Optional[str] = None) -> Resposta:
+        """Processa o pedido chamando o serviço e os backends direto."""
+        fluxo = self._fluxo(dados, cliente, chave)
+        resultado, erro = None, None
+        while True:
+            try:
+                passo = fluxo.throw(erro) if erro is not None else fluxo.send(resultado)
+            except StopIteration as fim:
+                return fim.value
+            resultado, erro = None, None
+            try:
+                resultado = passo.funcao(*passo.args)
+            except BaseException as e:
+                erro = e
+    
+    async def gerar_async(self, dados: Any, cliente: str, chave: Optional[str] = None) -> Resposta:
+        """Processa o pedido sem bloquear o event loop."""
+        fluxo = self._fluxo(dados, cliente, chave)
+        resultado, erro = None, None
+        while True:
+            try:
+                passo = fluxo.throw(erro) if erro is not None else fluxo.send(resultado)
+            except StopIteration as fim:
+                return fim.value
+            resultado, erro = None, None
+            try:
+                if passo.corrotina is not None:
+                    resultado = await passo.corrotina(*passo.args)
+                elif passo.bloqueante:
+                    resultado = await asyncio.to_thread(passo.funcao, *passo.args)
+                else:
+                    resultado = passo.funcao(*passo.args)
+            except BaseException as e:
+                # Inclusive o cancelamento: o fluxo libera a chave de idempotência
+                erro = e
+    
+    def _fluxo(self, dados: Any, cliente: str, chave: Optional[str]) -> Generator[Passo, Any, Resposta]:
+        """Idempotência em volta da geração.
+        
+        Repetições com a mesma Idempotency-Key recebem a resposta guardada
+        (ver idempotency.py); sem a chave, ou com a idempotência desligada,
+        cada pedido gera.
+        """
+        if not isinstance(dados, dict) or "tema" not in dados:
+            return {"erro": "Campo 'tema' obrigatório"}, 400, {}
+        
+        idempotencia = self.idempotencia
+        if not chave or not idempotencia.ativo:
+            return (yield from self._gerar(dados, cliente))
+        
+        resposta = yield Passo(idempotencia.abrir, (cliente, chave, dados), idempotencia.bloqueante)
+        if resposta is not None:
+            return resposta
+        try:
+            corpo, status, headers = yield from self._gerar(dados, cliente)
+        except BaseException:
+            yield Passo(idempotencia.cancelar, (cliente, chave), idempotencia.bloqueante)
+            raise
+        yield Passo(idempotencia.fechar, (cliente, chave, dados, corpo, status), idempotencia.bloqueante)
+        return corpo, status, headers
+    
+    def _gerar(self, dados: dict, cliente: str) -> Generator[Passo, Any, Resposta]:
+        """Valida o pedido, aplica o limite de taxa e gera o mapa.
+        
+        Pedidos inválidos não consomem o limite; se a geração falhar por
+        motivo do servidor (fila cheia, LLM), a tentativa é devolvida.
+        """
+        service, limitador = self.service, self.limitador
+        tema, perfil, prioridade = dados["tema"], dados.get("perfil"), dados.get("prioridade", "interativo")
+        try:
+            service.validar(tema, perfil, prioridade)
+        except ValueError as e:
+            return {"erro": str(e)}, 400, {}
+        
+        decisao = None
+        if limitador.ativo:
+            decisao = yield Passo(limitador.tentar, (cliente,), limitador.bloqueante)
+        if decisao and not decisao.permitido:
+            return {"erro": MENSAGENS_LIMITE[decisao.motivo]}, 429, {"Retry-After": str(decisao.retry_after)}
+        
+        try:
+            map_id, map_info = yield Passo(
+                service.gerar_mapa,
+                (tema, perfil, prioridade, cliente),
+                corrotina=service.gerar_mapa_async
+            )
+        except ValueError as e:
+            return {"erro": str(e)}, 400, {}
+        except Exception as e:
+            # Falha do servidor: a tentativa não conta no limite do cliente
+            if decisao:
+                yield Passo(limitador.devolver, (cliente,), limitador.bloqueante)
+            resposta = _falha(e)
+            if resposta is None:
+                raise
+            return resposta
+        
+        return _criado(map_id, map_info), 201, {}
+
+
+def _criado(map_id: str, map_info: dict) -> dict:
+    """Corpo da resposta de um mapa gerado."""
+    return {
+        "id": map_id,
+        "tema": map_info["tema"],
+        "perfil": map_info["perfil"],
+        "arquivo": map_info["arquivo"],
+        "tamanho": map_info["tamanho"],
+        "criado": map_info["criado"],
+        "links": {
+            "preview": f"/api/preview/{map_id}",
+            "download": f"/api/download/{map_id}",
+            "info": f"/api/info/{map_id}",
+            "arvore": f"/api/arvore/{map_id}",
+            "svg": f"/api/svg/{map_id}"
+        }
+    }
+
+
+def _falha(e: Exception) -> Optional[Resposta]:
+    """Resposta de uma falha esperada da geração, ou None."""
+    if isinstance(e, FilaCheia):
+        return {"erro": str(e)}, 503, {"Retry-After": str(e.retry_after)}
+    if isinstance(e, RespostaTruncada):
+        return {"erro": str(e)}, 502, {}
+    if isinstance(e, RuntimeError):
+        return {"erro": str(e)}, 500, {}
+    return None
@@ -0,0 +1,290 @@
+"""Agendador das chamadas à LLM, com prioridades.
+
+Toda chamada à LLM feita pelo ``MapaService`` passa por ``LLMScheduler``,
+que limita as chamadas simultâneas e decide quem entra quando um slot
+libera. O limite pode ser fixo ou uma função, como o limite adaptativo de
+``synapsis.AdaptiveLimiter`` (ver llm.py):
+
+- Entre classes (``interativo``, ``lote``, ``fundo``), partilha ponderada
+  pelo custo: cada classe tem um relógio virtual que avança
+  ``custo / peso`` a cada chamada, e a classe com o menor relógio vai
+  primeiro. Com pesos 8:2:1 um lote grande não atrasa o interativo, mas
+  também não fica parado.
+- ``LLM_RESERVA_INTERATIVA`` slots só atendem o interativo: lotes que
+  ocupem todos os outros não impedem uma requisição interativa de começar.
+- Dentro de uma classe, round-robin entre clientes: quem tem 100 chamadas
+  na fila não passa na frente de quem tem 1.
+- Admissão: o custo estimado (tokens do prompt + ``max_tokens`` do
+  perfil) na fila de cada classe é limitado a ``LLM_FILA_CUSTO_MAX``;
+  acima disso a chamada é recusada com ``FilaCheia`` em vez de esperar.
+  Quem espera mais que ``LLM_TIMEOUT`` por um slot desiste, também com
+  ``FilaCheia``, em vez de prender a thread indefinidamente.
+
+Chamadas em andamento não são interrompidas: a preempção acontece na
+escolha do próximo slot. Cada processo tem seu próprio agendador.
+"""
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Union
+from config import Config
+from metrics import LLM_QUEUE_WAIT, LLM_REJECTED
+
+# Classe de prioridade -> peso
+PRIORIDADES = {"interativo": 8, "lote": 2, "fundo": 1}
+
+
+class FilaCheia(Exception):
+    """Chamada recusada pelo controle de admissão."""
+    
+    def __init__(self, prioridade: str, retry_after: int):
+        super().__init__(f"Fila '{prioridade}' cheia, tente novamente em {retry_after} s")
+        self.prioridade = prioridade
+        self.retry_after = retry_after
+
+
+class EsperaEsgotada(FilaCheia):
+    """Pedido que esperou por um slot mais que o tempo máximo."""
+    
+    def __init__(self, prioridade: str, retry_after: int, espera: float):
+        super().__init__(prioridade, retry_after)
+        self.args = (f"Sem vaga na fila '{prioridade}' após {espera:g} s, tente novamente em {retry_after} s",)
+
+
+class _Pedido:
+    """Chamada aguardando (ou ocupando) um slot."""
+    
+    __slots__ = ("prioridade", "cliente", "custo", "entrada", "acordar", "liberado")
+    
+    def __init__(self, prioridade: str, cliente: str, custo: int, acordar: Callable[[], None]):
+        self.prioridade = prioridade
+        self.cliente = cliente
+        self.custo = custo
+        self.entrada = time.perf_counter()
+        self.acordar = acordar
+        self.liberado = False
+
+
+class _Classe:
+    """Fila de uma classe de prioridade: uma fila por cliente, em round-robin."""
+    
+    def __init__(self, peso: float):
+        self.peso = peso
+        self.relogio = 0.0
+        self.clientes: "OrderedDict[str, deque]" = OrderedDict()
+        self.pedidos = 0
+        self.custo = 0
+    
+    def push(self, pedido: _Pedido) -> None:
+        self.clientes.setdefault(pedido.cliente, deque()).append(pedido)
+        self.pedidos += 1
+        self.custo += pedido.custo
+    
+    def pop(self) -> _Pedido:
+        cliente, fila = next(iter(self.clientes.items()))
+        pedido = fila.popleft()
+        if fila:
+            self.clientes.move_to_end(cliente)
+        else:
+            del self.clientes[cliente]
+        self._descontar(pedido)
+        return pedido
+    
+    def remove(self, pedido: _Pedido) -> None:
+        fila = self.clientes[pedido.cliente]
+        fila.remove(pedido)
+        if not fila:
+            del self.clientes[pedido.cliente]
+        self._descontar(pedido)
+    
+    def _descontar(self, pedido: _Pedido) -> None:
+        self.pedidos -= 1
+        self.custo -= pedido.custo
+
+
+class LLMScheduler:
+    """Limita e ordena chamadas à LLM por prioridade e cliente."""
+    
+    def __init__(
+        self,
+        concorrencia: Union[int, Callable[[], int]] = None,
+        reserva: int = None,
+        custo_max: int = None,
+        pesos: Dict[str, float] = None,
+        espera_max: float = None
+    ):
+        """
+        Args:
+            concorrencia: Chamadas simultâneas, ou função que retorna o
+                limite atual (default: Config.LLM_CONCORRENCIA)
+            reserva: Slots só do interativo (default: Config.LLM_RESERVA_INTERATIVA)
+            custo_max: Custo estimado máximo na fila de cada classe
+            pesos: Classe de prioridade -> peso (default: PRIORIDADES)
+            espera_max: Segundos de espera por um slot antes de desistir
+                (default: Config.LLM_TIMEOUT)
+        """
+        if callable(concorrencia):
+            self._limite = concorrencia
+        else:
+            fixa = concorrencia or Config.LLM_CONCORRENCIA
+            self._limite = lambda: fixa
+        self.reserva = Config.LLM_RESERVA_INTERATIVA if reserva is None else reserva
+        self.custo_max = custo_max or Config.LLM_FILA_CUSTO_MAX
+        self.espera_max = espera_max or Config.LLM_TIMEOUT
+        self._classes = {nome: _Classe(peso) for nome, peso in (pesos or PRIORIDADES).items()}
+        self._ativos = 0
+        self._virtual = 0.0
+        # Média móvel da duração de uma chamada, para estimar o Retry-After
+        self._duracao = 5.0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def slot(self, prioridade: str = "interativo", cliente: str = "", custo: int = 0):
+        """Aguarda um slot (bloqueando a thread) e o ocupa durante o bloco.
+        
+        Raises:
+            ValueError: Se a prioridade não existir
+            FilaCheia: Se a fila da classe estiver cheia
+            EsperaEsgotada: Se o slot não vier em ``espera_max`` segundos
+        """
+        evento = threading.Event()
+        pedido = self._enfileirar(prioridade, cliente, custo, evento.set)
+        if not evento.wait(self.espera_max):
+            self._esgotar(pedido)
+        with self._ocupar(pedido):
+            yield
+    
+    @asynccontextmanager
+    async def slot_async(self, prioridade: str = "interativo", cliente: str = "", custo: int = 0):
+        """Como slot, aguardando sem bloquear o event loop."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        
+        def acordar():
+            loop.call_soon_threadsafe(lambda: futuro.done() or futuro.set_result(None))
+        
+        pedido = self._enfileirar(prioridade, cliente, custo, acordar)
+        try:
+            await asyncio.wait_for(futuro, self.espera_max)
+        except asyncio.TimeoutError:
+            self._esgotar(pedido)
+        except asyncio.CancelledError:
+            self._desistir(pedido)
+            raise
+        with self._ocupar(pedido):
+            yield
+    
+    @property
+    def concorrencia(self) -> int:
+        """Limite atual de chamadas simultâneas."""
+        return max(1, self._limite())
+    
+    def stats(self) -> dict:
+        """Slots em uso e, por classe, pedidos e custo estimado na fila."""
+        with self._lock:
+            return {
+                "concorrencia": self.concorrencia,
+                "ativos": self._ativos,
+                "filas": {
+                    nome: {"pedidos": classe.pedidos, "custo": classe.custo}
+                    for nome, classe in self._classes.items()
+                },
+            }
+    
+    def validar(self, prioridade: str) -> None:
+        """Confere a classe de prioridade antes de qualquer trabalho.
+        
+        Raises:
+            ValueError: Se a prioridade não existir ou não for texto
+        """
+        if not isinstance(prioridade, str) or prioridade not in self._classes:
+            raise ValueError(f"Prioridade inválida: {prioridade} (opções: {', '.join(self._classes)})")
+    
+    def _enfileirar(self, prioridade: str, cliente: str, custo: int, acordar) -> _Pedido:
+        self.validar(prioridade)
+        classe = self._classes[prioridade]
+        
+        with self._lock:
+            # Fila vazia sempre admite, senão um pedido caro nunca entraria
+            if classe.pedidos and classe.custo + custo > self.custo_max:
+                LLM_REJECTED.inc(prioridade)
+                raise FilaCheia(prioridade, self._retry_after())
+            if not classe.pedidos:
+                # Classe que ficou ociosa não acumula crédito
+                classe.relogio = max(classe.relogio, self._virtual)
+            pedido = _Pedido(prioridade, cliente, custo, acordar)
+            classe.push(pedido)
+            self._despachar()
+        return pedido
+    
+    def _despachar(self) -> None:
+        """Entrega slots livres aos próximos pedidos. Chamado com o lock."""
+        limite = self.concorrencia
+        # Pelo menos um slot fica para lote e fundo
+        reserva = min(self.reserva, limite - 1)
+        while self._ativos < limite:
+            # Os últimos `reserva` slots livres só atendem o interativo
+            so_interativo = self._ativos >= limite - reserva
+            candidatas = [
+                classe for nome, classe in self._classes.items()
+                if classe.pedidos and (not so_interativo or nome == "interativo")
+            ]
+            if not candidatas:
+                return
+            
+            classe = min(candidatas, key=lambda c: c.relogio)
+            pedido = classe.pop()
+            self._virtual = classe.relogio
+            classe.relogio += pedido.custo / classe.peso
+            pedido.liberado = True
+            self._ativos += 1
+            pedido.acordar()
+    
+    @contextmanager
+    def _ocupar(self, pedido: _Pedido):
+        inicio = time.perf_counter()
+        LLM_QUEUE_WAIT.observe(inicio - pedido.entrada, pedido.prioridade)
+        try:
+            yield
+        finally:
+            self._liberar(time.perf_counter() - inicio)
+    
+    def _liberar(self, duracao: float = None) -> None:
+        with self._lock:
+            self._ativos -= 1
+            if duracao is not None:
+                self._duracao = 0.8 * self._duracao + 0.2 * duracao
+            self._despachar()
+    
+    def _desistir(self, pedido: _Pedido) -> None:
+        """Cancela um pedido: sai da fila ou devolve o slot já entregue."""
+        with self._lock:
+            liberado = pedido.liberado
+            if not liberado:
+                self._classes[pedido.prioridade].remove(pedido)
+        if liberado:
+            self._liberar()
+    
+    def _esgotar(self, pedido: _Pedido) -> None:
+        """Desiste de um pedido que esperou demais.
+        
+        Se o slot chegou junto com o timeout, o pedido segue (sem exceção).
+        
+        Raises:
+            EsperaEsgotada: Se o pedido ainda estava na fila
+        """
+        with self._lock:
+            if pedido.liberado:
+                return
+            self._classes[pedido.prioridade].remove(pedido)
+            LLM_REJECTED.inc(pedido.prioridade)
+            retry_after = self._retry_after()
+        raise EsperaEsgotada(pedido.prioridade, retry_after, self.espera_max)
+    
+    def _retry_after(self) -> int:
+        """Segundos estimados até a fila andar. Chamado com o lock."""
+        na_fila = sum(classe.pedidos for classe in self._classes.values())
+        return max(1, math.ceil(self._duracao * (na_fila + 1) / self.concorrencia))
@@ -0,0 +1,135 @@
+"""Servidor de produção: workers pré-forkados com gunicorn.
+
+- ``synapsis``, o template compilado e a aplicação são carregados no
+  processo mestre antes do fork (``preload_app``), compartilhando memória
+  copy-on-write entre os workers.
+- Um único worker é eleito líder (lock de arquivo) e executa o
+  ``CleanupService``; se ele cair, outro assume no próximo intervalo.
+- Com mais de um worker as métricas de ``/metrics`` são somadas entre
+  os processos (``Registry.compartilhar``), em ``METRICS_DIR``.
+- No desligamento (SIGTERM) os workers param de aceitar conexões e
+  aguardam as gerações em andamento até ``LLM_TIMEOUT`` segundos.
+
+Uso:
+    python serve.py [--asgi] [--workers 4] [--threads 16] [--bind 0.0.0.0:5000]
+"""
+import os
+import shutil
+import logging
+import argparse
+from pathlib import Path
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _preload() -> None:
+    """Importa e aquece o que deve ser compartilhado entre os workers.
+    
+    Os imports sob demanda do app e do synapsis são antecipados aqui,
+    no mestre; os clientes da LLM continuam sendo criados em cada
+    worker, na primeira chamada (conexões não atravessam o fork).
+    """
+    import yaml  # noqa: F401
+    import synapsis.core  # noqa: F401
+    from synapsis.renderer import get_template
+    get_template()
+    if Config.LLM_PROVIDER == "groq":
+        import groq  # noqa: F401
+
+
+def carregar_app(modo: str):
+    """Importa a aplicação (Flask para wsgi, Starlette para asgi)."""
+    if modo == "asgi":
+        from asgi import app, service, cleaner, aquecedor
+    else:
+        from app import app, service, cleaner, aquecedor
+    return app, service, cleaner, aquecedor
+
+
+def diretorio_metricas() -> Path:
+    """Diretório onde os workers gravam suas métricas."""
+    return Path(Config.METRICS_DIR) if Config.METRICS_DIR else Config.DATA_DIR / "metrics"
+
+
+def opcoes(modo: str, workers: int, threads: int, bind: str) -> dict:
+    """Monta configuração do gunicorn."""
+    drenagem = Config.LLM_TIMEOUT + 10
+    
+    opts = {
+        "bind": bind,
+        "workers": workers,
+        "preload_app": True,
+        "graceful_timeout": drenagem,
+        "timeout": drenagem + 20,
+        "keepalive": 5,
+        "accesslog": "-",
+    }
+    
+    if modo == "asgi":
+        opts["worker_class"] = "uvicorn.workers.UvicornWorker"
+    else:
+        opts["worker_class"] = "gthread"
+        opts["threads"] = threads
+    
+    return opts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--asgi", action="store_true", help="Serve asgi.py (Starlette/uvicorn)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=Config.WORKER_THREADS)
+    parser.add_argument("--bind", default=f"{Config.HOST}:{Config.PORT}")
+    args = parser.parse_args()
+    
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("serve.py requer gunicorn: pip install gunicorn")
+    
+    modo = "asgi" if args.asgi else Config.SERVER_MODE
+    
+    # Limite de taxa e idempotência escolhem o backend pelo número de workers
+    Config.WORKERS = args.workers
+    _preload()
+    from metrics import REGISTRY
+    app, service, cleaner, aquecedor = carregar_app(modo)
+    
+    metricas = diretorio_metricas() if args.workers > 1 else None
+    if metricas:
+        # Arquivos de uma execução anterior somariam contadores de outros processos
+        shutil.rmtree(metricas, ignore_errors=True)
+    
+    def post_fork(server, worker):
+        if metricas:
+            REGISTRY.compartilhar(metricas)
+        # Com asgi o lifespan do Starlette inicia a limpeza e o aquecedor
+        if modo != "asgi":
+            cleaner.iniciar(intervalo_minutos=5, lider=True)
+            aquecedor.iniciar(lider=True)
+    
+    def worker_exit(server, worker):
+        if not service.aguardar_geracoes(Config.LLM_TIMEOUT):
+            logger.warning(f"Worker encerrado com {service.em_andamento} gerações em andamento")
+        aquecedor.parar()
+        cleaner.parar()
+        service.acessos.flush()
+        REGISTRY.gravar()
+    
+    class Servidor(BaseApplication):
+        def load_config(self):
+            for chave, valor in opcoes(modo, args.workers, args.threads, args.bind).items():
+                self.cfg.set(chave, valor)
+            self.cfg.set("post_fork", post_fork)
+            self.cfg.set("worker_exit", worker_exit)
+        
+        def load(self):
+            return app
+    
+    logger.info(f"Iniciando servidor {modo} - {args.workers} workers em {args.bind}")
+    Servidor().run()
+
+
+if __name__ == "__main__":
+    main()
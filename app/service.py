@@ -1,70 +1,397 @@
 """Serviço de geração de mapas mentais."""
 import uuid
+import time
+import asyncio
 import logging
-from pathlib import Path
-from typing import Tuple
-from llm import gerar_mapa_mental
-from storage import StorageManager
+import threading
+from typing import Optional, Tuple, Union
+from synapsis import TokenUsage
+from synapsis.codec import pack, unpack, encode_tree
+from llm import gerar_html, gerar_html_async, desenhar, RespostaTruncada, TOKENS, AGENDADOR
+from scheduler import FilaCheia
+from perfis import obter_perfil
+from metrics import registrar_geracao, contar_tokens
+from storage import StorageManager, FreedBytes, physical_bytes
+from eviction import AccessTracker, EvictionPolicy, NoEviction, criar_politica
+from cache import AtribuicaoCache, chave_cache
+from warmer import RegistroConsultas
 from config import Config
 
 
 logger = logging.getLogger(__name__)
 
+# Política do aquecedor: gera só no espaço livre, nunca despeja mapas de usuários
+SEM_DESPEJO = NoEviction()
+
 
 class MapaService:
     """Serviço de geração e gerenciamento de mapas mentais."""
     
+    FORMATOS_ARVORE = ("json", "compacto", "binario")
+    
     def __init__(self):
         self.storage = StorageManager()
+        self.acessos = AccessTracker(self.storage)
+        self.politica = criar_politica()
+        self.agendador = AGENDADOR
+        self.atribuicao = AtribuicaoCache()
+        # Pedidos por tema, para o aquecedor (ver warmer.py)
+        self.consultas = RegistroConsultas(Config.DATA_DIR / "consultas.db") if Config.AQUECEDOR else None
+        self.em_andamento = 0
+        self._andamento_lock = threading.Lock()
+    
+    def _iniciar_geracao(self) -> None:
+        with self._andamento_lock:
+            self.em_andamento += 1
+    
+    def _finalizar_geracao(self) -> None:
+        with self._andamento_lock:
+            self.em_andamento -= 1
+    
+    def aguardar_geracoes(self, timeout: float) -> bool:
+        """Aguarda gerações em andamento terminarem (desligamento gracioso).
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos
+            
+        Returns:
+            True se não restou geração em andamento
+        """
+        limite = time.monotonic() + timeout
+        while self.em_andamento > 0 and time.monotonic() < limite:
+            time.sleep(0.1)
+        return self.em_andamento == 0
+    
+    def validar(self, tema: str, perfil: str = None, prioridade: str = "interativo") -> Tuple[str, dict]:
+        """Valida um pedido de geração sem gerar nada.
+        
+        A API valida antes de consumir o limite de taxa do cliente: um
+        pedido inválido não gasta a cota.
+        
+        Returns:
+            Tuple com (tema normalizado, perfil)
+            
+        Raises:
+            ValueError: Se tema, perfil ou prioridade forem inválidos
+        """
+        perfil = obter_perfil(perfil)
+        self.agendador.validar(prioridade)
+        return self._validar_tema(tema), perfil
     
-    def gerar_mapa(self, tema: str) -> Tuple[str, dict]:
+    def gerar_mapa(
+        self, tema: str, perfil: str = None, prioridade: str = "interativo", cliente: str = ""
+    ) -> Tuple[str, dict]:
         """Gera um novo mapa mental.
         
+        Com o cache de geração ativo (Config.CACHE_TTL_S), um tema e perfil
+        gerados recentemente são copiados para o novo mapa sem chamar a LLM.
+        
         Args:
             tema: Tema para o mapa mental
+            perfil: Nome do perfil de geração (default: Config.PERFIL_PADRAO)
+            prioridade: Classe no agendador da LLM: interativo, lote ou fundo
+            cliente: Identificador do cliente (fila justa dentro da classe)
             
         Returns:
             Tuple com (map_id, info_dict)
             
         Raises:
-            ValueError: Se tema for inválido
+            ValueError: Se tema, perfil ou prioridade forem inválidos
+            FilaCheia: Se o agendador recusar a geração
+            RespostaTruncada: Se o mapa não couber em max_tokens do perfil
             RuntimeError: Se houver erro ao gerar mapa
         """
-        # Validação
-        tema = tema.strip()
-        if not tema:
-            raise ValueError("Tema não pode estar vazio")
+        tema, perfil = self.validar(tema, perfil, prioridade)
+        inicio = time.perf_counter()
+        self._registrar_consulta(tema, perfil)
         
-        if len(tema) > Config.MAX_REQUEST_SIZE:
-            raise ValueError(f"Tema muito longo (máx {Config.MAX_REQUEST_SIZE} caracteres)")
+        copia = self._copiar_do_cache(tema, perfil)
+        if copia is not None:
+            map_id, map_info, resultado = copia
+        else:
+            # Conferir o limite antes de gastar tokens; o despejo fica para depois da LLM
+            self._liberar_espaco(despejar=False)
+            map_id, map_info = self._gerar(tema, perfil, prioridade, cliente)
+            resultado = "miss"
+        self.atribuicao.registrar(resultado, time.perf_counter() - inicio)
+        return map_id, map_info
+    
+    async def gerar_mapa_async(
+        self, tema: str, perfil: str = None, prioridade: str = "interativo", cliente: str = ""
+    ) -> Tuple[str, dict]:
+        """Como gerar_mapa, aguardando a LLM sem bloquear o event loop.
         
-        # Verificar limite
-        stats = self.storage.get_stats()
-        if stats["total_mapas"] >= Config.MAX_MAPS:
-            raise RuntimeError(f"Limite de {Config.MAX_MAPS} mapas atingido")
+        Operações de armazenamento rodam em thread separada.
+        
+        Raises:
+            ValueError: Se tema, perfil ou prioridade forem inválidos
+            FilaCheia: Se o agendador recusar a geração
+            RespostaTruncada: Se o mapa não couber em max_tokens do perfil
+            RuntimeError: Se houver erro ao gerar mapa
+        """
+        tema, perfil = self.validar(tema, perfil, prioridade)
+        inicio = time.perf_counter()
+        if self.consultas is not None:
+            await asyncio.to_thread(self._registrar_consulta, tema, perfil)
+        
+        copia = await asyncio.to_thread(self._copiar_do_cache, tema, perfil) if Config.CACHE_TTL_S else None
+        if copia is not None:
+            map_id, map_info, resultado = copia
+        else:
+            await asyncio.to_thread(self._liberar_espaco, despejar=False)
+            map_id, map_info = await self._gerar_async(tema, perfil, prioridade, cliente)
+            resultado = "miss"
+        self.atribuicao.registrar(resultado, time.perf_counter() - inicio)
+        return map_id, map_info
+    
+    def aquecer(self, tema: str, perfil: str) -> Tuple[str, int]:
+        """Gera um mapa para o cache, na prioridade "fundo" (ver warmer.py).
+        
+        Só usa espaço livre: nenhum mapa é despejado para um tema aquecido,
+        nem antes nem depois da LLM.
+        
+        Returns:
+            Tuple com (map_id, tokens de prompt e resposta gastos)
+            
+        Raises:
+            ValueError, FilaCheia: Como em gerar_mapa
+            RuntimeError: Sem espaço livre, ou erro ao gerar mapa
+        """
+        perfil = obter_perfil(perfil)
+        tema = self._validar_tema(tema)
+        if not self.tem_espaco():
+            raise RuntimeError("Sem espaço livre para aquecer (o aquecedor não despeja mapas)")
+        uso = TokenUsage(hooks=[contar_tokens])
+        map_id, _ = self._gerar(tema, perfil, "fundo", "aquecedor", {"origem": "aquecedor"}, uso, SEM_DESPEJO)
+        tokens = sum(row["prompt_tokens"] + row["completion_tokens"] for row in uso.report().values())
+        return map_id, tokens
+    
+    def _gerar(
+        self,
+        tema: str,
+        perfil: dict,
+        prioridade: str,
+        cliente: str,
+        campos: dict = None,
+        usage: TokenUsage = None,
+        politica: EvictionPolicy = None
+    ) -> Tuple[str, dict]:
+        """Chama a LLM e grava o novo mapa (tema já validado).
+        
+        Args:
+            politica: Política de despejo (default: a do serviço)
+        """
+        self._iniciar_geracao()
+        inicio = time.perf_counter()
+        sucesso = False
         
         try:
             # Gera ID único
             map_id = str(uuid.uuid4())
-            filename = f"{map_id}.html"
             
             # Gera mapa
             logger.info(f"Gerando mapa para tema: {tema}")
-            caminho = gerar_mapa_mental(
-                tema=tema,
-                output_dir=str(Config.DATA_DIR),
-                filename=filename
+            html, arvore = gerar_html(tema, perfil, prioridade, cliente, usage)
+            svg, miniatura = self._desenhar(arvore)
+            
+            # Só despeja com o mapa pronto: uma geração que falha não remove nada
+            self._liberar_espaco(politica=politica)
+            
+            # Grava HTML, árvore compacta, SVG, miniatura e metadados
+            map_info = self.storage.save_map(
+                map_id, tema, html, arvore=pack(arvore), campos=self._campos(tema, perfil, campos),
+                svg=svg, miniatura=miniatura
             )
+            sucesso = True
+            logger.info(f"Mapa gerado com sucesso: {map_id}")
+            
+            return map_id, map_info
+        
+        except (FilaCheia, RespostaTruncada):
+            raise
+        
+        except Exception as e:
+            logger.error(f"Erro ao gerar mapa: {str(e)}")
+            raise RuntimeError(f"Erro ao gerar mapa: {str(e)}")
+        
+        finally:
+            registrar_geracao(perfil, time.perf_counter() - inicio, sucesso)
+            self._finalizar_geracao()
+    
+    async def _gerar_async(self, tema: str, perfil: dict, prioridade: str, cliente: str) -> Tuple[str, dict]:
+        """Como _gerar, sem bloquear o event loop."""
+        self._iniciar_geracao()
+        inicio = time.perf_counter()
+        sucesso = False
+        
+        try:
+            map_id = str(uuid.uuid4())
+            
+            logger.info(f"Gerando mapa para tema: {tema}")
+            html, arvore = await gerar_html_async(tema, perfil, prioridade, cliente)
+            # Layout e render são O(n) nos nós: fora do event loop
+            svg, miniatura = await asyncio.to_thread(self._desenhar, arvore)
             
-            # Salva metadados
-            map_info = self.storage.save_map(map_id, tema, str(caminho))
+            await asyncio.to_thread(self._liberar_espaco)
+            map_info = await asyncio.to_thread(
+                self.storage.save_map, map_id, tema, html, pack(arvore), self._campos(tema, perfil), svg, miniatura
+            )
+            sucesso = True
             logger.info(f"Mapa gerado com sucesso: {map_id}")
             
             return map_id, map_info
         
+        except (FilaCheia, RespostaTruncada):
+            raise
+        
         except Exception as e:
             logger.error(f"Erro ao gerar mapa: {str(e)}")
             raise RuntimeError(f"Erro ao gerar mapa: {str(e)}")
+        
+        finally:
+            registrar_geracao(perfil, time.perf_counter() - inicio, sucesso)
+            self._finalizar_geracao()
+    
+    @staticmethod
+    def _desenhar(arvore: dict) -> Tuple[Optional[str], Optional[str]]:
+        """SVG e miniatura do mapa, ou (None, None) se o desenho falhar.
+        
+        Os tokens da LLM já foram gastos: um erro no layout não perde o
+        mapa, que é salvo sem SVG.
+        """
+        try:
+            return desenhar(arvore)
+        except Exception as e:
+            logger.error(f"Erro ao desenhar mapa (salvo sem SVG): {str(e)}")
+            return None, None
+    
+    @staticmethod
+    def _campos(tema: str, perfil: dict, extras: dict = None) -> dict:
+        """Metadados de um mapa gerado: perfil e chave do cache de geração."""
+        campos = {"perfil": perfil["nome"], "chave_cache": chave_cache(tema, perfil["nome"])}
+        campos.update(extras or {})
+        return campos
+    
+    def _registrar_consulta(self, tema: str, perfil: dict) -> None:
+        """Conta o pedido para o aquecedor (falhas não afetam a geração)."""
+        if self.consultas is None:
+            return
+        try:
+            self.consultas.registrar(tema, perfil["nome"])
+        except Exception as e:
+            logger.warning(f"Erro ao registrar consulta: {str(e)}")
+    
+    def _copiar_do_cache(self, tema: str, perfil: dict) -> Optional[Tuple[str, dict, str]]:
+        """Copia o mapa mais novo do mesmo tema e perfil, se ainda válido.
+        
+        Returns:
+            Tuple com (map_id, info_dict, "hit" ou "warm_hit"), ou None
+        """
+        if not Config.CACHE_TTL_S:
+            return None
+        fonte = self.storage.find_cached(chave_cache(tema, perfil["nome"]), time.time() - Config.CACHE_TTL_S)
+        if fonte is None:
+            return None
+        # A fonte da cópia não pode ser despejada para abrir espaço para ela
+        self._liberar_espaco(preservar=fonte["id"])
+        map_id = str(uuid.uuid4())
+        try:
+            map_info = self.storage.link_map(
+                map_id, tema, fonte, campos={"perfil": perfil["nome"], "cache_de": fonte["id"]}
+            )
+        except KeyError:
+            return None
+        
+        logger.info(f"Mapa copiado do cache: {map_id} (de {fonte['id']})")
+        return map_id, map_info, "warm_hit" if fonte.get("origem") == "aquecedor" else "hit"
+    
+    @staticmethod
+    def _validar_tema(tema: str) -> str:
+        """Valida o tema e retorna normalizado.
+        
+        Raises:
+            ValueError: Se tema for inválido
+        """
+        if not isinstance(tema, str):
+            raise ValueError("Tema deve ser texto")
+        
+        tema = tema.strip()
+        if not tema:
+            raise ValueError("Tema não pode estar vazio")
+        
+        if len(tema) > Config.MAX_REQUEST_SIZE:
+            raise ValueError(f"Tema muito longo (máx {Config.MAX_REQUEST_SIZE} caracteres)")
+        
+        return tema
+    
+    def tem_espaco(self) -> bool:
+        """True se um novo mapa cabe nos limites sem despejar nenhum."""
+        excesso_mapas, excesso_bytes = self._excesso(self.storage._load_metadata())
+        return excesso_mapas <= 0 and excesso_bytes <= 0
+    
+    @staticmethod
+    def _excesso(metadata: dict) -> Tuple[int, int]:
+        """Mapas e bytes acima de MAX_MAPS e MAX_STORAGE_MB com um mapa a mais.
+        
+        Os bytes são os físicos: cópias do cache que compartilham blobs
+        não ocupam espaço de novo.
+        """
+        max_bytes = Config.MAX_STORAGE_MB * 1024 * 1024
+        
+        excesso_mapas = len(metadata) + 1 - Config.MAX_MAPS
+        excesso_bytes = 0
+        if max_bytes:
+            excesso_bytes = physical_bytes(metadata) - max_bytes
+        return excesso_mapas, excesso_bytes
+    
+    def _liberar_espaco(
+        self, despejar: bool = True, politica: EvictionPolicy = None, preservar: str = None
+    ) -> None:
+        """Garante espaço para um novo mapa, despejando conforme a política.
+        
+        Args:
+            despejar: False só confere se há espaço ou mapas que a política
+                despejaria, sem remover nada
+            politica: Política de despejo (default: a do serviço)
+            preservar: ID de um mapa que não pode ser despejado
+            
+        Raises:
+            RuntimeError: Se o limite for atingido e nada puder ser despejado
+        """
+        politica = politica or self.politica
+        metadata = self.storage._load_metadata()
+        excesso_mapas, excesso_bytes = self._excesso(metadata)
+        
+        if excesso_mapas <= 0 and excesso_bytes <= 0:
+            return
+        
+        # Grava acessos pendentes para a política decidir com dados atuais
+        if despejar and self.acessos.flush():
+            metadata = self.storage._load_metadata()
+        
+        vitimas = politica.select(
+            (info for map_id, info in metadata.items() if map_id != preservar),
+            max(excesso_mapas, 0),
+            max(excesso_bytes, 0),
+            FreedBytes(metadata)
+        )
+        if not despejar:
+            deletados = vitimas
+        else:
+            deletados = self.storage.delete_maps(vitimas)
+            if deletados:
+                logger.info(f"{len(deletados)} mapas despejados (política: {politica.nome})")
+        
+        if excesso_mapas > len(deletados):
+            raise RuntimeError(f"Limite de {Config.MAX_MAPS} mapas atingido")
+        # Só conta o blob que nenhum mapa restante referencia
+        liberar = FreedBytes(metadata)
+        if excesso_bytes > sum(liberar(metadata[i]) for i in deletados):
+            raise RuntimeError(f"Limite de {Config.MAX_STORAGE_MB} MB atingido")
+        
+    def registrar_acesso(self, map_id: str) -> None:
+        """Registra acesso a um mapa (gravado em lote)."""
+        self.acessos.hit(map_id)
     
     def obter_mapa(self, map_id: str) -> dict:
         """Obtém informações de um mapa.
@@ -90,9 +417,12 @@ class MapaService:
             limite: Número máximo de mapas
             
         Returns:
-            Lista de mapas
+            Lista de mapas (com o link da miniatura, se houver)
         """
-        return self.storage.list_maps(limit=limite)
+        return [
+            {**m, "miniatura": f"/api/miniatura/{m['id']}"} if "chave_miniatura" in m else m
+            for m in self.storage.list_maps(limit=limite)
+        ]
     
     def deletar_mapa(self, map_id: str) -> bool:
         """Deleta um mapa.
@@ -111,30 +441,80 @@ class MapaService:
         logger.info(f"Mapa deletado: {map_id}")
         return True
     
-    def obter_arquivo(self, map_id: str) -> Path:
-        """Obtém caminho do arquivo de um mapa.
+    def obter_arquivo(self, map_id: str) -> str:
+        """Obtém chave do blob de um mapa.
         
         Args:
             map_id: ID do mapa
             
         Returns:
-            Path do arquivo
+            Chave do arquivo no blob store
             
         Raises:
             ValueError: Se mapa não for encontrado
         """
-        map_info = self.obter_mapa(map_id)
-        filepath = Path(map_info["caminho"])
+        self.obter_mapa(map_id)
+        key = self.storage.resolve_key(map_id)
         
-        if not filepath.exists():
+        if not self.storage.blobs.exists(key):
             raise ValueError(f"Arquivo do mapa {map_id} não existe")
         
-        return filepath
+        return key
+    
+    def obter_arvore(self, map_id: str, formato: str = "json") -> Union[dict, bytes]:
+        """Obtém a árvore de um mapa para transporte.
+        
+        Args:
+            map_id: ID do mapa
+            formato: "json" (árvore aninhada), "compacto" (colunar,
+                synapsis.codec.encode_tree) ou "binario" (bytes de
+                synapsis.codec.pack, como gravados)
+                
+        Returns:
+            Dict nos formatos JSON ou bytes no binário
+            
+        Raises:
+            ValueError: Se formato for inválido ou mapa/árvore não existir
+        """
+        if formato not in self.FORMATOS_ARVORE:
+            raise ValueError(f"Formato inválido: {formato}")
+        
+        dados = self.storage.get_tree(map_id)
+        if dados is None:
+            raise ValueError(f"Árvore do mapa {map_id} não encontrada")
+        
+        if formato == "binario":
+            return dados
+        arvore = unpack(dados)
+        return encode_tree(arvore) if formato == "compacto" else arvore
+    
+    def obter_svg(self, map_id: str, miniatura: bool = False) -> bytes:
+        """Obtém o SVG estático de um mapa ou sua miniatura.
+        
+        Args:
+            map_id: ID do mapa
+            miniatura: Se True, a miniatura em vez do desenho completo
+            
+        Returns:
+            Bytes do SVG
+            
+        Raises:
+            ValueError: Se o mapa não existir ou tiver sido gerado antes do SVG
+        """
+        dados = self.storage.get_artifact(map_id, "miniatura" if miniatura else "svg")
+        if dados is None:
+            raise ValueError(f"SVG do mapa {map_id} não encontrado")
+        return dados
     
     def obter_stats(self) -> dict:
         """Obtém estatísticas.
         
         Returns:
-            Dict com estatísticas
+            Dict com estatísticas (inclui tokens por template de prompt e
+            filas do agendador da LLM e resultados do cache de geração)
         """
-        return self.storage.get_stats()
+        stats = self.storage.get_stats()
+        stats["tokens"] = TOKENS.report()
+        stats["fila_llm"] = self.agendador.stats()
+        stats["cache"] = self.atribuicao.relatorio()
+        return stats
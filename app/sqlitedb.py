@@ -0,0 +1,58 @@
+"""Banco SQLite compartilhado entre os processos da máquina.
+
+Uma conexão por thread, em modo WAL, e transações ``BEGIN IMMEDIATE``:
+a leitura e a escrita de uma decisão (ex: limite de taxa) acontecem sem
+outro processo no meio.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+
+
+def backend_padrao(backend: str) -> str:
+    """Backend configurado ou, se vazio, o default pelo número de workers.
+    
+    ``sqlite`` com mais de um worker (estado compartilhado entre os
+    processos) e ``memory`` com um. ``Config.WORKERS`` só passa de 1
+    quando o ``serve.py`` o define pelo ``--workers``.
+    """
+    return backend or ("sqlite" if Config.WORKERS > 1 else "memory")
+
+
+class BancoLocal:
+    """Arquivo SQLite com conexões por thread."""
+    
+    def __init__(self, caminho, esquema: str = ""):
+        """
+        Args:
+            caminho: Arquivo do banco (o diretório é criado)
+            esquema: SQL executado na abertura (ex: CREATE TABLE IF NOT EXISTS)
+        """
+        Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        self.caminho = str(caminho)
+        self._local = threading.local()
+        if esquema:
+            self.conexao().executescript(esquema)
+    
+    def conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def transacao(self):
+        """Transação com lock de escrita desde o início."""
+        conn = self.conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -1,9 +1,136 @@
-"""Gerenciamento de armazenamento."""
-import json
+"""Gerenciamento de armazenamento.
+
+Os blobs de um mapa (HTML, árvore, SVG e miniatura) são endereçados
+pelo conteúdo: cada um fica uma vez em ``cas/ab/cd/<sha256><sufixo>``
+e os metadados dos mapas apontam para ele. Cópias do cache de geração e
+mapas idênticos compartilham os blobs; um blob só é removido quando o
+último mapa que o referencia sai. As referências são contadas a partir
+dos metadados.
+
+Gravar na chave do conteúdo é idempotente, então os blobs são gravados
+fora do lock do journal; sob o lock só se confere que cada um existe e
+se faz o append. Como a remoção de blobs sem referência também acontece
+sob o lock, um processo não remove um blob que outro acabou de
+referenciar, e leituras e gravações de outros workers não esperam I/O
+de blobs.
+"""
+import time
+import uuid
+import heapq
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 from config import Config
+from blobstore import BlobStore, criar_blobstore
+from journal import MetadataJournal
+from metrics import medir, Cronometro, STAGE_SECONDS
+
+
+def shard_key(map_id: str, depth: Optional[int] = None) -> str:
+    """Retorna caminho relativo sharded de um mapa.
+    
+    Usa pares de caracteres hex do início do UUID como subdiretórios,
+    ex: ``3f/2a/3f2a9c1e-....html`` com depth=2.
+    
+    Args:
+        map_id: ID do mapa
+        depth: Níveis de sharding (default: Config.SHARD_DEPTH)
+        
+    Returns:
+        Caminho relativo ao diretório de dados
+    """
+    if depth is None:
+        depth = Config.SHARD_DEPTH
+    prefix = map_id.replace("-", "")
+    parts = [prefix[i * 2:i * 2 + 2] for i in range(depth)]
+    return "/".join(parts + [f"{map_id}.html"])
+
+
+# Prefixo dos blobs endereçados pelo conteúdo
+CAS_PREFIX = "cas"
+
+
+def content_key(digest: str, suffix: str, depth: Optional[int] = None) -> str:
+    """Retorna chave endereçada pelo conteúdo, ex: ``cas/9f/86/9f86d0....html``.
+    
+    Args:
+        digest: SHA-256 (hex) do conteúdo
+        suffix: Sufixo do artefato (ver ARTEFATOS)
+        depth: Níveis de sharding (default: Config.SHARD_DEPTH)
+    """
+    if depth is None:
+        depth = Config.SHARD_DEPTH
+    parts = [digest[i * 2:i * 2 + 2] for i in range(depth)]
+    return "/".join([CAS_PREFIX] + parts + [digest + suffix])
+
+
+# Blobs em gravação, antes de o hash ser conhecido
+STAGING_PREFIX = "staging"
+
+# Blobs de um mapa: nome -> (sufixo, campo da chave, campo do tamanho)
+ARTEFATOS = {
+    "html": (".html", "chave", "tamanho"),
+    "arvore": (".tree", "chave_arvore", "tamanho_arvore"),
+    "svg": (".svg", "chave_svg", "tamanho_svg"),
+    "miniatura": (".thumb.svg", "chave_miniatura", "tamanho_miniatura"),
+}
+
+
+def blob_keys(map_info: Dict) -> List[str]:
+    """Chaves dos blobs referenciados por um mapa."""
+    return [map_info[campo] for _, campo, _ in ARTEFATOS.values() if campo in map_info]
+
+
+def blob_sizes(map_info: Dict) -> Dict[str, int]:
+    """Tamanho de cada blob de um mapa, pela chave.
+    
+    Mapas anteriores ao endereçamento pelo conteúdo não compartilham blobs:
+    os artefatos sem chave ganham uma só do mapa.
+    """
+    return {
+        map_info.get(campo_chave) or f"{map_info['id']}{campo_tamanho}": map_info[campo_tamanho]
+        for _, campo_chave, campo_tamanho in ARTEFATOS.values()
+        if campo_tamanho in map_info
+    }
+
+
+def physical_bytes(metadata: Dict[str, Dict]) -> int:
+    """Bytes ocupados pelos mapas, contando cada blob compartilhado uma vez."""
+    tamanhos: Dict[str, int] = {}
+    for info in metadata.values():
+        tamanhos.update(blob_sizes(info))
+    return sum(tamanhos.values())
+
+
+class FreedBytes:
+    """Bytes liberados ao remover mapas, um de cada vez.
+    
+    Um blob só libera espaço quando sai o último mapa que o referencia;
+    chamar com um mapa o conta como removido e retorna o que ele libera.
+    """
+    
+    def __init__(self, metadata: Dict[str, Dict]):
+        self._refs = Counter(chave for info in metadata.values() for chave in blob_sizes(info))
+    
+    def __call__(self, map_info: Dict) -> int:
+        liberados = 0
+        for chave, tamanho in blob_sizes(map_info).items():
+            self._refs[chave] -= 1
+            if self._refs[chave] == 0:
+                liberados += tamanho
+        return liberados
+
+
+class _Blob(NamedTuple):
+    """Artefato de um mapa a gravar na chave do seu conteúdo."""
+    chave: str
+    tamanho: int
+    # Blob já gravado em STAGING_PREFIX, a promover para ``chave``
+    temporaria: Optional[str] = None
+    # Bytes a gravar se ``chave`` ainda não existir
+    dados: Optional[bytes] = None
 
 
 class StorageManager:
@@ -11,47 +138,361 @@ class StorageManager:
     
     METADATA_FILE = "metadata.json"
     
-    def __init__(self):
+    def __init__(self, blobs: Optional[BlobStore] = None):
         self.data_dir = Config.DATA_DIR
+        self.data_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_file = self.data_dir / self.METADATA_FILE
-        self._load_metadata()
+        self.blobs = blobs or criar_blobstore()
+        
+        # Índice de expiração: heap de (criado_ts, map_id), construído sob demanda
+        # e alimentado pelas operações do journal (inclusive de outros processos)
+        self._expiry_heap: Optional[List[Tuple[float, str]]] = None
+        self._expiry_pending: List[Tuple[float, str]] = []
+        # Índice do cache de geração: chave_cache -> (criado_ts, map_id) do mais novo
+        self._cache_index: Optional[Dict[str, Tuple[float, str]]] = None
+        # Referências por chave de blob, construído sob demanda (sob o lock do journal)
+        self._refs: Optional[Dict[str, int]] = None
+        
+        self.journal = MetadataJournal(
+            self.metadata_file,
+            compact_every=Config.JOURNAL_COMPACT_EVERY,
+            fsync=Config.JOURNAL_FSYNC,
+            listener=self._on_journal_op
+        )
+        # Os índices usam o lock do journal: o listener sempre roda sob ele,
+        # então leitura e atualização dos índices não correm entre si
+        self._index_lock = self.journal.mutex
+        self.journal.load()
     
     def _load_metadata(self) -> Dict:
-        """Carrega metadados existentes."""
-        if self.metadata_file.exists():
-            with open(self.metadata_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
+        """Carrega cópia dos metadados existentes."""
+        return dict(self.journal.load())
     
     def _save_metadata(self, metadata: Dict) -> None:
-        """Salva metadados em arquivo."""
-        with open(self.metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        """Substitui todos os metadados (reescrita completa e atômica)."""
+        self.journal.replace(metadata)
+    
+    def _on_journal_op(self, op: Optional[Dict]) -> None:
+        """Recebe operações aplicadas pelo journal (None = estado recarregado).
+        
+        Roda com ``_index_lock`` (o lock do journal) adquirido.
+        """
+        if op is None:
+            self._expiry_heap = None
+            self._cache_index = None
+            self._refs = None
+        elif op["op"] == "save":
+            try:
+                self._expiry_pending.append((self._criado_ts(op["info"]), op["id"]))
+            except (KeyError, ValueError):
+                pass
+            if self._cache_index is not None and "chave_cache" in op["info"]:
+                self._indexar_cache(op["id"], op["info"])
+            self._contar_refs(op["info"], 1)
+        elif op["op"] == "delete" and "info" in op:
+            self._contar_refs(op["info"], -1)
+        elif op["op"] == "update" and blob_keys(op.get("set", {})):
+            self._refs = None
+    
+    def _contar_refs(self, map_info: Dict, delta: int) -> None:
+        if self._refs is None:
+            return
+        for chave in blob_keys(map_info):
+            total = self._refs.get(chave, 0) + delta
+            if total > 0:
+                self._refs[chave] = total
+            else:
+                self._refs.pop(chave, None)
+    
+    def _ensure_refs(self, metadata: Dict[str, Dict]) -> None:
+        """Constrói o índice de referências. Chamar sob o lock do journal."""
+        if self._refs is not None:
+            return
+        self._refs = {}
+        for map_info in metadata.values():
+            self._contar_refs(map_info, 1)
+    
+    def _indexar_cache(self, map_id: str, map_info: Dict) -> None:
+        entrada = (map_info.get("criado_ts", 0.0), map_id)
+        atual = self._cache_index.get(map_info["chave_cache"])
+        if atual is None or atual <= entrada:
+            self._cache_index[map_info["chave_cache"]] = entrada
+    
+    @staticmethod
+    def _criado_ts(map_info: Dict) -> float:
+        """Timestamp de criação de um mapa (entradas antigas só têm 'criado')."""
+        if "criado_ts" in map_info:
+            return map_info["criado_ts"]
+        return datetime.fromisoformat(map_info["criado"]).timestamp()
+    
+    def _ensure_expiry_index(self) -> None:
+        """Constrói o índice de expiração ou incorpora operações pendentes.
+        Chamar com _index_lock adquirido."""
+        self.journal.load()
+        
+        if self._expiry_heap is not None:
+            pending, self._expiry_pending = self._expiry_pending, []
+            for entry in pending:
+                heapq.heappush(self._expiry_heap, entry)
+            return
+        
+        self._expiry_pending = []
+        heap = []
+        for map_id, map_info in list(self.journal.load().items()):
+            try:
+                heap.append((self._criado_ts(map_info), map_id))
+            except (KeyError, ValueError):
+                continue
+        heapq.heapify(heap)
+        self._expiry_heap = heap
+    
+    def expired_ids(self, before: datetime) -> List[str]:
+        """Retira do índice os mapas criados antes de uma data.
+        
+        Só toca as entradas expiradas: O(k log N) para k mapas expirados.
+        Entradas de mapas já removidos, ou removidos e gravados de novo com
+        o mesmo ID, são descartadas: só conta a data de criação atual.
+        
+        Args:
+            before: Data limite
+            
+        Returns:
+            Lista de IDs expirados, dos mais antigos para os mais novos
+        """
+        limite = before.timestamp()
+        expirados = []
+        
+        with self._index_lock:
+            self._ensure_expiry_index()
+            metadata = self.journal.load()
+            heap = self._expiry_heap
+            while heap and heap[0][0] < limite:
+                criado_ts, map_id = heapq.heappop(heap)
+                map_info = metadata.get(map_id)
+                if map_info is not None and self._criado_ts(map_info) == criado_ts:
+                    expirados.append(map_id)
+        
+        return expirados
+    
+    def find_cached(self, chave_cache: str, desde: float) -> Optional[Dict]:
+        """Mapa mais novo gerado para uma chave de cache (ver cache.py).
+        
+        Args:
+            chave_cache: Chave de tema e perfil
+            desde: Timestamp mínimo de criação
+            
+        Returns:
+            Metadados do mapa, ou None se não houver um criado depois de
+            ``desde`` (um mapa removido também conta como ausente)
+        """
+        with self._index_lock:
+            metadata = self.journal.load()
+            if self._cache_index is None:
+                self._cache_index = {}
+                for map_id, map_info in list(metadata.items()):
+                    if "chave_cache" in map_info:
+                        self._indexar_cache(map_id, map_info)
+            entrada = self._cache_index.get(chave_cache)
+        
+        if entrada is None or entrada[0] < desde:
+            return None
+        return metadata.get(entrada[1])
+    
+    def shard_path(self, map_id: str) -> Path:
+        """Retorna caminho local sharded de um mapa (driver local)."""
+        return self.data_dir / shard_key(map_id)
+    
+    def resolve_key(self, map_id: str) -> str:
+        """Resolve chave do blob de um mapa.
+        
+        Procura primeiro no layout sharded e depois no layout plano
+        legado, permitindo que a migração rode com a API no ar.
+        
+        Args:
+            map_id: ID do mapa
+            
+        Returns:
+            Chave do blob (sharded se ainda não existir)
+        """
+        map_info = self.journal.load().get(map_id)
+        if map_info and map_info.get("chave", "").startswith(CAS_PREFIX + "/"):
+            return map_info["chave"]
+        
+        sharded = shard_key(map_id)
+        if self.blobs.exists(sharded):
+            return sharded
+        
+        flat = f"{map_id}.html"
+        if self.blobs.exists(flat):
+            return flat
+        
+        # Arquivo pode ter sido movido entre as duas verificações
+        return sharded
     
-    def save_map(self, map_id: str, tema: str, filepath: str) -> Dict:
-        """Salva informações de um mapa mental.
+    def save_map(
+        self,
+        map_id: str,
+        tema: str,
+        html: Union[str, Iterable[str]],
+        arvore: Optional[bytes] = None,
+        campos: Optional[Dict] = None,
+        svg: Optional[str] = None,
+        miniatura: Optional[str] = None
+    ) -> Dict:
+        """Grava o HTML de um mapa mental e salva suas informações.
+        
+        Cada artefato vai para a chave do seu conteúdo; um já existente
+        (mapa idêntico) não é gravado de novo.
         
         Args:
             map_id: ID único do mapa
             tema: Tema do mapa
-            filepath: Caminho do arquivo HTML
+            html: Conteúdo HTML do mapa, ou seus pedaços (gravados em
+                streaming, ex: synapsis.iter_tree_html)
+            arvore: Árvore codificada com synapsis.codec.pack (opcional)
+            campos: Campos adicionais dos metadados (ex: perfil)
+            svg: Desenho estático do mapa (opcional, synapsis.render_svg)
+            miniatura: Miniatura SVG (opcional, synapsis.render_thumbnail)
+            
+        Returns:
+            Dict com metadados do mapa salvo
+        """
+        # Pedaços são renderizados enquanto são gravados: o tempo dentro do
+        # gerador vai para o estágio render_html e o resto para file_write
+        render = None if isinstance(html, str) else Cronometro()
+        fontes = {
+            "html": html.encode("utf-8") if render is None else (chunk.encode("utf-8") for chunk in render.medir(html)),
+            "arvore": arvore,
+            "svg": svg.encode("utf-8") if svg is not None else None,
+            "miniatura": miniatura.encode("utf-8") if miniatura is not None else None,
+        }
+        blobs = {}
+        try:
+            inicio = time.perf_counter()
+            try:
+                for nome, dados in fontes.items():
+                    if dados is not None:
+                        blobs[nome] = self._preparar_blob(dados, ARTEFATOS[nome][0])
+                blobs = self._gravar_cas(blobs)
+            finally:
+                gravacao = time.perf_counter() - inicio
+                if render is not None:
+                    STAGE_SECONDS.observe(render.segundos, "render_html")
+                    gravacao -= render.segundos
+                STAGE_SECONDS.observe(gravacao, "file_write")
+            return self._salvar(map_id, tema, blobs, campos)
+        except BaseException:
+            for blob in blobs.values():
+                if blob.temporaria is not None:
+                    self.blobs.delete(blob.temporaria)
+            raise
+        
+    def link_map(self, map_id: str, tema: str, fonte: Dict, campos: Optional[Dict] = None) -> Dict:
+        """Salva um novo mapa com os mesmos blobs de outro, sem copiá-los.
+        
+        Args:
+            map_id: ID único do novo mapa
+            tema: Tema do novo mapa
+            fonte: Metadados do mapa de origem
+            campos: Campos adicionais dos metadados
             
         Returns:
             Dict com metadados do mapa salvo
+            
+        Raises:
+            KeyError: Se a origem for anterior ao endereçamento pelo
+                conteúdo ou algum blob dela não existir mais
+        """
+        blobs = {
+            nome: _Blob(fonte[campo_chave], fonte.get(campo_tamanho, 0))
+            for nome, (_, campo_chave, campo_tamanho) in ARTEFATOS.items() if campo_chave in fonte
+        }
+        if not fonte.get("chave", "").startswith(CAS_PREFIX + "/"):
+            raise KeyError(f"Mapa {fonte.get('id')} sem blob endereçado pelo conteúdo")
+        return self._salvar(map_id, tema, blobs, campos)
+    
+    def _preparar_blob(self, dados: Union[bytes, Iterable[bytes]], sufixo: str) -> _Blob:
+        """Calcula o hash do conteúdo; pedaços são gravados em STAGING_PREFIX."""
+        if isinstance(dados, bytes):
+            return _Blob(content_key(hashlib.sha256(dados).hexdigest(), sufixo), len(dados), dados=dados)
+        
+        digest = hashlib.sha256()
+        
+        def com_hash():
+            for chunk in dados:
+                digest.update(chunk)
+                yield chunk
+        
+        temporaria = f"{STAGING_PREFIX}/{uuid.uuid4().hex}{sufixo}"
+        tamanho = self.blobs.put_stream(temporaria, com_hash())
+        return _Blob(content_key(digest.hexdigest(), sufixo), tamanho, temporaria=temporaria)
+    
+    def _gravar_cas(self, blobs: Dict[str, _Blob]) -> Dict[str, _Blob]:
+        """Grava cada blob na chave do seu conteúdo, fora do lock do journal.
+        
+        Se a chave já existe, a cópia temporária fica até o append: o mapa
+        que referencia a chave pode sair antes dele (ver _conferir_blobs).
+        
+        Returns:
+            Os blobs, sem ``temporaria`` nos que foram movidos
         """
-        metadata = self._load_metadata()
+        gravados = {}
+        for nome, blob in blobs.items():
+            if blob.temporaria is not None and not self.blobs.exists(blob.chave):
+                self.blobs.move(blob.temporaria, blob.chave)
+                blob = blob._replace(temporaria=None)
+            elif blob.dados is not None and not self.blobs.exists(blob.chave):
+                self.blobs.put(blob.chave, blob.dados)
+            gravados[nome] = blob
+        return gravados
+    
+    def _conferir_blobs(self, blobs: Iterable[_Blob]) -> None:
+        """Confere cada blob na chave do seu conteúdo. Chamar sob o lock do journal.
         
+        Um blob removido depois de _gravar_cas (o último mapa que o
+        referenciava saiu nesse intervalo, o que é raro) é restaurado da
+        cópia temporária ou dos dados.
+        
+        Raises:
+            KeyError: Se um blob não existir e não houver como restaurá-lo
+                (ex: a fonte de link_map foi removida)
+        """
+        for blob in blobs:
+            if self.blobs.exists(blob.chave):
+                continue
+            if blob.temporaria is not None:
+                self.blobs.move(blob.temporaria, blob.chave)
+            elif blob.dados is not None:
+                self.blobs.put(blob.chave, blob.dados)
+            else:
+                raise KeyError(blob.chave)
+    
+    def _salvar(self, map_id: str, tema: str, blobs: Dict[str, _Blob], campos: Optional[Dict]) -> Dict:
+        agora = datetime.now()
         map_info = {
             "id": map_id,
             "tema": tema,
-            "arquivo": Path(filepath).name,
-            "caminho": str(filepath),
-            "tamanho": Path(filepath).stat().st_size,
-            "criado": datetime.now().isoformat(),
+            "arquivo": f"{map_id}.html",
+            "criado": agora.isoformat(),
+            "criado_ts": agora.timestamp(),
         }
+        for nome, blob in blobs.items():
+            _, campo_chave, campo_tamanho = ARTEFATOS[nome]
+            map_info[campo_chave] = blob.chave
+            map_info[campo_tamanho] = blob.tamanho
+        if campos:
+            map_info.update(campos)
+        
+        with medir("metadata_save"):
+            self.journal.append(
+                [{"op": "save", "id": map_id, "info": map_info}],
+                before=lambda metadata: self._conferir_blobs(blobs.values())
+            )
         
-        metadata[map_id] = map_info
-        self._save_metadata(metadata)
+        # Cópias temporárias de blobs que já existiam
+        for blob in blobs.values():
+            if blob.temporaria is not None:
+                self.blobs.delete(blob.temporaria)
         
         return map_info
     
@@ -64,8 +505,38 @@ class StorageManager:
         Returns:
             Dict com metadados ou None se não encontrado
         """
-        metadata = self._load_metadata()
-        return metadata.get(map_id)
+        return self.journal.load().get(map_id)
+    
+    def get_tree(self, map_id: str) -> Optional[bytes]:
+        """Lê a árvore compacta de um mapa.
+        
+        Args:
+            map_id: ID do mapa
+            
+        Returns:
+            Bytes no formato synapsis.codec.pack, ou None se o mapa não
+            existir ou tiver sido gerado antes da árvore ser gravada
+        """
+        return self.get_artifact(map_id, "arvore")
+    
+    def get_artifact(self, map_id: str, nome: str) -> Optional[bytes]:
+        """Lê um dos blobs gravados junto com o HTML.
+        
+        Args:
+            map_id: ID do mapa
+            nome: Chave de ARTEFATOS ("arvore", "svg" ou "miniatura")
+            
+        Returns:
+            Bytes do blob, ou None se o mapa não existir ou não o tiver
+        """
+        campo = ARTEFATOS[nome][1]
+        map_info = self.get_map(map_id)
+        if not map_info or campo not in map_info:
+            return None
+        try:
+            return self.blobs.get(map_info[campo])
+        except KeyError:
+            return None
     
     def list_maps(self, limit: int = 100) -> List[Dict]:
         """Lista todos os mapas salvos.
@@ -76,9 +547,8 @@ class StorageManager:
         Returns:
             Lista de mapas ordenados por data (mais recentes primeiro)
         """
-        metadata = self._load_metadata()
         maps = sorted(
-            metadata.values(),
+            list(self.journal.load().values()),
             key=lambda x: x["criado"],
             reverse=True
         )
@@ -93,39 +563,99 @@ class StorageManager:
         Returns:
             True se deletado com sucesso, False caso contrário
         """
-        metadata = self._load_metadata()
+        return bool(self.delete_maps([map_id]))
         
-        if map_id not in metadata:
-            return False
+    def delete_maps(self, map_ids: List[str], delete_blobs: bool = True) -> List[str]:
+        """Deleta vários mapas com um único append no journal.
         
-        map_info = metadata[map_id]
-        filepath = Path(map_info["caminho"])
+        Os blobs de cada mapa só são removidos se nenhum outro mapa os
+        referenciar.
         
-        # Delete arquivo
-        if filepath.exists():
-            filepath.unlink()
+        Args:
+            map_ids: IDs dos mapas
+            delete_blobs: Se deve remover também os arquivos
         
-        # Remove metadata
-        del metadata[map_id]
-        self._save_metadata(metadata)
+        Returns:
+            IDs efetivamente removidos (ignora os inexistentes)
+        """
+        metadata = self.journal.load()
+        deletados = [map_id for map_id in map_ids if map_id in metadata]
+        
+        chaves = set()
+        if delete_blobs:
+            for map_id in deletados:
+                chaves.update(blob_keys(metadata[map_id]))
+                if "chave" not in metadata[map_id]:
+                    chaves.add(self.resolve_key(map_id))
+        
+        def remover_sem_referencia():
+            for chave in chaves:
+                if self._refs is not None and chave not in self._refs:
+                    self.blobs.delete(chave)
+        
+        self.journal.append(
+            [{"op": "delete", "id": map_id} for map_id in deletados],
+            before=self._ensure_refs,
+            after=remover_sem_referencia
+        )
+        return deletados
+    
+    def update_maps(self, changes: Dict[str, Dict]) -> None:
+        """Altera campos de vários mapas com um único append no journal.
         
-        return True
+        Args:
+            changes: map_id -> campos a definir
+        """
+        self.journal.append([
+            {"op": "update", "id": map_id, "set": campos}
+            for map_id, campos in changes.items()
+        ])
+    
+    def record_access(self, hits: Dict[str, Tuple[int, float]]) -> int:
+        """Grava acessos acumulados com um único append no journal.
+        
+        Args:
+            hits: map_id -> (quantidade de acessos, timestamp do último)
+            
+        Returns:
+            Quantidade de mapas atualizados
+        """
+        metadata = self.journal.load()
+        ops = [
+            {
+                "op": "update",
+                "id": map_id,
+                "set": {"ultimo_acesso": ultimo},
+                "incr": {"acessos": count},
+            }
+            for map_id, (count, ultimo) in hits.items()
+            if map_id in metadata
+        ]
+        self.journal.append(ops)
+        return len(ops)
     
     def get_stats(self) -> Dict:
         """Obtém estatísticas de armazenamento.
         
         Returns:
-            Dict com estatísticas
+            Dict com estatísticas. ``bytes_logicos`` soma os artefatos de
+            cada mapa; ``bytes_fisicos`` conta cada blob compartilhado uma vez
         """
-        metadata = self._load_metadata()
-        total_size = sum(
-            Path(info["caminho"]).stat().st_size
-            for info in metadata.values()
-            if Path(info["caminho"]).exists()
-        )
+        metadata = list(self.journal.load().values())
+        logicos = 0
+        fisicos: Dict[str, int] = {}
+        for info in metadata:
+            tamanhos = blob_sizes(info)
+            logicos += sum(tamanhos.values())
+            fisicos.update(tamanhos)
+        fisico = sum(fisicos.values())
         
         return {
             "total_mapas": len(metadata),
-            "tamanho_total_mb": round(total_size / (1024 * 1024), 2),
+            "tamanho_total_mb": round(logicos / (1024 * 1024), 2),
+            "tamanho_fisico_mb": round(fisico / (1024 * 1024), 2),
+            "bytes_logicos": logicos,
+            "bytes_fisicos": fisico,
+            "blobs": len(fisicos),
             "limite_mapas": Config.MAX_MAPS,
         }
@@ -0,0 +1,40 @@
+"""Fixtures e configuração dos testes da API.
+
+Os módulos da API usam imports planos (``from config import Config``),
+então o diretório ``app/`` entra no ``sys.path``. Rodar de ``app/``:
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+import pytest
+from pathlib import Path
+
+APP_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+# Antes de importar config: nada de data/ no repositório nem chamadas à Groq
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="mapas-testes-"))
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("LLM_FAKE_LATENCY_MS", "0")
+
+from config import Config  # noqa: E402
+from blobstore import criar_blobstore  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """DATA_DIR vazio e exclusivo do teste."""
+    monkeypatch.setattr(Config, "DATA_DIR", tmp_path)
+    # O blob store é criado uma vez por processo, sobre o DATA_DIR da época
+    criar_blobstore.cache_clear()
+    yield tmp_path
+    criar_blobstore.cache_clear()
+
+
+@pytest.fixture
+def service(data_dir):
+    """MapaService sobre o DATA_DIR do teste, com a LLM fake."""
+    from service import MapaService
+    return MapaService()
@@ -0,0 +1,99 @@
+"""API ASGI (asgi.py): as rotas de ponta a ponta pelo TestClient do Starlette."""
+import pytest
+from starlette.testclient import TestClient
+import asgi
+from config import Config
+from synapsis.codec import CONTENT_TYPE as TREE_CONTENT_TYPE
+from idempotency import MemoryIdempotencyStore
+from ratelimit import MemoryRateLimiter, Regras
+
+
+@pytest.fixture
+def cliente(service, monkeypatch):
+    """TestClient sobre um MapaService do teste, sem limite de taxa."""
+    monkeypatch.setattr(asgi, "service", service)
+    monkeypatch.setattr(asgi.geracao, "service", service)
+    monkeypatch.setattr(asgi.geracao, "limitador", MemoryRateLimiter(Regras(0, 0, 0)))
+    monkeypatch.setattr(asgi.geracao, "idempotencia", MemoryIdempotencyStore(ttl=100, em_andamento=10))
+    return TestClient(asgi.app)
+
+
+@pytest.fixture
+def mapa(cliente):
+    resposta = cliente.post("/api/gerar", json={"tema": "Python"})
+    assert resposta.status_code == 201
+    return resposta.json()
+
+
+class TestGerar:
+    def test_criado(self, mapa):
+        assert mapa["tema"] == "Python"
+        assert mapa["perfil"] == Config.PERFIL_PADRAO
+        assert mapa["links"]["preview"] == f"/api/preview/{mapa['id']}"
+    
+    def test_sem_tema(self, cliente):
+        assert cliente.post("/api/gerar", json={"assunto": "x"}).status_code == 400
+        assert cliente.post("/api/gerar", json=["tema"]).status_code == 400
+        assert cliente.post("/api/gerar", content=b"{", headers={"content-type": "application/json"}).status_code == 400
+    
+    def test_idempotency_key(self, cliente):
+        headers = {"Idempotency-Key": "k1"}
+        primeira = cliente.post("/api/gerar", json={"tema": "Rust"}, headers=headers)
+        repetida = cliente.post("/api/gerar", json={"tema": "Rust"}, headers=headers)
+        assert repetida.status_code == 201
+        assert repetida.headers["idempotent-replayed"] == "true"
+        assert repetida.json() == primeira.json()
+        assert cliente.post("/api/gerar", json={"tema": "Go"}, headers=headers).status_code == 422
+    
+    def test_erro_inesperado_libera_a_chave(self, cliente, service, monkeypatch):
+        async def quebrado(*args):
+            raise KeyError("bug")
+        monkeypatch.setattr(service, "gerar_mapa_async", quebrado)
+        headers = {"Idempotency-Key": "k2"}
+        with pytest.raises(KeyError):
+            cliente.post("/api/gerar", json={"tema": "Rust"}, headers=headers)
+        # A reserva foi cancelada: a repetição pode gerar de novo
+        assert asgi.geracao.idempotencia.abrir("testclient", "k2", {"tema": "Rust"}) is None
+
+
+class TestLeitura:
+    def test_info_e_listar(self, cliente, mapa):
+        assert cliente.get(f"/api/info/{mapa['id']}").json()["tema"] == "Python"
+        listados = cliente.get("/api/listar?limite=10").json()
+        assert [m["id"] for m in listados["mapas"]] == [mapa["id"]]
+    
+    def test_preview_e_download(self, cliente, mapa):
+        preview = cliente.get(mapa["links"]["preview"])
+        assert preview.status_code == 200
+        assert preview.headers["content-type"].startswith("text/html")
+        download = cliente.get(mapa["links"]["download"])
+        assert download.content == preview.content
+        assert download.headers["content-disposition"].startswith("attachment")
+    
+    def test_arvore(self, cliente, mapa):
+        assert cliente.get(f"{mapa['links']['arvore']}?formato=json").status_code == 200
+        binario = cliente.get(f"{mapa['links']['arvore']}?formato=binario")
+        assert binario.headers["content-type"] == TREE_CONTENT_TYPE
+        assert cliente.get(f"{mapa['links']['arvore']}?formato=xml").status_code == 400
+    
+    def test_svg_e_miniatura(self, cliente, mapa):
+        for rota in (f"/api/svg/{mapa['id']}", f"/api/miniatura/{mapa['id']}"):
+            resposta = cliente.get(rota)
+            assert resposta.status_code == 200
+            assert resposta.headers["content-type"] == "image/svg+xml"
+    
+    def test_inexistente(self, cliente):
+        for rota in ("info", "preview", "download", "arvore", "svg", "miniatura"):
+            assert cliente.get(f"/api/{rota}/nada").status_code == 404
+    
+    def test_saude_perfis_e_stats(self, cliente, mapa):
+        assert cliente.get("/api/saude").json()["status"] == "ok"
+        assert "rapido" in cliente.get("/api/perfis").json()["perfis"]
+        assert cliente.get("/api/stats").json()["total_mapas"] == 1
+
+
+class TestDeletar:
+    def test_deletar(self, cliente, mapa):
+        assert cliente.delete(f"/api/deletar/{mapa['id']}").json()["status"] == "deletado com sucesso"
+        assert cliente.get(f"/api/info/{mapa['id']}").status_code == 404
+        assert cliente.delete(f"/api/deletar/{mapa['id']}").status_code == 404
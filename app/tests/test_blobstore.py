@@ -0,0 +1,191 @@
+"""Contrato dos blob stores: os mesmos testes em memória, disco e S3 (cliente fake)."""
+import threading
+import pytest
+from blobstore import BlobStore, LocalBlobStore, MemoryBlobStore, S3BlobStore
+
+
+class ErroS3(Exception):
+    """Erro no formato do botocore (``error.response["Error"]["Code"]``)."""
+    
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class _Corpo:
+    def __init__(self, data: bytes):
+        self.data = data
+    
+    def iter_chunks(self, chunk_size):
+        return (self.data[i:i + chunk_size] for i in range(0, len(self.data), chunk_size))
+
+
+class FakeS3:
+    """Cliente S3 com as chamadas que S3BlobStore usa, sobre um dict."""
+    
+    def __init__(self):
+        self.objetos = {}
+    
+    def _ler(self, bucket, key, code="NoSuchKey"):
+        if (bucket, key) not in self.objetos:
+            raise ErroS3(code)
+        return self.objetos[(bucket, key)]
+    
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objetos[(Bucket, Key)] = bytes(Body)
+    
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        # Lê tudo antes de gravar: um upload interrompido não cria o objeto
+        partes = []
+        while True:
+            parte = Fileobj.read(1000)
+            if not parte:
+                break
+            partes.append(parte)
+        self.objetos[(Bucket, Key)] = b"".join(partes)
+    
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objetos[(Bucket, Key)] = self._ler(CopySource["Bucket"], CopySource["Key"])
+    
+    def get_object(self, Bucket, Key):
+        return {"Body": _Corpo(self._ler(Bucket, Key))}
+    
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self._ler(Bucket, Key, code="404"))}
+    
+    def delete_object(self, Bucket, Key):
+        self.objetos.pop((Bucket, Key), None)
+
+
+@pytest.fixture(params=["memory", "local", "s3"])
+def blobs(request, tmp_path) -> BlobStore:
+    if request.param == "memory":
+        return MemoryBlobStore()
+    if request.param == "local":
+        return LocalBlobStore(tmp_path)
+    return S3BlobStore("mapas", prefix="pre", client=FakeS3())
+
+
+def _falha_no_meio():
+    yield b"parte 1"
+    raise RuntimeError("render falhou")
+
+
+class TestContrato:
+    def test_put_e_get(self, blobs):
+        assert blobs.put("ab/cd/x.html", b"<html>") == 6
+        assert blobs.get("ab/cd/x.html") == b"<html>"
+        assert blobs.exists("ab/cd/x.html")
+        assert blobs.size("ab/cd/x.html") == 6
+    
+    def test_put_sobrescreve(self, blobs):
+        blobs.put("x", b"velho")
+        blobs.put("x", b"novo")
+        assert blobs.get("x") == b"novo"
+    
+    def test_ausente(self, blobs):
+        assert not blobs.exists("nada")
+        assert blobs.size("nada") is None
+        with pytest.raises(KeyError):
+            blobs.get("nada")
+        with pytest.raises(KeyError):
+            blobs.iter_chunks("nada")
+    
+    def test_iter_chunks(self, blobs):
+        data = bytes(range(256)) * 10
+        blobs.put("x", data)
+        chunks = list(blobs.iter_chunks("x", chunk_size=1000))
+        assert [len(c) for c in chunks] == [1000, 1000, 560]
+        assert b"".join(chunks) == data
+    
+    def test_delete(self, blobs):
+        blobs.put("x", b"1")
+        assert blobs.delete("x") is True
+        assert blobs.delete("x") is False
+        assert not blobs.exists("x")
+    
+    def test_put_stream(self, blobs):
+        tamanho = blobs.put_stream("ab/x.html", iter([b"<html>", b"", b"a" * 5000, b"</html>"]))
+        assert tamanho == 5013
+        assert blobs.get("ab/x.html") == b"<html>" + b"a" * 5000 + b"</html>"
+    
+    def test_put_stream_vazio(self, blobs):
+        assert blobs.put_stream("x", iter([])) == 0
+        assert blobs.get("x") == b""
+    
+    def test_put_stream_falha_nao_grava(self, blobs):
+        blobs.put("x", b"anterior")
+        with pytest.raises(RuntimeError):
+            blobs.put_stream("x", _falha_no_meio())
+        with pytest.raises(RuntimeError):
+            blobs.put_stream("y", _falha_no_meio())
+        assert blobs.get("x") == b"anterior"
+        assert not blobs.exists("y")
+    
+    def test_move(self, blobs):
+        blobs.put("staging/a", b"conteudo")
+        blobs.put("cas/b", b"velho")
+        blobs.move("staging/a", "cas/b")
+        assert blobs.get("cas/b") == b"conteudo"
+        assert not blobs.exists("staging/a")
+    
+    def test_move_ausente(self, blobs):
+        with pytest.raises(KeyError):
+            blobs.move("nada", "outro")
+        assert not blobs.exists("outro")
+
+
+class TestDrivers:
+    def test_local_sem_temporarios(self, tmp_path):
+        blobs = LocalBlobStore(tmp_path)
+        blobs.put("ab/x", b"1")
+        blobs.put_stream("ab/y", iter([b"2"]))
+        with pytest.raises(RuntimeError):
+            blobs.put_stream("ab/z", _falha_no_meio())
+        assert sorted(p.name for p in (tmp_path / "ab").iterdir()) == ["x", "y"]
+    
+    def test_local_put_concorrente_mesmo_conteudo(self, tmp_path):
+        # Chaves por conteúdo: threads do mesmo worker gravam a mesma chave
+        blobs = LocalBlobStore(tmp_path)
+        data = b"x" * (4 * 1024 * 1024)
+        barreira = threading.Barrier(8)
+        erros = []
+        
+        def gravar():
+            barreira.wait()
+            try:
+                for _ in range(5):
+                    blobs.put("ab/x", data)
+            except Exception as e:
+                erros.append(e)
+        
+        threads = [threading.Thread(target=gravar) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert erros == []
+        assert blobs.get("ab/x") == data
+        assert [p.name for p in (tmp_path / "ab").iterdir()] == ["x"]
+    
+    def test_local_path(self, tmp_path):
+        blobs = LocalBlobStore(tmp_path)
+        blobs.put("ab/x", b"1")
+        assert blobs.local_path("ab/x") == tmp_path / "ab" / "x"
+        assert blobs.local_path("ab/nada") is None
+        assert MemoryBlobStore().local_path("ab/x") is None
+    
+    def test_s3_prefixo(self):
+        client = FakeS3()
+        blobs = S3BlobStore("mapas", prefix="/pre/", client=client)
+        blobs.put_stream("ab/x", iter([b"1"]))
+        blobs.move("ab/x", "ab/y")
+        assert list(client.objetos) == [("mapas", "pre/ab/y")]
+    
+    def test_s3_outros_erros_propagam(self):
+        class Quebrado(FakeS3):
+            def head_object(self, Bucket, Key):
+                raise ErroS3("AccessDenied")
+        
+        with pytest.raises(ErroS3):
+            S3BlobStore("mapas", client=Quebrado()).size("x")
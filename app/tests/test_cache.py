@@ -0,0 +1,228 @@
+"""Cache de geração e aquecedor: chave, atribuição, tendências, orçamento e espaço."""
+import pytest
+from config import Config
+from cache import AtribuicaoCache, chave_cache
+from eviction import criar_politica
+from warmer import HORA, DIA, Aquecedor, RegistroConsultas
+
+# Início de uma hora qualquer (UTC)
+T0 = 480_000 * HORA
+
+
+class TestChave:
+    def test_ignora_caixa_e_espacos(self):
+        assert chave_cache("  Python   Básico ", "rapido") == chave_cache("python básico", "rapido")
+    
+    def test_perfil_separa(self):
+        assert chave_cache("Python", "rapido") != chave_cache("Python", "completo")
+    
+    def test_palavras_diferentes(self):
+        assert chave_cache("Python Básico", "rapido") != chave_cache("PythonBásico", "rapido")
+
+
+class TestAtribuicao:
+    def test_vazio(self):
+        assert AtribuicaoCache().relatorio() == {
+            "pedidos": {"miss": 0, "hit": 0, "warm_hit": 0},
+            "p50_ms": None,
+            "p50_sem_aquecedor_ms": None,
+        }
+    
+    def test_p50_sem_aquecedor(self):
+        atribuicao = AtribuicaoCache()
+        for segundos in (8.0, 10.0, 12.0):
+            atribuicao.registrar("miss", segundos)
+        for _ in range(4):
+            atribuicao.registrar("warm_hit", 0.01)
+        relatorio = atribuicao.relatorio()
+        assert relatorio["pedidos"] == {"miss": 3, "hit": 0, "warm_hit": 4}
+        assert relatorio["p50_ms"] == 10.0
+        # Cada warm_hit vira a mediana das gerações (10 s)
+        assert relatorio["p50_sem_aquecedor_ms"] == 10000.0
+    
+    def test_sem_geracoes_nao_estima(self):
+        atribuicao = AtribuicaoCache()
+        atribuicao.registrar("hit", 0.02)
+        assert atribuicao.relatorio()["p50_sem_aquecedor_ms"] is None
+    
+    def test_so_as_amostras_recentes(self):
+        atribuicao = AtribuicaoCache(amostras=2)
+        for segundos in (100.0, 1.0, 1.0):
+            atribuicao.registrar("miss", segundos)
+        relatorio = atribuicao.relatorio()
+        assert relatorio["pedidos"]["miss"] == 3
+        assert relatorio["p50_ms"] == 1000.0
+
+
+@pytest.fixture
+def consultas(tmp_path):
+    return RegistroConsultas(tmp_path / "consultas.db")
+
+
+def _pedir(consultas, tema, vezes, agora, perfil="rapido"):
+    for _ in range(vezes):
+        consultas.registrar(tema, perfil, agora)
+
+
+class TestTendencias:
+    def test_ordem_pelos_pedidos(self, consultas):
+        _pedir(consultas, "Python", 5, T0)
+        _pedir(consultas, "Rust", 3, T0)
+        temas = consultas.tendencias(T0, janela_h=24, minimo=1, limite=10)
+        assert [t.tema for t in temas] == ["Python", "Rust"]
+    
+    def test_alta_recente_passa_na_frente(self, consultas):
+        # Python: 12 pedidos espalhados; Rust: 8, todos na última hora
+        for h in range(12):
+            _pedir(consultas, "Python", 1, T0 - h * HORA)
+        _pedir(consultas, "Rust", 8, T0)
+        python, rust = sorted(consultas.tendencias(T0, janela_h=24, minimo=1, limite=10), key=lambda t: t.tema)
+        assert python.pedidos == 12 and rust.pedidos == 8
+        assert rust.alta == 8
+        assert rust.pontos > python.pontos
+    
+    def test_minimo_e_limite(self, consultas):
+        _pedir(consultas, "Python", 3, T0)
+        _pedir(consultas, "Rust", 2, T0)
+        _pedir(consultas, "Go", 1, T0)
+        assert [t.tema for t in consultas.tendencias(T0, janela_h=24, minimo=2, limite=10)] == ["Python", "Rust"]
+        assert [t.tema for t in consultas.tendencias(T0, janela_h=24, minimo=1, limite=1)] == ["Python"]
+    
+    def test_janela_descarta_horas_antigas(self, consultas):
+        _pedir(consultas, "Python", 5, T0 - 30 * HORA)
+        _pedir(consultas, "Rust", 1, T0)
+        assert [t.tema for t in consultas.tendencias(T0, janela_h=24, minimo=1, limite=10)] == ["Rust"]
+        linhas = consultas.banco.conexao().execute("SELECT COUNT(*) FROM consultas").fetchone()[0]
+        assert linhas == 1
+    
+    def test_mesma_chave_fica_com_o_tema_mais_recente(self, consultas):
+        _pedir(consultas, "python", 2, T0 - HORA)
+        _pedir(consultas, "Python ", 1, T0)
+        (tendencia,) = consultas.tendencias(T0, janela_h=24, minimo=1, limite=10)
+        assert tendencia.pedidos == 3
+        assert tendencia.tema == "Python "
+        assert tendencia.chave == chave_cache("Python", "rapido")
+    
+    def test_perfis_separados(self, consultas):
+        _pedir(consultas, "Python", 2, T0, perfil="rapido")
+        _pedir(consultas, "Python", 2, T0, perfil="completo")
+        assert len(consultas.tendencias(T0, janela_h=24, minimo=2, limite=10)) == 2
+
+
+class TestOrcamento:
+    def test_gasto_por_dia(self, consultas):
+        consultas.gastar(300, T0)
+        consultas.gastar(200, T0 + 1)
+        assert consultas.gasto_hoje(T0) == 500
+        assert consultas.gasto_hoje(T0 + DIA) == 0
+    
+    def test_dias_antigos_saem(self, consultas):
+        consultas.gastar(300, T0)
+        consultas.gastar(100, T0 + DIA)
+        assert consultas.gasto_hoje(T0) == 0
+        assert consultas.gasto_hoje(T0 + DIA) == 100
+
+
+class _Agendador:
+    def __init__(self, ativos=0):
+        self.ativos = ativos
+    
+    def stats(self):
+        return {"ativos": self.ativos, "concorrencia": 4, "filas": {"fundo": {"pedidos": 0}}}
+
+
+class _Storage:
+    def find_cached(self, chave, desde):
+        return None
+
+
+class ServicoFalso:
+    """O que o Aquecedor usa do MapaService; cada geração gasta ``tokens``."""
+    
+    def __init__(self, consultas, tokens=600, espaco=10, ativos=0):
+        self.consultas = consultas
+        self.storage = _Storage()
+        self.agendador = _Agendador(ativos)
+        self.tokens = tokens
+        self.espaco = espaco
+        self.aquecidos = []
+    
+    def tem_espaco(self):
+        return len(self.aquecidos) < self.espaco
+    
+    def aquecer(self, tema, perfil):
+        self.aquecidos.append(tema)
+        return f"id-{tema}", self.tokens
+
+
+class TestAquecedor:
+    @pytest.fixture(autouse=True)
+    def config(self, monkeypatch):
+        monkeypatch.setattr(Config, "CACHE_TTL_S", 3600)
+        monkeypatch.setattr(Config, "AQUECEDOR_TOKENS_DIA", 1000)
+        monkeypatch.setattr(Config, "AQUECEDOR_UTILIZACAO_MAX", 0.5)
+        monkeypatch.setattr(Config, "AQUECEDOR_MIN_PEDIDOS", 1)
+    
+    @pytest.fixture
+    def temas(self, consultas):
+        for i, tema in enumerate(["a", "b", "c", "d"]):
+            _pedir(consultas, tema, 10 - i, T0)
+        return consultas
+    
+    def test_para_no_orcamento(self, temas):
+        servico = ServicoFalso(temas)
+        resultado = Aquecedor(servico).ciclo(T0)
+        # 0 e 600 tokens gastos estão abaixo de 1000: a segunda geração passa dele
+        assert servico.aquecidos == ["a", "b"]
+        assert resultado["parada"] == "orcamento"
+        assert temas.gasto_hoje(T0) == 1200
+    
+    def test_orcamento_renova_no_dia_seguinte(self, temas):
+        temas.gastar(1000, T0 - DIA)
+        servico = ServicoFalso(temas, tokens=10)
+        assert Aquecedor(servico).ciclo(T0)["parada"] == "fim"
+        assert len(servico.aquecidos) == 4
+    
+    def test_para_com_a_llm_ocupada(self, temas):
+        servico = ServicoFalso(temas, ativos=2)
+        assert Aquecedor(servico).ciclo(T0) == {"gerados": [], "parada": "ocupado"}
+    
+    def test_para_sem_espaco(self, temas):
+        servico = ServicoFalso(temas, tokens=10, espaco=1)
+        assert Aquecedor(servico).ciclo(T0)["parada"] == "sem_espaco"
+        assert servico.aquecidos == ["a"]
+
+
+class TestEspacoNoServico:
+    @pytest.fixture
+    def cheio(self, service, monkeypatch):
+        monkeypatch.setattr(Config, "MAX_MAPS", 2)
+        monkeypatch.setattr(Config, "CACHE_TTL_S", 3600)
+        monkeypatch.setattr(service, "politica", criar_politica("lru"))
+        ids = [service.gerar_mapa(tema)[0] for tema in ("Python", "Rust")]
+        return service, ids
+    
+    def test_aquecer_nao_despeja(self, cheio):
+        service, ids = cheio
+        assert not service.tem_espaco()
+        with pytest.raises(RuntimeError, match="espaço"):
+            service.aquecer("Go", "rapido")
+        assert sorted(service.storage.journal.load()) == sorted(ids)
+    
+    def test_aquecer_no_espaco_livre(self, service, monkeypatch):
+        monkeypatch.setattr(Config, "MAX_MAPS", 1)
+        monkeypatch.setattr(service, "politica", criar_politica("lru"))
+        map_id, tokens = service.aquecer("Go", "rapido")
+        assert service.storage.journal.load()[map_id]["origem"] == "aquecedor"
+        # Cabia um: o segundo já não cabe e nada é despejado
+        with pytest.raises(RuntimeError):
+            service.aquecer("Rust", "rapido")
+        assert list(service.storage.journal.load()) == [map_id]
+    
+    def test_acerto_nao_despeja_a_fonte(self, cheio):
+        service, (python, rust) = cheio
+        # Python é o menos recente (LRU), mas é a fonte da cópia
+        novo, info = service.gerar_mapa("python")
+        assert info["cache_de"] == python
+        assert sorted(service.storage.journal.load()) == sorted([python, novo])
+        assert service.atribuicao.relatorio()["pedidos"]["hit"] == 1
@@ -0,0 +1,113 @@
+"""Limpeza: índice de expiração e varredura incremental de órfãos."""
+from datetime import datetime
+import pytest
+from config import Config
+from cleaner import CleanupService
+from storage import StorageManager
+
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture
+def storage(data_dir):
+    return StorageManager()
+
+
+def _salvar(storage, map_id, criado_ts, html=None):
+    campos = {"criado_ts": criado_ts, "criado": datetime.fromtimestamp(criado_ts).isoformat()}
+    return storage.save_map(map_id, "Tema", html or f"<html>{map_id}</html>", campos=campos)
+
+
+def _antes(ts):
+    return datetime.fromtimestamp(ts)
+
+
+class TestExpiracao:
+    def test_mais_antigos_primeiro(self, storage):
+        for map_id, ts in (("b", T0 + 2), ("c", T0 + 3), ("a", T0 + 1)):
+            _salvar(storage, map_id, ts)
+        assert storage.expired_ids(_antes(T0 + 2.5)) == ["a", "b"]
+        # Retirados do índice: não voltam
+        assert storage.expired_ids(_antes(T0 + 2.5)) == []
+        assert storage.expired_ids(_antes(T0 + 10)) == ["c"]
+    
+    def test_removido_nao_aparece(self, storage):
+        _salvar(storage, "a", T0 + 1)
+        _salvar(storage, "b", T0 + 2)
+        storage.expired_ids(_antes(T0))  # índice construído
+        storage.delete_map("a")
+        assert storage.expired_ids(_antes(T0 + 10)) == ["b"]
+    
+    def test_id_regravado_vale_a_nova_data(self, storage):
+        _salvar(storage, "a", T0 + 1)
+        b = _salvar(storage, "b", T0 + 2)
+        storage.expired_ids(_antes(T0))
+        storage.delete_map("a")
+        # O mesmo ID volta, mais novo que "b", ligado aos blobs de "b"
+        storage.link_map("a", "Tema", b, campos={"criado_ts": T0 + 5})
+        assert storage.expired_ids(_antes(T0 + 3)) == ["b"]
+        assert storage.expired_ids(_antes(T0 + 10)) == ["a"]
+    
+    def test_gravado_por_outro_processo(self, storage, data_dir):
+        storage.expired_ids(_antes(T0))
+        _salvar(StorageManager(), "a", T0 + 1)
+        assert storage.expired_ids(_antes(T0 + 10)) == ["a"]
+    
+    def test_limpar_antigos(self, storage, monkeypatch):
+        monkeypatch.setattr(Config, "RETENTION_DAYS", 1)
+        _salvar(storage, "velho", datetime.now().timestamp() - 3 * 86400)
+        _salvar(storage, "novo", datetime.now().timestamp())
+        resultado = CleanupService(storage=storage).limpar_antigos()
+        assert resultado["ids_deletados"] == ["velho"]
+        assert list(storage.journal.load()) == ["novo"]
+
+
+class TestOrfaos:
+    @pytest.fixture
+    def visitados(self, storage, monkeypatch):
+        """IDs conferidos pela varredura, na ordem."""
+        visitados = []
+        resolve_key = storage.resolve_key
+        monkeypatch.setattr(storage, "resolve_key", lambda map_id: visitados.append(map_id) or resolve_key(map_id))
+        return visitados
+    
+    def test_cada_id_uma_vez_por_ciclo(self, storage, visitados):
+        ids = [f"m{i}" for i in range(5)]
+        for i, map_id in enumerate(ids):
+            _salvar(storage, map_id, T0 + i)
+        limpeza = CleanupService(storage=storage)
+        
+        pendentes = [limpeza.limpar_orfaos(limite=2)["pendentes"] for _ in range(3)]
+        assert pendentes == [3, 1, 0]
+        assert sorted(visitados) == ids
+    
+    def test_novo_ciclo_depois_de_ver_todos(self, storage, visitados):
+        for i in range(3):
+            _salvar(storage, f"m{i}", T0 + i)
+        limpeza = CleanupService(storage=storage)
+        limpeza.limpar_orfaos(limite=2)
+        limpeza.limpar_orfaos(limite=2)
+        # Mapa criado no meio do ciclo entra no próximo
+        _salvar(storage, "m3", T0 + 3)
+        visitados.clear()
+        resultado = limpeza.limpar_orfaos(limite=10)
+        assert resultado["total_verificados"] == 4
+        assert resultado["pendentes"] == 0
+        assert sorted(visitados) == ["m0", "m1", "m2", "m3"]
+    
+    def test_limite_default_da_config(self, storage, monkeypatch):
+        monkeypatch.setattr(Config, "ORPHAN_SWEEP_BATCH", 1)
+        for i in range(2):
+            _salvar(storage, f"m{i}", T0 + i)
+        resultado = CleanupService(storage=storage).limpar_orfaos()
+        assert resultado["total_verificados"] == 1
+        assert resultado["pendentes"] == 1
+    
+    def test_orfao_removido_e_demais_mantidos(self, storage):
+        for i in range(4):
+            _salvar(storage, f"m{i}", T0 + i)
+        storage.blobs.delete(storage.get_map("m2")["chave"])
+        limpeza = CleanupService(storage=storage)
+        deletados = limpeza.limpar_orfaos(limite=3)["ids_deletados"] + limpeza.limpar_orfaos(limite=3)["ids_deletados"]
+        assert deletados == ["m2"]
+        assert sorted(storage.journal.load()) == ["m0", "m1", "m3"]
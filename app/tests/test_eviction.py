@@ -0,0 +1,185 @@
+"""Testes das políticas de despejo, do rastreamento de acessos e do despejo na geração."""
+import time
+import pytest
+from config import Config
+from eviction import AccessTracker, POLICIES, TTLEviction, criar_politica
+
+
+def _mapa(i, tamanho=100, acessos=0, ultimo_acesso=None, criado_ts=None):
+    info = {"id": f"m{i}", "tamanho": tamanho, "acessos": acessos, "criado_ts": criado_ts or i}
+    if ultimo_acesso is not None:
+        info["ultimo_acesso"] = ultimo_acesso
+    return info
+
+
+MAPAS = [
+    _mapa(1, tamanho=500, acessos=9, ultimo_acesso=50),
+    _mapa(2, tamanho=100, acessos=1, ultimo_acesso=40),
+    _mapa(3, tamanho=300, acessos=1, ultimo_acesso=10),
+    _mapa(4, tamanho=200, acessos=5),  # nunca acessado: vale a criação (4)
+]
+
+
+class TestPoliticas:
+    def test_lru(self):
+        assert criar_politica("lru").select(MAPAS, 2, 0) == ["m4", "m3"]
+    
+    def test_lfu_empate_pelo_acesso_mais_antigo(self):
+        assert criar_politica("lfu").select(MAPAS, 2, 0) == ["m3", "m2"]
+    
+    def test_tamanho(self):
+        assert criar_politica("tamanho").select(MAPAS, 1, 0) == ["m1"]
+    
+    def test_bytes(self):
+        # Despeja até liberar os bytes pedidos, mesmo acima do número de mapas
+        assert criar_politica("lru").select(MAPAS, 1, 450) == ["m4", "m3"]
+        assert criar_politica("tamanho").select(MAPAS, 0, 600) == ["m1", "m3"]
+    
+    def test_sem_excesso(self):
+        assert criar_politica("lru").select(MAPAS, 0, 0) == []
+    
+    def test_nenhuma(self):
+        assert criar_politica("nenhuma").select(MAPAS, 2, 1000) == []
+    
+    def test_ttl_so_expirados(self):
+        agora = time.time()
+        mapas = [
+            _mapa(1, ultimo_acesso=agora - 3 * 3600),
+            _mapa(2, ultimo_acesso=agora - 60),
+            _mapa(3, ultimo_acesso=agora - 5 * 3600),
+        ]
+        assert TTLEviction(ttl_horas=1).select(mapas, 3, 0) == ["m3", "m1"]
+    
+    def test_criar_politica(self, monkeypatch):
+        monkeypatch.setattr(Config, "EVICTION_POLICY", "lfu")
+        assert criar_politica().nome == "lfu"
+        assert set(POLICIES) == {"nenhuma", "lru", "lfu", "tamanho", "ttl"}
+        with pytest.raises(ValueError):
+            criar_politica("fifo")
+    
+    def test_default_recusa(self):
+        assert Config.EVICTION_POLICY == "nenhuma"
+
+
+class StorageFalso:
+    def __init__(self):
+        self.gravacoes = []
+    
+    def record_access(self, hits):
+        self.gravacoes.append(dict(hits))
+        return len(hits)
+
+
+def _esperar(condicao, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.005)
+    return condicao()
+
+
+class TestAccessTracker:
+    def test_acumula_ate_o_flush(self):
+        storage = StorageFalso()
+        acessos = AccessTracker(storage, flush_batch=100, flush_seconds=60)
+        for map_id in ("a", "b", "a"):
+            acessos.hit(map_id)
+        assert storage.gravacoes == []
+        assert acessos.flush() == 2
+        (hits,) = storage.gravacoes
+        assert hits["a"][0] == 2 and hits["b"][0] == 1
+        assert acessos.flush() == 0
+    
+    def test_lote_cheio_grava_em_background(self):
+        storage = StorageFalso()
+        acessos = AccessTracker(storage, flush_batch=3, flush_seconds=60)
+        
+        def lento(hits):
+            time.sleep(0.2)
+            return StorageFalso.record_access(storage, hits)
+        storage.record_access = lento
+        
+        inicio = time.perf_counter()
+        for _ in range(3):
+            acessos.hit("a")
+        # A requisição não espera a gravação
+        assert time.perf_counter() - inicio < 0.1
+        assert _esperar(lambda: len(storage.gravacoes) == 1)
+        assert storage.gravacoes[0]["a"][0] == 3
+    
+    def test_grava_por_tempo(self):
+        storage = StorageFalso()
+        acessos = AccessTracker(storage, flush_batch=1000, flush_seconds=0.05)
+        acessos.hit("a")
+        assert _esperar(lambda: len(storage.gravacoes) == 1)
+    
+    def test_erro_na_gravacao_nao_propaga(self):
+        class Quebrado:
+            def record_access(self, hits):
+                raise OSError("disco cheio")
+        
+        acessos = AccessTracker(Quebrado(), flush_batch=100, flush_seconds=60)
+        acessos.hit("a")
+        assert acessos.flush() == 0
+
+
+class TestDespejoNaGeracao:
+    @pytest.fixture
+    def cheio(self, service, monkeypatch):
+        monkeypatch.setattr(Config, "MAX_MAPS", 2)
+        monkeypatch.setattr(service, "politica", criar_politica("lru"))
+        antigos = [service.gerar_mapa(f"tema {i}")[0] for i in range(2)]
+        return service, antigos
+    
+    def test_falha_na_llm_nao_despeja(self, cheio, monkeypatch):
+        service, antigos = cheio
+        
+        def falha(*args, **kwargs):
+            raise ConnectionError("provider fora do ar")
+        monkeypatch.setattr("service.gerar_html", falha)
+        
+        with pytest.raises(RuntimeError):
+            service.gerar_mapa("outro")
+        assert sorted(service.storage.journal.load()) == sorted(antigos)
+    
+    def test_sucesso_despeja(self, cheio):
+        service, antigos = cheio
+        novo, _ = service.gerar_mapa("outro")
+        assert sorted(service.storage.journal.load()) == sorted([antigos[1], novo])
+    
+    def test_nenhuma_recusa_antes_da_llm(self, cheio, monkeypatch):
+        service, antigos = cheio
+        monkeypatch.setattr(service, "politica", criar_politica("nenhuma"))
+        chamadas = []
+        monkeypatch.setattr("service.gerar_html", lambda *args, **kwargs: chamadas.append(args))
+        
+        with pytest.raises(RuntimeError, match="Limite"):
+            service.gerar_mapa("outro")
+        assert chamadas == []
+        assert sorted(service.storage.journal.load()) == sorted(antigos)
+
+
+class TestDespejoPorBytes:
+    @pytest.fixture
+    def limite(self, service, monkeypatch):
+        """Limite de bytes logo acima do que um mapa ocupa."""
+        monkeypatch.setattr(Config, "CACHE_TTL_S", 3600)
+        monkeypatch.setattr(service, "politica", criar_politica("lru"))
+        fonte, _ = service.gerar_mapa("Python")
+        fisicos = service.storage.get_stats()["bytes_fisicos"]
+        monkeypatch.setattr(Config, "MAX_STORAGE_MB", (fisicos + 1) / (1024 * 1024))
+        return service, fonte
+    
+    def test_copias_deduplicadas_nao_despejam(self, limite):
+        service, fonte = limite
+        copias = [service.gerar_mapa("python")[0] for _ in range(5)]
+        assert sorted(service.storage.journal.load()) == sorted([fonte] + copias)
+        stats = service.storage.get_stats()
+        assert stats["bytes_logicos"] > Config.MAX_STORAGE_MB * 1024 * 1024 >= stats["bytes_fisicos"]
+    
+    def test_despejar_copia_nao_conta_como_liberado(self, limite):
+        service, fonte = limite
+        copia, _ = service.gerar_mapa("python")
+        outro = service.storage.save_map("outro", "Rust", "<html>rust</html>")
+        # Acima do limite: despejar só a fonte não libera nada, a cópia ainda usa os blobs
+        service._liberar_espaco()
+        assert list(service.storage.journal.load()) == [outro["id"]]
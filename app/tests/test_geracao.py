@@ -0,0 +1,115 @@
+"""Geração: métrica de SLO por perfil, respostas truncadas da LLM e desenho do SVG."""
+import types
+import asyncio
+import threading
+import pytest
+import llm
+import service as service_mod
+from llm import RespostaTruncada
+from metrics import PROFILE_SLO, GENERATION_SECONDS
+from scheduler import FilaCheia
+
+
+def _resposta(conteudo: str, finish_reason: str = "stop"):
+    escolha = types.SimpleNamespace(finish_reason=finish_reason, message=types.SimpleNamespace(content=conteudo))
+    return types.SimpleNamespace(choices=[escolha])
+
+
+class TestSLO:
+    def _contagens(self, perfil="rapido"):
+        return {r: PROFILE_SLO.value(perfil, r) for r in ("ok", "late", "error")}
+    
+    def test_sucesso(self, service):
+        antes = self._contagens()
+        concluidas = GENERATION_SECONDS.count("rapido")
+        service.gerar_mapa("Python", "rapido")
+        depois = self._contagens()
+        assert depois["ok"] + depois["late"] == antes["ok"] + antes["late"] + 1
+        assert depois["error"] == antes["error"]
+        assert GENERATION_SECONDS.count("rapido") == concluidas + 1
+    
+    def test_falha_conta_como_erro(self, service, monkeypatch):
+        def falha(*args, **kwargs):
+            raise TimeoutError("LLM não respondeu")
+        monkeypatch.setattr(service_mod, "gerar_html", falha)
+        
+        antes = self._contagens()
+        concluidas = GENERATION_SECONDS.count("rapido")
+        with pytest.raises(RuntimeError):
+            service.gerar_mapa("Python", "rapido")
+        assert self._contagens()["error"] == antes["error"] + 1
+        assert GENERATION_SECONDS.count("rapido") == concluidas
+    
+    def test_fila_cheia_conta_como_erro(self, service, monkeypatch):
+        def recusa(*args, **kwargs):
+            raise FilaCheia("fundo", 5)
+        monkeypatch.setattr(service_mod, "gerar_html", recusa)
+        
+        antes = self._contagens()
+        with pytest.raises(FilaCheia):
+            service.gerar_mapa("Python", "rapido")
+        assert self._contagens()["error"] == antes["error"] + 1
+
+
+class TestTruncada:
+    def test_finish_reason_length(self):
+        assert llm._conteudo(_resposta("title: x")) == "title: x"
+        with pytest.raises(RespostaTruncada):
+            llm._conteudo(_resposta("title: x\nchildren:\n  - ti", "length"), 2048)
+    
+    def _com_respostas(self, monkeypatch, respostas):
+        prompts = []
+        
+        def fake(prompt):
+            prompts.append(prompt)
+            resposta = respostas.pop(0)
+            if resposta is None:
+                raise RespostaTruncada("cortada")
+            return resposta
+        monkeypatch.setattr(llm, "obter_llm", lambda perfil: fake)
+        return prompts
+    
+    def test_nova_tentativa_com_um_nivel_a_menos(self, monkeypatch):
+        prompts = self._com_respostas(monkeypatch, [None, llm.FAKE_YAML])
+        _, arvore = llm.gerar_html("Python", llm.obter_perfil("profundo"))
+        assert arvore["title"] == "Mapa"
+        assert "- 4-5 níveis" in prompts[0]
+        assert "- 3-4 níveis" in prompts[1]
+    
+    def test_erro_claro_se_nao_couber(self, monkeypatch, service):
+        self._com_respostas(monkeypatch, [None, None])
+        monkeypatch.setattr(service_mod, "gerar_html", llm.gerar_html)
+        with pytest.raises(RespostaTruncada, match="perfil rapido"):
+            service.gerar_mapa("Python", "rapido")
+
+
+class TestDesenho:
+    @pytest.fixture
+    def quebrado(self, monkeypatch):
+        def falha(arvore):
+            raise RecursionError("layout")
+        monkeypatch.setattr(service_mod, "desenhar", falha)
+    
+    def test_falha_no_desenho_salva_sem_svg(self, service, quebrado):
+        map_id, _ = service.gerar_mapa("Python", "rapido")
+        assert service.obter_arvore(map_id)
+        with pytest.raises(ValueError):
+            service.obter_svg(map_id)
+    
+    def test_falha_no_desenho_salva_sem_svg_async(self, service, quebrado):
+        map_id, _ = asyncio.run(service.gerar_mapa_async("Python", "rapido"))
+        with pytest.raises(ValueError):
+            service.obter_svg(map_id, miniatura=True)
+    
+    def test_async_desenha_fora_do_event_loop(self, service, monkeypatch):
+        threads = []
+        original = service_mod.desenhar
+        
+        def desenhar(arvore):
+            threads.append(threading.current_thread())
+            return original(arvore)
+        monkeypatch.setattr(service_mod, "desenhar", desenhar)
+        
+        map_id, _ = asyncio.run(service.gerar_mapa_async("Python", "rapido"))
+        assert threads and threads[0] is not threading.main_thread()
+        assert service.obter_svg(map_id).startswith(b"<svg")
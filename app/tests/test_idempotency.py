@@ -0,0 +1,125 @@
+"""Idempotency-Key: reserva, repetição, conflito, em andamento e limite de chaves."""
+import pytest
+from config import Config
+from idempotency import MemoryIdempotencyStore, SQLiteIdempotencyStore, criar_idempotencia
+
+T0 = 1_700_000_000.0
+
+DADOS = {"tema": "Python"}
+CORPO = {"id": "abc", "tema": "Python"}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def novo_store(request, tmp_path):
+    """Fábrica de stores do backend; no sqlite todos usam o mesmo arquivo."""
+    def criar(**kwargs):
+        kwargs = {"ttl": 100, "em_andamento": 10, "max_chaves": 1000, **kwargs}
+        if request.param == "memory":
+            return MemoryIdempotencyStore(**kwargs)
+        return SQLiteIdempotencyStore(tmp_path / "idempotencia.db", **kwargs)
+    return criar
+
+
+@pytest.fixture
+def store(novo_store):
+    return novo_store()
+
+
+class TestFluxo:
+    def test_primeira_reserva(self, store):
+        assert store.abrir("c", "k", DADOS, T0) is None
+    
+    def test_em_andamento(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        corpo, status, headers = store.abrir("c", "k", DADOS, T0 + 1)
+        assert status == 409
+        assert headers["Retry-After"]
+    
+    def test_repeticao_da_resposta(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        store.fechar("c", "k", DADOS, CORPO, 201, T0 + 1)
+        assert store.abrir("c", "k", DADOS, T0 + 2) == (CORPO, 201, {"Idempotent-Replayed": "true"})
+    
+    def test_outro_corpo(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        store.fechar("c", "k", DADOS, CORPO, 201, T0 + 1)
+        assert store.abrir("c", "k", {"tema": "Rust"}, T0 + 2)[1] == 422
+        # Também durante a geração
+        store.abrir("c", "k2", DADOS, T0)
+        assert store.abrir("c", "k2", {"tema": "Rust"}, T0 + 1)[1] == 422
+    
+    def test_chaves_por_cliente(self, store):
+        store.abrir("a", "k", DADOS, T0)
+        assert store.abrir("b", "k", DADOS, T0) is None
+    
+    def test_chave_invalida(self, store):
+        assert store.abrir("c", "", DADOS, T0)[1] == 400
+        assert store.abrir("c", "x" * 256, DADOS, T0)[1] == 400
+        assert store.abrir("c", "chave\n", DADOS, T0)[1] == 400
+    
+    def test_falha_libera_a_chave(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        store.fechar("c", "k", DADOS, {"erro": "x"}, 503, T0 + 1)
+        assert store.abrir("c", "k", DADOS, T0 + 2) is None
+    
+    def test_cancelar(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        store.cancelar("c", "k")
+        assert store.abrir("c", "k", DADOS, T0 + 1) is None
+    
+    def test_reserva_expira(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        assert store.abrir("c", "k", DADOS, T0 + 11) is None
+    
+    def test_resposta_expira(self, store):
+        store.abrir("c", "k", DADOS, T0)
+        store.fechar("c", "k", DADOS, CORPO, 201, T0)
+        assert store.abrir("c", "k", DADOS, T0 + 99)[1] == 201
+        assert store.abrir("c", "k", DADOS, T0 + 101) is None
+
+
+class TestLimite:
+    def _encher(self, store, n, agora=T0):
+        for i in range(n):
+            store.abrir("c", f"k{i}", DADOS, agora)
+            store.fechar("c", f"k{i}", DADOS, CORPO, 201, agora)
+    
+    def _descartar(self, store):
+        if isinstance(store, SQLiteIdempotencyStore):
+            store.descartar(T0)
+    
+    def test_respostas_antigas_saem(self, novo_store):
+        store = novo_store(max_chaves=3)
+        self._encher(store, 5)
+        self._descartar(store)
+        assert store.abrir("c", "k0", DADOS, T0) is None
+        assert store.abrir("c", "k4", DADOS, T0)[1] == 201
+    
+    def test_reserva_em_andamento_nao_sai(self, novo_store):
+        store = novo_store(max_chaves=3)
+        store.abrir("c", "andamento", DADOS, T0)
+        self._encher(store, 5)
+        self._descartar(store)
+        assert store.abrir("c", "andamento", DADOS, T0)[1] == 409
+
+
+class TestWorkers:
+    def test_sqlite_compartilhado(self, tmp_path):
+        # Dois workers: a repetição chega ao outro processo
+        primeiro = SQLiteIdempotencyStore(tmp_path / "i.db", ttl=100, em_andamento=10)
+        segundo = SQLiteIdempotencyStore(tmp_path / "i.db", ttl=100, em_andamento=10)
+        primeiro.abrir("c", "k", DADOS, T0)
+        assert segundo.abrir("c", "k", DADOS, T0 + 1)[1] == 409
+        primeiro.fechar("c", "k", DADOS, CORPO, 201, T0 + 2)
+        assert segundo.abrir("c", "k", DADOS, T0 + 3)[0] == CORPO
+    
+    def test_backend_padrao(self, monkeypatch, data_dir):
+        monkeypatch.setattr(Config, "IDEMPOTENCIA_BACKEND", "")
+        for workers, tipo in ((1, MemoryIdempotencyStore), (4, SQLiteIdempotencyStore)):
+            monkeypatch.setattr(Config, "WORKERS", workers)
+            criar_idempotencia.cache_clear()
+            try:
+                assert type(criar_idempotencia()) is tipo
+            finally:
+                criar_idempotencia.cache_clear()
+
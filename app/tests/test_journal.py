@@ -0,0 +1,178 @@
+"""Testes do journal de metadados: replay, linhas parciais, compactação e processos."""
+import json
+import multiprocessing
+import pytest
+from journal import MetadataJournal
+
+
+def _save(map_id, **campos):
+    return {"op": "save", "id": map_id, "info": {"id": map_id, **campos}}
+
+
+def _incr(map_id, n=1):
+    return {"op": "update", "id": map_id, "incr": {"acessos": n}}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return tmp_path / "metadata.json"
+
+
+class TestReplay:
+    def test_outra_instancia_ve_as_operacoes(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1", tema="x"), _save("m2"), _incr("m1", 2)])
+        a.append([{"op": "delete", "id": "m2"}, {"op": "update", "id": "m1", "set": {"tema": "y"}}])
+        
+        b = MetadataJournal(snapshot)
+        assert b.load() == {"m1": {"id": "m1", "tema": "y", "acessos": 2}}
+    
+    def test_catch_up_incremental(self, snapshot):
+        a, b = MetadataJournal(snapshot), MetadataJournal(snapshot)
+        a.append([_save("m1")])
+        assert list(b.load()) == ["m1"]
+        a.append([_save("m2"), _incr("m1")])
+        assert b.load()["m1"]["acessos"] == 1
+        assert list(b.load()) == ["m1", "m2"]
+    
+    def test_listener(self, snapshot):
+        recebidas = []
+        a = MetadataJournal(snapshot, listener=recebidas.append)
+        a.append([_save("m1", tema="x")])
+        a.append([{"op": "delete", "id": "m1"}, {"op": "delete", "id": "nada"}])
+        assert recebidas[0] == _save("m1", tema="x")
+        # O delete leva os metadados removidos
+        assert recebidas[1]["info"] == {"id": "m1", "tema": "x"}
+        assert "info" not in recebidas[2]
+    
+    def test_update_nao_altera_dict_ja_entregue(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1")])
+        antes = a.load()["m1"]
+        a.append([_incr("m1")])
+        assert "acessos" not in antes
+
+
+class TestLinhas:
+    def test_linha_parcial_ignorada_e_descartada(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1")])
+        with open(a.journal_file, "ab") as f:
+            f.write(b'{"op":"save","id":"m2","info":{"id":')
+        
+        b = MetadataJournal(snapshot)
+        assert list(b.load()) == ["m1"]
+        b.append([_save("m3")])
+        assert list(MetadataJournal(snapshot).load()) == ["m1", "m3"]
+    
+    def test_linha_invalida_ignorada(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1")])
+        with open(a.journal_file, "ab") as f:
+            f.write(b"nao e json\n" + b'{"sem_op": 1}\n')
+        a.append([_save("m2")])
+        assert list(MetadataJournal(snapshot).load()) == ["m1", "m2"]
+
+
+class TestCompactacao:
+    def test_compacta_a_cada_n_operacoes(self, snapshot):
+        a = MetadataJournal(snapshot, compact_every=5)
+        for i in range(7):
+            a.append([_save(f"m{i}"), _incr(f"m{i}")])
+        
+        dados = json.loads(snapshot.read_text())
+        assert dados["geracao"] >= 1
+        assert len(dados["mapas"]) >= 5
+        estado = MetadataJournal(snapshot).load()
+        assert len(estado) == 7
+        assert all(info["acessos"] == 1 for info in estado.values())
+    
+    def test_outra_instancia_recarrega(self, snapshot):
+        recebidas = []
+        a = MetadataJournal(snapshot)
+        b = MetadataJournal(snapshot, listener=recebidas.append)
+        a.append([_save("m1"), _incr("m1")])
+        b.load()
+        a.compact()
+        a.append([_incr("m1")])
+        assert b.load()["m1"]["acessos"] == 2
+        assert None in recebidas
+    
+    def test_crash_entre_snapshot_e_journal(self, snapshot, monkeypatch):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1"), _incr("m1"), _incr("m1")])
+        
+        # Crash depois de publicar o snapshot, antes de trocar o journal
+        def crash(self):
+            raise SystemExit("crash")
+        with monkeypatch.context() as m:
+            m.setattr(MetadataJournal, "_reset_journal", crash)
+            with pytest.raises(SystemExit):
+                a.compact()
+        
+        # O journal antigo continua lá, mas não é reaplicado
+        assert MetadataJournal(snapshot).load()["m1"]["acessos"] == 2
+        
+        b = MetadataJournal(snapshot)
+        b.append([_incr("m1")])
+        assert MetadataJournal(snapshot).load()["m1"]["acessos"] == 3
+        assert b.load()["m1"]["acessos"] == 3
+    
+    def test_replace(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1"), _incr("m1")])
+        a.replace({"m2": {"id": "m2"}})
+        a.append([_incr("m2")])
+        assert MetadataJournal(snapshot).load() == {"m2": {"id": "m2", "acessos": 1}}
+    
+    def test_formato_antigo(self, snapshot):
+        # Snapshot sem geração e journal sem cabeçalho (antes da geração)
+        snapshot.write_text(json.dumps({"m1": {"id": "m1", "acessos": 1}}))
+        snapshot.with_suffix(".journal").write_text(json.dumps(_incr("m1")) + "\n")
+        a = MetadataJournal(snapshot)
+        assert a.load()["m1"]["acessos"] == 2
+        a.compact()
+        a.append([_incr("m1")])
+        assert MetadataJournal(snapshot).load()["m1"]["acessos"] == 3
+
+
+class TestAntesDepois:
+    def test_before_com_erro_nao_grava(self, snapshot):
+        a = MetadataJournal(snapshot)
+        
+        def recusa(estado):
+            raise KeyError("blob")
+        with pytest.raises(KeyError):
+            a.append([_save("m1")], before=recusa)
+        assert MetadataJournal(snapshot).load() == {}
+    
+    def test_before_e_after(self, snapshot):
+        a = MetadataJournal(snapshot)
+        a.append([_save("m1")])
+        visto = {}
+        a.append(
+            [_save("m2")],
+            before=lambda estado: visto.setdefault("antes", sorted(estado)),
+            after=lambda: visto.setdefault("depois", sorted(a._state))
+        )
+        assert visto == {"antes": ["m1"], "depois": ["m1", "m2"]}
+
+
+def _incrementar(snapshot, n):
+    journal = MetadataJournal(snapshot, compact_every=7)
+    for _ in range(n):
+        journal.append([_incr("m1")])
+
+
+class TestProcessos:
+    def test_appends_concorrentes(self, snapshot):
+        MetadataJournal(snapshot).append([_save("m1")])
+        ctx = multiprocessing.get_context("fork")
+        processos = [ctx.Process(target=_incrementar, args=(snapshot, 50)) for _ in range(4)]
+        for p in processos:
+            p.start()
+        for p in processos:
+            p.join(30)
+            assert p.exitcode == 0
+        # Nenhum append perdido nem reaplicado, com compactações no meio
+        assert MetadataJournal(snapshot).load()["m1"]["acessos"] == 200
@@ -0,0 +1,117 @@
+"""Métricas: shards por thread, soma entre processos e o endpoint /metrics."""
+import time
+import threading
+from starlette.testclient import TestClient
+import app
+import asgi
+from metrics import Counter, Histogram, Gauge, Registry, Cronometro, STAGE_SECONDS, CONTENT_TYPE
+
+
+def _em_threads(func, n=20):
+    threads = [threading.Thread(target=func) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestShards:
+    def test_threads_encerradas_sao_somadas(self):
+        contador = Counter("c", "teste", ["rota"])
+        _em_threads(lambda: contador.inc("/a"))
+        assert len(contador._shards) == 0
+        assert contador.value("/a") == 20
+        
+        contador.inc("/a", amount=2)
+        assert len(contador._shards) == 1
+        assert contador.value("/a") == 22
+    
+    def test_histograma(self):
+        histograma = Histogram("h", "teste", buckets=(1.0,))
+        _em_threads(lambda: histograma.observe(0.5), n=3)
+        histograma.observe(2.0)
+        assert len(histograma._shards) == 1
+        assert histograma.count() == 4
+        assert histograma.collect() == [
+            'h_bucket{le="1.0"} 3', 'h_bucket{le="+Inf"} 4', "h_sum 3.5", "h_count 4",
+        ]
+
+
+def _registro(diretorio=None):
+    registro = Registry()
+    contador = registro.register(Counter("c_total", "teste", ["rota"]))
+    histograma = registro.register(Histogram("h", "teste", buckets=(1.0,)))
+    registro.register(Gauge("g", "teste", lambda: 7))
+    if diretorio:
+        registro.compartilhar(diretorio, intervalo_s=3600)
+    return registro, contador, histograma
+
+
+class TestProcessos:
+    def test_sem_diretorio_so_o_processo(self):
+        registro, contador, _ = _registro()
+        contador.inc("/a")
+        assert 'c_total{rota="/a"} 1' in registro.expose()
+    
+    def test_scrape_soma_todos(self, tmp_path):
+        # Dois registros no mesmo diretório fazem o papel de dois workers
+        primeiro, contador1, histograma1 = _registro(tmp_path)
+        segundo, contador2, histograma2 = _registro(tmp_path)
+        contador1.inc("/a")
+        contador2.inc("/a", amount=2)
+        contador2.inc("/b")
+        histograma1.observe(0.5)
+        histograma2.observe(5.0)
+        segundo.gravar()
+        
+        texto = primeiro.expose()
+        assert 'c_total{rota="/a"} 3' in texto
+        assert 'c_total{rota="/b"} 1' in texto
+        assert "h_count 2" in texto
+        assert 'h_bucket{le="1.0"} 1' in texto
+        assert "g 7" in texto
+    
+    def test_valores_defasados_ate_gravar(self, tmp_path):
+        primeiro, _, _ = _registro(tmp_path)
+        segundo, contador2, _ = _registro(tmp_path)
+        contador2.inc("/a")
+        assert 'rota="/a"' not in primeiro.expose()
+        segundo.gravar()
+        assert 'c_total{rota="/a"} 1' in primeiro.expose()
+    
+    def test_arquivo_corrompido_ignorado(self, tmp_path):
+        registro, contador, _ = _registro(tmp_path)
+        (tmp_path / "lixo.json").write_text("{")
+        contador.inc("/a")
+        assert 'c_total{rota="/a"} 1' in registro.expose()
+
+
+class TestEstagios:
+    def test_cronometro_so_conta_o_gerador(self):
+        def lento():
+            for _ in range(3):
+                time.sleep(0.01)
+                yield "x"
+        
+        cronometro = Cronometro()
+        for _ in cronometro.medir(lento()):
+            time.sleep(0.02)
+        assert 0.03 <= cronometro.segundos < 0.09
+    
+    def test_save_map_separa_render_e_gravacao(self, service):
+        antes = {stage: STAGE_SECONDS.count(stage) for stage in ("render_html", "file_write")}
+        service.storage.save_map("a", "A", iter(["<html>", "</html>"]))
+        service.storage.save_map("b", "B", "<html></html>")
+        # HTML já renderizado (str) não tem estágio de render
+        assert STAGE_SECONDS.count("render_html") == antes["render_html"] + 1
+        assert STAGE_SECONDS.count("file_write") == antes["file_write"] + 2
+
+
+class TestEndpoint:
+    def test_content_type_flask(self):
+        resposta = app.app.test_client().get("/metrics")
+        assert resposta.headers["Content-Type"] == CONTENT_TYPE
+    
+    def test_content_type_asgi(self):
+        resposta = TestClient(asgi.app).get("/metrics")
+        assert resposta.headers["content-type"] == CONTENT_TYPE
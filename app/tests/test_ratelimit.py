@@ -0,0 +1,225 @@
+"""Limite de taxa: decisão pura, devolução, IP atrás de proxy e backends."""
+import os
+import sys
+import subprocess
+import pytest
+from starlette.testclient import TestClient
+import app
+import asgi
+from config import Config
+from scheduler import FilaCheia
+from sqlitedb import backend_padrao
+from ratelimit import (
+    DIA, Regras, decidir, restituir, ip_do_cliente, criar_rate_limiter,
+    MemoryRateLimiter, SQLiteRateLimiter
+)
+
+# Meio-dia de um dia qualquer (UTC)
+T0 = 20000 * DIA + DIA / 2
+
+REGRAS = Regras(por_minuto=6, rajada=2, cota_diaria=3)
+
+
+def _tentativas(regras: Regras, instantes):
+    estado, decisoes = None, []
+    for agora in instantes:
+        estado, decisao = decidir(estado, agora, regras)
+        decisoes.append(decisao)
+    return estado, decisoes
+
+
+class TestDecidir:
+    def test_cliente_novo_comeca_com_a_rajada(self):
+        _, decisoes = _tentativas(REGRAS, [T0, T0, T0])
+        assert [d.permitido for d in decisoes] == [True, True, False]
+        assert decisoes[0].cota_restante == 2
+        assert decisoes[2].motivo == "taxa"
+    
+    def test_retry_after_ate_o_proximo_token(self):
+        _, decisoes = _tentativas(REGRAS, [T0, T0, T0 + 4])
+        # 6/min: um token a cada 10 s, 4 s já passaram
+        assert decisoes[2].retry_after == 6
+    
+    def test_tokens_repostos_com_o_tempo(self):
+        _, decisoes = _tentativas(REGRAS, [T0, T0, T0 + 10])
+        assert decisoes[2].permitido
+    
+    def test_recusa_nao_consome_cota(self):
+        estado, _ = _tentativas(REGRAS, [T0, T0, T0, T0])
+        assert estado[3] == 2
+    
+    def test_cota_esgotada_ate_a_meia_noite(self):
+        _, decisoes = _tentativas(REGRAS, [T0, T0 + 60, T0 + 120, T0 + 180])
+        assert [d.permitido for d in decisoes] == [True, True, True, False]
+        assert decisoes[3].motivo == "cota"
+        assert decisoes[3].cota_restante == 0
+        assert decisoes[3].retry_after == int(DIA / 2 - 180) + 1
+    
+    def test_cota_renovada_no_dia_seguinte(self):
+        _, decisoes = _tentativas(REGRAS, [T0, T0 + 60, T0 + 120, T0 + DIA])
+        assert decisoes[3].permitido
+        assert decisoes[3].cota_restante == 2
+    
+    def test_sem_limites(self):
+        _, decisoes = _tentativas(Regras(0, 0, 0), [T0] * 50)
+        assert all(d.permitido and d.cota_restante is None for d in decisoes)
+
+
+class TestRestituir:
+    def test_devolve_token_e_cota(self):
+        estado, _ = _tentativas(REGRAS, [T0, T0])
+        estado = restituir(estado, T0, REGRAS)
+        assert estado[0] == 1
+        assert estado[3] == 1
+        _, decisao = decidir(estado, T0, REGRAS)
+        assert decisao.permitido
+    
+    def test_nao_passa_da_rajada(self):
+        estado, _ = _tentativas(REGRAS, [T0])
+        estado = restituir(restituir(estado, T0, REGRAS), T0, REGRAS)
+        assert estado[0] == REGRAS.rajada
+        assert estado[3] == 0
+    
+    def test_cota_de_ontem_nao_volta(self):
+        estado, _ = _tentativas(REGRAS, [T0])
+        assert restituir(estado, T0 + DIA, REGRAS)[3] == 1
+
+
+class TestIpDoCliente:
+    def test_sem_proxy_ignora_o_header(self):
+        assert ip_do_cliente("10.0.0.1", ["1.2.3.4"], proxies=0) == "10.0.0.1"
+    
+    def test_um_proxy_usa_a_ultima_entrada(self):
+        assert ip_do_cliente("10.0.0.1", ["1.2.3.4"], proxies=1) == "1.2.3.4"
+    
+    def test_entradas_forjadas_sao_ignoradas(self):
+        # O cliente mandou "6.6.6.6"; o proxy acrescentou o endereço real
+        assert ip_do_cliente("10.0.0.1", ["6.6.6.6, 1.2.3.4"], proxies=1) == "1.2.3.4"
+        assert ip_do_cliente("10.0.0.1", ["6.6.6.6", "1.2.3.4, 10.0.0.2"], proxies=2) == "1.2.3.4"
+    
+    def test_menos_entradas_que_proxies(self):
+        assert ip_do_cliente("10.0.0.1", [], proxies=1) == "10.0.0.1"
+        assert ip_do_cliente("10.0.0.1", ["1.2.3.4"], proxies=2) == "10.0.0.1"
+
+
+class TestBackends:
+    @pytest.fixture(params=["memory", "sqlite"])
+    def limitador(self, request, tmp_path):
+        if request.param == "memory":
+            return MemoryRateLimiter(REGRAS)
+        return SQLiteRateLimiter(tmp_path / "limites.db", REGRAS)
+    
+    def test_devolver(self, limitador):
+        assert limitador.tentar("a", T0).permitido
+        assert limitador.tentar("a", T0).permitido
+        assert not limitador.tentar("a", T0).permitido
+        limitador.devolver("a", T0)
+        assert limitador.tentar("a", T0).permitido
+    
+    def test_devolver_cliente_desconhecido(self, limitador):
+        limitador.devolver("nada", T0)
+        assert limitador.tentar("nada", T0).cota_restante == 2
+    
+    def test_descarte_amortizado(self, monkeypatch):
+        monkeypatch.setattr(MemoryRateLimiter, "MAX_CLIENTES", 10)
+        limitador = MemoryRateLimiter(REGRAS)
+        descartes = []
+        original = limitador._descartar
+        monkeypatch.setattr(limitador, "_descartar", lambda agora: descartes.append(agora) or original(agora))
+        
+        # Todos ativos hoje: nada sai, e o próximo descarte espera o dobro
+        for i in range(100):
+            limitador.tentar(f"c{i}", T0)
+        assert len(limitador._estados) == 100
+        assert len(descartes) == 4  # com 11, 23, 47 e 95 clientes
+    
+    def test_descarte_remove_clientes_de_ontem(self, monkeypatch):
+        monkeypatch.setattr(MemoryRateLimiter, "MAX_CLIENTES", 10)
+        limitador = MemoryRateLimiter(REGRAS)
+        for i in range(10):
+            limitador.tentar(f"ontem{i}", T0 - DIA)
+        limitador.tentar("hoje", T0)
+        assert list(limitador._estados) == ["hoje"]
+    
+    def test_sqlite_com_varios_workers(self, monkeypatch, data_dir):
+        monkeypatch.setattr(Config, "RATE_LIMIT_BACKEND", "")
+        monkeypatch.setattr(Config, "WORKERS", 4)
+        criar_rate_limiter.cache_clear()
+        try:
+            assert isinstance(criar_rate_limiter(), SQLiteRateLimiter)
+        finally:
+            criar_rate_limiter.cache_clear()
+    
+    def test_um_worker_fora_do_serve(self):
+        # python app.py e uvicorn não passam pelo serve.py: nada de sqlite
+        env = {k: v for k, v in os.environ.items() if k != "WORKERS"}
+        saida = subprocess.run(
+            [sys.executable, "-c", "from config import Config; print(Config.WORKERS)"],
+            cwd=os.path.dirname(sys.modules["config"].__file__),
+            env=env, capture_output=True, text=True, check=True
+        )
+        assert saida.stdout.strip() == "1"
+    
+    def test_backend_padrao(self, monkeypatch):
+        monkeypatch.setattr(Config, "WORKERS", 1)
+        assert backend_padrao("") == "memory"
+        assert backend_padrao("sqlite") == "sqlite"
+        monkeypatch.setattr(Config, "WORKERS", 2)
+        assert backend_padrao("") == "sqlite"
+        assert backend_padrao("memory") == "memory"
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def api(request, monkeypatch):
+    """Cliente de teste de uma das APIs, com limite de 1 geração por dia."""
+    modulo = app if request.param == "flask" else asgi
+    limitador = MemoryRateLimiter(Regras(0, 0, 1))
+    monkeypatch.setattr(modulo.geracao, "limitador", limitador)
+    
+    def post(dados):
+        if modulo is app:
+            resposta = app.app.test_client().post("/api/gerar", json=dados)
+            return resposta.status_code
+        return TestClient(asgi.app).post("/api/gerar", json=dados).status_code
+    
+    return modulo, limitador, post
+
+
+class TestCotaNaApi:
+    def test_pedido_invalido_nao_gasta_cota(self, api):
+        modulo, limitador, post = api
+        assert post({"tema": "Python", "perfil": "inexistente"}) == 400
+        assert post({"tema": "Python", "prioridade": "urgente"}) == 400
+        assert post({"tema": "   "}) == 400
+        assert post({"tema": 42}) == 400
+        assert limitador._estados == {}
+    
+    def test_falha_do_servidor_devolve_a_tentativa(self, api, monkeypatch):
+        modulo, limitador, post = api
+        
+        def fila_cheia(*args):
+            raise FilaCheia("interativo", 5)
+        
+        async def fila_cheia_async(*args):
+            fila_cheia()
+        
+        monkeypatch.setattr(modulo.service, "gerar_mapa", fila_cheia)
+        monkeypatch.setattr(modulo.service, "gerar_mapa_async", fila_cheia_async)
+        assert post({"tema": "Python"}) == 503
+        assert post({"tema": "Python"}) == 503
+        (estado,) = limitador._estados.values()
+        assert estado[3] == 0
+    
+    def test_erro_do_cliente_continua_contando(self, api, monkeypatch):
+        modulo, limitador, post = api
+        
+        def recusa(*args):
+            raise ValueError("inválido")
+        
+        async def recusa_async(*args):
+            recusa()
+        
+        monkeypatch.setattr(modulo.service, "gerar_mapa", recusa)
+        monkeypatch.setattr(modulo.service, "gerar_mapa_async", recusa_async)
+        assert post({"tema": "Python"}) == 400
+        assert post({"tema": "Python"}) == 429
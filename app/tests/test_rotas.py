@@ -0,0 +1,63 @@
+"""Paridade entre a API Flask (app.py) e a ASGI (asgi.py)."""
+import re
+import pytest
+from starlette.testclient import TestClient
+
+import app
+import asgi
+
+
+def _normalizar(rota: str) -> str:
+    return re.sub(r"<(\w+)>", r"{\1}", rota)
+
+
+def _rotas_flask():
+    return {
+        (metodo, _normalizar(regra.rule))
+        for regra in app.app.url_map.iter_rules()
+        if regra.endpoint != "static"
+        for metodo in regra.methods - {"HEAD", "OPTIONS"}
+    }
+
+
+def _rotas_asgi():
+    return {(metodo, rota.path) for rota in asgi.app.routes for metodo in rota.methods - {"HEAD"}}
+
+
+class TestParidade:
+    def test_mesmas_rotas(self):
+        assert _rotas_flask() == _rotas_asgi()
+    
+    def test_docs_nas_duas(self):
+        flask = app.app.test_client().get("/docs").get_json()
+        starlette = TestClient(asgi.app).get("/docs").json()
+        assert flask.pop("base_url") == "http://localhost"
+        assert starlette.pop("base_url") == "http://testserver"
+        assert flask == starlette
+    
+    def test_docs_cobre_a_api(self):
+        documentadas = {
+            tuple(endpoint.split(" ", 1))
+            for endpoint in app.documentacao("http://x/")["endpoints"]
+        }
+        # A documentação usa <id> para todos os parâmetros
+        rotas = {(m, re.sub(r"{\w+}", "<id>", r)) for m, r in _rotas_asgi() if r != "/"}
+        assert documentadas == rotas
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def post(request):
+    """POST /api/gerar em uma das APIs; retorna o status."""
+    if request.param == "flask":
+        return lambda dados: app.app.test_client().post("/api/gerar", json=dados).status_code
+    return lambda dados: TestClient(asgi.app).post("/api/gerar", json=dados).status_code
+
+
+class TestValidacao:
+    @pytest.mark.parametrize("perfil", [["rapido"], {"nome": "rapido"}, 1])
+    def test_perfil_que_nao_e_texto(self, post, perfil):
+        assert post({"tema": "x", "perfil": perfil}) == 400
+    
+    @pytest.mark.parametrize("prioridade", [["interativo"], {"classe": "lote"}])
+    def test_prioridade_que_nao_e_texto(self, post, prioridade):
+        assert post({"tema": "x", "prioridade": prioridade}) == 400
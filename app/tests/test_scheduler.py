@@ -0,0 +1,158 @@
+"""Agendador da LLM: partilha entre classes, reserva, round-robin e admissão."""
+import asyncio
+import threading
+import pytest
+import service as service_mod
+from eviction import criar_politica
+from scheduler import LLMScheduler, FilaCheia, EsperaEsgotada
+
+
+class Registro:
+    """Pedidos enfileirados direto no agendador, anotando a ordem de entrada."""
+    
+    def __init__(self, agendador: LLMScheduler):
+        self.agendador = agendador
+        self.ordem = []
+    
+    def pedir(self, prioridade: str, cliente: str = "", custo: int = 1, nome: str = None):
+        nome = nome or f"{prioridade}:{cliente}"
+        return self.agendador._enfileirar(prioridade, cliente, custo, lambda: self.ordem.append(nome))
+    
+    def terminar(self, n: int = 1):
+        for _ in range(n):
+            self.agendador._liberar()
+
+
+class TestReserva:
+    def test_lote_nao_ocupa_a_reserva(self):
+        registro = Registro(LLMScheduler(concorrencia=4, reserva=2))
+        for i in range(5):
+            registro.pedir("lote", nome=f"lote{i}")
+        assert registro.ordem == ["lote0", "lote1"]
+        
+        registro.pedir("interativo", nome="interativo")
+        assert registro.ordem[-1] == "interativo"
+        assert registro.agendador.stats()["ativos"] == 3
+    
+    def test_um_slot_sempre_fica_para_lote(self):
+        registro = Registro(LLMScheduler(concorrencia=2, reserva=5))
+        registro.pedir("fundo", nome="fundo")
+        assert registro.ordem == ["fundo"]
+    
+    def test_pesos_entre_classes(self):
+        registro = Registro(LLMScheduler(concorrencia=1, reserva=0))
+        registro.pedir("lote", nome="primeiro")
+        for i in range(8):
+            registro.pedir("interativo", nome=f"i{i}")
+            registro.pedir("lote", nome=f"l{i}")
+        registro.terminar(16)
+        # Pesos 8:2 e custos iguais: o lote avança 4x mais rápido no relógio
+        # virtual, então entra um lote a cada ~4 interativos, sem ficar parado
+        assert registro.ordem == [
+            "primeiro", "i0", "i1", "i2", "i3", "i4", "l0", "i5", "i6", "i7",
+            "l1", "l2", "l3", "l4", "l5", "l6", "l7",
+        ]
+
+
+class TestRoundRobin:
+    def test_clientes_alternam_na_classe(self):
+        registro = Registro(LLMScheduler(concorrencia=1, reserva=0))
+        registro.pedir("interativo", "ocupa")
+        for _ in range(3):
+            registro.pedir("interativo", "a")
+        registro.pedir("interativo", "b")
+        registro.pedir("interativo", "c")
+        registro.terminar(5)
+        assert registro.ordem[1:] == [
+            "interativo:a", "interativo:b", "interativo:c", "interativo:a", "interativo:a",
+        ]
+
+
+class TestAdmissao:
+    def test_recusa_acima_do_custo(self):
+        registro = Registro(LLMScheduler(concorrencia=1, reserva=0, custo_max=100))
+        registro.pedir("lote", custo=10)
+        registro.pedir("lote", custo=60)
+        with pytest.raises(FilaCheia) as erro:
+            registro.pedir("lote", custo=50)
+        assert erro.value.retry_after >= 1
+        # Outras classes têm fila própria
+        registro.pedir("fundo", custo=50)
+    
+    def test_fila_vazia_sempre_admite(self):
+        registro = Registro(LLMScheduler(concorrencia=1, reserva=0, custo_max=100))
+        registro.pedir("lote", custo=10)
+        registro.pedir("lote", custo=500)
+        assert registro.agendador.stats()["filas"]["lote"] == {"pedidos": 1, "custo": 500}
+    
+    def test_prioridade_invalida(self):
+        agendador = LLMScheduler(concorrencia=1)
+        with pytest.raises(ValueError):
+            agendador.validar("urgente")
+        # Do JSON pode vir lista ou objeto: ValueError, não TypeError
+        for prioridade in (["interativo"], {"classe": "lote"}):
+            with pytest.raises(ValueError):
+                agendador.validar(prioridade)
+        with pytest.raises(ValueError):
+            with agendador.slot("urgente"):
+                pass
+
+
+class TestEspera:
+    def test_slot_desiste_apos_espera_max(self):
+        agendador = LLMScheduler(concorrencia=1, reserva=0, espera_max=0.05)
+        with agendador.slot("lote"):
+            with pytest.raises(EsperaEsgotada):
+                with agendador.slot("lote"):
+                    pass
+            assert agendador.stats()["filas"]["lote"]["pedidos"] == 0
+        assert agendador.stats()["ativos"] == 0
+    
+    def test_slot_async_desiste_apos_espera_max(self):
+        agendador = LLMScheduler(concorrencia=1, reserva=0, espera_max=0.05)
+        
+        async def rodar():
+            async with agendador.slot_async("lote"):
+                with pytest.raises(EsperaEsgotada):
+                    async with agendador.slot_async("lote"):
+                        pass
+        
+        asyncio.run(rodar())
+        assert agendador.stats() == {
+            "concorrencia": 1, "ativos": 0,
+            "filas": {nome: {"pedidos": 0, "custo": 0} for nome in ("interativo", "lote", "fundo")},
+        }
+    
+    def test_slot_liberado_a_tempo(self):
+        agendador = LLMScheduler(concorrencia=1, reserva=0, espera_max=5)
+        entrou = threading.Event()
+        
+        def segundo():
+            with agendador.slot("lote"):
+                entrou.set()
+        
+        with agendador.slot("lote"):
+            thread = threading.Thread(target=segundo)
+            thread.start()
+            assert not entrou.wait(0.05)
+        thread.join(1)
+        assert entrou.is_set()
+
+
+class TestServico:
+    def test_fila_cheia_nao_despeja(self, service, monkeypatch):
+        monkeypatch.setattr(service_mod.Config, "MAX_MAPS", 1)
+        service.politica = criar_politica("lru")
+        existente, _ = service.gerar_mapa("Existente", "rapido")
+        
+        def recusa(*args, **kwargs):
+            raise FilaCheia("interativo", 3)
+        monkeypatch.setattr(service_mod, "gerar_html", recusa)
+        with pytest.raises(FilaCheia):
+            service.gerar_mapa("Novo", "rapido")
+        assert service.obter_mapa(existente)
+    
+    def test_prioridade_invalida_antes_de_gerar(self, service, monkeypatch):
+        monkeypatch.setattr(service_mod, "gerar_html", lambda *a, **k: pytest.fail("chamou a LLM"))
+        with pytest.raises(ValueError, match="Prioridade"):
+            service.gerar_mapa("Python", "rapido", prioridade="urgente")
@@ -0,0 +1,84 @@
+"""Servidor pré-forkado: líder da limpeza e diretório de métricas dos workers."""
+import os
+import sys
+import subprocess
+import pytest
+from config import Config
+from cleaner import CleanupService
+from storage import StorageManager
+from serve import diretorio_metricas, opcoes
+
+
+def _candidato():
+    """Limpeza de um worker que disputa a liderança (sem iniciar a thread)."""
+    limpeza = CleanupService(storage=StorageManager())
+    limpeza._lider = True
+    return limpeza
+
+
+class TestLider:
+    def test_um_lider_por_diretorio(self, data_dir):
+        candidatos = [_candidato() for _ in range(3)]
+        try:
+            assert [c._sou_lider() for c in candidatos] == [True, False, False]
+            assert (data_dir / CleanupService.LEADER_LOCK_FILE).exists()
+            # O líder continua líder nos próximos intervalos
+            assert candidatos[0]._sou_lider()
+        finally:
+            for c in candidatos:
+                c.parar()
+    
+    def test_outro_assume_quando_o_lider_para(self, data_dir):
+        lider, reserva = _candidato(), _candidato()
+        try:
+            assert lider._sou_lider()
+            assert not reserva._sou_lider()
+            lider.parar()
+            assert reserva._sou_lider()
+        finally:
+            reserva.parar()
+    
+    def test_outro_processo_nao_assume(self, data_dir):
+        lider = _candidato()
+        try:
+            assert lider._sou_lider()
+            codigo = (
+                "import sys; from journal import try_file_lock; "
+                "sys.exit(0 if try_file_lock(sys.argv[1]) is None else 1)"
+            )
+            caminho = str(data_dir / CleanupService.LEADER_LOCK_FILE)
+            subprocess.run(
+                [sys.executable, "-c", codigo, caminho],
+                cwd=os.path.dirname(sys.modules["journal"].__file__), check=True
+            )
+        finally:
+            lider.parar()
+    
+    def test_sem_lider_sempre_limpa(self, data_dir):
+        candidatos = [CleanupService(storage=StorageManager()) for _ in range(2)]
+        assert all(c._sou_lider() for c in candidatos)
+
+
+class TestMetricas:
+    def test_diretorio_default(self, data_dir, monkeypatch):
+        monkeypatch.setattr(Config, "METRICS_DIR", "")
+        assert diretorio_metricas() == data_dir / "metrics"
+    
+    def test_diretorio_configurado(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(Config, "METRICS_DIR", str(tmp_path / "m"))
+        assert diretorio_metricas() == tmp_path / "m"
+
+
+class TestOpcoes:
+    @pytest.mark.parametrize("modo, classe", [("wsgi", "gthread"), ("asgi", "uvicorn.workers.UvicornWorker")])
+    def test_workers_pre_forkados(self, modo, classe):
+        opts = opcoes(modo, workers=4, threads=8, bind="0.0.0.0:5000")
+        assert opts["workers"] == 4
+        assert opts["preload_app"] is True
+        assert opts["worker_class"] == classe
+        assert opts.get("threads") == (8 if modo == "wsgi" else None)
+    
+    def test_drenagem_cobre_a_geracao(self):
+        opts = opcoes("wsgi", workers=2, threads=1, bind="x")
+        assert opts["graceful_timeout"] > Config.LLM_TIMEOUT
+        assert opts["timeout"] > opts["graceful_timeout"]
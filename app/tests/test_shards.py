@@ -0,0 +1,94 @@
+"""Layout sharded: chaves, resolução do layout plano legado e migração."""
+import pytest
+from config import Config
+from migrate_shards import migrar
+from storage import StorageManager, shard_key
+
+ID_A = "3f2a9c1e-0000-4000-8000-000000000001"
+ID_B = "b7c1d2e3-0000-4000-8000-000000000002"
+
+
+class TestShardKey:
+    def test_pares_hex_do_inicio_do_id(self):
+        assert shard_key(ID_A, depth=2) == f"3f/2a/{ID_A}.html"
+        assert shard_key(ID_A, depth=3) == f"3f/2a/9c/{ID_A}.html"
+    
+    def test_hifens_ignorados(self):
+        assert shard_key("ab-cd-ef", depth=3) == "ab/cd/ef/ab-cd-ef.html"
+    
+    def test_sem_niveis_e_plano(self):
+        assert shard_key(ID_A, depth=0) == f"{ID_A}.html"
+    
+    def test_default_da_config(self, monkeypatch):
+        monkeypatch.setattr(Config, "SHARD_DEPTH", 1)
+        assert shard_key(ID_A) == f"3f/{ID_A}.html"
+
+
+@pytest.fixture
+def storage(data_dir):
+    return StorageManager()
+
+
+def _legado(storage, map_id, html=b"<html>legado</html>"):
+    """Mapa gravado antes dos shards: ``<uuid>.html`` na raiz de DATA_DIR."""
+    storage.blobs.put(f"{map_id}.html", html)
+    storage.journal.append([{"op": "save", "id": map_id, "info": {
+        "id": map_id,
+        "tema": "Legado",
+        "arquivo": f"{map_id}.html",
+        "chave": f"{map_id}.html",
+        "tamanho": len(html),
+        "criado": "2026-01-01T00:00:00",
+    }}])
+
+
+class TestResolveKey:
+    def test_arquivo_plano_legado(self, storage):
+        _legado(storage, ID_A)
+        assert storage.resolve_key(ID_A) == f"{ID_A}.html"
+    
+    def test_sharded_tem_precedencia(self, storage):
+        _legado(storage, ID_A)
+        storage.blobs.move(f"{ID_A}.html", shard_key(ID_A))
+        assert storage.resolve_key(ID_A) == shard_key(ID_A)
+    
+    def test_sem_arquivo_resolve_para_o_shard(self, storage):
+        assert storage.resolve_key(ID_A) == shard_key(ID_A)
+    
+    def test_conteudo_enderecado(self, storage):
+        info = storage.save_map(ID_A, "Tema", "<html>novo</html>")
+        assert storage.resolve_key(ID_A) == info["chave"]
+
+
+class TestMigracao:
+    def test_move_e_atualiza_a_chave(self, storage, data_dir):
+        _legado(storage, ID_A)
+        _legado(storage, ID_B, html=b"<html>b</html>")
+        assert migrar(storage, lote=1) == {"total": 2, "dry_run": False}
+        
+        for map_id in (ID_A, ID_B):
+            assert not (data_dir / f"{map_id}.html").exists()
+            assert storage.shard_path(map_id).exists()
+            assert storage.get_map(map_id)["chave"] == shard_key(map_id)
+        assert storage.blobs.get(storage.resolve_key(ID_B)) == b"<html>b</html>"
+    
+    def test_segunda_execucao_nao_muda_nada(self, storage):
+        _legado(storage, ID_A)
+        migrar(storage)
+        antes = dict(storage.journal.load())
+        assert migrar(storage) == {"total": 0, "dry_run": False}
+        assert storage.journal.load() == antes
+        assert storage.shard_path(ID_A).exists()
+    
+    def test_dry_run(self, storage, data_dir):
+        _legado(storage, ID_A)
+        assert migrar(storage, dry_run=True) == {"total": 1, "dry_run": True}
+        assert (data_dir / f"{ID_A}.html").exists()
+        assert storage.get_map(ID_A)["chave"] == f"{ID_A}.html"
+    
+    def test_arquivo_sem_metadados(self, storage):
+        # Arquivo solto: é movido, mas nenhum metadado é criado
+        storage.blobs.put(f"{ID_A}.html", b"<html>")
+        migrar(storage)
+        assert storage.shard_path(ID_A).exists()
+        assert storage.get_map(ID_A) is None
@@ -0,0 +1,158 @@
+"""Blobs endereçados pelo conteúdo: compartilhamento, referências, lock e órfãos."""
+import pytest
+from cleaner import CleanupService
+from storage import StorageManager, STAGING_PREFIX, blob_keys
+
+HTML = "<html>mapa</html>"
+
+
+def _salvar(storage, map_id, html=HTML, arvore=b"arvore", svg="<svg/>"):
+    return storage.save_map(map_id, "Tema", html, arvore=arvore, svg=svg, miniatura="<svg>mini</svg>")
+
+
+@pytest.fixture
+def storage(data_dir):
+    return StorageManager()
+
+
+def _existem(storage, map_info):
+    return [storage.blobs.exists(chave) for chave in blob_keys(map_info)]
+
+
+class TestCompartilhamento:
+    def test_mapas_identicos_compartilham_blobs(self, storage):
+        a = _salvar(storage, "a")
+        b = _salvar(storage, "b")
+        assert blob_keys(a) == blob_keys(b)
+        assert all(_existem(storage, a))
+    
+    def test_html_em_pedacos_cai_na_mesma_chave(self, storage, data_dir):
+        a = _salvar(storage, "a")
+        b = _salvar(storage, "b", html=iter(["<html>", "mapa", "</html>"]))
+        assert b["chave"] == a["chave"]
+        assert storage.blobs.get(b["chave"]) == HTML.encode()
+        assert list((data_dir / STAGING_PREFIX).iterdir()) == []
+    
+    def test_link_map(self, storage):
+        a = _salvar(storage, "a")
+        b = storage.link_map("b", "Tema", a, campos={"cache_de": "a"})
+        assert blob_keys(b) == blob_keys(a)
+        assert storage.get_tree("b") == b"arvore"
+    
+    def test_link_map_sem_blob(self, storage):
+        a = _salvar(storage, "a")
+        storage.blobs.delete(a["chave_svg"])
+        with pytest.raises(KeyError):
+            storage.link_map("b", "Tema", a)
+        assert storage.get_map("b") is None
+    
+    def test_stats_logicos_e_fisicos(self, storage):
+        a = _salvar(storage, "a")
+        _salvar(storage, "b")
+        _salvar(storage, "c", svg="<svg>outro</svg>")
+        stats = storage.get_stats()
+        por_mapa = a["tamanho"] + a["tamanho_arvore"] + a["tamanho_svg"] + a["tamanho_miniatura"]
+        assert stats["bytes_logicos"] == 3 * por_mapa - a["tamanho_svg"] + len("<svg>outro</svg>")
+        assert stats["bytes_fisicos"] == por_mapa + len("<svg>outro</svg>")
+        assert stats["blobs"] == 5
+
+
+class TestReferencias:
+    def test_remover_uma_referencia_mantem_o_blob(self, storage):
+        a = _salvar(storage, "a")
+        storage.link_map("b", "Tema", a)
+        assert storage.delete_map("a")
+        assert all(_existem(storage, a))
+    
+    def test_remover_a_ultima_referencia_apaga_o_blob(self, storage):
+        a = _salvar(storage, "a")
+        storage.link_map("b", "Tema", a)
+        storage.delete_maps(["a", "b"])
+        assert not any(_existem(storage, a))
+    
+    def test_so_os_blobs_sem_referencia_saem(self, storage):
+        a = _salvar(storage, "a")
+        c = _salvar(storage, "c", svg="<svg>outro</svg>")
+        storage.delete_map("c")
+        assert not storage.blobs.exists(c["chave_svg"])
+        assert all(_existem(storage, a))
+    
+    def test_dois_processos_no_mesmo_diretorio(self, data_dir):
+        primeiro = StorageManager()
+        segundo = StorageManager()
+        a = _salvar(primeiro, "a")
+        # O segundo referencia o blob; o primeiro precisa ver isso ao remover
+        segundo.link_map("b", "Tema", segundo.get_map("a"))
+        primeiro.delete_map("a")
+        assert all(_existem(primeiro, a))
+        segundo.delete_map("b")
+        assert not any(_existem(primeiro, a))
+
+
+class _Espiao:
+    """Anota as gravações no blob store feitas sob o lock do journal."""
+    
+    def __init__(self, storage, monkeypatch):
+        self.sob_lock = False
+        self.gravacoes = []
+        for nome in ("put", "put_stream", "move"):
+            monkeypatch.setattr(storage.blobs, nome, self._anotar(nome, getattr(storage.blobs, nome)))
+        append = storage.journal.append
+        
+        def append_espiado(ops, before=None, after=None):
+            def antes(metadata):
+                self.sob_lock = True
+                try:
+                    if before is not None:
+                        before(metadata)
+                finally:
+                    self.sob_lock = False
+            return append(ops, before=antes, after=after)
+        monkeypatch.setattr(storage.journal, "append", append_espiado)
+    
+    def _anotar(self, nome, metodo):
+        def anotado(*args, **kwargs):
+            self.gravacoes.append((nome, self.sob_lock))
+            return metodo(*args, **kwargs)
+        return anotado
+
+
+class TestLock:
+    def test_blobs_gravados_fora_do_lock(self, storage, monkeypatch):
+        espiao = _Espiao(storage, monkeypatch)
+        _salvar(storage, "a", html=iter(["<html>", "</html>"]))
+        assert espiao.gravacoes
+        assert not any(sob_lock for _, sob_lock in espiao.gravacoes)
+    
+    def test_blob_removido_antes_do_lock_e_restaurado(self, storage, monkeypatch):
+        a = _salvar(storage, "a")
+        gravar_cas = storage._gravar_cas
+        
+        def remover_no_intervalo(blobs):
+            gravados = gravar_cas(blobs)
+            # Outro processo remove "a", a última referência, antes do append
+            storage.delete_map("a")
+            return gravados
+        monkeypatch.setattr(storage, "_gravar_cas", remover_no_intervalo)
+        
+        b = _salvar(storage, "b", html=iter([HTML]))
+        assert blob_keys(b) == blob_keys(a)
+        assert all(_existem(storage, b))
+        assert storage.blobs.get(b["chave"]) == HTML.encode()
+
+
+class TestOrfaos:
+    def test_artefatos_do_orfao_saem(self, storage):
+        a = _salvar(storage, "a", svg="<svg>a</svg>")
+        storage.blobs.delete(a["chave"])
+        resultado = CleanupService(storage=storage).limpar_orfaos(limite=10)
+        assert resultado["ids_deletados"] == ["a"]
+        assert not any(_existem(storage, a))
+    
+    def test_artefatos_compartilhados_ficam(self, storage):
+        a = _salvar(storage, "a", html="<html>a</html>")
+        b = _salvar(storage, "b", html="<html>b</html>")
+        storage.blobs.delete(a["chave"])
+        CleanupService(storage=storage).limpar_orfaos(limite=10)
+        assert storage.get_map("a") is None
+        assert all(_existem(storage, b))
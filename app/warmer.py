@@ -0,0 +1,276 @@
+"""Aquecedor: pré-gera mapas de temas em alta com a LLM ociosa.
+
+Cada pedido de geração é contado por hora em ``RegistroConsultas``
+(SQLite em DATA_DIR, compartilhado pelos workers). A cada
+``AQUECEDOR_INTERVALO_S`` o ``Aquecedor`` pega os temas mais pedidos e
+em alta nas últimas ``AQUECEDOR_JANELA_H`` horas e gera (prioridade
+``fundo``) os que não têm mapa no cache de geração ou cujo mapa passou
+de ``AQUECEDOR_RENOVAR`` do ``CACHE_TTL_S``. Assim um pedido no pico
+vira cópia do cache (ver cache.py) em vez de uma chamada à LLM.
+
+O ciclo para quando a LLM passa de ``AQUECEDOR_UTILIZACAO_MAX`` (slots
+em uso e pedidos na fila sobre o limite de concorrência), quando os
+tokens do dia chegam a ``AQUECEDOR_TOKENS_DIA`` ou quando não há espaço
+livre: o aquecedor nunca despeja mapas (ver ``MapaService.aquecer``). O orçamento é
+conferido antes de cada geração, então o dia pode passar dele em até
+uma geração.
+"""
+import time
+import logging
+import threading
+from typing import Dict, List, NamedTuple
+from cache import chave_cache
+from config import Config
+from journal import try_file_lock
+from metrics import WARMER_GENERATIONS, WARMER_TOKENS
+from sqlitedb import BancoLocal
+
+logger = logging.getLogger(__name__)
+
+HORA = 3600
+DIA = 86400
+
+# Horas mais recentes comparadas com o resto da janela para medir a alta
+RECENTES_H = 3
+
+# Peso dos pedidos acima do esperado (alta) em relação ao total na janela
+PESO_ALTA = 2.0
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS consultas (
+    chave TEXT, hora INTEGER, pedidos INTEGER, tema TEXT, perfil TEXT,
+    PRIMARY KEY (chave, hora)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS orcamento (dia INTEGER PRIMARY KEY, tokens INTEGER);
+"""
+
+
+class Tendencia(NamedTuple):
+    """Tema candidato a aquecimento."""
+    tema: str
+    perfil: str
+    chave: str
+    pedidos: int
+    alta: float
+    pontos: float
+
+
+class RegistroConsultas:
+    """Pedidos por tema e hora, e tokens gastos pelo aquecedor por dia."""
+    
+    def __init__(self, caminho):
+        self.banco = BancoLocal(caminho, ESQUEMA)
+    
+    def registrar(self, tema: str, perfil: str, agora: float = None) -> None:
+        """Conta um pedido de geração."""
+        agora = time.time() if agora is None else agora
+        self.banco.conexao().execute(
+            "INSERT INTO consultas VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (chave, hora) DO UPDATE SET pedidos = pedidos + 1, tema = excluded.tema",
+            (chave_cache(tema, perfil), int(agora // HORA), tema, perfil)
+        )
+    
+    def tendencias(
+        self, agora: float = None, janela_h: int = None, minimo: int = None, limite: int = None
+    ) -> List[Tendencia]:
+        """Temas mais pedidos e em alta, dos mais para os menos pontuados.
+        
+        Pontos = pedidos na janela + PESO_ALTA * pedidos das últimas
+        RECENTES_H horas acima do esperado pelo ritmo do resto da janela.
+        Remove as horas que saíram da janela.
+        
+        Args:
+            agora: Instante atual (epoch, segundos)
+            janela_h: Horas analisadas (default: Config.AQUECEDOR_JANELA_H)
+            minimo: Pedidos mínimos na janela (default: Config.AQUECEDOR_MIN_PEDIDOS)
+            limite: Número máximo de temas (default: Config.AQUECEDOR_TOPICOS)
+        """
+        agora = time.time() if agora is None else agora
+        janela_h = janela_h or Config.AQUECEDOR_JANELA_H
+        minimo = Config.AQUECEDOR_MIN_PEDIDOS if minimo is None else minimo
+        limite = limite or Config.AQUECEDOR_TOPICOS
+        hora = int(agora // HORA)
+        inicio = hora - janela_h + 1
+        recentes_h = min(RECENTES_H, janela_h - 1)
+        
+        conn = self.banco.conexao()
+        conn.execute("DELETE FROM consultas WHERE hora < ?", (inicio,))
+        linhas = conn.execute(
+            "SELECT chave, hora, pedidos, tema, perfil FROM consultas WHERE hora >= ? ORDER BY hora",
+            (inicio,)
+        ).fetchall()
+        
+        # chave -> [total, recentes, tema, perfil]; o tema mais recente fica
+        temas: Dict[str, list] = {}
+        for chave, hora_linha, pedidos, tema, perfil in linhas:
+            soma = temas.setdefault(chave, [0, 0, tema, perfil])
+            soma[0] += pedidos
+            if hora_linha > hora - recentes_h:
+                soma[1] += pedidos
+            soma[2] = tema
+        
+        resultado = []
+        for chave, (total, recentes, tema, perfil) in temas.items():
+            if total < minimo:
+                continue
+            esperado = (total - recentes) * recentes_h / (janela_h - recentes_h) if recentes_h else recentes
+            alta = max(0.0, recentes - esperado)
+            resultado.append(Tendencia(tema, perfil, chave, total, alta, total + PESO_ALTA * alta))
+        resultado.sort(key=lambda t: t.pontos, reverse=True)
+        return resultado[:limite]
+    
+    def gasto_hoje(self, agora: float = None) -> int:
+        """Tokens gastos pelo aquecedor no dia (UTC)."""
+        agora = time.time() if agora is None else agora
+        linha = self.banco.conexao().execute(
+            "SELECT tokens FROM orcamento WHERE dia = ?", (int(agora // DIA),)
+        ).fetchone()
+        return linha[0] if linha else 0
+    
+    def gastar(self, tokens: int, agora: float = None) -> None:
+        agora = time.time() if agora is None else agora
+        dia = int(agora // DIA)
+        with self.banco.transacao() as conn:
+            conn.execute("DELETE FROM orcamento WHERE dia < ?", (dia,))
+            conn.execute(
+                "INSERT INTO orcamento VALUES (?, ?) "
+                "ON CONFLICT (dia) DO UPDATE SET tokens = tokens + excluded.tokens",
+                (dia, tokens)
+            )
+
+
+class Aquecedor:
+    """Gera em background os mapas dos temas em alta."""
+    
+    LEADER_LOCK_FILE = "warmer.leader"
+    
+    def __init__(self, service):
+        """
+        Args:
+            service: MapaService (usa consultas, storage, agendador,
+                tem_espaco e aquecer)
+        """
+        self.service = service
+        self.running = False
+        self.thread = None
+        self.geracoes = 0
+        self.erros = 0
+        self._lider = False
+        self._leader_lock = None
+    
+    @property
+    def consultas(self) -> RegistroConsultas:
+        return self.service.consultas
+    
+    def iniciar(self, lider: bool = False):
+        """Inicia o aquecedor em background.
+        
+        Args:
+            lider: Se True, só aquece o processo que detiver o lock de líder
+                (um por diretório de dados), como na limpeza
+        """
+        if self.running:
+            logger.warning("Aquecedor já está em execução")
+            return
+        if self.consultas is None or not Config.CACHE_TTL_S:
+            if Config.AQUECEDOR:
+                logger.warning("AQUECEDOR requer CACHE_TTL_S > 0; aquecedor desativado")
+            return
+        
+        self.running = True
+        self._lider = lider
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Aquecedor iniciado (intervalo: {Config.AQUECEDOR_INTERVALO_S}s)")
+    
+    def parar(self):
+        """Para o aquecedor (uma geração em andamento termina antes)."""
+        if not self.running:
+            return
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
+        logger.info("Aquecedor parado")
+    
+    def _sou_lider(self) -> bool:
+        if not self._lider or self._leader_lock is not None:
+            return True
+        self._leader_lock = try_file_lock(self.service.storage.data_dir / self.LEADER_LOCK_FILE)
+        if self._leader_lock is not None:
+            logger.info("Este processo assumiu o aquecedor")
+        return self._leader_lock is not None
+    
+    def _loop(self):
+        while self.running:
+            try:
+                if self._sou_lider():
+                    self.ciclo()
+            except Exception as e:
+                logger.error(f"Erro no aquecedor: {str(e)}")
+            
+            for _ in range(Config.AQUECEDOR_INTERVALO_S):
+                if not self.running:
+                    break
+                threading.Event().wait(1)
+    
+    def utilizacao(self) -> float:
+        """Slots da LLM em uso e pedidos na fila, sobre o limite de concorrência."""
+        stats = self.service.agendador.stats()
+        na_fila = sum(fila["pedidos"] for fila in stats["filas"].values())
+        return (stats["ativos"] + na_fila) / stats["concorrencia"]
+    
+    def ciclo(self, agora: float = None) -> dict:
+        """Aquece os temas em alta sem mapa recente, enquanto houver folga e orçamento.
+        
+        Returns:
+            Dict com os mapas gerados e o motivo da parada ("fim",
+            "ocupado", "orcamento" ou "sem_espaco")
+        """
+        agora = time.time() if agora is None else agora
+        recente = agora - Config.CACHE_TTL_S * Config.AQUECEDOR_RENOVAR
+        gerados = []
+        parada = "fim"
+        
+        for tendencia in self.consultas.tendencias(agora):
+            if self.service.storage.find_cached(tendencia.chave, recente) is not None:
+                continue
+            if self.consultas.gasto_hoje(agora) >= Config.AQUECEDOR_TOKENS_DIA:
+                parada = "orcamento"
+                break
+            if self.utilizacao() >= Config.AQUECEDOR_UTILIZACAO_MAX:
+                parada = "ocupado"
+                break
+            if not self.service.tem_espaco():
+                parada = "sem_espaco"
+                break
+            
+            try:
+                map_id, tokens = self.service.aquecer(tendencia.tema, tendencia.perfil)
+            except Exception as e:
+                self.erros += 1
+                WARMER_GENERATIONS.inc("error")
+                logger.warning(f"Aquecedor falhou em '{tendencia.tema}': {str(e)}")
+                continue
+            
+            self.consultas.gastar(tokens, agora)
+            self.geracoes += 1
+            WARMER_GENERATIONS.inc("ok")
+            WARMER_TOKENS.inc(amount=tokens)
+            gerados.append(map_id)
+        
+        if gerados:
+            logger.info(f"Aquecedor gerou {len(gerados)} mapas (parada: {parada})")
+        return {"gerados": gerados, "parada": parada}
+    
+    def obter_status(self) -> dict:
+        """Status do aquecedor e tokens gastos hoje."""
+        return {
+            "ativo": self.running,
+            "geracoes": self.geracoes,
+            "erros": self.erros,
+            "tokens_hoje": self.consultas.gasto_hoje() if self.consultas else 0,
+            "orcamento_tokens_dia": Config.AQUECEDOR_TOKENS_DIA,
+        }
@@ -0,0 +1 @@
+"""Suíte de benchmarks do synapsis e da API (ver README.md)."""
@@ -0,0 +1,31 @@
+"""Executa a suíte de benchmarks.
+
+Uso:
+    python -m benchmarks [--filtro storage] [--rapido] [--saida resultados.json]
+    python -m benchmarks.compare base.json novo.json
+"""
+import json
+import argparse
+
+from . import bench_pipeline, bench_storage, bench_api, bench_template, bench_tree, bench_ratelimit, bench_render, bench_import  # noqa: F401 (registram benchmarks)
+from .harness import executar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do synapsis e da API")
+    parser.add_argument("--filtro", default="", help="Só benchmarks cujo nome contém o texto")
+    parser.add_argument("--rapido", action="store_true", help="Só o primeiro tamanho de cada benchmark")
+    parser.add_argument("--min-tempo", type=float, default=0.2, help="Segundos medidos por caso")
+    parser.add_argument("--saida", help="Grava resultados em JSON")
+    args = parser.parse_args()
+    
+    resultado = executar(args.filtro, rapido=args.rapido, min_tempo=args.min_tempo)
+    
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark ponta a ponta de ``POST /api/gerar`` com clientes concorrentes.
+
+Sobe a aplicação Flask em um servidor WSGI com threads (porta livre)
+e troca a LLM pela MockLLM, com latência e tamanho de saída fixos.
+"""
+import threading
+
+from .harness import benchmark, diretorio_temporario
+from .mock_llm import MockLLM
+
+CONCORRENCIA = (1, 8, 32)
+LATENCIA_MS = 50
+NODES = 200
+REQUISICOES = 200
+
+_servidor = {}
+
+
+def _url() -> str:
+    """Sobe o servidor uma vez por execução e retorna sua URL."""
+    if "url" in _servidor:
+        return _servidor["url"]
+    
+    from config import Config
+    Config.DATA_DIR = diretorio_temporario()
+    Config.MAX_MAPS = 10 ** 6
+    # Todas as requisições vêm do mesmo IP
+    Config.RATE_LIMIT_POR_MINUTO = 0
+    Config.COTA_DIARIA = 0
+    
+    import llm
+    import app as flask_app
+    from werkzeug.serving import make_server
+    
+    mock = MockLLM(latencia_ms=LATENCIA_MS, nodes=NODES)
+    llm.obter_llm = lambda perfil=None: mock
+    
+    servidor = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    _servidor["url"] = f"http://127.0.0.1:{servidor.server_port}"
+    return _servidor["url"]
+
+
+@benchmark("api.gerar", CONCORRENCIA)
+def bench_gerar(concorrencia):
+    from loadtest import executar
+    
+    resultado = executar(_url(), "gerar", concorrencia, REQUISICOES)
+    return {
+        "requisicoes": resultado["requisicoes"],
+        "erros": resultado["erros"],
+        "req_s": resultado["req_s"],
+        "p50_ms": resultado["p50_ms"],
+        "p99_ms": resultado["p99_ms"],
+        "llm_latencia_ms": LATENCIA_MS,
+        "llm_nodes": NODES,
+    }
@@ -0,0 +1,55 @@
+"""Tempo de importação do synapsis (``python -X importtime``).
+
+Cada medida roda em processo novo e soma o tempo próprio dos módulos
+que o código importa além do interpretador vazio. Referência local:
+~1 ms para ``import synapsis`` e ~15 ms até o ``SynapsisBuilder``
+(78 ms antes do carregamento sob demanda).
+
+Os testes (``tests/test_import.py``) só verificam que as dependências
+pesadas não são importadas; o tempo fica aqui, fora do CI.
+"""
+import sys
+import statistics
+import subprocess
+
+from .harness import benchmark
+
+CASOS = {
+    "synapsis": "import synapsis",
+    "builder": "from synapsis import SynapsisBuilder",
+}
+REPETICOES = 5
+
+
+def _importtime(code: str) -> dict:
+    """Executa ``code`` em processo novo e retorna {módulo: s próprios}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True
+    )
+    modulos = {}
+    for linha in result.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        proprio, _, nome = linha[len("import time:"):].split("|")
+        if proprio.strip().isdigit():
+            modulos[nome.strip()] = int(proprio) / 1e6
+    return modulos
+
+
+def _custo(code: str) -> float:
+    base = _importtime("pass")
+    return sum(s for nome, s in _importtime(code).items() if nome not in base)
+
+
+@benchmark("import.tempo", list(CASOS), rapido=["synapsis"])
+def bench_import(caso):
+    tempos = sorted(_custo(CASOS[caso]) for _ in range(REPETICOES))
+    return {
+        "repeticoes": REPETICOES,
+        "min": tempos[0],
+        "mediana": statistics.median(tempos),
+        "media": statistics.fmean(tempos),
+        "p95": tempos[-1],
+        "ops_s": len(tempos) / sum(tempos),
+    }
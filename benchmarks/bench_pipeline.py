@@ -0,0 +1,46 @@
+"""Benchmarks dos estágios do pipeline synapsis por tamanho de mapa."""
+from synapsis import sanitize, validate_schema, render_html
+from synapsis.renderer import render_html_string
+from synapsis.synthetic import generate_yaml
+
+from .harness import benchmark, diretorio_temporario
+from .mock_llm import gerar_yaml
+
+TAMANHOS = (10, 100, 1000, 5000)
+
+
+@benchmark("pipeline.sanitize", TAMANHOS)
+def bench_sanitize(nodes):
+    raw = gerar_yaml(nodes)
+    return lambda: sanitize(raw)
+
+
+@benchmark("pipeline.validate_schema", TAMANHOS)
+def bench_validate_schema(nodes):
+    cleaned = sanitize(gerar_yaml(nodes))
+    return lambda: validate_schema(cleaned)
+
+
+@benchmark("pipeline.render_html_string", TAMANHOS)
+def bench_render_html_string(nodes):
+    cleaned = sanitize(gerar_yaml(nodes))
+    return lambda: render_html_string(cleaned)
+
+
+@benchmark("pipeline.render_html", TAMANHOS)
+def bench_render_html(nodes):
+    cleaned = sanitize(gerar_yaml(nodes))
+    output = diretorio_temporario() / "mapa.html"
+    return lambda: render_html(cleaned, str(output))
+
+
+@benchmark("pipeline.mapa_realista", (4, 5, 6))
+def bench_mapa_realista(depth):
+    # Profundidade e fanout (5-8) pedidos pelo prompt do Expander: ~12 mil nós com depth=6
+    raw = generate_yaml(depth=depth, fanout=(5, 8), unicode_ratio=0.3, fences=True)
+    
+    def pipeline():
+        cleaned = sanitize(raw)
+        validate_schema(cleaned)
+        return render_html_string(cleaned)
+    return pipeline
@@ -0,0 +1,23 @@
+"""Custo por requisição do limite de taxa (``ratelimit.py``).
+
+Cada decisão é de um cliente entre ``CLIENTES``, com limites altos para
+que todas sejam permitidas e o estado seja gravado.
+"""
+import itertools
+
+from .harness import benchmark, diretorio_temporario
+
+CLIENTES = 1000
+
+
+@benchmark("ratelimit.tentar", ("memory", "sqlite"), rapido=("memory",))
+def bench_tentar(backend):
+    from ratelimit import MemoryRateLimiter, SQLiteRateLimiter, Regras
+    
+    regras = Regras(por_minuto=1e9, rajada=10**9, cota_diaria=0)
+    if backend == "memory":
+        limitador = MemoryRateLimiter(regras)
+    else:
+        limitador = SQLiteRateLimiter(diretorio_temporario() / "ratelimit.db", regras)
+    clientes = itertools.cycle([f"ip:10.0.{i // 256}.{i % 256}" for i in range(CLIENTES)])
+    return lambda: limitador.tentar(next(clientes))
@@ -0,0 +1,72 @@
+"""Pico de memória do render HTML: string inteira contra streaming.
+
+Cada caso roda em um processo novo: gera a árvore sintética, zera o
+pico de RSS do processo (``/proc/self/clear_refs``) e grava o HTML
+com ``render_tree_string`` + ``write_text`` (como o ``render_html``
+antigo) ou com ``write_tree_html``. O resultado é o pico de RSS acima
+do processo com a árvore carregada. Só Linux; nos demais os casos são
+pulados.
+"""
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+from .harness import benchmark, diretorio_temporario
+
+TAMANHOS = (50000, 200000)
+
+_MEDIR = """
+import gc, json, sys
+from pathlib import Path
+from synapsis.renderer import render_tree_string, write_tree_html
+from synapsis.synthetic import generate_tree
+
+def rss_kb(campo):
+    with open("/proc/self/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith(campo + ":"))
+
+nodes, modo, packed, saida = int(sys.argv[1]), sys.argv[2], sys.argv[3] == "1", sys.argv[4]
+arvore = generate_tree(depth=10, fanout=(5, 8), max_nodes=nodes, unicode_ratio=0.3, seed=1)
+gc.collect()
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+base = rss_kb("VmRSS")
+if modo == "string":
+    Path(saida).write_text(render_tree_string(arvore, packed=packed), encoding="utf-8")
+else:
+    write_tree_html(arvore, saida, packed=packed)
+print(json.dumps({"base": base, "pico": rss_kb("VmHWM")}))
+"""
+
+
+def _pico_mb(nodes: int, modo: str, packed: bool, saida: Path) -> float:
+    resultado = subprocess.run(
+        [sys.executable, "-c", _MEDIR, str(nodes), modo, "1" if packed else "0", str(saida)],
+        capture_output=True, text=True, check=True
+    )
+    kb = json.loads(resultado.stdout)
+    return round((kb["pico"] - kb["base"]) / 1024, 1)
+
+
+def _comparar(nodes: int, packed: bool):
+    if not Path("/proc/self/clear_refs").exists():
+        return None
+    saida = diretorio_temporario() / "mapa.html"
+    string = _pico_mb(nodes, "string", packed, saida)
+    stream = _pico_mb(nodes, "stream", packed, saida)
+    return {
+        "html_mb": round(saida.stat().st_size / (1024 * 1024), 1),
+        "pico_string_mb": string,
+        "pico_stream_mb": stream,
+    }
+
+
+@benchmark("render.pico_rss", TAMANHOS)
+def bench_pico_rss(nodes):
+    return _comparar(nodes, packed=False)
+
+
+@benchmark("render.pico_rss_packed", TAMANHOS)
+def bench_pico_rss_packed(nodes):
+    return _comparar(nodes, packed=True)
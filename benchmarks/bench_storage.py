@@ -0,0 +1,103 @@
+"""Benchmarks do StorageManager com N mapas já armazenados."""
+import uuid
+import itertools
+from datetime import datetime, timedelta
+
+from .harness import benchmark, diretorio_temporario
+
+TAMANHOS = (100, 1000, 10000)
+HTML = "<html>" + "x" * 8000 + "</html>"
+
+
+def _storage(n: int):
+    """StorageManager em diretório novo com ``n`` mapas nos metadados."""
+    from config import Config
+    from storage import StorageManager
+    from blobstore import LocalBlobStore
+    
+    Config.DATA_DIR = diretorio_temporario()
+    storage = StorageManager(blobs=LocalBlobStore(Config.DATA_DIR))
+    
+    inicio = datetime.now() - timedelta(days=60)
+    ops = []
+    for i in range(n):
+        map_id = str(uuid.UUID(int=i))
+        criado = inicio + timedelta(minutes=i)
+        ops.append({"op": "save", "id": map_id, "info": {
+            "id": map_id, "tema": f"tema {i}", "arquivo": f"{map_id}.html",
+            "tamanho": len(HTML), "criado": criado.isoformat(),
+            "criado_ts": criado.timestamp(),
+        }})
+    storage.journal.append(ops)
+    storage.journal.compact()
+    return storage
+
+
+@benchmark("storage.save_map", TAMANHOS)
+def bench_save_map(n):
+    storage = _storage(n)
+    ids = (str(uuid.uuid4()) for _ in itertools.count())
+    return lambda: storage.save_map(next(ids), "tema", HTML)
+
+
+@benchmark("storage.save_map_unico", TAMANHOS)
+def bench_save_map_unico(n):
+    # HTML diferente a cada mapa: sem deduplicação, todo blob é gravado
+    storage = _storage(n)
+    ids = (str(uuid.uuid4()) for _ in itertools.count())
+    
+    def salvar():
+        map_id = next(ids)
+        storage.save_map(map_id, "tema", HTML + map_id)
+    return salvar
+
+
+@benchmark("storage.get_map", TAMANHOS)
+def bench_get_map(n):
+    storage = _storage(n)
+    map_id = str(uuid.UUID(int=n // 2))
+    return lambda: storage.get_map(map_id)
+
+
+@benchmark("storage.list_maps", TAMANHOS)
+def bench_list_maps(n):
+    storage = _storage(n)
+    return lambda: storage.list_maps(limit=50)
+
+
+@benchmark("storage.get_stats", TAMANHOS)
+def bench_get_stats(n):
+    storage = _storage(n)
+    return storage.get_stats
+
+
+@benchmark("storage.delete_map", TAMANHOS)
+def bench_delete_map(n):
+    storage = _storage(n)
+    
+    def salvar_e_deletar():
+        map_id = str(uuid.uuid4())
+        storage.save_map(map_id, "tema", HTML)
+        storage.delete_map(map_id)
+    return salvar_e_deletar
+
+
+@benchmark("storage.expired_ids", TAMANHOS)
+def bench_expired_ids(n):
+    storage = _storage(n)
+    limite = datetime.now() - timedelta(days=30)
+    
+    def expirar():
+        # Descarta o índice a cada chamada: mede construção + consulta
+        ids = storage.expired_ids(limite)
+        storage._expiry_heap = None
+        return ids
+    return expirar
+
+
+@benchmark("storage.cold_load", TAMANHOS)
+def bench_cold_load(n):
+    from storage import StorageManager
+    
+    storage = _storage(n)
+    return lambda: StorageManager(blobs=storage.blobs)
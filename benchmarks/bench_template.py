@@ -0,0 +1,68 @@
+"""Tempo até interação do HTML gerado, em navegador headless.
+
+Requer playwright com Chromium (``pip install playwright`` e
+``playwright install chromium``); sem ele os casos são pulados.
+
+O template marca ``synapsis-interactive`` quando o primeiro lote de
+nós está no DOM e ``synapsis-complete`` quando termina de construir
+o que está visível (subárvores colapsadas e janelas de irmãos fora da
+tela ficam para depois).
+"""
+import atexit
+import statistics
+
+from synapsis.renderer import render_html_string
+from synapsis.synthetic import generate_yaml
+
+from .harness import benchmark, diretorio_temporario
+
+TAMANHOS = (1000, 10000, 50000)
+REPETICOES = 3
+
+_browser = {}
+
+
+def _pagina():
+    """Abre o Chromium uma vez por execução (None sem playwright)."""
+    if "page" not in _browser:
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            _browser["page"] = None
+            return None
+        playwright = sync_playwright().start()
+        browser = playwright.chromium.launch()
+        atexit.register(playwright.stop)
+        atexit.register(browser.close)
+        _browser["page"] = browser.new_page(viewport={"width": 1440, "height": 900})
+    return _browser["page"]
+
+
+def _medir(page, url: str) -> dict:
+    page.goto(url, wait_until="domcontentloaded")
+    page.wait_for_function("window.synapsisComplete === true", timeout=120000)
+    return page.evaluate("""() => ({
+        interativo: performance.getEntriesByName('synapsis-interactive')[0].startTime,
+        completo: performance.getEntriesByName('synapsis-complete')[0].startTime,
+        nos_dom: document.querySelectorAll('.node').length,
+    })""")
+
+
+@benchmark("template.time_to_interactive", TAMANHOS)
+def bench_time_to_interactive(nodes):
+    page = _pagina()
+    if page is None:
+        return None
+    
+    caminho = diretorio_temporario() / "mapa.html"
+    texto = generate_yaml(depth=8, fanout=(5, 8), collapsed_ratio=0.1, max_nodes=nodes, seed=1)
+    caminho.write_text(render_html_string(texto), encoding="utf-8")
+    
+    medidas = [_medir(page, caminho.as_uri()) for _ in range(REPETICOES)]
+    return {
+        "repeticoes": REPETICOES,
+        "interativo_ms": round(statistics.median(m["interativo"] for m in medidas), 1),
+        "completo_ms": round(statistics.median(m["completo"] for m in medidas), 1),
+        "nos_dom": medidas[-1]["nos_dom"],
+        "nos_mapa": nodes,
+    }
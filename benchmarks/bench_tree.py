@@ -0,0 +1,108 @@
+"""Memória e percurso: árvore aninhada (dicts) contra ``MindMapTree``.
+
+Os títulos são os mesmos objetos nas duas formas, então a memória
+medida é só a da estrutura (dicts, listas, arrays). Também mede o
+layout no servidor (synapsis.layout), que deve crescer linearmente.
+"""
+import copy
+import tracemalloc
+
+from synapsis import MindMapTree, layout_tree, render_svg, render_thumbnail
+from synapsis.synthetic import generate_tree
+
+from .harness import benchmark
+
+TAMANHOS = (10000, 50000)
+
+_arvores = {}
+
+
+def _arvore(nodes: int) -> dict:
+    if nodes not in _arvores:
+        _arvores[nodes] = generate_tree(depth=8, fanout=(5, 8), max_nodes=nodes, seed=1)
+    return _arvores[nodes]
+
+
+def _alocado(func) -> int:
+    """Bytes ainda alocados pelo resultado de ``func``."""
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        resultado = func()
+        depois = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del resultado
+    return depois - antes
+
+
+def _percorrer_dict(raiz: dict) -> int:
+    total = 0
+    pilha = [raiz]
+    while pilha:
+        node = pilha.pop()
+        total += len(node["title"])
+        pilha.extend(node.get("children", ()))
+    return total
+
+
+def _percorrer_arvore(arvore: MindMapTree) -> int:
+    title = arvore.title
+    return sum(len(title[i]) for i in arvore.iter_preorder())
+
+
+@benchmark("tree.memoria", TAMANHOS)
+def bench_memoria(nodes):
+    raiz = _arvore(nodes)
+    dicts = _alocado(lambda: copy.deepcopy(raiz))
+    arrays = _alocado(lambda: MindMapTree.from_dict(raiz))
+    return {
+        "dict_bytes": dicts,
+        "arrays_bytes": arrays,
+        "bytes_por_no_dict": round(dicts / nodes, 1),
+        "bytes_por_no_arrays": round(arrays / nodes, 1),
+        "reducao": round(dicts / arrays, 1),
+    }
+
+
+@benchmark("tree.percurso_dict", TAMANHOS)
+def bench_percurso_dict(nodes):
+    raiz = _arvore(nodes)
+    return lambda: _percorrer_dict(raiz)
+
+
+@benchmark("tree.percurso_arrays", TAMANHOS)
+def bench_percurso_arrays(nodes):
+    arvore = MindMapTree.from_dict(_arvore(nodes))
+    return lambda: _percorrer_arvore(arvore)
+
+
+@benchmark("tree.from_dict", TAMANHOS)
+def bench_from_dict(nodes):
+    raiz = _arvore(nodes)
+    return lambda: MindMapTree.from_dict(raiz)
+
+
+@benchmark("tree.to_dict", TAMANHOS)
+def bench_to_dict(nodes):
+    arvore = MindMapTree.from_dict(_arvore(nodes))
+    return arvore.to_dict
+
+
+@benchmark("tree.layout", TAMANHOS)
+def bench_layout(nodes):
+    raiz = _arvore(nodes)
+    return lambda: layout_tree(raiz)
+
+
+@benchmark("tree.render_svg", TAMANHOS)
+def bench_render_svg(nodes):
+    raiz = _arvore(nodes)
+    layout = layout_tree(raiz)
+    return lambda: render_svg(raiz, layout)
+
+
+@benchmark("tree.render_thumbnail", TAMANHOS)
+def bench_render_thumbnail(nodes):
+    raiz = _arvore(nodes)
+    return lambda: render_thumbnail(raiz)
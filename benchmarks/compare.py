@@ -0,0 +1,69 @@
+"""Compara dois arquivos de resultados de benchmark.
+
+Uso:
+    python -m benchmarks.compare base.json novo.json [--limite 0.10]
+
+Termina com código 1 se algum caso ficou mais lento que ``limite``
+(fração da mediana, ou de req/s nos benchmarks de carga).
+"""
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+
+def _indexar(resultado: Dict) -> Dict[Tuple, Dict]:
+    return {(r["nome"], str(r["param"])): r for r in resultado["resultados"]}
+
+
+def variacao(base: Dict, novo: Dict) -> Optional[float]:
+    """Variação relativa; positiva significa mais lento."""
+    if "mediana" in base and "mediana" in novo:
+        return novo["mediana"] / base["mediana"] - 1
+    if "req_s" in base and "req_s" in novo and novo["req_s"]:
+        return base["req_s"] / novo["req_s"] - 1
+    return None
+
+
+def comparar(base: Dict, novo: Dict, limite: float) -> List[Dict]:
+    """Lista casos presentes nos dois resultados com sua variação."""
+    base_idx = _indexar(base)
+    linhas = []
+    for chave, r in _indexar(novo).items():
+        if chave not in base_idx:
+            continue
+        delta = variacao(base_idx[chave], r)
+        linhas.append({
+            "nome": chave[0],
+            "param": chave[1],
+            "variacao": delta,
+            "regressao": delta is not None and delta > limite,
+        })
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--limite", type=float, default=0.10)
+    args = parser.parse_args()
+    
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.novo, encoding="utf-8") as f:
+        novo = json.load(f)
+    
+    print(f"base: {base.get('commit')}  novo: {novo.get('commit')}")
+    linhas = comparar(base, novo, args.limite)
+    for linha in linhas:
+        delta = "n/a" if linha["variacao"] is None else f"{linha['variacao'] * 100:+.1f}%"
+        marca = "  REGRESSÃO" if linha["regressao"] else ""
+        print(f"{linha['nome']}[{linha['param']}]".ljust(45) + f"{delta:>9s}{marca}")
+    
+    if any(linha["regressao"] for linha in linhas):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
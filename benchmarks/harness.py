@@ -0,0 +1,134 @@
+"""Registro e execução de benchmarks com saída em JSON.
+
+Cada benchmark é uma função registrada com ``@benchmark``. Ela recebe
+um valor de parâmetro (ex: tamanho dos dados), faz o preparo e retorna
+a função a ser medida (ou um dict de métricas já medidas, para
+cenários como carga concorrente que fazem a própria medição, ou None
+para pular o caso quando falta uma dependência opcional).
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import tempfile
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Módulos do app usam imports planos; synapsis vem do pacote instalado
+if str(RAIZ / "app") not in sys.path:
+    sys.path.insert(0, str(RAIZ / "app"))
+
+# O app nunca chama a LLM real nos benchmarks
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+BENCHMARKS: List[dict] = []
+
+
+def benchmark(nome: str, params: Sequence = (None,), rapido: Sequence = None):
+    """Registra um benchmark.
+    
+    Args:
+        nome: Nome único (ex: ``pipeline.sanitize``)
+        params: Valores do parâmetro, um resultado por valor
+        rapido: Subconjunto de params usado com ``--rapido``
+    """
+    def decorator(func: Callable) -> Callable:
+        BENCHMARKS.append({
+            "nome": nome,
+            "func": func,
+            "params": list(params),
+            "rapido": list(rapido if rapido is not None else params[:1]),
+        })
+        return func
+    return decorator
+
+
+def diretorio_temporario() -> Path:
+    """Diretório temporário removido ao fim da execução."""
+    caminho = Path(tempfile.mkdtemp(prefix="synapsis-bench-"))
+    atexit.register(shutil.rmtree, caminho, ignore_errors=True)
+    return caminho
+
+
+def medir(func: Callable[[], object], min_tempo: float = 0.2, max_repeticoes: int = 1000) -> Dict:
+    """Executa ``func`` repetidamente e retorna estatísticas em segundos.
+    
+    Repete até somar ``min_tempo`` segundos (no mínimo 3 vezes), depois
+    de uma execução de aquecimento fora da medição.
+    """
+    func()
+    
+    tempos = []
+    total = 0.0
+    while len(tempos) < 3 or (total < min_tempo and len(tempos) < max_repeticoes):
+        inicio = time.perf_counter()
+        func()
+        tempo = time.perf_counter() - inicio
+        tempos.append(tempo)
+        total += tempo
+    
+    tempos.sort()
+    return {
+        "repeticoes": len(tempos),
+        "min": tempos[0],
+        "mediana": statistics.median(tempos),
+        "media": statistics.fmean(tempos),
+        "p95": tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        "ops_s": len(tempos) / total,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(filtro: str = "", rapido: bool = False, min_tempo: float = 0.2, log=print) -> Dict:
+    """Executa benchmarks registrados cujo nome contém ``filtro``.
+    
+    Returns:
+        Dict com ambiente (commit, python, plataforma) e resultados
+    """
+    resultados = []
+    for bench in BENCHMARKS:
+        if filtro not in bench["nome"]:
+            continue
+        for param in (bench["rapido"] if rapido else bench["params"]):
+            alvo = bench["func"](param)
+            if alvo is None:
+                log(f"{bench['nome']}[{param}] pulado (dependência ausente)")
+                continue
+            if callable(alvo):
+                stats = medir(alvo, min_tempo=min_tempo)
+            else:
+                stats = alvo
+            resultado = {"nome": bench["nome"], "param": param, **stats}
+            resultados.append(resultado)
+            log(_formatar(resultado))
+    
+    return {
+        "commit": _commit(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+
+
+def _formatar(r: Dict) -> str:
+    nome = r["nome"] if r["param"] is None else f"{r['nome']}[{r['param']}]"
+    if "mediana" in r:
+        return f"{nome:45s} mediana {r['mediana'] * 1000:10.3f} ms   {r['ops_s']:10.1f} ops/s"
+    return f"{nome:45s} " + "  ".join(f"{k}={v}" for k, v in r.items() if k not in ("nome", "param"))
@@ -0,0 +1,55 @@
+"""LLM mock determinística para benchmarks.
+
+A resposta depende só de ``nodes`` e ``seed`` (não do prompt), então
+duas execuções com os mesmos parâmetros medem exatamente o mesmo
+trabalho.
+"""
+import time
+import asyncio
+
+from synapsis.synthetic import generate_yaml
+
+
+def gerar_yaml(nodes: int, largura: int = 6, seed: int = 0, fences: bool = True) -> str:
+    """Gera YAML sintético com exatamente ``nodes`` nós, preenchido em largura.
+    
+    Args:
+        nodes: Total de nós (inclusive a raiz)
+        largura: Filhos por nó
+        seed: Semente dos títulos e ícones
+        fences: Envolve em ```yaml, como uma LLM real costuma fazer
+    """
+    return generate_yaml(
+        depth=nodes,
+        fanout=largura,
+        max_nodes=nodes,
+        seed=seed,
+        fences=fences,
+    )
+
+
+class MockLLM:
+    """LLM determinística com latência e tamanho de saída configuráveis.
+    
+    Args:
+        latencia_ms: Espera antes de responder
+        nodes: Nós no YAML de resposta
+        seed: Semente do conteúdo
+    """
+    
+    def __init__(self, latencia_ms: float = 0, nodes: int = 50, seed: int = 0):
+        self.latencia = latencia_ms / 1000
+        self.resposta = gerar_yaml(nodes, seed=seed)
+        self.chamadas = 0
+    
+    def __call__(self, prompt: str) -> str:
+        self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self.resposta
+    
+    async def async_call(self, prompt: str) -> str:
+        self.chamadas += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return self.resposta
@@ -1,24 +1,82 @@
-"""Synapsis - Biblioteca para geração de mapas mentais com LLM."""
+"""Synapsis - Biblioteca para geração de mapas mentais com LLM.
+
+Os nomes públicos são carregados sob demanda (PEP 562): ``import synapsis``
+não importa submódulos, jinja2 nem PyYAML; cada submódulo é importado no
+primeiro acesso a um de seus nomes.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
 
 __version__ = "1.0.0"
 
-from .types import LLMFunc, MindMapNode, ValidationResult
-from .core import generate, SynapsisBuilder
-from .validator import sanitize, validate_schema, clean_and_validate, ValidationError
-from .agents import Planner, Expander
-from .renderer import render_html
-
-__all__ = [
-    "generate",
-    "SynapsisBuilder",
-    "LLMFunc",
-    "MindMapNode",
-    "ValidationResult",
-    "sanitize",
-    "validate_schema",
-    "clean_and_validate",
-    "ValidationError",
-    "Planner",
-    "Expander",
-    "render_html",
-]
+# Nome público -> submódulo que o define
+_LAZY = {
+    "generate": "core",
+    "SynapsisBuilder": "core",
+    "LLMFunc": "types",
+    "AsyncLLMFunc": "types",
+    "MindMapNode": "types",
+    "MindMapTree": "tree",
+    "prune_tree": "prune",
+    "AdaptiveLimiter": "limiter",
+    "ValidationResult": "types",
+    "StageSpan": "types",
+    "TraceHook": "types",
+    "TokenRecord": "types",
+    "sanitize": "validator",
+    "validate_schema": "validator",
+    "clean_and_validate": "validator",
+    "ValidationError": "validator",
+    "Planner": "agents",
+    "Expander": "agents",
+    "PromptTemplate": "agents",
+    "TokenUsage": "agents",
+    "register_prompt": "agents",
+    "get_prompt": "agents",
+    "render_html": "renderer",
+    "render_html_string": "renderer",
+    "iter_tree_html": "renderer",
+    "write_tree_html": "renderer",
+    "layout_tree": "layout",
+    "Layout": "layout",
+    "render_svg": "layout",
+    "render_thumbnail": "layout",
+    "Tracer": "tracing",
+    "InMemoryRecorder": "tracing",
+    "OpenTelemetryEmitter": "tracing",
+    "encode_tree": "codec",
+    "decode_tree": "codec",
+    "pack": "codec",
+    "unpack": "codec",
+    "iter_encode_json": "codec",
+    "iter_pack": "codec",
+    "CodecError": "codec",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .types import LLMFunc, AsyncLLMFunc, MindMapNode, ValidationResult, StageSpan, TraceHook, TokenRecord
+    from .core import generate, SynapsisBuilder
+    from .validator import sanitize, validate_schema, clean_and_validate, ValidationError
+    from .agents import Planner, Expander, PromptTemplate, TokenUsage, register_prompt, get_prompt
+    from .renderer import render_html, render_html_string, iter_tree_html, write_tree_html
+    from .layout import layout_tree, Layout, render_svg, render_thumbnail
+    from .tracing import Tracer, InMemoryRecorder, OpenTelemetryEmitter
+    from .codec import encode_tree, decode_tree, pack, unpack, iter_encode_json, iter_pack, CodecError
+    from .tree import MindMapTree
+    from .prune import prune_tree
+    from .limiter import AdaptiveLimiter
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_LAZY[name]}", __name__), name)
+    # Próximos acessos não passam por aqui
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
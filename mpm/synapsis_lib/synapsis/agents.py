@@ -1,11 +1,182 @@
-"""Agentes de planejamento e expansão de mapas mentais."""
-from .types import LLMFunc
+"""Agentes de planejamento e expansão de mapas mentais.
 
+Os prompts vêm de um registro de templates versionados. Cada template
+tem um prefixo estático (instruções, formato, paleta) seguido da parte
+variável (tema, plano, estilo): chamadas ao mesmo template compartilham
+o prefixo inteiro, que os providers com cache de prompt reaproveitam
+(menos tokens cobrados e menor tempo até o primeiro token).
+"""
+import inspect
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Union
 
-class Planner:
-    """Agente mestre: cria plano conciso em 2-3 níveis."""
+from .types import LLMFunc, AsyncLLMFunc, TokenRecord
+from .tracing import estimate_tokens
+
+# Tokenizer: texto -> quantidade de tokens
+Tokenizer = Callable[[str], int]
+
+
+async def _call_async(llm: Union[LLMFunc, AsyncLLMFunc], prompt: str) -> str:
+    """Chama LLM síncrona ou assíncrona e aguarda a resposta."""
+    result = llm(prompt)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class PromptTemplate:
+    """Prompt versionado: prefixo estático + sufixo com variáveis.
+    
+    O prefixo é concatenado sem formatação (pode conter chaves); só o
+    sufixo passa por ``str.format``.
+    """
+    
+    def __init__(self, name: str, version: int, prefix: str, suffix: str):
+        self.name = name
+        self.version = version
+        self.prefix = prefix
+        self.suffix = suffix
+    
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+    
+    def render(self, **values) -> str:
+        """Monta o prompt com os valores do sufixo."""
+        return self.prefix + self.suffix.format(**values)
+    
+    @property
+    def text(self) -> str:
+        """Prompt inteiro como string de ``str.format`` (chaves do prefixo escapadas)."""
+        return self.prefix.replace("{", "{{").replace("}", "}}") + self.suffix
+    
+    def __repr__(self) -> str:
+        return f"PromptTemplate({self.key!r})"
+
+
+PROMPTS: Dict[str, Dict[int, PromptTemplate]] = {}
+
+
+def register_prompt(template: PromptTemplate) -> PromptTemplate:
+    """Registra template; versões de um mesmo nome convivem."""
+    PROMPTS.setdefault(template.name, {})[template.version] = template
+    return template
+
+
+def get_prompt(name: str, version: Optional[int] = None) -> PromptTemplate:
+    """Template pelo nome; sem ``version``, a mais recente.
+    
+    Raises:
+        KeyError: Se nome ou versão não estiverem registrados
+    """
+    versions = PROMPTS[name]
+    return versions[max(versions) if version is None else version]
+
+
+class TokenUsage:
+    """Conta tokens de prompt e de resposta por chamada e por template.
+    
+    O tokenizer é plugável (default: estimativa de ~4 caracteres por
+    token); para contagens exatas passe o do modelo, ex:
+    ``lambda t: len(enc.encode(t))`` com tiktoken. Hooks recebem cada
+    ``TokenRecord``. Guarda só as últimas ``max_records`` chamadas; os
+    totais de ``report`` cobrem todas. Seguro para uso entre threads.
+    """
+    
+    def __init__(
+        self,
+        tokenizer: Optional[Tokenizer] = None,
+        hooks: Optional[Iterable[Callable[[TokenRecord], None]]] = None,
+        max_records: int = 1000
+    ):
+        self.tokenizer = tokenizer or estimate_tokens
+        self.hooks = list(hooks or [])
+        self.records: Deque[TokenRecord] = deque(maxlen=max_records)
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._prefix_tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, template: PromptTemplate, prompt: str, completion: str) -> TokenRecord:
+        """Registra uma chamada à LLM."""
+        prefix = self._prefix_tokens.get(template.key)
+        if prefix is None:
+            prefix = self._prefix_tokens[template.key] = self.tokenizer(template.prefix)
+        
+        record: TokenRecord = {
+            "template": template.key,
+            "prompt_tokens": self.tokenizer(prompt),
+            "prefix_tokens": prefix,
+            "completion_tokens": self.tokenizer(completion or ""),
+        }
+        with self._lock:
+            self.records.append(record)
+            totals = self._totals.setdefault(template.key, dict.fromkeys(
+                ("calls", "prompt_tokens", "prefix_tokens", "completion_tokens"), 0
+            ))
+            totals["calls"] += 1
+            for field in ("prompt_tokens", "prefix_tokens", "completion_tokens"):
+                totals[field] += record[field]
+        
+        for hook in self.hooks:
+            hook(record)
+        return record
+    
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Totais por template, com a fração do prompt que é prefixo estático."""
+        with self._lock:
+            report = {key: dict(totals) for key, totals in self._totals.items()}
+        
+        for row in report.values():
+            row["prefix_ratio"] = round(row["prefix_tokens"] / row["prompt_tokens"], 3) if row["prompt_tokens"] else 0.0
+        return report
+
+
+class _PromptText:
+    """``PROMPT`` das versões anteriores: o texto do template em uso.
+    
+    Na classe é o da versão mais recente; na instância, o da versão
+    escolhida. Uma subclasse que define ``PROMPT`` como string passa a
+    usá-la como template.
+    """
+    
+    def __get__(self, agent, cls) -> str:
+        template = agent.template if agent is not None else get_prompt(cls.TEMPLATE)
+        return template.text
+
+
+class _Agent:
+    """Base dos agentes: chama a LLM com um template e contabiliza tokens."""
+    
+    TEMPLATE = ""
+    PROMPT = _PromptText()
+    
+    def __init__(self, llm: LLMFunc, usage: Optional[TokenUsage] = None, version: Optional[int] = None):
+        self.llm = llm
+        self.usage = usage
+        custom = inspect.getattr_static(type(self), "PROMPT")
+        if isinstance(custom, str):
+            self.template = PromptTemplate(f"{self.TEMPLATE}-{type(self).__name__}", 0, prefix="", suffix=custom)
+        else:
+            self.template = get_prompt(self.TEMPLATE, version)
+    
+    def _call(self, prompt: str) -> str:
+        response = self.llm(prompt)
+        if self.usage is not None:
+            self.usage.record(self.template, prompt, response)
+        return response
     
-    PROMPT = """
+    async def _call_async(self, prompt: str) -> str:
+        response = await _call_async(self.llm, prompt)
+        if self.usage is not None:
+            self.usage.record(self.template, prompt, response)
+        return response
+
+
+# Versão 1: os prompts da 1.0.0 (``version=1``). O expansor tinha tema,
+# plano e estilo no fim, nessa ordem.
+_PLANNER_V1 = """
 Você é um AGENTE MESTRE de Mapas Mentais.
 
 Tarefa: Extrair conceitos PRINCIPAIS e estruturar mapa mental CONCISO.
@@ -24,24 +195,16 @@ REGRAS:
 - 2-3 níveis de profundidade
 - Conceitos essenciais apenas
 - Comece com "title:"
+"""
 
+register_prompt(PromptTemplate("planner", 1, prefix=_PLANNER_V1, suffix="""
 TEMA: {topic}
 
-YAML:"""
-
-    def __init__(self, llm: LLMFunc):
-        self.llm = llm
-    
-    def create(self, topic: str) -> str:
-        """Gera plano inicial do mapa mental."""
-        prompt = self.PROMPT.format(topic=topic)
-        return self.llm(prompt)
-
+YAML:"""))
 
-class Expander:
-    """Agente expansor: transforma plano em mapa detalhado 5-7 níveis."""
-    
-    PROMPT = """
+# Instruções do expansor comuns a todas as versões; cada uma acrescenta
+# a seção LAYOUT
+_EXPANDER_BASE = """
 Você é um gerador AVANÇADO de mapas mentais em YAML PURO.
 O output será parseado por js-yaml e renderizado em HTML.
 
@@ -63,30 +226,116 @@ Nível 0: #667eea (roxo)
 Nível 1: #4CAF50, #2196F3, #FF9800, #E91E63
 Nível 2: #8BC34A, #64B5F6, #FFB74D, #F06292
 Nível 3+: #AED581, #90CAF9, #FFCC80, #F48FB1
+"""
 
+_EXPANDER_V1 = _EXPANDER_BASE + """
 LAYOUT:
 - 5-8 filhos por nó
 - 4-5 níveis de profundidade
 - Títulos descritivos
 - Cores progressivas por nível
+"""
 
+register_prompt(PromptTemplate("expander", 1, prefix=_EXPANDER_V1, suffix="""
 TEMA: {topic}
 {plan_section}
 {style_section}
 
-GERE YAML EXPANSIVO E DETALHADO (começando com "title:"):"""
+GERE YAML EXPANSIVO E DETALHADO (começando com "title:"):"""))
 
-    def __init__(self, llm: LLMFunc):
-        self.llm = llm
+# Versão 2: o mesmo prefixo; o estilo passa para antes do tema, e o sufixo
+# deixa de ter linhas em branco que sobravam sem plano ou estilo
+register_prompt(PromptTemplate("expander", 2, prefix=_EXPANDER_V1, suffix="""
+{style_section}TEMA: {topic}
+{plan_section}
+GERE YAML EXPANSIVO E DETALHADO (começando com "title:"):"""))
+
+# Versão 3: limites de profundidade e fanout no sufixo, por chamada, como
+# faixas (com os limites default, as mesmas da versão 2: 5-8 filhos, 4-5 níveis)
+register_prompt(PromptTemplate("expander", 3, prefix=_EXPANDER_BASE + """
+LAYOUT:
+- Títulos descritivos
+- Cores progressivas por nível
+- Respeite os LIMITES abaixo
+""", suffix="""
+LIMITES:
+- {fanout} filhos por nó
+- {depth} níveis de profundidade
+{style_section}TEMA: {topic}
+{plan_section}
+GERE YAML EXPANSIVO E DETALHADO (começando com "title:"):"""))
+
+
+def _range(maximum: int, span: int) -> str:
+    """Faixa "mínimo-máximo" terminando em ``maximum`` (ex: "5-8")."""
+    minimum = max(1, maximum - span)
+    return str(maximum) if minimum == maximum else f"{minimum}-{maximum}"
+
+
+class Planner(_Agent):
+    """Agente mestre: cria plano conciso em 2-3 níveis."""
+    
+    TEMPLATE = "planner"
+    
+    def build_prompt(self, topic: str) -> str:
+        """Monta prompt do plano."""
+        return self.template.render(topic=topic)
+    
+    def create(self, topic: str) -> str:
+        """Gera plano inicial do mapa mental."""
+        return self._call(self.build_prompt(topic))
+    
+    async def create_async(self, topic: str) -> str:
+        """Gera plano inicial com LLM assíncrona."""
+        return await self._call_async(self.build_prompt(topic))
+
+
+class Expander(_Agent):
+    """Agente expansor: transforma plano em mapa detalhado.
+    
+    ``max_depth`` e ``max_fanout`` vão para o prompt; a LLM pode não
+    respeitá-los, e ``synapsis.prune.prune_tree`` os impõe depois.
+    """
     
-    def expand(self, topic: str, plan: str = "", style: str = "") -> str:
-        """Expande tema/plano em mapa mental detalhado."""
-        plan_section = f"PLANO BASE:\n{plan}" if plan else ""
-        style_section = f"ESTILO: {style}" if style else ""
+    TEMPLATE = "expander"
+    MAX_DEPTH = 5
+    MAX_FANOUT = 8
+    # Largura das faixas pedidas no prompt: 5-8 filhos e 4-5 níveis no default
+    FANOUT_SPAN = 3
+    DEPTH_SPAN = 1
+    
+    def build_prompt(
+        self,
+        topic: str,
+        plan: str = "",
+        style: str = "",
+        max_depth: Optional[int] = None,
+        max_fanout: Optional[int] = None
+    ) -> str:
+        """Monta prompt de expansão."""
+        plan_section = f"PLANO BASE:\n{plan}\n" if plan else ""
+        style_section = f"ESTILO: {style}\n" if style else ""
+        max_depth = max_depth or self.MAX_DEPTH
+        max_fanout = max_fanout or self.MAX_FANOUT
         
-        prompt = self.PROMPT.format(
+        return self.template.render(
             topic=topic,
             plan_section=plan_section,
-            style_section=style_section
+            style_section=style_section,
+            max_depth=max_depth,
+            max_fanout=max_fanout,
+            depth=_range(max_depth, self.DEPTH_SPAN),
+            fanout=_range(max_fanout, self.FANOUT_SPAN)
         )
-        return self.llm(prompt)
+
+    def expand(self, topic: str, plan: str = "", style: str = "", **limits) -> str:
+        """Expande tema/plano em mapa mental detalhado.
+        
+        Args:
+            limits: max_depth e max_fanout (ver build_prompt)
+        """
+        return self._call(self.build_prompt(topic, plan, style, **limits))
+    
+    async def expand_async(self, topic: str, plan: str = "", style: str = "", **limits) -> str:
+        """Expande tema/plano com LLM assíncrona."""
+        return await self._call_async(self.build_prompt(topic, plan, style, **limits))
@@ -0,0 +1,252 @@
+"""Codificação compacta de árvores de mapa mental.
+
+Formato colunar (dict serializável em JSON), com nós em pré-ordem::
+
+    {
+        "v": 1,
+        "title": ["Raiz", "A", "A.1", "B"],
+        "parent": [0, 1, 1, 3],      # distância até o pai (0 = raiz)
+        "icon": [0, 1, -1, 1],       # índice em "icons" (-1 = sem ícone)
+        "icons": ["🎯", "📚"],
+        "color": [0, 1, 2, 1],       # índice em "colors" (-1 = sem cor)
+        "colors": ["#667eea", "#4CAF50", "#8BC34A"],
+        "collapsed": [1],            # nós com expanded: false
+        "extra": {"2": {...}}        # outras chaves, por nó (sem perdas)
+    }
+    
+As chaves repetidas somem e ícones/cores viram índices em paletas
+internadas. ``pack`` comprime esse dict em bytes (``SYN1`` + zlib),
+para armazenamento e transporte binário.
+
+``iter_encode_json`` e ``iter_pack`` produzem o mesmo JSON (e bytes que
+``unpack`` lê) em pedaços, percorrendo a árvore uma vez por coluna, sem
+montar as colunas nem o texto inteiro em memória.
+"""
+import json
+import zlib
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .types import MindMapNode
+
+VERSION = 1
+MAGIC = b"SYN1"
+CONTENT_TYPE = "application/x-synapsis-tree"
+
+_KNOWN = ("title", "icon", "color", "children")
+
+# Elementos por pedaço em iter_encode_json
+CHUNK_NODES = 1000
+
+_dumps = partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+
+
+class CodecError(ValueError):
+    """Dados codificados inválidos."""
+    pass
+
+
+def _intern(palette: Dict[str, int], value) -> int:
+    if value is None:
+        return -1
+    value = str(value)
+    if value not in palette:
+        palette[value] = len(palette)
+    return palette[value]
+
+
+def _others(node: MindMapNode) -> Dict[str, Any]:
+    """Chaves do nó fora das colunas (vão para "extra")."""
+    return {
+        k: v for k, v in node.items()
+        if k not in _KNOWN and not (k == "expanded" and v is False)
+    }
+
+
+def encode_tree(tree: MindMapNode) -> Dict[str, Any]:
+    """Converte árvore aninhada no formato colunar."""
+    if not isinstance(tree, dict):
+        raise CodecError("Raiz deve ser um dicionário")
+    
+    titles: List[str] = []
+    parents: List[int] = []
+    icons: List[int] = []
+    colors: List[int] = []
+    collapsed: List[int] = []
+    extra: Dict[str, Dict] = {}
+    icon_palette: Dict[str, int] = {}
+    color_palette: Dict[str, int] = {}
+    
+    # Pilha de (nó, índice do pai); filhos empilhados ao contrário
+    # para sair em ordem
+    stack = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(titles)
+        
+        titles.append(str(node.get("title", "")))
+        parents.append(0 if parent < 0 else index - parent)
+        icons.append(_intern(icon_palette, node.get("icon")))
+        colors.append(_intern(color_palette, node.get("color")))
+        if node.get("expanded") is False:
+            collapsed.append(index)
+        
+        others = _others(node)
+        if others:
+            extra[str(index)] = others
+        
+        children = node.get("children")
+        if isinstance(children, list):
+            for child in reversed(children):
+                if isinstance(child, dict):
+                    stack.append((child, index))
+    
+    encoded = {
+        "v": VERSION,
+        "title": titles,
+        "parent": parents,
+        "icon": icons,
+        "icons": list(icon_palette),
+        "color": colors,
+        "colors": list(color_palette),
+        "collapsed": collapsed,
+    }
+    if extra:
+        encoded["extra"] = extra
+    return encoded
+
+
+def _preorder(tree: MindMapNode) -> Iterator[Tuple[MindMapNode, int]]:
+    """(nó, distância até o pai) em pré-ordem, como em encode_tree."""
+    stack = [(tree, -1)]
+    index = 0
+    while stack:
+        node, parent = stack.pop()
+        yield node, 0 if parent < 0 else index - parent
+        children = node.get("children")
+        if isinstance(children, list):
+            for child in reversed(children):
+                if isinstance(child, dict):
+                    stack.append((child, index))
+        index += 1
+
+
+def _json_array(values: Iterable, chunk_size: int) -> Iterator[str]:
+    """Array JSON em pedaços de até ``chunk_size`` elementos."""
+    yield "["
+    batch = []
+    separator = ""
+    for value in values:
+        batch.append(value)
+        if len(batch) == chunk_size:
+            yield separator + _dumps(batch)[1:-1]
+            separator = ","
+            batch = []
+    if batch:
+        yield separator + _dumps(batch)[1:-1]
+    yield "]"
+
+
+def iter_encode_json(tree: MindMapNode, chunk_size: int = CHUNK_NODES) -> Iterator[str]:
+    """JSON compacto de ``encode_tree(tree)``, em pedaços.
+    
+    ``"".join(...)`` é igual a ``json.dumps(encode_tree(tree),
+    ensure_ascii=False, separators=(",", ":"))``. Só as paletas e a lista
+    de nós recolhidos ficam em memória.
+    """
+    if not isinstance(tree, dict):
+        raise CodecError("Raiz deve ser um dicionário")
+    
+    icon_palette: Dict[str, int] = {}
+    color_palette: Dict[str, int] = {}
+    collapsed: List[int] = []
+    
+    def colors():
+        for index, (node, _) in enumerate(_preorder(tree)):
+            if node.get("expanded") is False:
+                collapsed.append(index)
+            yield _intern(color_palette, node.get("color"))
+    
+    yield f'{{"v":{VERSION},"title":'
+    yield from _json_array((str(node.get("title", "")) for node, _ in _preorder(tree)), chunk_size)
+    yield ',"parent":'
+    yield from _json_array((distance for _, distance in _preorder(tree)), chunk_size)
+    yield ',"icon":'
+    yield from _json_array((_intern(icon_palette, node.get("icon")) for node, _ in _preorder(tree)), chunk_size)
+    yield ',"icons":' + _dumps(list(icon_palette)) + ',"color":'
+    yield from _json_array(colors(), chunk_size)
+    yield ',"colors":' + _dumps(list(color_palette)) + ',"collapsed":' + _dumps(collapsed)
+    
+    prefix = ',"extra":{'
+    for index, (node, _) in enumerate(_preorder(tree)):
+        others = _others(node)
+        if others:
+            yield prefix + _dumps({str(index): others})[1:-1]
+            prefix = ","
+    yield "}" if prefix == ',"extra":{' else "}}"
+
+
+def decode_tree(encoded: Dict[str, Any]) -> MindMapNode:
+    """Reconstrói a árvore aninhada a partir do formato colunar."""
+    if not isinstance(encoded, dict) or encoded.get("v") != VERSION:
+        raise CodecError("Versão de codificação não suportada")
+    
+    try:
+        titles = encoded["title"]
+        parents = encoded["parent"]
+        icons, icon_palette = encoded["icon"], encoded["icons"]
+        colors, color_palette = encoded["color"], encoded["colors"]
+        collapsed = set(encoded.get("collapsed", ()))
+        extra = encoded.get("extra", {})
+        
+        nodes: List[MindMapNode] = []
+        for i, title in enumerate(titles):
+            node: MindMapNode = {"title": title}
+            if icons[i] >= 0:
+                node["icon"] = icon_palette[icons[i]]
+            if colors[i] >= 0:
+                node["color"] = color_palette[colors[i]]
+            if i in collapsed:
+                node["expanded"] = False
+            node.update(extra.get(str(i), {}))
+            nodes.append(node)
+            
+            if i > 0:
+                parent = nodes[i - parents[i]]
+                parent.setdefault("children", []).append(node)
+    except (KeyError, IndexError, TypeError) as e:
+        raise CodecError(f"Árvore codificada inválida: {e}")
+    
+    if not nodes:
+        raise CodecError("Árvore vazia")
+    return nodes[0]
+
+
+def pack(tree: MindMapNode, level: int = 9) -> bytes:
+    """Codifica e comprime árvore em bytes (``SYN1`` + zlib)."""
+    payload = json.dumps(encode_tree(tree), ensure_ascii=False, separators=(",", ":"))
+    return MAGIC + zlib.compress(payload.encode("utf-8"), level)
+
+
+def iter_pack(tree: MindMapNode, level: int = 9) -> Iterator[bytes]:
+    """Como ``pack``, em pedaços (``unpack`` lê a junção)."""
+    compressor = zlib.compressobj(level)
+    yield MAGIC
+    for chunk in iter_encode_json(tree):
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def unpack(data: bytes) -> MindMapNode:
+    """Inverso de ``pack``."""
+    if not data.startswith(MAGIC):
+        raise CodecError("Cabeçalho inválido")
+    try:
+        payload = zlib.decompress(data[len(MAGIC):])
+        return decode_tree(json.loads(payload))
+    except (zlib.error, ValueError) as e:
+        if isinstance(e, CodecError):
+            raise
+        raise CodecError(f"Dados comprimidos inválidos: {e}")
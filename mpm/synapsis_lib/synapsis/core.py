@@ -1,44 +1,118 @@
 """Core da biblioteca Synapsis: Builder e função generate."""
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional, Union
 
-from .types import LLMFunc
-from .agents import Planner, Expander
+from .types import LLMFunc, AsyncLLMFunc, TraceHook
+from .agents import Planner, Expander, TokenUsage
 from .validator import clean_and_validate, ValidationError
-from .renderer import render_html
+from .renderer import render_html, render_html_string
+from .tracing import Tracer, text_attributes, tree_attributes
 
 
 class SynapsisBuilder:
-    """Builder para criar mapas mentais com LLM injetável."""
+    """Builder para criar mapas mentais com LLM injetável.
     
-    def __init__(self, llm: LLMFunc):
+    Cada estágio (plan, expand, validate, render) gera um span entregue
+    aos ``hooks`` com duração, tamanho de prompt/resposta em bytes e
+    tokens estimados, e quantidade de nós e profundidade do mapa.
+    """
+    
+    def __init__(
+        self,
+        llm: Union[LLMFunc, AsyncLLMFunc],
+        hooks: Optional[Iterable[TraceHook]] = None,
+        usage: Optional[TokenUsage] = None
+    ):
         self.llm = llm
-        self.planner = Planner(llm)
-        self.expander = Expander(llm)
+        self.usage = usage
+        self.planner = Planner(llm, usage=usage)
+        self.expander = Expander(llm, usage=usage)
+        self.tracer = Tracer(hooks)
         self._yaml: Optional[str] = None
     
+    def add_hook(self, hook: TraceHook) -> "SynapsisBuilder":
+        """Registra hook de tracing."""
+        self.tracer.add_hook(hook)
+        return self
+    
+    def _trace_llm(self, attrs: dict, prompt: str) -> None:
+        if self.tracer.enabled:
+            attrs.update(text_attributes("prompt", prompt))
+    
+    def _trace_response(self, attrs: dict) -> None:
+        if self.tracer.enabled:
+            attrs.update(text_attributes("response", self._yaml or ""))
+    
     def plan(self, topic: str) -> "SynapsisBuilder":
         """Cria plano inicial (2-3 níveis)."""
-        self._yaml = self.planner.create(topic)
+        with self.tracer.span("plan", topic=topic) as attrs:
+            self._trace_llm(attrs, self.planner.build_prompt(topic))
+            self._yaml = self.planner.create(topic)
+            self._trace_response(attrs)
+        return self
+    
+    def expand(self, topic: str, style: str = "", **limits) -> "SynapsisBuilder":
+        """Expande para mapa detalhado.
+        
+        Args:
+            limits: max_depth e max_fanout pedidos à LLM (default: 5 e 8)
+        """
+        plan = self._yaml or ""
+        with self.tracer.span("expand", topic=topic) as attrs:
+            self._trace_llm(attrs, self.expander.build_prompt(topic, plan, style, **limits))
+            self._yaml = self.expander.expand(topic, plan, style, **limits)
+            self._trace_response(attrs)
+        return self
+    
+    async def plan_async(self, topic: str) -> "SynapsisBuilder":
+        """Como plan(), aguardando LLM assíncrona."""
+        with self.tracer.span("plan", topic=topic) as attrs:
+            self._trace_llm(attrs, self.planner.build_prompt(topic))
+            self._yaml = await self.planner.create_async(topic)
+            self._trace_response(attrs)
         return self
     
-    def expand(self, topic: str, style: str = "") -> "SynapsisBuilder":
-        """Expande para mapa detalhado (5-7 níveis)."""
+    async def expand_async(self, topic: str, style: str = "", **limits) -> "SynapsisBuilder":
+        """Como expand(), aguardando LLM assíncrona."""
         plan = self._yaml or ""
-        self._yaml = self.expander.expand(topic, plan, style)
+        with self.tracer.span("expand", topic=topic) as attrs:
+            self._trace_llm(attrs, self.expander.build_prompt(topic, plan, style, **limits))
+            self._yaml = await self.expander.expand_async(topic, plan, style, **limits)
+            self._trace_response(attrs)
         return self
     
     def validate(self) -> "SynapsisBuilder":
         """Sanitiza e valida YAML."""
         if self._yaml:
-            self._yaml = clean_and_validate(self._yaml)
+            with self.tracer.span("validate") as attrs:
+                if self.tracer.enabled:
+                    attrs.update(text_attributes("input", self._yaml))
+                self._yaml = clean_and_validate(self._yaml)
+                if self.tracer.enabled:
+                    attrs.update(text_attributes("output", self._yaml))
+                    import yaml
+                    attrs.update(tree_attributes(yaml.safe_load(self._yaml)))
         return self
     
     def render(self, output: str = None) -> str:
         """Renderiza HTML e retorna caminho do arquivo."""
         if not self._yaml:
             raise ValueError("Nenhum YAML para renderizar")
-        return render_html(self._yaml, output)
+        with self.tracer.span("render") as attrs:
+            path = render_html(self._yaml, output)
+            if self.tracer.enabled:
+                attrs["output_bytes"] = Path(path).stat().st_size
+        return path
+    
+    def to_html(self) -> str:
+        """Renderiza HTML e retorna o conteúdo, sem gravar arquivo."""
+        if not self._yaml:
+            raise ValueError("Nenhum YAML para renderizar")
+        with self.tracer.span("render") as attrs:
+            html = render_html_string(self._yaml)
+            if self.tracer.enabled:
+                attrs["output_bytes"] = len(html.encode("utf-8"))
+        return html
     
     def get_yaml(self) -> str:
         """Retorna YAML atual."""
@@ -56,7 +130,8 @@ def generate(
     llm: LLMFunc,
     output: str = None,
     style: str = "",
-    validate: bool = True
+    validate: bool = True,
+    hooks: Optional[Iterable[TraceHook]] = None
 ) -> str:
     """Gera mapa mental completo e retorna caminho do HTML.
     
@@ -66,11 +141,12 @@ def generate(
         output: Caminho do HTML de saída (default: mindmap.html)
         style: Estilo/personalidade do mapa
         validate: Se deve validar YAML (default: True)
+        hooks: Hooks de tracing chamados ao fim de cada estágio
     
     Returns:
         Caminho absoluto do HTML gerado
     """
-    builder = SynapsisBuilder(llm)
+    builder = SynapsisBuilder(llm, hooks=hooks)
     builder.expand(topic, style=style)
     
     if validate:
@@ -0,0 +1,329 @@
+"""Layout de árvore no servidor e renderização SVG estática.
+
+``layout_tree`` calcula, uma vez, a posição de cada nó no desenho em
+pirâmide (raiz no topo, cada nível em uma linha) com o algoritmo tidy
+tree de Walker na versão linear de Buchheim, Jünger e Leipert: subárvores
+vizinhas se encaixam pelos contornos em vez de cada uma ocupar a largura
+de todas as suas folhas, como no flexbox do template HTML. Pai centrado
+sobre os filhos, irmãos na ordem original, O(n) nós.
+
+``render_svg`` desenha o layout em um SVG estático (o navegador só pinta,
+sem layout) e ``render_thumbnail`` uma miniatura sem texto dos primeiros
+níveis, para listagens.
+
+O tamanho de cada nó é estimado pelo número de caracteres e pelo estilo
+do nível (como no template); passe ``measure`` para medir de outro jeito.
+"""
+import re
+import unicodedata
+from typing import Callable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from .types import MindMapNode
+
+# Estilo por nível (o último vale para os mais fundos), como no template
+# HTML: (tamanho do texto, tamanho do ícone, padding horizontal, altura)
+LEVEL_STYLES = [
+    (18, 24, 28, 56),
+    (13, 16, 16, 40),
+    (12, 14, 14, 36),
+    (11, 14, 12, 32),
+]
+
+# Largura média de um caractere em relação ao tamanho da fonte
+CHAR_WIDTH = 0.6
+
+H_GAP = 24
+V_GAP = 48
+
+ACCENT = "#6366f1"
+_COLOR = re.compile(r"^#[0-9a-fA-F]{3,8}$")
+
+Measure = Callable[[MindMapNode, int], Tuple[float, float]]
+
+
+def estimate_size(node: MindMapNode, depth: int) -> Tuple[float, float]:
+    """Largura e altura estimadas da caixa de um nó.
+    
+    Caracteres largos (CJK, emoji) contam como dois.
+    """
+    text, icon, pad, height = LEVEL_STYLES[min(depth, len(LEVEL_STYLES) - 1)]
+    title = str(node.get("title", ""))
+    chars = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in title)
+    width = 2 * pad + chars * text * CHAR_WIDTH
+    if node.get("icon"):
+        width += icon + 10
+    return round(width), height
+
+
+class Layout:
+    """Posições calculadas por ``layout_tree``, em listas por nó (pré-ordem).
+    
+    ``x``/``y`` são o canto superior esquerdo da caixa; ``width`` e
+    ``height`` o tamanho do desenho todo.
+    """
+    
+    __slots__ = ("nodes", "parent", "depth", "x", "y", "w", "h", "width", "height")
+    
+    def __init__(self, nodes, parent, depth, x, y, w, h, width, height):
+        self.nodes: List[MindMapNode] = nodes
+        self.parent: List[int] = parent
+        self.depth: List[int] = depth
+        self.x: List[float] = x
+        self.y: List[float] = y
+        self.w: List[float] = w
+        self.h: List[float] = h
+        self.width = width
+        self.height = height
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+def layout_tree(
+    tree: MindMapNode,
+    measure: Optional[Measure] = None,
+    h_gap: float = H_GAP,
+    v_gap: float = V_GAP,
+    max_depth: Optional[int] = None,
+    include_collapsed: bool = False
+) -> Layout:
+    """Calcula a posição de cada nó.
+    
+    Args:
+        tree: Raiz da árvore
+        measure: (nó, nível) -> (largura, altura) (default: estimate_size)
+        h_gap: Espaço horizontal mínimo entre caixas de um mesmo nível
+        v_gap: Espaço vertical entre níveis
+        max_depth: Níveis desenhados, contando a raiz (None = todos)
+        include_collapsed: Desenha também os filhos de nós com
+            ``expanded: false`` (o template HTML os esconde)
+    """
+    measure = measure or estimate_size
+    
+    # Achata em pré-ordem
+    nodes: List[MindMapNode] = []
+    parent: List[int] = []
+    depth: List[int] = []
+    children: List[List[int]] = []
+    stack = [(tree, -1, 0)]
+    while stack:
+        node, up, level = stack.pop()
+        index = len(nodes)
+        nodes.append(node)
+        parent.append(up)
+        depth.append(level)
+        children.append([])
+        if up >= 0:
+            children[up].append(index)
+        kids = node.get("children")
+        if (
+            isinstance(kids, list)
+            and (max_depth is None or level + 1 < max_depth)
+            and (include_collapsed or node.get("expanded") is not False)
+        ):
+            stack.extend((c, index, level + 1) for c in reversed(kids) if isinstance(c, dict))
+    
+    n = len(nodes)
+    sizes = [measure(nodes[i], depth[i]) for i in range(n)]
+    w = [s[0] for s in sizes]
+    h = [s[1] for s in sizes]
+    x = _tidy(children, w, h_gap)
+    
+    # Linhas: altura da maior caixa do nível; caixas centradas na linha
+    rows = max(depth) + 1
+    row_height = [0.0] * rows
+    for i in range(n):
+        row_height[depth[i]] = max(row_height[depth[i]], h[i])
+    row_top = [0.0] * rows
+    for level in range(1, rows):
+        row_top[level] = row_top[level - 1] + row_height[level - 1] + v_gap
+    
+    left = min(x[i] - w[i] / 2 for i in range(n))
+    xs = [x[i] - w[i] / 2 - left for i in range(n)]
+    ys = [row_top[depth[i]] + (row_height[depth[i]] - h[i]) / 2 for i in range(n)]
+    width = max(xs[i] + w[i] for i in range(n))
+    height = row_top[-1] + row_height[-1]
+    return Layout(nodes, parent, depth, xs, ys, w, h, width, height)
+
+
+def _tidy(children: List[List[int]], w: List[float], gap: float) -> List[float]:
+    """Centro x de cada nó (Buchheim, Jünger e Leipert, 2002), sem recursão."""
+    n = len(children)
+    prelim = [0.0] * n
+    mod = [0.0] * n
+    shift = [0.0] * n
+    change = [0.0] * n
+    thread = [-1] * n
+    ancestor = list(range(n))
+    number = [0] * n
+    parent = [-1] * n
+    for v in range(n):
+        for k, c in enumerate(children[v]):
+            number[c] = k
+            parent[c] = v
+    
+    def left_sibling(v):
+        return children[parent[v]][number[v] - 1] if number[v] > 0 else -1
+    
+    def next_left(v):
+        return children[v][0] if children[v] else thread[v]
+    
+    def next_right(v):
+        return children[v][-1] if children[v] else thread[v]
+    
+    def separation(a, b):
+        return (w[a] + w[b]) / 2 + gap
+    
+    def apportion(v, default):
+        sibling = left_sibling(v)
+        if sibling < 0:
+            return default
+        vip = vop = v
+        vim = sibling
+        vom = children[parent[v]][0]
+        sip, sop, sim, som = mod[vip], mod[vop], mod[vim], mod[vom]
+        while next_right(vim) >= 0 and next_left(vip) >= 0:
+            vim, vip = next_right(vim), next_left(vip)
+            vom, vop = next_left(vom), next_right(vop)
+            ancestor[vop] = v
+            distance = (prelim[vim] + sim) - (prelim[vip] + sip) + separation(vim, vip)
+            if distance > 0:
+                left = ancestor[vim] if parent[ancestor[vim]] == parent[v] else default
+                subtrees = number[v] - number[left]
+                change[v] -= distance / subtrees
+                shift[v] += distance
+                change[left] += distance / subtrees
+                prelim[v] += distance
+                mod[v] += distance
+                sip += distance
+                sop += distance
+            sim += mod[vim]
+            sip += mod[vip]
+            som += mod[vom]
+            sop += mod[vop]
+        if next_right(vim) >= 0 and next_right(vop) < 0:
+            thread[vop] = next_right(vim)
+            mod[vop] += sim - sop
+        if next_left(vip) >= 0 and next_left(vom) < 0:
+            thread[vom] = next_left(vip)
+            mod[vom] += sip - som
+            default = v
+        return default
+    
+    # Primeira passada em pós-ordem: cada nó depois dos filhos e dos irmãos à esquerda
+    default_ancestor = [kids[0] if kids else -1 for kids in children]
+    stack = [(0, False)]
+    while stack:
+        v, done = stack.pop()
+        if not done:
+            stack.append((v, True))
+            stack.extend((c, False) for c in reversed(children[v]))
+            continue
+        
+        kids = children[v]
+        if kids:
+            moved = changed = 0.0
+            for c in reversed(kids):
+                prelim[c] += moved
+                mod[c] += moved
+                changed += change[c]
+                moved += shift[c] + changed
+            midpoint = (prelim[kids[0]] + prelim[kids[-1]]) / 2
+        sibling = left_sibling(v) if v else -1
+        if sibling >= 0:
+            prelim[v] = prelim[sibling] + separation(sibling, v)
+            if kids:
+                mod[v] = prelim[v] - midpoint
+        elif kids:
+            prelim[v] = midpoint
+        if v:
+            default_ancestor[parent[v]] = apportion(v, default_ancestor[parent[v]])
+    
+    # Segunda passada em pré-ordem: soma os deslocamentos dos ancestrais
+    x = [0.0] * n
+    stack = [(0, 0.0)]
+    while stack:
+        v, offset = stack.pop()
+        x[v] = prelim[v] + offset
+        stack.extend((c, offset + mod[v]) for c in children[v])
+    return x
+
+
+def _color(node: MindMapNode) -> str:
+    color = node.get("color")
+    return color if isinstance(color, str) and _COLOR.match(color) else ACCENT
+
+
+def _edges(layout: Layout) -> str:
+    """Conectores em cotovelo de todos os nós, em um único path."""
+    parts = []
+    for i in range(1, len(layout)):
+        p = layout.parent[i]
+        px = round(layout.x[p] + layout.w[p] / 2)
+        py = round(layout.y[p] + layout.h[p])
+        cx = round(layout.x[i] + layout.w[i] / 2)
+        cy = round(layout.y[i])
+        mid = round((py + cy) / 2)
+        parts.append(f"M{px} {py}V{mid}H{cx}V{cy}")
+    return "".join(parts)
+
+
+SVG_STYLE = (
+    ".e{fill:none;stroke:#3a3a4a;stroke-width:2}"
+    ".n{fill:#1a1a24;stroke:#2c2c3a}"
+    ".r{fill:#1e1e2e;stroke:#6366f1;stroke-width:2}"
+    "text{fill:#f5f5f7;font-family:'Segoe UI',-apple-system,sans-serif;dominant-baseline:central}"
+)
+
+
+def render_svg(tree: MindMapNode, layout: Optional[Layout] = None, margin: float = 40) -> str:
+    """Desenha a árvore em um SVG estático.
+    
+    Args:
+        tree: Raiz da árvore
+        layout: Layout já calculado (default: layout_tree(tree))
+        margin: Margem em volta do desenho
+    """
+    layout = layout or layout_tree(tree)
+    width = round(layout.width + 2 * margin)
+    height = round(layout.height + 2 * margin)
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="{-margin} {-margin} {width} {height}">',
+        f"<style>{SVG_STYLE}</style>",
+        f'<rect x="{-margin}" y="{-margin}" width="{width}" height="{height}" fill="#0a0a0f"/>',
+        f'<path class="e" d="{_edges(layout)}"/>',
+    ]
+    for i, node in enumerate(layout.nodes):
+        level = min(layout.depth[i], len(LEVEL_STYLES) - 1)
+        text, _, pad, _ = LEVEL_STYLES[level]
+        x, y = round(layout.x[i]), round(layout.y[i])
+        w, h = round(layout.w[i]), round(layout.h[i])
+        label = escape(f"{node['icon']} {node.get('title', '')}" if node.get("icon") else str(node.get("title", "")))
+        cls = "r" if i == 0 else "n"
+        out.append(
+            f'<rect class="{cls}" x="{x}" y="{y}" width="{w}" height="{h}" rx="12"/>'
+            f'<rect x="{x}" y="{y + 4}" width="3" height="{h - 8}" fill="{_color(node)}"/>'
+            f'<text x="{x + pad}" y="{y + h // 2}" font-size="{text}">{label}</text>'
+        )
+    out.append("</svg>")
+    return "".join(out)
+
+
+def render_thumbnail(tree: MindMapNode, width: int = 240, max_depth: int = 3) -> str:
+    """Miniatura sem texto dos primeiros níveis, com ``width`` pixels de largura."""
+    layout = layout_tree(tree, max_depth=max_depth)
+    height = max(1, round(width * layout.height / layout.width))
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {round(layout.width)} {round(layout.height)}" preserveAspectRatio="xMidYMid meet">',
+        f'<path d="{_edges(layout)}" fill="none" stroke="#3a3a4a" stroke-width="4"/>',
+    ]
+    for i, node in enumerate(layout.nodes):
+        out.append(
+            f'<rect x="{round(layout.x[i])}" y="{round(layout.y[i])}" '
+            f'width="{round(layout.w[i])}" height="{round(layout.h[i])}" rx="12" fill="{_color(node)}"/>'
+        )
+    out.append("</svg>")
+    return "".join(out)
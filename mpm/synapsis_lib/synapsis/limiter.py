@@ -0,0 +1,254 @@
+"""Limite adaptativo de chamadas simultâneas à LLM.
+
+``AdaptiveLimiter`` ajusta o limite de chamadas em andamento pelo que
+observa do provider (AIMD com gradiente de latência):
+
+- Aumento aditivo: com a latência estável e o limite em uso, o limite
+  sobe ~1 a cada ``limit`` chamadas bem-sucedidas.
+- Redução multiplicativa: ``limit * backoff`` em sobrecarga (429,
+  timeout) ou quando a latência recente passa de ``tolerance`` vezes a
+  latência de referência.
+
+A latência de uma LLM cresce com a resposta, então cada amostra é
+dividida pelos tokens gerados (``measure``, por padrão a estimativa de
+~4 caracteres por token): compara-se tempo por token, e uma resposta
+curta e rápida não parece a velocidade normal do provider. A referência
+é um percentil baixo (``percentile``) das últimas ``window`` amostras,
+não a menor já vista: um valor atípico não a prende, e ela acompanha
+mudanças do provider. Amostras e referência são separadas por ``key``
+(ex: modelo ou perfil).
+
+Só chamadas iniciadas depois da última redução podem reduzir de novo, então
+uma rajada de 429 da mesma leva corta o limite uma vez, não N vezes.
+
+    limiter = AdaptiveLimiter(initial=4, max_limit=32)
+    generate("Python", limiter.wrap(my_llm))
+"""
+import time
+import asyncio
+import functools
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .types import LLMFunc, AsyncLLMFunc
+from .tracing import estimate_tokens
+
+
+def is_overload(error: BaseException) -> bool:
+    """Erro de sobrecarga do provider: HTTP 429 ou timeout.
+    
+    Reconhece ``status_code == 429`` (Groq, OpenAI, httpx), exceções de
+    timeout e classes cujo nome contenha ``RateLimit`` ou ``Timeout``.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    name = type(error).__name__
+    return "RateLimit" in name or "Timeout" in name
+
+
+class AdaptiveLimiter:
+    """Limite de concorrência AIMD guiado por latência e sobrecarga."""
+    
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.3,
+        window: int = 500,
+        percentile: float = 0.1,
+        min_samples: int = 10,
+        measure: Optional[Callable[[str], float]] = estimate_tokens,
+        classify: Callable[[BaseException], bool] = is_overload,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            initial: Limite inicial
+            min_limit: Limite mínimo
+            max_limit: Limite máximo
+            backoff: Fator aplicado ao limite em cada redução
+            tolerance: Latência recente / referência acima da qual reduz
+            smoothing: Peso de cada amostra na latência recente
+            window: Amostras recentes, por key, de onde sai a referência
+            percentile: Percentil dessas amostras usado como referência
+            min_samples: Amostras de uma key antes que a latência possa
+                reduzir o limite
+            measure: Tamanho de uma resposta (ex: tokens) pelo qual a
+                latência é dividida em ``wrap``; None compara a latência
+                total
+            classify: Decide se uma exceção indica sobrecarga
+            clock: Relógio (substituível em testes)
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.window = window
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.measure = measure
+        self.classify = classify
+        self.clock = clock
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        # key -> latência recente (EWMA) e últimas amostras
+        self._recent: Dict[Hashable, Optional[float]] = {}
+        self._samples: Dict[Hashable, Deque[float]] = {}
+        self._last_drop = float("-inf")
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    @property
+    def limit(self) -> int:
+        """Limite atual de chamadas em andamento."""
+        return int(self._limit)
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    def acquire(self) -> float:
+        """Aguarda vaga abaixo do limite. Retorna o instante de início."""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+            return self.clock()
+    
+    async def acquire_async(self) -> float:
+        """Como acquire, sem bloquear o event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return self.clock()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+    
+    def start(self) -> float:
+        """Conta uma chamada sem esperar vaga (quem chama já limita)."""
+        with self._cond:
+            self._in_flight += 1
+            return self.clock()
+    
+    def release(
+        self,
+        started: float,
+        error: Optional[BaseException] = None,
+        key: Hashable = None,
+        size: float = 1
+    ) -> None:
+        """Encerra uma chamada e ajusta o limite pelo resultado.
+        
+        Args:
+            started: Valor retornado por acquire/start
+            error: Exceção da chamada, se houve
+            key: Classe de chamadas com latência comparável
+            size: Tamanho da resposta (ex: tokens); a amostra é a
+                latência dividida por ele
+        """
+        now = self.clock()
+        with self._cond:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+            if error is not None:
+                if self.classify(error):
+                    self._drop(started, now)
+            else:
+                self._sample(key, (now - started) / max(size, 1), started, now, saturated)
+            self._wake()
+    
+    def _wake(self) -> None:
+        """Acorda quem espera vaga (threads e tarefas). Chamado com o lock."""
+        self._cond.notify_all()
+        waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(lambda w=waiter: w.done() or w.set_result(None))
+    
+    def baseline(self, key: Hashable = None) -> Optional[float]:
+        """Latência de referência de ``key`` (None sem amostras)."""
+        with self._cond:
+            return self._baseline(key)
+    
+    def _baseline(self, key: Hashable) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+    
+    def _sample(self, key: Hashable, latency: float, started: float, now: float, saturated: bool) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(latency)
+        
+        fast = self._recent.get(key)
+        if fast is None:
+            self._recent[key] = latency
+            return
+        self._recent[key] = fast = fast + self.smoothing * (latency - fast)
+        
+        if len(samples) >= self.min_samples and fast > self.tolerance * self._baseline(key):
+            self._drop(started, now)
+        elif saturated:
+            # +1 a cada `limit` sucessos com o limite todo em uso
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+    
+    def _drop(self, started: float, now: float) -> None:
+        if started < self._last_drop:
+            return
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        self._last_drop = now
+        # A latência recente recomeça na nova carga
+        for key in self._recent:
+            self._recent[key] = None
+    
+    def wrap(self, llm: LLMFunc, gate: bool = True, key: Hashable = None) -> LLMFunc:
+        """Envolve uma LLM: cada chamada aguarda vaga e alimenta o limite.
+        
+        Args:
+            llm: Função LLM
+            gate: False só mede (para quando outro agendador já respeita
+                ``limit``)
+            key: Classe das chamadas para a latência de referência
+        """
+        @functools.wraps(llm)
+        def call(prompt: str) -> str:
+            started = self.acquire() if gate else self.start()
+            try:
+                response = llm(prompt)
+            except BaseException as e:
+                self.release(started, e, key)
+                raise
+            self.release(started, key=key, size=self._size(response))
+            return response
+        return call
+    
+    def wrap_async(self, llm: AsyncLLMFunc, gate: bool = True, key: Hashable = None) -> AsyncLLMFunc:
+        """Como wrap, para LLM assíncrona."""
+        @functools.wraps(llm)
+        async def call(prompt: str) -> str:
+            started = await self.acquire_async() if gate else self.start()
+            try:
+                response = await llm(prompt)
+            except BaseException as e:
+                self.release(started, e, key)
+                raise
+            self.release(started, key=key, size=self._size(response))
+            return response
+        return call
+    
+    def _size(self, response) -> float:
+        if self.measure is None or not isinstance(response, str):
+            return 1
+        return self.measure(response)
@@ -0,0 +1,77 @@
+"""Poda de árvores a um orçamento de profundidade, fanout e nós.
+
+A LLM nem sempre respeita os limites pedidos no prompt; ``prune_tree``
+os impõe depois da geração. O corte é feito em largura, então com
+``max_nodes`` os níveis de cima são mantidos inteiros antes dos de baixo.
+"""
+from collections import deque
+from typing import Optional, Tuple
+
+from .types import MindMapNode
+
+
+def prune_tree(
+    tree: MindMapNode,
+    max_depth: Optional[int] = None,
+    max_fanout: Optional[int] = None,
+    max_nodes: Optional[int] = None
+) -> Tuple[MindMapNode, int]:
+    """Copia a árvore respeitando os limites (None = sem limite).
+    
+    Args:
+        tree: Raiz da árvore (não é alterada)
+        max_depth: Níveis, contando a raiz
+        max_fanout: Filhos por nó (mantém os primeiros)
+        max_nodes: Total de nós
+        
+    Returns:
+        Tuple com (árvore podada, quantidade de nós removidos)
+    """
+    def copy(node: MindMapNode) -> MindMapNode:
+        return {k: v for k, v in node.items() if k != "children"}
+    
+    root = copy(tree)
+    queue = deque([(tree, root, 1)])
+    total = 0
+    kept = 1
+    while queue:
+        source, target, level = queue.popleft()
+        total += 1
+        children = source.get("children")
+        if not isinstance(children, list):
+            continue
+        children = [c for c in children if isinstance(c, dict)]
+        
+        allowed = children
+        if max_depth is not None and level >= max_depth:
+            allowed = []
+        if max_fanout is not None:
+            allowed = allowed[:max_fanout]
+        if max_nodes is not None:
+            allowed = allowed[:max(0, max_nodes - kept)]
+        
+        if allowed:
+            target["children"] = []
+            for child in allowed:
+                copied = copy(child)
+                target["children"].append(copied)
+                queue.append((child, copied, level + 1))
+            kept += len(allowed)
+        
+        # Subárvores descartadas contam como removidas sem entrar na fila
+        for child in children[len(allowed):]:
+            total += _count(child)
+    
+    return root, total - kept
+
+
+def _count(node: MindMapNode) -> int:
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        children = current.get("children")
+        if isinstance(children, list):
+            stack.extend(c for c in children if isinstance(c, dict))
+    return count
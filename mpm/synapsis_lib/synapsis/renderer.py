@@ -1,7 +1,16 @@
-"""Renderizador HTML com template pirâmide."""
+"""Renderizador HTML com template pirâmide.
+
+``render_tree_string`` monta o HTML inteiro em uma string.
+``iter_tree_html`` produz o mesmo documento em pedaços, com a árvore
+serializada aos poucos (``synapsis.codec.iter_encode_json``), e
+``write_tree_html`` grava esses pedaços em um arquivo temporário
+renomeado no fim: o pico de memória não cresce com o tamanho do HTML.
+"""
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, BaseLoader
+from typing import Iterable, Iterator, Tuple
 
 
 # Template inline para casos sem arquivo externo
@@ -40,6 +49,7 @@ INLINE_TEMPLATE = '''<!DOCTYPE html>
         }
         .badge::before { content: ''; width: 6px; height: 6px; background: #34c759; border-radius: 50%; }
         .mind-map { display: flex; flex-direction: column; align-items: center; padding-top: 60px; }
+        .load-error { max-width: 480px; color: #666; text-align: center; }
         .node { display: flex; flex-direction: column; align-items: center; }
         .node-content {
             display: flex; align-items: center; gap: 10px;
@@ -73,7 +83,8 @@ INLINE_TEMPLATE = '''<!DOCTYPE html>
             content: ''; position: absolute; top: 0; height: 2px;
             background: var(--line-color); left: 50px; right: 50px;
         }
-        .node-children:has(.node-branch:only-child)::before { display: none; }
+        .node-children.single::before { display: none; }
+        .node-connector.hidden { display: none; }
         .node-branch {
             display: flex; flex-direction: column; align-items: center;
             padding: 0 12px; position: relative;
@@ -99,6 +110,12 @@ INLINE_TEMPLATE = '''<!DOCTYPE html>
         }
         .toggle-btn:hover { background: var(--bg-hover); border-color: var(--accent); color: var(--text-primary); }
         .toggle-btn.collapsed { transform: translateX(-50%) rotate(-90deg); }
+        .more-btn {
+            padding: 8px 14px; background: var(--bg-card);
+            border: 1px dashed var(--border-color); border-radius: 12px;
+            color: var(--text-secondary); cursor: pointer; font-size: 12px;
+        }
+        .more-btn:hover { background: var(--bg-hover); border-color: var(--accent); color: var(--text-primary); }
     </style>
 </head>
 <body>
@@ -107,11 +124,39 @@ INLINE_TEMPLATE = '''<!DOCTYPE html>
         <div id="mindMap" class="mind-map"></div>
     </div>
     <script>
+        // Árvore no formato colunar de synapsis.codec, ou string base64
+        // do formato comprimido (pack) quando renderizada com packed=True
         const DATA = {{ data | safe }};
         
-        function renderNode(node, isRoot = false) {
+        // Nós construídos antes do primeiro paint; o restante é construído
+        // em lotes, em largura, quando o navegador fica ocioso
+        const INITIAL_NODES = 300;
+        const BATCH_MS = 8;
+        // Linhas com mais irmãos que isso são construídas em janelas,
+        // conforme entram na tela (ou ao clicar em "+N")
+        const ROW_WINDOW = 40;
+        
+        const mindMap = document.getElementById('mindMap');
+        const nodeData = new WeakMap();
+        const moreData = new WeakMap();
+        const queue = [];
+        let head = 0;
+        let built = 0;
+        let scheduled = false;
+        
+        const idle = window.requestIdleCallback
+            ? (cb) => window.requestIdleCallback(cb, { timeout: 100 })
+            : (cb) => setTimeout(() => cb(null), 1);
+            
+        const observer = 'IntersectionObserver' in window
+            ? new IntersectionObserver((entries) => {
+                entries.forEach(entry => { if (entry.isIntersecting) loadMore(entry.target); });
+            }, { rootMargin: '200px' })
+            : null;
+            
+        function renderNode(node, isRoot) {
             const div = document.createElement('div');
-            div.className = `node ${isRoot ? 'node-root' : ''}`;
+            div.className = isRoot ? 'node node-root' : 'node';
             
             const content = document.createElement('div');
             content.className = 'node-content';
@@ -129,41 +174,168 @@ INLINE_TEMPLATE = '''<!DOCTYPE html>
             text.textContent = node.title;
             content.appendChild(text);
             div.appendChild(content);
+            built++;
             
             if (node.children?.length) {
+                const collapsed = node.expanded === false;
+                
                 const toggle = document.createElement('button');
-                toggle.className = `toggle-btn ${node.expanded === false ? 'collapsed' : ''}`;
-                toggle.innerHTML = '▼';
-                toggle.onclick = (e) => {
-                    e.stopPropagation();
-                    const children = div.querySelector(':scope > .node-children');
-                    const connector = div.querySelector(':scope > .node-connector');
-                    if (children) {
-                        children.classList.toggle('hidden');
-                        if (connector) connector.classList.toggle('hidden');
-                        toggle.classList.toggle('collapsed');
-                    }
-                };
+                toggle.className = collapsed ? 'toggle-btn collapsed' : 'toggle-btn';
+                toggle.textContent = '▼';
                 content.appendChild(toggle);
                 
                 const connector = document.createElement('div');
-                connector.className = `node-connector ${node.expanded === false ? 'hidden' : ''}`;
+                connector.className = collapsed ? 'node-connector hidden' : 'node-connector';
                 div.appendChild(connector);
                 
                 const childrenDiv = document.createElement('div');
-                childrenDiv.className = `node-children ${node.expanded === false ? 'hidden' : ''}`;
-                node.children.forEach(child => {
-                    const branch = document.createElement('div');
-                    branch.className = 'node-branch';
-                    branch.appendChild(renderNode(child));
-                    childrenDiv.appendChild(branch);
-                });
+                childrenDiv.className = 'node-children'
+                    + (node.children.length === 1 ? ' single' : '')
+                    + (collapsed ? ' hidden' : '');
                 div.appendChild(childrenDiv);
+                nodeData.set(div, node);
+                
+                // Subárvores colapsadas só são construídas na primeira expansão
+                if (!collapsed) queue.push([node, childrenDiv]);
             }
             return div;
         }
         
-        document.getElementById('mindMap').appendChild(renderNode(DATA, true));
+        function buildRow(node, childrenDiv, start = 0) {
+            const fragment = document.createDocumentFragment();
+            const end = Math.min(node.children.length, start + ROW_WINDOW);
+            
+            for (let i = start; i < end; i++) {
+                const branch = document.createElement('div');
+                branch.className = 'node-branch';
+                branch.appendChild(renderNode(node.children[i], false));
+                fragment.appendChild(branch);
+            }
+            
+            if (end < node.children.length) {
+                const more = document.createElement('div');
+                more.className = 'node-branch node-more';
+                const button = document.createElement('button');
+                button.className = 'more-btn';
+                button.textContent = `+${node.children.length - end}`;
+                more.appendChild(button);
+                moreData.set(more, [node, childrenDiv, end]);
+                fragment.appendChild(more);
+                if (observer) observer.observe(more);
+            }
+            
+            childrenDiv.dataset.built = '1';
+            childrenDiv.appendChild(fragment);
+        }
+        
+        function loadMore(more) {
+            const args = moreData.get(more);
+            if (!args) return;
+            moreData.delete(more);
+            if (observer) observer.unobserve(more);
+            more.remove();
+            buildRow(...args);
+            schedule();
+        }
+        
+        function buildNext() {
+            const [node, childrenDiv] = queue[head++];
+            // Pode já ter sido construída por um clique antes de chegar a vez
+            if (!childrenDiv.dataset.built) buildRow(node, childrenDiv);
+        }
+        
+        function drain(deadline) {
+            scheduled = false;
+            const start = performance.now();
+            const hasTime = deadline && !deadline.didTimeout
+                ? () => deadline.timeRemaining() > 1
+                : () => performance.now() - start < BATCH_MS;
+            while (head < queue.length && hasTime()) buildNext();
+            schedule();
+        }
+        
+        function schedule() {
+            if (head < queue.length) {
+                if (!scheduled) {
+                    scheduled = true;
+                    idle(drain);
+                }
+                return;
+            }
+            queue.length = 0;
+            head = 0;
+            if (!window.synapsisComplete) {
+                window.synapsisComplete = true;
+                performance.mark('synapsis-complete');
+            }
+        }
+        
+        mindMap.addEventListener('click', (e) => {
+            const more = e.target.closest('.node-more');
+            if (more) {
+                loadMore(more);
+                return;
+            }
+            
+            const toggle = e.target.closest('.toggle-btn');
+            if (!toggle) return;
+            e.stopPropagation();
+            
+            const div = toggle.closest('.node');
+            const children = div.lastElementChild;
+            if (!children.dataset.built) {
+                buildRow(nodeData.get(div), children);
+                schedule();
+            }
+            children.classList.toggle('hidden');
+            children.previousElementSibling.classList.toggle('hidden');
+            toggle.classList.toggle('collapsed');
+        });
+        
+        function decodeTree(enc) {
+            const nodes = new Array(enc.title.length);
+            const collapsed = new Set(enc.collapsed || []);
+            const extra = enc.extra || {};
+            for (let i = 0; i < enc.title.length; i++) {
+                const node = { title: enc.title[i] };
+                if (enc.icon[i] >= 0) node.icon = enc.icons[enc.icon[i]];
+                if (enc.color[i] >= 0) node.color = enc.colors[enc.color[i]];
+                if (collapsed.has(i)) node.expanded = false;
+                if (extra[i]) Object.assign(node, extra[i]);
+                nodes[i] = node;
+                if (i > 0) {
+                    const parent = nodes[i - enc.parent[i]];
+                    (parent.children || (parent.children = [])).push(node);
+                }
+            }
+            return nodes[0];
+        }
+        
+        async function loadData(raw) {
+            if (typeof raw === 'string') {
+                if (typeof DecompressionStream === 'undefined') {
+                    throw new Error('Este navegador não descomprime mapas (DecompressionStream); abra em um navegador atualizado.');
+                }
+                // "SYN1" + zlib: DecompressionStream('deflate') lê o formato zlib
+                const bytes = Uint8Array.from(atob(raw), c => c.charCodeAt(0)).subarray(4);
+                const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+                raw = JSON.parse(await new Response(stream).text());
+            }
+            return raw && raw.v ? decodeTree(raw) : raw;
+        }
+        
+        loadData(DATA).then(tree => {
+            const root = renderNode(tree, true);
+            while (head < queue.length && built < INITIAL_NODES) buildNext();
+            mindMap.appendChild(root);
+            performance.mark('synapsis-interactive');
+            schedule();
+        }).catch(err => {
+            const msg = document.createElement('p');
+            msg.className = 'load-error';
+            msg.textContent = err.message;
+            mindMap.appendChild(msg);
+        });
     </script>
 </body>
 </html>'''
@@ -174,25 +346,136 @@ def get_template_path() -> Path:
     return Path(__file__).parent.parent / "templates" / "pyramid.html"
 
 
-def render_html(yaml_str: str, output: str = None) -> str:
-    """Renderiza YAML em HTML standalone. Retorna caminho do arquivo."""
+@lru_cache(maxsize=None)
+def get_template():
+    """Compila o template inline uma vez por processo.
+    
+    Chamar antes de um fork (ex: gunicorn --preload) compartilha o
+    template compilado entre os workers. O jinja2 só é importado
+    aqui, fora do caminho de ``import synapsis``.
+    """
+    from jinja2 import Environment, BaseLoader
+    
+    env = Environment(loader=BaseLoader())
+    return env.from_string(INLINE_TEMPLATE)
+
+
+@lru_cache(maxsize=None)
+def _template_parts() -> Tuple[str, str]:
+    """Template renderizado antes e depois dos dados."""
+    marker = "\0SYNAPSIS_DATA\0"
+    head, tail = get_template().render(data=marker).split(marker)
+    return head, tail
+
+
+def render_html_string(yaml_str: str) -> str:
+    """Renderiza YAML em HTML standalone e retorna o conteúdo."""
     import yaml as pyyaml
-    import json
     
     data = pyyaml.safe_load(yaml_str)
-    data_json = json.dumps(data, ensure_ascii=False)
+    return render_tree_string(data)
+
+
+def render_tree_string(data: dict, packed: bool = False) -> str:
+    """Renderiza a árvore já carregada (dict) em HTML standalone.
+    
+    A árvore é embutida no formato colunar de ``synapsis.codec``
+    (cerca de metade do JSON aninhado). Com ``packed=True`` vai
+    comprimida em base64, várias vezes menor em mapas grandes, e o
+    navegador precisa de ``DecompressionStream`` (sem ele a página
+    mostra um aviso no lugar do mapa).
+    """
+    import json
+    import base64
+    from .codec import encode_tree, pack
+    
+    if not isinstance(data, dict):
+        data_json = json.dumps(data, ensure_ascii=False)
+    elif packed:
+        data_json = json.dumps(base64.b64encode(pack(data)).decode("ascii"))
+    else:
+        data_json = json.dumps(encode_tree(data), ensure_ascii=False, separators=(",", ":"))
+    
+    data_json = _escape_script(data_json)
     
     # Usa template inline com Jinja2
-    env = Environment(loader=BaseLoader())
-    template = env.from_string(INLINE_TEMPLATE)
-    html = template.render(data=data_json)
+    return get_template().render(data=data_json)
+
+
+def _escape_script(data_json: str) -> str:
+    """JSON seguro dentro de ``<script>``.
+    
+    ``<`` só aparece dentro de strings JSON, onde ``\\u003c`` é
+    equivalente; assim "</script>" ou "<!--" em um título não fecham
+    nem alteram o bloco de script.
+    """
+    return data_json.replace("<", "\\u003c")
+
+
+def _base64_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Base64 de uma sequência de bytes, em pedaços."""
+    import base64
+    
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        cut = len(pending) - len(pending) % 3
+        if cut:
+            yield base64.b64encode(pending[:cut]).decode("ascii")
+            pending = pending[cut:]
+    if pending:
+        yield base64.b64encode(pending).decode("ascii")
+
+
+def iter_tree_html(data: dict, packed: bool = False) -> Iterator[str]:
+    """Como ``render_tree_string``, em pedaços.
+    
+    Serve para gravar (``write_tree_html``) ou responder em streaming
+    sem montar o HTML inteiro. Com ``packed=False`` a junção é igual a
+    ``render_tree_string(data)``; com ``packed=True`` os dados
+    comprimidos são os de ``synapsis.codec.iter_pack``.
+    """
+    import json
+    from .codec import iter_encode_json, iter_pack
     
-    # Define output path
-    if output is None:
-        output = "mindmap.html"
+    head, tail = _template_parts()
+    yield head
+    if not isinstance(data, dict):
+        yield _escape_script(json.dumps(data, ensure_ascii=False))
+    elif packed:
+        yield '"'
+        yield from _base64_chunks(iter_pack(data))
+        yield '"'
+    else:
+        for chunk in iter_encode_json(data):
+            yield _escape_script(chunk)
+    yield tail
+
+
+def write_tree_html(data: dict, output: str, packed: bool = False) -> str:
+    """Grava o HTML da árvore em streaming. Retorna caminho do arquivo.
     
+    Escreve em um temporário no mesmo diretório e renomeia no fim:
+    leitores nunca veem arquivo parcial e uma falha não deixa lixo.
+    """
     output_path = Path(output)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(html, encoding="utf-8")
+    tmp = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chunk in iter_tree_html(data, packed):
+                f.write(chunk)
+        os.replace(tmp, output_path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
     
     return str(output_path.absolute())
+
+
+def render_html(yaml_str: str, output: str = None) -> str:
+    """Renderiza YAML em HTML standalone. Retorna caminho do arquivo."""
+    import yaml as pyyaml
+    
+    return write_tree_html(pyyaml.safe_load(yaml_str), output or "mindmap.html")
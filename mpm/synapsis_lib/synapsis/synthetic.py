@@ -0,0 +1,164 @@
+"""Mapas mentais sintéticos para testes de carga e de escala.
+
+Gera árvores ``MindMapNode`` determinísticas (mesma semente, mesma
+árvore) com profundidade, fanout, tamanho de título e mistura de
+unicode/emoji controláveis, o YAML correspondente e uma LLM fake que
+os serve.
+"""
+import random
+from collections import deque
+from typing import Optional, Tuple, Union
+
+import yaml
+
+from .types import MindMapNode
+
+# Paleta do prompt do Expander, por nível
+COLORS = [
+    ["#667eea"],
+    ["#4CAF50", "#2196F3", "#FF9800", "#E91E63"],
+    ["#8BC34A", "#64B5F6", "#FFB74D", "#F06292"],
+    ["#AED581", "#90CAF9", "#FFCC80", "#F48FB1"],
+]
+
+EMOJIS = ["🎯", "📚", "⚡", "📝", "🔧", "💡", "🧩", "🚀", "🧠", "📊", "🔍", "🌱"]
+
+ASCII_WORDS = [
+    "dados", "modelo", "sistema", "rede", "processo", "teoria", "prática",
+    "base", "camada", "fluxo", "estrutura", "agente", "regra", "exemplo",
+]
+
+UNICODE_WORDS = [
+    "ação", "índice", "coração", "naïve", "Ωmega", "データ", "模型", "数据",
+    "модель", "δίκτυο", "شبكة", "נתונים", "ग्राफ", "café",
+]
+
+Range = Union[int, Tuple[int, int]]
+
+
+def _pick(rng: random.Random, value: Range) -> int:
+    if isinstance(value, int):
+        return value
+    return rng.randint(*value)
+
+
+class _NodeFactory:
+    def __init__(self, rng, title_words, emoji_ratio, unicode_ratio, collapsed_ratio):
+        self.rng = rng
+        self.title_words = title_words
+        self.emoji_ratio = emoji_ratio
+        self.unicode_ratio = unicode_ratio
+        self.collapsed_ratio = collapsed_ratio
+        self.count = 0
+    
+    def title(self) -> str:
+        rng = self.rng
+        words = [
+            rng.choice(UNICODE_WORDS if rng.random() < self.unicode_ratio else ASCII_WORDS)
+            for _ in range(_pick(rng, self.title_words))
+        ]
+        if rng.random() < self.emoji_ratio / 4:
+            words.append(rng.choice(EMOJIS))
+        return " ".join(words).capitalize()
+    
+    def node(self, level: int) -> MindMapNode:
+        rng = self.rng
+        self.count += 1
+        node: MindMapNode = {"title": f"{self.title()} {self.count}"}
+        if rng.random() < self.emoji_ratio:
+            node["icon"] = rng.choice(EMOJIS)
+        node["color"] = rng.choice(COLORS[min(level, len(COLORS) - 1)])
+        if level > 0 and rng.random() < self.collapsed_ratio:
+            node["expanded"] = False
+        return node
+
+
+def generate_tree(
+    depth: int = 5,
+    fanout: Range = (5, 8),
+    title_words: Range = (1, 5),
+    emoji_ratio: float = 0.8,
+    unicode_ratio: float = 0.2,
+    collapsed_ratio: float = 0.0,
+    max_nodes: Optional[int] = None,
+    seed: int = 0
+) -> MindMapNode:
+    """Gera árvore sintética, preenchida em largura.
+    
+    Args:
+        depth: Níveis da árvore, contando a raiz
+        fanout: Filhos por nó (fixo ou intervalo ``(min, max)``)
+        title_words: Palavras por título (fixo ou intervalo)
+        emoji_ratio: Fração de nós com ícone emoji
+        unicode_ratio: Fração de palavras não-ASCII nos títulos
+        collapsed_ratio: Fração de nós com ``expanded: false``
+        max_nodes: Limite de nós; a árvore é cortada em largura
+        seed: Semente; mesmos argumentos geram a mesma árvore
+        
+    Returns:
+        Raiz da árvore
+    """
+    factory = _NodeFactory(random.Random(seed), title_words, emoji_ratio, unicode_ratio, collapsed_ratio)
+    root = factory.node(0)
+    queue = deque([(root, 1)])
+    
+    while queue:
+        node, level = queue.popleft()
+        if level >= depth:
+            continue
+        
+        children = []
+        for _ in range(_pick(factory.rng, fanout)):
+            if max_nodes is not None and factory.count >= max_nodes:
+                break
+            child = factory.node(level)
+            children.append(child)
+            queue.append((child, level + 1))
+        
+        if children:
+            node["children"] = children
+        if max_nodes is not None and factory.count >= max_nodes:
+            break
+    
+    return root
+
+
+def tree_to_yaml(tree: MindMapNode, fences: bool = False) -> str:
+    """Serializa árvore em YAML no formato do Expander.
+    
+    Args:
+        tree: Raiz da árvore
+        fences: Envolve em ```yaml, como LLMs costumam responder
+    """
+    text = yaml.safe_dump(
+        tree,
+        allow_unicode=True,
+        sort_keys=False,
+        default_flow_style=False,
+        width=1000,
+    ).strip()
+    if fences:
+        text = f"```yaml\n{text}\n```"
+    return text
+
+
+def generate_yaml(fences: bool = False, **params) -> str:
+    """Atalho: ``tree_to_yaml(generate_tree(**params))``."""
+    return tree_to_yaml(generate_tree(**params), fences=fences)
+
+
+class SyntheticLLM:
+    """LLMFunc fake que responde com um mapa sintético.
+    
+    A resposta é gerada uma vez e repetida a cada chamada; os
+    parâmetros são os de ``generate_tree``.
+    """
+    
+    def __init__(self, fences: bool = False, **params):
+        self.tree = generate_tree(**params)
+        self.response = tree_to_yaml(self.tree, fences=fences)
+        self.calls = 0
+    
+    def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        return self.response
@@ -0,0 +1,144 @@
+"""Hooks de tracing dos estágios do SynapsisBuilder."""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from .types import StageSpan, TraceHook
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens (~4 caracteres por token), sem tokenizer."""
+    return (len(text) + 3) // 4
+
+
+def text_attributes(prefix: str, text: str) -> Dict[str, int]:
+    """Tamanho em bytes e tokens estimados de um texto."""
+    return {
+        f"{prefix}_bytes": len(text.encode("utf-8")),
+        f"{prefix}_tokens": estimate_tokens(text),
+    }
+
+
+def tree_attributes(data) -> Dict[str, int]:
+    """Quantidade de nós e profundidade de uma árvore de mapa mental."""
+    if not isinstance(data, dict):
+        return {"nodes": 0, "depth": 0}
+    
+    nodes = 0
+    depth = 0
+    stack = [(data, 1)]
+    while stack:
+        node, level = stack.pop()
+        nodes += 1
+        depth = max(depth, level)
+        children = node.get("children")
+        if isinstance(children, list):
+            stack.extend((c, level + 1) for c in children if isinstance(c, dict))
+    
+    return {"nodes": nodes, "depth": depth}
+
+
+class Tracer:
+    """Cria spans por estágio e os entrega aos hooks registrados.
+    
+    Sem hooks, ``span`` não mede nada e os atributos caros (contagem
+    de nós, tamanho do prompt) não são calculados.
+    """
+    
+    def __init__(self, hooks: Optional[Iterable[TraceHook]] = None):
+        self.hooks: List[TraceHook] = list(hooks or [])
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.hooks)
+    
+    def add_hook(self, hook: TraceHook) -> None:
+        self.hooks.append(hook)
+    
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Mede um estágio. O bloco recebe o dict de atributos e pode completá-lo."""
+        if not self.hooks:
+            yield attributes
+            return
+        
+        start = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span: StageSpan = {
+                "stage": stage,
+                "start": start,
+                "duration": time.perf_counter() - t0,
+                "attributes": attributes,
+            }
+            for hook in self.hooks:
+                hook(span)
+
+
+class InMemoryRecorder:
+    """Hook que guarda os spans em memória (testes e diagnóstico)."""
+    
+    def __init__(self):
+        self.spans: List[StageSpan] = []
+    
+    def __call__(self, span: StageSpan) -> None:
+        self.spans.append(span)
+    
+    def stages(self) -> List[str]:
+        """Nomes dos estágios na ordem em que terminaram."""
+        return [span["stage"] for span in self.spans]
+    
+    def by_stage(self, stage: str) -> List[StageSpan]:
+        return [span for span in self.spans if span["stage"] == stage]
+    
+    def total(self, stage: str) -> float:
+        """Soma das durações de um estágio, em segundos."""
+        return sum(span["duration"] for span in self.by_stage(stage))
+    
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class OpenTelemetryEmitter:
+    """Hook que reemite cada estágio como span OpenTelemetry.
+    
+    Os spans são criados com os tempos já medidos, então aparecem
+    como filhos do span ativo no momento em que o estágio termina.
+    
+    Requer ``opentelemetry-api`` (``pip install synapsis[otel]``) se
+    nenhum tracer for passado.
+    """
+    
+    def __init__(self, tracer=None, prefix: str = "synapsis."):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError(
+                    "OpenTelemetryEmitter requer opentelemetry-api: pip install synapsis[otel]"
+                )
+            tracer = trace.get_tracer("synapsis")
+        self.tracer = tracer
+        self.prefix = prefix
+    
+    def __call__(self, span: StageSpan) -> None:
+        attributes = {
+            f"{self.prefix}{key}": value
+            for key, value in span["attributes"].items()
+            if key != "error"
+        }
+        if "error" in span["attributes"]:
+            attributes["error.type"] = span["attributes"]["error"]
+        
+        start_ns = int(span["start"] * 1e9)
+        otel_span = self.tracer.start_span(
+            f"{self.prefix}{span['stage']}",
+            start_time=start_ns,
+            attributes=attributes,
+        )
+        otel_span.end(end_time=start_ns + int(span["duration"] * 1e9))
@@ -0,0 +1,240 @@
+"""Árvore de mapa mental em arrays paralelos.
+
+``MindMapTree`` guarda os nós em pré-ordem, um índice por nó, em vez de
+um dict por nó com listas de filhos aninhadas::
+
+    title         ["Raiz", "A", "A.1", "B"]
+    parent        [-1, 0, 1, 0]
+    first_child   [1, 2, -1, -1]
+    next_sibling  [-1, 3, -1, -1]
+    icon/color    índices em ``icons``/``colors`` (-1 = ausente)
+
+Em pré-ordem a subárvore de um nó é o intervalo contíguo
+``[i, end(i))``, o que torna percurso e recorte simples fatias.
+Os índices ficam em ``array('i')`` (4 bytes por nó e campo).
+"""
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .types import MindMapNode
+
+_KNOWN = ("title", "icon", "color", "children")
+
+
+def _intern(palette: List[str], index: Dict[str, int], value) -> int:
+    if value is None:
+        return -1
+    value = str(value)
+    if value not in index:
+        index[value] = len(palette)
+        palette.append(value)
+    return index[value]
+
+
+class MindMapTree:
+    """Árvore compacta, convertida de e para ``MindMapNode``."""
+    
+    __slots__ = (
+        "title", "icon", "color", "parent", "first_child", "next_sibling",
+        "icons", "colors", "collapsed", "extra",
+    )
+    
+    def __init__(self):
+        self.title: List[str] = []
+        self.icon = array("i")
+        self.color = array("i")
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.icons: List[str] = []
+        self.colors: List[str] = []
+        # Nós com expanded: false e chaves fora do schema, por índice
+        self.collapsed: set = set()
+        self.extra: Dict[int, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.title)
+    
+    def __repr__(self) -> str:
+        raiz = self.title[0] if self.title else None
+        return f"MindMapTree({raiz!r}, {len(self)} nós)"
+    
+    @classmethod
+    def from_dict(cls, root: MindMapNode) -> "MindMapTree":
+        """Converte árvore aninhada (percurso iterativo, sem recursão)."""
+        if not isinstance(root, dict):
+            raise TypeError("Raiz deve ser um dicionário")
+        
+        tree = cls()
+        icon_index: Dict[str, int] = {}
+        color_index: Dict[str, int] = {}
+        # Último filho já adicionado de cada nó, para encadear irmãos
+        last_child: Dict[int, int] = {}
+        
+        stack = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            i = len(tree.title)
+            
+            tree.title.append(str(node.get("title", "")))
+            tree.icon.append(_intern(tree.icons, icon_index, node.get("icon")))
+            tree.color.append(_intern(tree.colors, color_index, node.get("color")))
+            tree.parent.append(parent)
+            tree.first_child.append(-1)
+            tree.next_sibling.append(-1)
+            
+            if parent >= 0:
+                if parent in last_child:
+                    tree.next_sibling[last_child[parent]] = i
+                else:
+                    tree.first_child[parent] = i
+                last_child[parent] = i
+            
+            if node.get("expanded") is False:
+                tree.collapsed.add(i)
+            others = {
+                k: v for k, v in node.items()
+                if k not in _KNOWN and not (k == "expanded" and v is False)
+            }
+            if others:
+                tree.extra[i] = others
+            
+            children = node.get("children")
+            if isinstance(children, list):
+                for child in reversed(children):
+                    if isinstance(child, dict):
+                        stack.append((child, i))
+        
+        return tree
+    
+    @classmethod
+    def from_encoded(cls, encoded: Dict[str, Any]) -> "MindMapTree":
+        """Converte o formato colunar de ``synapsis.codec`` (mesma ordem)."""
+        from .codec import CodecError, VERSION
+        
+        if not isinstance(encoded, dict) or encoded.get("v") != VERSION:
+            raise CodecError("Versão de codificação não suportada")
+        
+        tree = cls()
+        n = len(encoded["title"])
+        tree.title = list(encoded["title"])
+        tree.icon = array("i", encoded["icon"])
+        tree.color = array("i", encoded["color"])
+        tree.icons = list(encoded["icons"])
+        tree.colors = list(encoded["colors"])
+        tree.collapsed = set(encoded.get("collapsed", ()))
+        tree.extra = {int(k): dict(v) for k, v in encoded.get("extra", {}).items()}
+        tree.parent = array("i", (i - d if i else -1 for i, d in enumerate(encoded["parent"])))
+        tree.first_child = array("i", [-1]) * n
+        tree.next_sibling = array("i", [-1]) * n
+        
+        # De trás para frente, cada filho vira o primeiro do pai
+        for i in range(n - 1, 0, -1):
+            p = tree.parent[i]
+            tree.next_sibling[i] = tree.first_child[p]
+            tree.first_child[p] = i
+        return tree
+    
+    def node(self, i: int) -> MindMapNode:
+        """Campos de um nó, sem os filhos."""
+        node: MindMapNode = {"title": self.title[i]}
+        if self.icon[i] >= 0:
+            node["icon"] = self.icons[self.icon[i]]
+        if self.color[i] >= 0:
+            node["color"] = self.colors[self.color[i]]
+        if i in self.collapsed:
+            node["expanded"] = False
+        if i in self.extra:
+            node.update(self.extra[i])
+        return node
+    
+    def to_dict(self, i: int = 0) -> MindMapNode:
+        """Reconstrói a árvore aninhada a partir do nó ``i``."""
+        nodes: Dict[int, MindMapNode] = {}
+        for j in self.iter_preorder(i):
+            nodes[j] = node = self.node(j)
+            if j != i:
+                nodes[self.parent[j]].setdefault("children", []).append(node)
+        return nodes[i]
+    
+    def children(self, i: int) -> Iterator[int]:
+        """Índices dos filhos de ``i``, em ordem."""
+        child = self.first_child[i]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+    
+    def end(self, i: int) -> int:
+        """Fim (exclusivo) do intervalo da subárvore de ``i``."""
+        while i >= 0:
+            if self.next_sibling[i] >= 0:
+                return self.next_sibling[i]
+            i = self.parent[i]
+        return len(self.title)
+    
+    def iter_preorder(self, i: int = 0) -> range:
+        """Índices da subárvore de ``i`` em pré-ordem."""
+        return range(i, self.end(i))
+    
+    def iter_bfs(self, i: int = 0) -> Iterator[int]:
+        """Índices da subárvore de ``i`` em largura."""
+        queue = deque([i])
+        while queue:
+            j = queue.popleft()
+            yield j
+            queue.extend(self.children(j))
+    
+    def depths(self) -> array:
+        """Profundidade de cada nó (raiz = 1)."""
+        depth = array("i", [0]) * len(self.title)
+        for i in range(len(self.title)):
+            p = self.parent[i]
+            depth[i] = 1 if p < 0 else depth[p] + 1
+        return depth
+    
+    def path(self, i: int) -> List[str]:
+        """Títulos da raiz até ``i``."""
+        titles = []
+        while i >= 0:
+            titles.append(self.title[i])
+            i = self.parent[i]
+        titles.reverse()
+        return titles
+    
+    def find(self, path: Sequence[str]) -> Optional[int]:
+        """Índice do nó com a sequência de títulos ``path`` a partir da raiz.
+        
+        Returns:
+            Índice do nó ou None se o caminho não existir
+        """
+        if not self.title or not path or self.title[0] != path[0]:
+            return None
+        i = 0
+        for title in path[1:]:
+            i = next((c for c in self.children(i) if self.title[c] == title), -1)
+            if i < 0:
+                return None
+        return i
+    
+    def subtree(self, i: int) -> "MindMapTree":
+        """Cópia da subárvore de ``i``, com ``i`` como raiz."""
+        start, stop = i, self.end(i)
+        
+        def shift(values: array) -> array:
+            return array("i", (v - start if v >= 0 else -1 for v in values[start:stop]))
+        
+        tree = MindMapTree()
+        tree.title = self.title[start:stop]
+        tree.icon = self.icon[start:stop]
+        tree.color = self.color[start:stop]
+        tree.parent = shift(self.parent)
+        tree.first_child = shift(self.first_child)
+        tree.next_sibling = shift(self.next_sibling)
+        tree.parent[0] = -1
+        tree.next_sibling[0] = -1
+        tree.icons = list(self.icons)
+        tree.colors = list(self.colors)
+        tree.collapsed = {j - start for j in self.collapsed if start <= j < stop}
+        tree.extra = {j - start: v for j, v in self.extra.items() if start <= j < stop}
+        return tree
@@ -1,9 +1,12 @@
 """Tipos base da biblioteca Synapsis."""
-from typing import Callable, TypedDict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, TypedDict, List, Optional
 
 # Função LLM: recebe prompt, retorna resposta
 LLMFunc = Callable[[str], str]
 
+# Função LLM assíncrona: recebe prompt, retorna awaitable da resposta
+AsyncLLMFunc = Callable[[str], Awaitable[str]]
+
 
 class MindMapNode(TypedDict, total=False):
     """Estrutura de um nó do mapa mental."""
@@ -19,3 +22,23 @@ class ValidationResult(TypedDict):
     valid: bool
     errors: List[str]
     cleaned: Optional[str]
+
+
+class StageSpan(TypedDict):
+    """Span de um estágio do builder, entregue aos hooks de tracing."""
+    stage: str
+    start: float
+    duration: float
+    attributes: Dict[str, Any]
+
+
+# Hook de tracing: recebe o span de cada estágio concluído
+TraceHook = Callable[[StageSpan], None]
+
+
+class TokenRecord(TypedDict):
+    """Tokens de uma chamada à LLM, contados por agents.TokenUsage."""
+    template: str
+    prompt_tokens: int
+    prefix_tokens: int
+    completion_tokens: int
@@ -1,7 +1,6 @@
 """Validador e sanitizador de YAML."""
 import re
 from typing import Tuple
-import yaml
 
 
 class ValidationError(Exception):
@@ -31,6 +30,8 @@ def sanitize(raw: str) -> str:
 
 def validate_schema(yaml_str: str) -> Tuple[bool, list]:
     """Valida estrutura YAML do mapa mental. Retorna (válido, erros)."""
+    import yaml
+    
     errors = []
     
     try:
@@ -1,6 +1,8 @@
 """Testes dos agentes."""
+import asyncio
 import pytest
-from synapsis import Planner, Expander
+from synapsis import Planner, Expander, SynapsisBuilder, PromptTemplate, TokenUsage, register_prompt, get_prompt
+from synapsis.agents import PROMPTS, _EXPANDER_BASE
 
 
 class TestPlanner:
@@ -46,3 +48,121 @@ class TestExpander:
         expander.expand("Python", style="técnico e detalhado")
         
         assert "técnico e detalhado" in calls[0]
+
+    def test_expand_async_with_async_llm(self, mock_llm):
+        async def async_llm(prompt):
+            await asyncio.sleep(0)
+            return mock_llm(prompt)
+        
+        expander = Expander(async_llm)
+        result = asyncio.run(expander.expand_async("Python"))
+        assert result == mock_llm("")
+    
+    def test_expand_async_with_sync_llm(self, mock_llm):
+        expander = Expander(mock_llm)
+        result = asyncio.run(expander.expand_async("Python"))
+        assert result == mock_llm("")
+
+
+class TestPromptTemplates:
+    def test_registry(self):
+        assert get_prompt("planner").key == "planner@v1"
+        assert get_prompt("expander") is Expander(lambda p: p).template
+        assert Expander(lambda p: p, version=2).template.key == "expander@v2"
+        with pytest.raises(KeyError):
+            get_prompt("inexistente")
+    
+    def test_static_prefix_first(self):
+        expander = Expander(lambda p: p)
+        a = expander.build_prompt("Python", plan="title: Python", style="técnico")
+        b = expander.build_prompt("Culinária")
+        prefix = expander.template.prefix
+        assert a.startswith(prefix) and b.startswith(prefix)
+        assert "Python" not in prefix
+        assert a.index("TEMA: Python") > len(prefix)
+    
+    def test_expander_limits(self):
+        expander = Expander(lambda p: p)
+        default = expander.build_prompt("Python")
+        assert "- 5-8 filhos por nó" in default and "- 4-5 níveis de profundidade" in default
+        prompt = expander.build_prompt("Python", max_depth=3, max_fanout=4)
+        assert "- 1-4 filhos por nó" in prompt and "- 2-3 níveis" in prompt
+        assert "- 1 níveis" in expander.build_prompt("Python", max_depth=1)
+        assert prompt.startswith(expander.template.prefix)
+    
+    def test_versions_differ(self):
+        # Cada versão registrada muda o texto enviado à LLM
+        for versions in PROMPTS.values():
+            texts = [template.text for template in versions.values()]
+            assert len(set(texts)) == len(texts)
+        assert get_prompt("expander", 3).prefix.startswith(_EXPANDER_BASE)
+    
+    def test_v1_registered(self):
+        assert get_prompt("planner", 1).key == "planner@v1"
+        prompt = Expander(lambda p: p, version=1).build_prompt("Python", style="técnico")
+        assert "5-8 filhos por nó" in prompt
+        assert prompt.index("TEMA: Python") < prompt.index("ESTILO: técnico")
+    
+    def test_prompt_attribute(self):
+        # Compatível com o PROMPT de classe da 1.0.0 (string de str.format)
+        assert Planner.PROMPT.format(topic="Python") == Planner(lambda p: p).build_prompt("Python")
+        assert Expander(lambda p: p, version=1).PROMPT == get_prompt("expander", 1).text
+        template = PromptTemplate("teste", 1, prefix="{literal}\n", suffix="{topic}")
+        assert template.text.format(topic="X") == template.render(topic="X")
+    
+    def test_custom_prompt_subclass(self):
+        class Curto(Planner):
+            PROMPT = "Resuma {topic}"
+        
+        planner = Curto(lambda p: p)
+        assert planner.create("Python") == "Resuma Python"
+        assert planner.PROMPT == "Resuma {topic}"
+    
+    def test_new_version(self):
+        template = PromptTemplate("teste", 1, prefix="Instruções {literais}\n", suffix="TEMA: {topic}")
+        try:
+            register_prompt(template)
+            register_prompt(PromptTemplate("teste", 2, prefix="v2\n", suffix="{topic}"))
+            assert get_prompt("teste").version == 2
+            assert get_prompt("teste", 1) is template
+            assert template.render(topic="X") == "Instruções {literais}\nTEMA: X"
+        finally:
+            PROMPTS.pop("teste", None)
+
+
+class TestTokenUsage:
+    def test_counts_per_call(self, mock_llm):
+        usage = TokenUsage(tokenizer=lambda text: len(text.split()))
+        planner = Planner(mock_llm, usage=usage)
+        planner.create("Python")
+        
+        record = usage.records[0]
+        assert record["template"] == "planner@v1"
+        assert record["prompt_tokens"] == len(planner.build_prompt("Python").split())
+        assert record["prefix_tokens"] == len(planner.template.prefix.split())
+        assert record["completion_tokens"] == len(mock_llm("").split())
+    
+    def test_report(self, mock_llm):
+        usage = TokenUsage()
+        builder = SynapsisBuilder(mock_llm, usage=usage)
+        builder.plan("Python").expand("Python")
+        asyncio.run(Expander(mock_llm, usage=usage).expand_async("Go"))
+        
+        report = usage.report()
+        assert report["planner@v1"]["calls"] == 1
+        assert report["expander@v3"]["calls"] == 2
+        assert 0.5 < report["expander@v3"]["prefix_ratio"] < 1
+    
+    def test_max_records(self, mock_llm):
+        usage = TokenUsage(max_records=2)
+        expander = Expander(mock_llm, usage=usage)
+        for _ in range(5):
+            expander.expand("Python")
+        assert len(usage.records) == 2
+        assert usage.report()["expander@v3"]["calls"] == 5
+    
+    def test_hooks(self, mock_llm):
+        seen = []
+        usage = TokenUsage(hooks=[seen.append])
+        Expander(mock_llm, usage=usage).expand("Python")
+        assert seen == list(usage.records)
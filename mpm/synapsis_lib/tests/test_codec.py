@@ -0,0 +1,154 @@
+"""Testes da codificação compacta de árvores."""
+import json
+import base64
+import pytest
+from synapsis import encode_tree, decode_tree, pack, unpack, iter_encode_json, iter_pack, CodecError
+from synapsis import iter_tree_html, write_tree_html
+from synapsis.codec import MAGIC
+from synapsis.renderer import render_tree_string
+from synapsis.synthetic import generate_tree
+
+
+TREE = {
+    "title": "Raiz",
+    "icon": "🎯",
+    "color": "#667eea",
+    "children": [
+        {
+            "title": "A",
+            "icon": "📚",
+            "color": "#4CAF50",
+            "expanded": False,
+            "children": [{"title": "A.1", "color": "#8BC34A"}],
+        },
+        {"title": "B", "icon": "📚", "color": "#4CAF50"},
+    ],
+}
+
+
+class TestEncodeTree:
+    def test_roundtrip(self):
+        assert decode_tree(encode_tree(TREE)) == TREE
+    
+    def test_preorder_columns(self):
+        encoded = encode_tree(TREE)
+        assert encoded["title"] == ["Raiz", "A", "A.1", "B"]
+        assert encoded["parent"] == [0, 1, 1, 3]
+        assert encoded["icons"] == ["🎯", "📚"]
+        assert encoded["icon"] == [0, 1, -1, 1]
+        assert encoded["collapsed"] == [1]
+        assert "extra" not in encoded
+    
+    def test_extra_keys(self):
+        tree = {"title": "Raiz", "note": "x", "expanded": True, "children": [{"title": "A", "link": "y"}]}
+        encoded = encode_tree(tree)
+        assert encoded["extra"] == {"0": {"note": "x", "expanded": True}, "1": {"link": "y"}}
+        assert decode_tree(encoded) == tree
+    
+    def test_synthetic_roundtrip(self):
+        tree = generate_tree(depth=5, fanout=(2, 6), unicode_ratio=0.5, collapsed_ratio=0.2, seed=4)
+        assert decode_tree(encode_tree(tree)) == tree
+    
+    def test_smaller_than_json(self):
+        tree = generate_tree(depth=5, fanout=(5, 8), seed=1)
+        nested = len(json.dumps(tree, ensure_ascii=False))
+        columnar = len(json.dumps(encode_tree(tree), ensure_ascii=False))
+        assert columnar < nested * 0.6
+    
+    def test_invalid(self):
+        with pytest.raises(CodecError):
+            encode_tree(["não", "é", "árvore"])
+        with pytest.raises(CodecError):
+            decode_tree({"v": 99})
+        with pytest.raises(CodecError):
+            decode_tree({"v": 1, "title": ["a"]})
+
+
+class TestPack:
+    def test_roundtrip(self):
+        data = pack(TREE)
+        assert data.startswith(MAGIC)
+        assert unpack(data) == TREE
+    
+    def test_compression(self):
+        tree = generate_tree(depth=5, fanout=(5, 8), seed=1)
+        assert len(pack(tree)) * 5 < len(json.dumps(tree, ensure_ascii=False).encode("utf-8"))
+    
+    def test_invalid(self):
+        with pytest.raises(CodecError):
+            unpack(b"XXXX")
+        with pytest.raises(CodecError):
+            unpack(MAGIC + b"lixo")
+
+
+class TestRenderEmbedding:
+    def test_columnar_by_default(self):
+        html = render_tree_string(TREE)
+        assert '"title":["Raiz","A","A.1","B"]' in html
+        assert "decodeTree" in html
+    
+    def test_packed(self):
+        html = render_tree_string(TREE, packed=True)
+        assert base64.b64encode(pack(TREE)).decode("ascii") in html
+        assert "DecompressionStream" in html
+    
+    def test_script_escape(self):
+        html = render_tree_string({"title": "</script><b>x</b>"})
+        assert "</script><b>" not in html
+    
+    def test_no_raw_lt_in_data(self):
+        tree = {"title": "<!-- <script>", "children": [{"title": "a < b"}]}
+        for html in (render_tree_string(tree), "".join(iter_tree_html(tree))):
+            embedded = html.split("const DATA = ")[1].split(";\n")[0]
+            assert "<" not in embedded
+            assert decode_tree(json.loads(embedded)) == tree
+    
+    def test_packed_checks_support(self):
+        html = render_tree_string(TREE, packed=True)
+        assert "typeof DecompressionStream === 'undefined'" in html
+        assert ".catch(" in html
+
+
+class TestStreaming:
+    TREE = generate_tree(depth=5, fanout=(2, 6), unicode_ratio=0.5, emoji_ratio=0.3, collapsed_ratio=0.2, seed=5)
+    
+    def test_json_matches_encode_tree(self):
+        tree = {**self.TREE, "note": "x", "children": self.TREE["children"] + [{"title": "Z", "link": "y"}]}
+        for chunk_size in (1, 7, 1000):
+            text = "".join(iter_encode_json(tree, chunk_size=chunk_size))
+            assert text == json.dumps(encode_tree(tree), ensure_ascii=False, separators=(",", ":"))
+    
+    def test_json_in_chunks(self):
+        chunks = list(iter_encode_json(self.TREE, chunk_size=10))
+        assert max(len(c) for c in chunks) < len("".join(chunks)) / 10
+    
+    def test_pack_roundtrip(self):
+        data = b"".join(iter_pack(self.TREE))
+        assert data.startswith(MAGIC)
+        assert unpack(data) == self.TREE
+    
+    def test_html_matches_string(self):
+        assert "".join(iter_tree_html(self.TREE)) == render_tree_string(self.TREE)
+        html = "".join(iter_tree_html(self.TREE, packed=True))
+        encoded = html.split("const DATA = ")[1].split(";")[0]
+        assert unpack(base64.b64decode(json.loads(encoded))) == self.TREE
+    
+    def test_html_script_escape(self):
+        html = "".join(iter_tree_html({"title": "</script><b>x</b>", "children": [{"title": "</"}]}))
+        assert "</script><b>" not in html
+        assert "\\u003c/script>" in html
+    
+    def test_write_atomic(self, tmp_path):
+        output = tmp_path / "sub" / "mapa.html"
+        path = write_tree_html(self.TREE, str(output))
+        assert output.read_text(encoding="utf-8") == render_tree_string(self.TREE)
+        assert path == str(output.absolute())
+        assert [p.name for p in output.parent.iterdir()] == ["mapa.html"]
+    
+    def test_write_failure_keeps_previous(self, tmp_path):
+        output = tmp_path / "mapa.html"
+        output.write_text("anterior", encoding="utf-8")
+        with pytest.raises(TypeError):
+            write_tree_html({"title": "x", "note": object()}, str(output))
+        assert output.read_text(encoding="utf-8") == "anterior"
+        assert [p.name for p in tmp_path.iterdir()] == ["mapa.html"]
@@ -1,4 +1,5 @@
 """Testes do core (Builder e generate)."""
+import asyncio
 import pytest
 import tempfile
 from pathlib import Path
@@ -33,6 +34,40 @@ class TestSynapsisBuilder:
             assert "Synapsis" in content
             assert "renderNode" in content
     
+    def test_to_html(self, mock_llm):
+        builder = SynapsisBuilder(mock_llm)
+        html = builder.expand("Python").validate().to_html()
+        assert html.startswith("<!DOCTYPE html>")
+        assert "Conceito 1" in html
+    
+    def test_to_html_without_yaml(self, mock_llm):
+        with pytest.raises(ValueError):
+            SynapsisBuilder(mock_llm).to_html()
+    
+    def test_template_lazy_dom(self):
+        from synapsis.renderer import render_tree_string
+        html = render_tree_string({"title": "Raiz"})
+        assert ":has(" not in html
+        assert "requestIdleCallback" in html
+        assert "synapsis-interactive" in html
+    
+    def test_render_tree_string(self):
+        from synapsis.renderer import render_html_string, render_tree_string
+        assert render_tree_string({"title": "Raiz"}) == render_html_string("title: Raiz")
+    
+    def test_expand_async(self, mock_llm):
+        async def async_llm(prompt):
+            return mock_llm(prompt)
+        
+        async def run():
+            builder = SynapsisBuilder(async_llm)
+            await builder.plan_async("Python")
+            await builder.expand_async("Python")
+            return builder.validate().to_html()
+        
+        html = asyncio.run(run())
+        assert "Conceito 1" in html
+    
     def test_plan_and_expand(self, mock_llm):
         builder = SynapsisBuilder(mock_llm)
         yaml = builder.plan_and_expand("Python", style="conciso")
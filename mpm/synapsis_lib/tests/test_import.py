@@ -0,0 +1,36 @@
+"""Dependências carregadas sob demanda.
+
+O tempo de importação é medido em ``python -m benchmarks --filtro import``;
+aqui só se verifica, em processo novo, o que cada import traz.
+"""
+import sys
+import subprocess
+import pytest
+import synapsis
+
+IMPORTS = ("import synapsis", "from synapsis import SynapsisBuilder")
+
+HEAVY = ("jinja2", "yaml", "groq", "opentelemetry")
+
+
+def _loaded(code: str) -> set:
+    """Módulos de topo carregados por ``code`` além do interpretador vazio."""
+    script = f"import sys; before = set(sys.modules); {code}; print(*sorted(set(sys.modules) - before))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return {name.split(".")[0] for name in result.stdout.split()}
+
+
+@pytest.mark.parametrize("code", IMPORTS)
+def test_heavy_dependencies_deferred(code):
+    assert not _loaded(code) & set(HEAVY)
+
+
+def test_import_synapsis_loads_only_the_package():
+    assert _loaded("import synapsis") == {"synapsis"}
+
+
+def test_lazy_attributes():
+    assert set(synapsis.__all__) <= set(dir(synapsis))
+    assert synapsis.render_html_string("title: Raiz").startswith("<!DOCTYPE html>")
+    with pytest.raises(AttributeError):
+        synapsis.nao_existe
@@ -0,0 +1,105 @@
+"""Testes do layout no servidor e da renderização SVG."""
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from synapsis import layout_tree, render_svg, render_thumbnail
+from synapsis.layout import H_GAP, estimate_size
+from synapsis.synthetic import generate_tree
+from synapsis.tracing import tree_attributes
+
+
+def _rows(layout):
+    rows = defaultdict(list)
+    for i in range(len(layout)):
+        rows[layout.depth[i]].append(i)
+    return rows
+
+
+class TestLayoutTree:
+    def test_no_overlap_in_level(self):
+        tree = generate_tree(depth=5, fanout=(1, 5), emoji_ratio=0.3, seed=3)
+        layout = layout_tree(tree)
+        for row in _rows(layout).values():
+            for a, b in zip(row, row[1:]):
+                assert layout.x[a] + layout.w[a] + H_GAP <= layout.x[b] + 1e-6
+    
+    def test_parent_centered_over_children(self):
+        tree = generate_tree(depth=4, fanout=(1, 4), seed=4)
+        layout = layout_tree(tree)
+        children = defaultdict(list)
+        for i in range(1, len(layout)):
+            children[layout.parent[i]].append(i)
+        
+        def center(i):
+            return layout.x[i] + layout.w[i] / 2
+        
+        for parent, kids in children.items():
+            assert abs(center(parent) - (center(kids[0]) + center(kids[-1])) / 2) < 1e-6
+    
+    def test_levels_top_to_bottom(self):
+        layout = layout_tree(generate_tree(depth=3, fanout=2))
+        for i in range(1, len(layout)):
+            assert layout.y[i] >= layout.y[layout.parent[i]] + layout.h[layout.parent[i]]
+        assert min(layout.x) == 0
+        assert layout.width == max(x + w for x, w in zip(layout.x, layout.w))
+    
+    def test_compact_subtrees(self):
+        # Subárvores vizinhas se encaixam: a largura fica abaixo da soma das folhas
+        tree = {"title": "r", "children": [
+            {"title": "a", "children": [{"title": "a1"}, {"title": "a2"}, {"title": "a3"}]},
+            {"title": "b"},
+            {"title": "c", "children": [{"title": "c1"}, {"title": "c2"}, {"title": "c3"}]},
+        ]}
+        layout = layout_tree(tree)
+        leaves = sum(layout.w[i] + H_GAP for i in range(len(layout)) if layout.depth[i] == 2)
+        assert layout.width < leaves
+    
+    def test_collapsed_children_skipped(self):
+        tree = generate_tree(depth=4, fanout=3, collapsed_ratio=0.5, seed=5)
+        assert len(layout_tree(tree)) < tree_attributes(tree)["nodes"]
+        assert len(layout_tree(tree, include_collapsed=True)) == tree_attributes(tree)["nodes"]
+    
+    def test_max_depth(self):
+        layout = layout_tree(generate_tree(depth=5, fanout=3), max_depth=2)
+        assert len(layout) == 4
+        assert max(layout.depth) == 1
+    
+    def test_deep_tree_no_recursion(self):
+        tree = node = {"title": "0"}
+        for i in range(1, 3000):
+            node["children"] = [{"title": str(i)}]
+            node = node["children"][0]
+        layout = layout_tree(tree)
+        assert len(layout) == 3000
+        assert len(set(round(layout.x[i] + layout.w[i] / 2, 6) for i in range(len(layout)))) == 1
+    
+    def test_custom_measure(self):
+        layout = layout_tree(generate_tree(depth=2, fanout=3), measure=lambda node, depth: (10, 10), h_gap=5)
+        row = _rows(layout)[1]
+        assert [layout.x[i] for i in row] == [0, 15, 30]
+    
+    def test_wide_characters(self):
+        assert estimate_size({"title": "漢字"}, 1)[0] > estimate_size({"title": "ab"}, 1)[0]
+
+
+class TestRenderSvg:
+    def test_valid_svg(self):
+        tree = generate_tree(depth=3, fanout=3, emoji_ratio=0.5, unicode_ratio=0.5, seed=6)
+        root = ET.fromstring(render_svg(tree))
+        texts = root.findall("{http://www.w3.org/2000/svg}text")
+        assert len(texts) == tree_attributes(tree)["nodes"]
+    
+    def test_escaping(self):
+        tree = {"title": "<script>&", "color": "red\" onload=\"x", "children": [{"title": "a \"b\""}]}
+        svg = render_svg(tree)
+        root = ET.fromstring(svg)
+        assert "<script>" not in svg and "onload" not in svg
+        assert root.findall("{http://www.w3.org/2000/svg}text")[0].text == "<script>&"
+    
+    def test_thumbnail_small(self):
+        tree = generate_tree(depth=5, fanout=4, seed=7)
+        thumb = render_thumbnail(tree, width=200)
+        root = ET.fromstring(thumb)
+        assert root.get("width") == "200"
+        assert not root.findall("{http://www.w3.org/2000/svg}text")
+        assert len(root.findall("{http://www.w3.org/2000/svg}rect")) == 1 + 4 + 16
+        assert len(thumb) < len(render_svg(tree)) / 10
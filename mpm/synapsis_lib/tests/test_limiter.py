@@ -0,0 +1,281 @@
+"""Testes do limite adaptativo de concorrência."""
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from synapsis import AdaptiveLimiter, generate
+from synapsis.limiter import is_overload
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class SimulatedProvider:
+    """Provider com capacidade fixa.
+    
+    Acima da capacidade responde 429 ou, com ``queueing=True``, enfileira:
+    a latência cresce na proporção da sobrecarga.
+    """
+    
+    def __init__(self, capacity: int, latency: float = 0.002, queueing: bool = False):
+        self.capacity = capacity
+        self.latency = latency
+        self.queueing = queueing
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.rejected = 0
+    
+    async def __call__(self, prompt: str) -> str:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.calls += 1
+        try:
+            overload = self.in_flight / self.capacity
+            if overload > 1 and not self.queueing:
+                self.rejected += 1
+                raise RateLimitError("429")
+            await asyncio.sleep(self.latency * max(1.0, overload))
+            return "title: Raiz"
+        finally:
+            self.in_flight -= 1
+
+
+def _call(limiter, clock, latency, error=None, saturate=True, key=None, size=1):
+    """Uma chamada de `latency` segundos no relógio falso."""
+    started = limiter.acquire()
+    # Ocupa o resto do limite para a chamada contar como saturada
+    others = [limiter.start() for _ in range(limiter.limit - limiter.in_flight)] if saturate else []
+    clock.now += latency
+    limiter.release(started, error, key, size)
+    for other in others:
+        # Erro comum: libera a vaga sem alterar o limite
+        limiter.release(other, ValueError())
+
+
+class TestController:
+    def test_additive_increase_when_saturated(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=4, max_limit=10, clock=clock)
+        for _ in range(40):
+            _call(limiter, clock, 1.0)
+        assert 8 <= limiter.limit <= 10
+    
+    def test_no_increase_when_underused(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=4, clock=clock)
+        for _ in range(40):
+            _call(limiter, clock, 1.0, saturate=False)
+        assert limiter.limit == 4
+    
+    def test_overload_halves_once_per_burst(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=16, clock=clock)
+        # Quatro chamadas iniciadas antes da primeira redução
+        started = [limiter.start() for _ in range(4)]
+        clock.now += 1
+        for s in started:
+            limiter.release(s, RateLimitError())
+        assert limiter.limit == 8
+        
+        # Chamada iniciada depois da redução reduz de novo
+        _call(limiter, clock, 1.0, error=TimeoutError(), saturate=False)
+        assert limiter.limit == 4
+    
+    def test_latency_inflation_reduces(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=8, max_limit=8, clock=clock)
+        for _ in range(20):
+            _call(limiter, clock, 1.0)
+        _call(limiter, clock, 10.0)
+        assert limiter.limit == 4
+    
+    def test_latency_baseline_per_key(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=8, max_limit=8, clock=clock)
+        for _ in range(20):
+            _call(limiter, clock, 1.0, key="rapido")
+            _call(limiter, clock, 10.0, key="profundo")
+        assert limiter.limit == 8
+    
+    def test_latency_per_token(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=8, max_limit=8, clock=clock)
+        # Mesma velocidade (10 ms/token), respostas de 20 a 2000 tokens
+        for i in range(60):
+            tokens = 20 if i == 0 else 200 + (i * 379) % 1800
+            _call(limiter, clock, 0.01 * tokens, size=tokens)
+        assert limiter.limit == 8
+        assert limiter.baseline() == pytest.approx(0.01)
+        
+        # Velocidade por token 3x pior: reduz
+        _call(limiter, clock, 0.03 * 1000, size=1000)
+        _call(limiter, clock, 0.03 * 1000, size=1000)
+        assert limiter.limit == 4
+    
+    def test_fast_outlier_does_not_pin_baseline(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=8, max_limit=8, clock=clock)
+        for i in range(40):
+            # Uma resposta 10x mais rápida (ex: cache do provider) no meio
+            _call(limiter, clock, 0.1 if i == 3 else 1.0)
+        assert limiter.baseline() == 1.0
+        assert limiter.limit == 8
+    
+    def test_baseline_window(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=8, max_limit=8, window=10, tolerance=100, clock=clock)
+        for _ in range(10):
+            _call(limiter, clock, 1.0)
+        for _ in range(10):
+            _call(limiter, clock, 3.0)
+        # A referência acompanha o provider mais lento
+        assert limiter.baseline() == 3.0
+        assert limiter.baseline("outra") is None
+    
+    def test_other_errors_do_not_change_limit(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=6, clock=clock)
+        _call(limiter, clock, 1.0, error=ValueError("yaml"))
+        assert limiter.limit == 6
+    
+    def test_bounds(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(initial=100, min_limit=2, max_limit=5, clock=clock)
+        assert limiter.limit == 5
+        for _ in range(5):
+            _call(limiter, clock, 1.0, error=RateLimitError(), saturate=False)
+        assert limiter.limit == 2
+    
+    def test_is_overload(self):
+        class APITimeoutError(Exception):
+            pass
+        
+        assert is_overload(RateLimitError())
+        assert is_overload(TimeoutError())
+        assert is_overload(asyncio.TimeoutError())
+        assert is_overload(APITimeoutError())
+        assert not is_overload(ValueError())
+
+
+class TestWrap:
+    def test_gate_caps_in_flight(self):
+        limiter = AdaptiveLimiter(initial=3, max_limit=3)
+        lock = threading.Lock()
+        state = {"now": 0, "peak": 0}
+        
+        def llm(prompt):
+            with lock:
+                state["now"] += 1
+                state["peak"] = max(state["peak"], state["now"])
+            time.sleep(0.005)
+            with lock:
+                state["now"] -= 1
+            return prompt
+        
+        wrapped = limiter.wrap(llm)
+        threads = [threading.Thread(target=wrapped, args=("x",)) for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert state["peak"] == 3
+        assert limiter.in_flight == 0
+    
+    def test_errors_propagate(self):
+        limiter = AdaptiveLimiter(initial=4)
+        
+        def llm(prompt):
+            raise RateLimitError("429")
+        
+        with pytest.raises(RateLimitError):
+            limiter.wrap(llm)("x")
+        assert limiter.in_flight == 0
+        assert limiter.limit == 2
+    
+    def test_wrap_measures_response(self):
+        clock = FakeClock()
+        limiter = AdaptiveLimiter(clock=clock)
+        
+        def llm(prompt):
+            clock.now += 0.01 * len(prompt)
+            return "x" * (4 * len(prompt))
+        
+        wrapped = limiter.wrap(llm)
+        for size in (10, 100, 1000):
+            wrapped("p" * size)
+        # ~4 caracteres por token: 0.01 s por token em todas
+        assert limiter.baseline() == pytest.approx(0.01)
+        
+        limiter = AdaptiveLimiter(clock=clock, measure=None)
+        limiter.wrap(llm)("p" * 10)
+        assert limiter.baseline() == pytest.approx(0.1)
+    
+    def test_generate_with_wrapped_llm(self, tmp_path):
+        limiter = AdaptiveLimiter()
+        path = generate("Python", limiter.wrap(lambda p: "title: Python"), output=str(tmp_path / "m.html"))
+        assert Path(path).exists()
+    
+    def _simulate(self, provider, limiter, workers=24, calls=40):
+        wrapped = limiter.wrap_async(provider)
+        limits = []
+        
+        async def worker():
+            for _ in range(calls):
+                try:
+                    await wrapped("x")
+                except RateLimitError:
+                    pass
+                limits.append(limiter.limit)
+        
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        
+        asyncio.run(main())
+        assert limiter.in_flight == 0
+        return limits
+    
+    def test_converges_on_rate_limits(self):
+        provider = SimulatedProvider(capacity=6)
+        limits = self._simulate(provider, AdaptiveLimiter(initial=2, max_limit=32))
+        # Sobe acima do inicial, mas oscila em torno da capacidade
+        assert max(limits) >= 6
+        assert max(limits) <= 2 * provider.capacity
+        assert provider.rejected < 0.1 * provider.calls
+    
+    def test_converges_on_latency(self):
+        provider = SimulatedProvider(capacity=6, latency=0.004, queueing=True)
+        limits = self._simulate(provider, AdaptiveLimiter(initial=2, max_limit=32))
+        # Sem 429: sobe até a latência dobrar (~2x a capacidade) e recua
+        assert max(limits) >= provider.capacity
+        assert sum(limits) / len(limits) < 3 * provider.capacity
+        assert min(limits[len(limits) // 4:]) < max(limits)
+    
+    def test_async_cancel_releases(self):
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        
+        async def slow(prompt):
+            await asyncio.sleep(1)
+        
+        async def main():
+            wrapped = limiter.wrap_async(slow)
+            first = asyncio.create_task(wrapped("a"))
+            second = asyncio.create_task(wrapped("b"))
+            await asyncio.sleep(0.01)
+            second.cancel()
+            first.cancel()
+            await asyncio.gather(first, second, return_exceptions=True)
+        
+        asyncio.run(main())
+        assert limiter.in_flight == 0
+        assert limiter.limit == 1
@@ -0,0 +1,44 @@
+"""Testes da poda de árvores."""
+from synapsis import prune_tree
+from synapsis.synthetic import generate_tree
+from synapsis.tracing import tree_attributes
+
+
+def _fanout(node):
+    children = node.get("children", [])
+    return max([len(children)] + [_fanout(c) for c in children])
+
+
+class TestPruneTree:
+    def test_no_limits(self):
+        tree = generate_tree(depth=4, fanout=(2, 5), seed=1)
+        pruned, removed = prune_tree(tree)
+        assert pruned == tree and pruned is not tree
+        assert removed == 0
+    
+    def test_depth(self):
+        tree = generate_tree(depth=5, fanout=3)
+        pruned, removed = prune_tree(tree, max_depth=3)
+        assert tree_attributes(pruned) == {"nodes": 1 + 3 + 9, "depth": 3}
+        assert removed == 27 + 81
+    
+    def test_fanout(self):
+        tree = generate_tree(depth=3, fanout=6)
+        pruned, removed = prune_tree(tree, max_fanout=2)
+        assert _fanout(pruned) == 2
+        assert pruned["children"][0]["title"] == tree["children"][0]["title"]
+        assert removed == tree_attributes(tree)["nodes"] - 7
+    
+    def test_max_nodes_breadth_first(self):
+        tree = generate_tree(depth=4, fanout=4)
+        pruned, removed = prune_tree(tree, max_nodes=10)
+        assert tree_attributes(pruned)["nodes"] == 10
+        assert len(pruned["children"]) == 4
+        assert removed == tree_attributes(tree)["nodes"] - 10
+    
+    def test_original_untouched(self):
+        tree = generate_tree(depth=3, fanout=4, collapsed_ratio=0.5, seed=2)
+        before = tree_attributes(tree)
+        pruned, _ = prune_tree(tree, max_depth=2, max_fanout=1)
+        assert tree_attributes(tree) == before
+        assert pruned["children"][0].get("expanded") == tree["children"][0].get("expanded")
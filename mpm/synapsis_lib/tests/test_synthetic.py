@@ -0,0 +1,77 @@
+"""Testes do gerador de mapas sintéticos."""
+import yaml
+from synapsis import SynapsisBuilder, validate_schema
+from synapsis.renderer import render_html_string
+from synapsis.synthetic import generate_tree, generate_yaml, tree_to_yaml, SyntheticLLM
+from synapsis.tracing import tree_attributes
+
+
+def _levels(node, level=1):
+    children = node.get("children", [])
+    yield level, len(children)
+    for child in children:
+        yield from _levels(child, level + 1)
+
+
+class TestGenerateTree:
+    def test_deterministic(self):
+        assert generate_tree(seed=7, depth=3) == generate_tree(seed=7, depth=3)
+        assert generate_tree(seed=7, depth=3) != generate_tree(seed=8, depth=3)
+    
+    def test_depth_and_fanout(self):
+        tree = generate_tree(depth=4, fanout=(2, 3))
+        assert tree_attributes(tree)["depth"] == 4
+        for level, n in _levels(tree):
+            assert n == 0 if level == 4 else 2 <= n <= 3
+    
+    def test_fixed_fanout(self):
+        tree = generate_tree(depth=3, fanout=5)
+        assert tree_attributes(tree)["nodes"] == 1 + 5 + 25
+    
+    def test_max_nodes(self):
+        tree = generate_tree(depth=7, fanout=8, max_nodes=1000)
+        assert tree_attributes(tree)["nodes"] == 1000
+    
+    def test_title_words(self):
+        tree = generate_tree(depth=2, fanout=10, title_words=3, emoji_ratio=0)
+        for child in tree["children"]:
+            # 3 palavras + contador
+            assert len(child["title"].split()) == 4
+    
+    def test_unicode_and_emoji(self):
+        tree = generate_tree(depth=3, fanout=6, unicode_ratio=1.0, emoji_ratio=1.0)
+        assert all("icon" in child for child in tree["children"])
+        assert not tree["children"][0]["title"].isascii()
+    
+    def test_collapsed(self):
+        tree = generate_tree(depth=2, fanout=20, collapsed_ratio=1.0)
+        assert all(child["expanded"] is False for child in tree["children"])
+        assert "expanded" not in tree
+
+
+class TestSyntheticYaml:
+    def test_roundtrip(self):
+        tree = generate_tree(depth=4, unicode_ratio=0.5, seed=3)
+        assert yaml.safe_load(tree_to_yaml(tree)) == tree
+    
+    def test_valid_schema(self):
+        valid, errors = validate_schema(generate_yaml(depth=4, fanout=(5, 8)))
+        assert valid, errors
+    
+    def test_fences(self):
+        assert generate_yaml(depth=2, fences=True).startswith("```yaml\n")
+    
+    def test_large_map_renders(self):
+        text = generate_yaml(depth=6, fanout=(5, 8), max_nodes=2000, seed=1)
+        valid, _ = validate_schema(text)
+        assert valid
+        html = render_html_string(text)
+        assert " 2000\"" in html
+
+
+class TestSyntheticLLM:
+    def test_builder(self):
+        llm = SyntheticLLM(depth=4, fanout=3, fences=True)
+        builder = SynapsisBuilder(llm).expand("Python").validate()
+        assert yaml.safe_load(builder.get_yaml()) == llm.tree
+        assert llm.calls == 1
@@ -0,0 +1,136 @@
+"""Testes dos hooks de tracing."""
+import asyncio
+import pytest
+import tempfile
+from pathlib import Path
+from synapsis import generate, SynapsisBuilder, InMemoryRecorder, OpenTelemetryEmitter, ValidationError
+from synapsis.tracing import Tracer, estimate_tokens, tree_attributes
+
+
+class TestTracer:
+    def test_span_without_hooks(self):
+        tracer = Tracer()
+        with tracer.span("x", a=1) as attrs:
+            attrs["b"] = 2
+        assert not tracer.enabled
+    
+    def test_span_records_duration(self):
+        recorder = InMemoryRecorder()
+        with Tracer([recorder]).span("x", a=1) as attrs:
+            attrs["b"] = 2
+        
+        span, = recorder.spans
+        assert span["stage"] == "x"
+        assert span["duration"] >= 0
+        assert span["attributes"] == {"a": 1, "b": 2}
+    
+    def test_span_records_error(self):
+        recorder = InMemoryRecorder()
+        with pytest.raises(KeyError):
+            with Tracer([recorder]).span("x"):
+                raise KeyError("falha")
+        assert recorder.spans[0]["attributes"]["error"] == "KeyError"
+    
+    def test_tree_attributes(self):
+        tree = {"title": "a", "children": [{"title": "b", "children": [{"title": "c"}]}, {"title": "d"}]}
+        assert tree_attributes(tree) == {"nodes": 4, "depth": 3}
+        assert tree_attributes(None) == {"nodes": 0, "depth": 0}
+    
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcdefgh") == 2
+
+
+class TestBuilderHooks:
+    def test_stages(self, mock_llm):
+        recorder = InMemoryRecorder()
+        builder = SynapsisBuilder(mock_llm, hooks=[recorder])
+        builder.plan("Python").expand("Python").validate().to_html()
+        
+        assert recorder.stages() == ["plan", "expand", "validate", "render"]
+    
+    def test_llm_attributes(self, mock_llm):
+        recorder = InMemoryRecorder()
+        SynapsisBuilder(mock_llm).add_hook(recorder).expand("Python")
+        
+        attrs = recorder.by_stage("expand")[0]["attributes"]
+        assert attrs["topic"] == "Python"
+        assert attrs["prompt_bytes"] > 0
+        assert attrs["prompt_tokens"] > 0
+        assert attrs["response_bytes"] == len(mock_llm("").encode("utf-8"))
+    
+    def test_validate_attributes(self, mock_llm):
+        recorder = InMemoryRecorder()
+        SynapsisBuilder(mock_llm, hooks=[recorder]).expand("Python").validate()
+        
+        attrs = recorder.by_stage("validate")[0]["attributes"]
+        assert attrs["nodes"] == 4
+        assert attrs["depth"] == 3
+    
+    def test_validate_error(self, invalid_no_title_yaml):
+        recorder = InMemoryRecorder()
+        builder = SynapsisBuilder(lambda p: invalid_no_title_yaml, hooks=[recorder])
+        with pytest.raises(ValidationError):
+            builder.expand("Python").validate()
+        assert recorder.by_stage("validate")[0]["attributes"]["error"] == "ValidationError"
+    
+    def test_expand_async(self, mock_llm):
+        async def async_llm(prompt):
+            return mock_llm(prompt)
+        
+        recorder = InMemoryRecorder()
+        builder = SynapsisBuilder(async_llm, hooks=[recorder])
+        asyncio.run(builder.expand_async("Python"))
+        assert recorder.by_stage("expand")[0]["attributes"]["response_bytes"] > 0
+    
+    def test_generate_hooks(self, mock_llm):
+        recorder = InMemoryRecorder()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = Path(tmpdir) / "test.html"
+            generate("Python", mock_llm, output=str(output), hooks=[recorder])
+            size = output.stat().st_size
+        
+        assert recorder.stages() == ["expand", "validate", "render"]
+        assert recorder.by_stage("render")[0]["attributes"]["output_bytes"] == size
+
+
+class FakeOtelSpan:
+    def __init__(self, name, start_time, attributes):
+        self.name = name
+        self.start_time = start_time
+        self.attributes = attributes
+        self.end_time = None
+    
+    def end(self, end_time=None):
+        self.end_time = end_time
+
+
+class FakeOtelTracer:
+    def __init__(self):
+        self.spans = []
+    
+    def start_span(self, name, start_time=None, attributes=None):
+        span = FakeOtelSpan(name, start_time, attributes)
+        self.spans.append(span)
+        return span
+
+
+class TestOpenTelemetryEmitter:
+    def test_emits_spans(self, mock_llm):
+        tracer = FakeOtelTracer()
+        builder = SynapsisBuilder(mock_llm, hooks=[OpenTelemetryEmitter(tracer)])
+        builder.expand("Python").validate()
+        
+        names = [span.name for span in tracer.spans]
+        assert names == ["synapsis.expand", "synapsis.validate"]
+        
+        span = tracer.spans[1]
+        assert span.attributes["synapsis.nodes"] == 4
+        assert span.end_time >= span.start_time
+    
+    def test_error_type(self):
+        tracer = FakeOtelTracer()
+        with pytest.raises(ValueError):
+            with Tracer([OpenTelemetryEmitter(tracer)]).span("x"):
+                raise ValueError()
+        assert tracer.spans[0].attributes["error.type"] == "ValueError"
@@ -0,0 +1,83 @@
+"""Testes da árvore em arrays paralelos."""
+import pytest
+from synapsis import MindMapTree, encode_tree
+from synapsis.synthetic import generate_tree
+from synapsis.tracing import tree_attributes
+
+
+TREE = {
+    "title": "Raiz",
+    "icon": "🎯",
+    "color": "#667eea",
+    "children": [
+        {
+            "title": "A",
+            "color": "#4CAF50",
+            "expanded": False,
+            "children": [{"title": "A.1"}, {"title": "A.2", "note": "x"}],
+        },
+        {"title": "B", "icon": "📚", "children": [{"title": "B.1"}]},
+    ],
+}
+
+
+class TestConversion:
+    def test_roundtrip(self):
+        assert MindMapTree.from_dict(TREE).to_dict() == TREE
+    
+    def test_synthetic_roundtrip(self):
+        tree = generate_tree(depth=5, fanout=(1, 6), collapsed_ratio=0.2, seed=9)
+        assert MindMapTree.from_dict(tree).to_dict() == tree
+    
+    def test_arrays(self):
+        tree = MindMapTree.from_dict(TREE)
+        assert tree.title == ["Raiz", "A", "A.1", "A.2", "B", "B.1"]
+        assert list(tree.parent) == [-1, 0, 1, 1, 0, 4]
+        assert list(tree.first_child) == [1, 2, -1, -1, 5, -1]
+        assert list(tree.next_sibling) == [-1, 4, 3, -1, -1, -1]
+        assert list(tree.icon) == [0, -1, -1, -1, 1, -1]
+        assert tree.collapsed == {1}
+        assert tree.extra == {3: {"note": "x"}}
+    
+    def test_from_encoded(self):
+        tree = generate_tree(depth=4, fanout=(2, 5), seed=2)
+        a = MindMapTree.from_dict(tree)
+        b = MindMapTree.from_encoded(encode_tree(tree))
+        assert list(a.first_child) == list(b.first_child)
+        assert list(a.next_sibling) == list(b.next_sibling)
+        assert b.to_dict() == tree
+    
+    def test_invalid(self):
+        with pytest.raises(TypeError):
+            MindMapTree.from_dict([])
+
+
+class TestTraversal:
+    def test_preorder_and_bfs(self):
+        tree = MindMapTree.from_dict(TREE)
+        assert list(tree.iter_preorder()) == [0, 1, 2, 3, 4, 5]
+        assert list(tree.iter_preorder(1)) == [1, 2, 3]
+        assert list(tree.iter_bfs()) == [0, 1, 4, 2, 3, 5]
+        assert list(tree.children(0)) == [1, 4]
+    
+    def test_depths(self):
+        tree = generate_tree(depth=5, fanout=(2, 4), seed=1)
+        compact = MindMapTree.from_dict(tree)
+        assert max(compact.depths()) == tree_attributes(tree)["depth"]
+        assert len(compact) == tree_attributes(tree)["nodes"]
+    
+    def test_path_and_find(self):
+        tree = MindMapTree.from_dict(TREE)
+        assert tree.path(3) == ["Raiz", "A", "A.2"]
+        assert tree.find(["Raiz", "A", "A.2"]) == 3
+        assert tree.find(["Raiz"]) == 0
+        assert tree.find(["Raiz", "C"]) is None
+        assert tree.find(["Outra"]) is None
+    
+    def test_subtree(self):
+        tree = MindMapTree.from_dict(TREE)
+        sub = tree.subtree(1)
+        assert len(sub) == 3
+        assert sub.to_dict() == TREE["children"][0]
+        assert tree.to_dict(4) == TREE["children"][1]
+        assert sub.path(2) == ["A", "A.2"]